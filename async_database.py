@@ -0,0 +1,152 @@
+"""
+Akses database untuk varian asyncio bot (main_async.py), memakai pool aiomysql.
+
+Koneksi berjalan dengan autocommit sehingga lookup biasa tidak menahan transaksi;
+blok yang perlu transaksi memakai transaction(). Setiap fetchone/fetchall mengambil
+koneksi sendiri dari pool, jadi beberapa lookup bisa dijalankan bersamaan:
+
+    nama, total = await asyncio.gather(db.fetchone(...), db.fetchone(...))
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import aiomysql
+from config import config
+from database import identity_cache, IDENTITY_NEGATIVE_TTL, IDENTITY_SQL
+from utils.query_stats import query_stats
+
+class InstrumentedAsyncCursor(aiomysql.DictCursor):
+    """DictCursor aiomysql yang mencatat setiap execute ke utils.query_stats (tanpa EXPLAIN)"""
+
+    async def execute(self, query, args=None):
+        started = time.perf_counter()
+        error = True
+        try:
+            result = await super().execute(query, args)
+            error = False
+            return result
+        finally:
+            query_stats.record(
+                query, args, time.perf_counter() - started,
+                rows=None if error else self.rowcount, error=error
+            )
+
+class AsyncDatabase:
+    """Pool koneksi MySQL async; start() harus dipanggil di dalam event loop"""
+
+    def __init__(self, min_size=1, max_size=10, max_lifetime=3600, wait_timeout=10):
+        self.min_size = min_size
+        self.max_size = max(1, max_size)
+        self.max_lifetime = max_lifetime
+        self.wait_timeout = wait_timeout
+        self.pool = None
+
+    @classmethod
+    def from_config(cls):
+        """Ukuran pool dari key DB_ASYNC_POOL_* (default mengikuti DB_POOL_*)"""
+        return cls(
+            min_size=config.get_int('DB_ASYNC_POOL_MIN', config.get_int('DB_POOL_MIN', 1)),
+            max_size=config.get_int('DB_ASYNC_POOL_MAX', config.get_int('DB_POOL_MAX', 10)),
+            max_lifetime=config.get_float('DB_POOL_MAX_LIFETIME', 3600),
+            wait_timeout=config.get_float('DB_POOL_TIMEOUT', 10)
+        )
+
+    async def start(self):
+        if self.pool is None:
+            self.pool = await aiomysql.create_pool(
+                minsize=self.min_size,
+                maxsize=self.max_size,
+                pool_recycle=int(self.max_lifetime),
+                host=config.DB_HOST,
+                user=config.DB_USER,
+                password=config.DB_PASSWORD,
+                db=config.DB_NAME,
+                charset='utf8mb4',
+                cursorclass=InstrumentedAsyncCursor,
+                autocommit=True
+            )
+        return self
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Koneksi dari pool untuk blok async with, None jika koneksi gagal
+        (pola yang sama dengan database.connection).
+        """
+        try:
+            if self.pool is None:
+                await self.start()
+            conn = await asyncio.wait_for(self.pool.acquire(), self.wait_timeout)
+        except Exception as e:
+            print(f"Database connection error: {e}")
+            yield None
+            return
+        try:
+            yield conn
+        finally:
+            self.pool.release(conn)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Cursor dalam satu transaksi: commit jika blok selesai, rollback jika error"""
+        async with self.connection() as conn:
+            if conn is None:
+                raise ConnectionError("Koneksi database gagal")
+            await conn.begin()
+            try:
+                async with conn.cursor() as cur:
+                    yield cur
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
+
+    async def fetchone(self, query, params=()):
+        async with self.connection() as conn:
+            if conn is None:
+                raise ConnectionError("Koneksi database gagal")
+            async with conn.cursor() as cur:
+                await cur.execute(query, params)
+                return await cur.fetchone()
+
+    async def fetchall(self, query, params=()):
+        async with self.connection() as conn:
+            if conn is None:
+                raise ConnectionError("Koneksi database gagal")
+            async with conn.cursor() as cur:
+                await cur.execute(query, params)
+                return await cur.fetchall()
+
+    def stats(self):
+        if self.pool is None:
+            return {'size': 0, 'idle': 0, 'max_size': self.max_size}
+        return {'size': self.pool.size, 'idle': self.pool.freesize, 'max_size': self.pool.maxsize}
+
+# Global async database instance (pool dibuat saat start())
+db = AsyncDatabase.from_config()
+
+async def get_nik_from_telegram(user_id):
+    """Versi async database.get_nik_from_telegram, memakai cache identitas yang sama"""
+    key = str(user_id)
+    cached = identity_cache.get(key, False)
+    if cached is not False:
+        return dict(cached) if cached else None
+
+    try:
+        result = await db.fetchone(IDENTITY_SQL, (user_id,))
+    except Exception as e:
+        print(f"Error get_nik_from_telegram: {e}")
+        return None
+
+    if result:
+        identity_cache.set(key, dict(result))
+    else:
+        identity_cache.set(key, None, ttl=IDENTITY_NEGATIVE_TTL)
+    return result
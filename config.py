@@ -29,6 +29,31 @@ class Config:
         self.BOT_TOKEN = ''
         self.LOG_FILE = 'log_bot.txt'
         self.ITEMS_PER_PAGE = 10
+    
+    def get(self, key, default=None):
+        """Ambil nilai konfigurasi, atau default jika tidak ada di config.txt"""
+        return getattr(self, key, default)
+    
+    def get_int(self, key, default):
+        """Ambil nilai konfigurasi sebagai integer"""
+        try:
+            return int(getattr(self, key, default))
+        except (TypeError, ValueError):
+            return default
+    
+    def get_float(self, key, default):
+        """Ambil nilai konfigurasi sebagai float"""
+        try:
+            return float(getattr(self, key, default))
+        except (TypeError, ValueError):
+            return default
+    
+    def get_bool(self, key, default=False):
+        """Ambil nilai konfigurasi Y/N sebagai boolean"""
+        value = getattr(self, key, None)
+        if value is None:
+            return default
+        return str(value).strip().upper() in ('Y', 'YES', 'TRUE', '1')
 
 # Global config instance
 config = Config()
\ No newline at end of file
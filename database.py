@@ -1,61 +1,494 @@
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import pymysql
 from config import config
+from utils.cache import TTLCache
+from utils.query_stats import query_stats, explain_rows
 
-def connection():
-    """Create database connection"""
+class PoolTimeout(Exception):
+    """Tidak ada koneksi yang tersedia dalam batas waktu tunggu"""
+
+class InstrumentedCursor(pymysql.cursors.DictCursor):
+    """DictCursor yang mencatat setiap execute/executemany ke utils.query_stats (dan span metrik)"""
+
+    _in_many = False
+
+    def _explain(self, query, args):
+        return lambda: explain_rows(self.connection, query, args, pymysql.cursors.DictCursor)
+
+    def execute(self, query, args=None):
+        if self._in_many:
+            # Bagian dari executemany, dicatat sekali oleh executemany
+            return super().execute(query, args)
+        started = time.perf_counter()
+        error = True
+        try:
+            result = super().execute(query, args)
+            error = False
+            return result
+        finally:
+            query_stats.record(
+                query, args, time.perf_counter() - started,
+                rows=None if error else self.rowcount, error=error, explain=self._explain(query, args)
+            )
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        self._in_many = True
+        error = True
+        try:
+            result = super().executemany(query, args)
+            error = False
+            return result
+        finally:
+            self._in_many = False
+            query_stats.record(
+                query, args, time.perf_counter() - started,
+                rows=None if error else self.rowcount, error=error
+            )
+
+def create_connection():
+    """Create database connection (koneksi fisik baru, tanpa pool)"""
+    return pymysql.connect(
+        host=config.DB_HOST,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        db=config.DB_NAME,
+        charset='utf8mb4',
+        cursorclass=InstrumentedCursor
+    )
+
+class _PooledEntry:
+    """Koneksi fisik beserta waktu dibuat dan terakhir dipakai"""
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+class ConnectionPool:
+    """
+    Pool koneksi MySQL yang thread-safe.
+
+    - min_size/max_size: jumlah koneksi minimal yang dipertahankan dan maksimal yang boleh dibuka
+    - max_lifetime: koneksi yang lebih tua dari ini (detik) ditutup saat dikembalikan/diambil
+    - max_idle: koneksi idle lebih lama dari ini (detik) ditutup oleh reaper, selama di atas min_size
+    - wait_timeout: lama menunggu koneksi bebas sebelum PoolTimeout
+    - ping_interval: koneksi yang idle lebih lama dari ini di-ping dulu sebelum dipakai
+    """
+
+    def __init__(self, factory=create_connection, min_size=1, max_size=10, max_lifetime=3600,
+                 max_idle=300, wait_timeout=10, ping_interval=5):
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max(1, max_size)
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.wait_timeout = wait_timeout
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._reaper = None
+        self._closed = False
+
+        self._stats = {
+            'created': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'ping_failures': 0,
+            'wait_time_total': 0.0,
+        }
+
+    # ------------------------------------------------------------------ checkout
+
+    def acquire(self, timeout=None):
+        """Ambil koneksi dari pool, buat baru jika perlu dan masih di bawah max_size"""
+        if timeout is None:
+            timeout = self.wait_timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        self._start_reaper()
+
+        while True:
+            entry = None
+            expired = []
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("Pool koneksi sudah ditutup")
+                waited = False
+                timed_out = False
+                while True:
+                    now = time.monotonic()
+                    expired.extend(self._collect_expired(now))
+                    if self._idle:
+                        # LIFO: pakai koneksi yang paling baru dikembalikan (paling "hangat")
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        timed_out = True
+                        break
+                    if not waited:
+                        self._stats['waits'] += 1
+                        waited = True
+                    self._cond.wait(remaining)
+            self._close_entries(expired)
+            if timed_out:
+                raise PoolTimeout(
+                    f"Tidak ada koneksi database bebas dalam {timeout} detik "
+                    f"(max_size={self.max_size})"
+                )
+
+            if entry is None:
+                try:
+                    entry = _PooledEntry(self.factory())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats['created'] += 1
+            elif not self._is_healthy(entry):
+                self._discard(entry)
+                continue
+
+            entry.last_used = time.monotonic()
+            with self._cond:
+                self._in_use[id(entry.conn)] = entry
+                self._stats['checkouts'] += 1
+                self._stats['wait_time_total'] += entry.last_used - started
+            return entry.conn
+
+    def release(self, conn, discard=False):
+        """Kembalikan koneksi ke pool; transaksi yang masih terbuka di-rollback"""
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            return
+
+        now = time.monotonic()
+        if not discard and (not conn.open or now - entry.created_at > self.max_lifetime):
+            discard = True
+        if not discard:
+            try:
+                # Akhiri transaksi/snapshot agar pemakai berikutnya melihat data terbaru
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            self._discard(entry)
+            return
+
+        entry.last_used = now
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                self._stats['closed'] += 1
+                discard_now = True
+            else:
+                self._idle.append(entry)
+                discard_now = False
+            self._cond.notify()
+        if discard_now:
+            self._close_quietly(entry.conn)
+
+    # ------------------------------------------------------------------ maintenance
+
+    def warmup(self):
+        """Buka koneksi sampai min_size agar permintaan pertama tidak menunggu handshake"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                entry = _PooledEntry(self.factory())
+            except Exception as e:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                print(f"Database pool warmup error: {e}")
+                return
+            with self._cond:
+                self._stats['created'] += 1
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def reap(self):
+        """Tutup koneksi idle yang kedaluwarsa (idle terlalu lama atau melewati max_lifetime)"""
+        with self._cond:
+            expired = self._collect_expired(time.monotonic())
+        self._close_entries(expired)
+        return len(expired)
+
+    def close(self):
+        """Tutup semua koneksi idle; koneksi yang sedang dipakai ditutup saat dikembalikan"""
+        with self._cond:
+            self._closed = True
+            entries = list(self._idle)
+            self._idle.clear()
+            self._size -= len(entries)
+            self._stats['closed'] += len(entries)
+            self._cond.notify_all()
+        for entry in entries:
+            self._close_quietly(entry.conn)
+
+    def stats(self):
+        """Statistik pool untuk monitoring"""
+        with self._cond:
+            result = dict(self._stats)
+            result['size'] = self._size
+            result['idle'] = len(self._idle)
+            result['in_use'] = len(self._in_use)
+            result['max_size'] = self.max_size
+        wait_total = result.pop('wait_time_total')
+        result['avg_wait_ms'] = round(wait_total * 1000 / result['checkouts'], 3) if result['checkouts'] else 0.0
+        return result
+
+    # ------------------------------------------------------------------ internal
+
+    def _is_healthy(self, entry):
+        now = time.monotonic()
+        if now - entry.created_at > self.max_lifetime or not entry.conn.open:
+            return False
+        if now - entry.last_used > self.ping_interval:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._stats['ping_failures'] += 1
+                return False
+        return True
+
+    def _collect_expired(self, now):
+        """Ambil entry idle yang harus ditutup. Dipanggil dengan lock dipegang."""
+        expired = []
+        keep = deque()
+        live = self._size
+        # Idle tertua ada di kiri deque
+        for entry in self._idle:
+            too_old = now - entry.created_at > self.max_lifetime
+            too_idle = now - entry.last_used > self.max_idle and live > self.min_size
+            if too_old or too_idle:
+                expired.append(entry)
+                live -= 1
+            else:
+                keep.append(entry)
+        if expired:
+            self._idle = keep
+            self._size -= len(expired)
+            self._stats['closed'] += len(expired)
+            self._cond.notify_all()
+        return expired
+
+    def _discard(self, entry):
+        with self._cond:
+            self._size -= 1
+            self._stats['closed'] += 1
+            self._cond.notify()
+        self._close_quietly(entry.conn)
+
+    def _close_entries(self, entries):
+        for entry in entries:
+            self._close_quietly(entry.conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            if conn.open:
+                conn.close()
+        except Exception:
+            pass
+
+    def _start_reaper(self):
+        if self._reaper is not None:
+            return
+        with self._cond:
+            if self._reaper is not None:
+                return
+            interval = max(5, min(60, self.max_idle / 2))
+            self._reaper = threading.Thread(
+                target=self._reaper_loop, args=(interval,), name='db-pool-reaper', daemon=True
+            )
+            self._reaper.start()
+
+    def _reaper_loop(self, interval):
+        while not self._closed:
+            time.sleep(interval)
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"Database pool reaper error: {e}")
+
+# Global pool instance
+pool = ConnectionPool(
+    min_size=config.get_int('DB_POOL_MIN', 1),
+    max_size=config.get_int('DB_POOL_MAX', 10),
+    max_lifetime=config.get_float('DB_POOL_MAX_LIFETIME', 3600),
+    max_idle=config.get_float('DB_POOL_MAX_IDLE', 300),
+    wait_timeout=config.get_float('DB_POOL_TIMEOUT', 10),
+    ping_interval=config.get_float('DB_POOL_PING_INTERVAL', 5)
+)
+
+class DbSession:
+    """
+    Unit of work untuk satu update Telegram (message/callback).
+    Koneksi baru diambil dari pool saat pertama kali dibutuhkan, lalu dipakai
+    bersama oleh semua helper database sampai update selesai diproses.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+        self.failed = False
+
+    def connection(self):
+        """Koneksi milik session ini, atau None jika koneksi gagal"""
+        if self.conn is None and not self.failed:
+            try:
+                self.conn = self.pool.acquire()
+            except Exception as e:
+                # Jangan coba lagi di update yang sama, handler lain akan dapat None juga
+                self.failed = True
+                print(f"Database connection error: {e}")
+        return self.conn
+
+    def cursor(self):
+        """Cursor baru pada koneksi session"""
+        conn = self.connection()
+        if conn is None:
+            raise pymysql.err.OperationalError("Koneksi database gagal")
+        return conn.cursor()
+
+    def close(self, discard=False):
+        """Kembalikan koneksi ke pool (transaksi yang belum di-commit di-rollback)"""
+        if self.conn is not None:
+            conn, self.conn = self.conn, None
+            self.pool.release(conn, discard=discard)
+
+_local = threading.local()
+
+def current_session():
+    """Session yang sedang aktif di thread ini, atau None"""
+    return getattr(_local, 'session', None)
+
+@contextmanager
+def db_session():
+    """
+    Ikat satu koneksi ke thread ini selama blok with.
+    Jika sudah ada session aktif, session tersebut yang dipakai (tidak bersarang).
+    """
+    session = current_session()
+    if session is not None:
+        yield session
+        return
+
+    session = DbSession(pool)
+    _local.session = session
+    broken = False
     try:
-        conn = pymysql.connect(
-            host=config.DB_HOST,
-            user=config.DB_USER,
-            password=config.DB_PASSWORD,
-            db=config.DB_NAME,
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        return conn
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        return None
+        yield session
+    except pymysql.err.OperationalError:
+        # Koneksi kemungkinan putus, jangan dikembalikan ke pool
+        broken = True
+        raise
+    finally:
+        _local.session = None
+        session.close(discard=broken)
+
+def request_session(handler):
+    """Decorator handler bot: satu session database untuk setiap update"""
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        with db_session():
+            return handler(*args, **kwargs)
+    return wrapper
+
+@contextmanager
+def connection():
+    """
+    Koneksi database untuk blok with, menghasilkan None jika koneksi gagal.
+    Di dalam session (satu update Telegram) semua pemanggil mendapat koneksi
+    yang sama sehingga lookup ikut transaksi yang sedang berjalan.
+
+        with connection() as conn:
+            if conn is None:
+                ...
+    """
+    with db_session() as session:
+        yield session.connection()
+
+# Cache identitas user berdasarkan ID Telegram, termasuk hasil negatif (belum terdaftar)
+identity_cache = TTLCache(
+    maxsize=config.get_int('IDENTITY_CACHE_SIZE', 5000),
+    ttl=config.get_float('IDENTITY_CACHE_TTL', 300)
+)
+IDENTITY_NEGATIVE_TTL = config.get_float('IDENTITY_CACHE_NEGATIVE_TTL', 30)
+_NOT_CACHED = object()
+
+# Identitas user aktif dari ID Telegram (setiap update)
+IDENTITY_SQL = """
+    SELECT nik, nama
+    FROM tb_karyawan
+    WHERE id_tele = %s AND aktif = 'Y'
+"""
 
 def get_nik_from_telegram(user_id):
     """Get user data from telegram ID"""
-    conn = connection()
-    if conn is None:
-        return None
-    
-    try:
-        with conn.cursor() as sql:
-            sql.execute("""
-                SELECT nik, nama 
-                FROM tb_karyawan 
-                WHERE id_tele = %s AND aktif = 'Y'
-            """, (user_id,))
-            result = sql.fetchone()
-            return result
-    except Exception as e:
-        print(f"Error get_nik_from_telegram: {e}")
-        return None
-    finally:
-        if conn and conn.open:
-            conn.close()
+    key = str(user_id)
+    cached = identity_cache.get(key, _NOT_CACHED)
+    if cached is not _NOT_CACHED:
+        # Salinan, agar pemanggil tidak mengubah isi cache
+        return dict(cached) if cached else None
+
+    with connection() as conn:
+        if conn is None:
+            return None
+
+        try:
+            with conn.cursor() as sql:
+                sql.execute(IDENTITY_SQL, (user_id,))
+                result = sql.fetchone()
+        except Exception as e:
+            print(f"Error get_nik_from_telegram: {e}")
+            return None
+
+    if result:
+        identity_cache.set(key, dict(result))
+    else:
+        identity_cache.set(key, None, ttl=IDENTITY_NEGATIVE_TTL)
+    return result
+
+def invalidate_identity(user_id=None, nik=None):
+    """Hapus identitas dari cache berdasarkan ID Telegram dan/atau NIK"""
+    removed = 0
+    if user_id is not None and identity_cache.delete(str(user_id)):
+        removed += 1
+    if nik is not None:
+        removed += identity_cache.delete_where(lambda key, value: bool(value) and value['nik'] == nik)
+    return removed
+
+def purge_identity_cache():
+    """Kosongkan seluruh cache identitas (perintah admin)"""
+    return identity_cache.clear()
 
 def get_nama_satuan(id_satuan):
-    """Get unit name from tb_satuan"""
-    if not id_satuan:
-        return "PCS"
-    
-    conn = connection()
-    if conn is None:
-        return "PCS"
-    
-    try:
-        with conn.cursor() as sql:
-            sql.execute("SELECT satuan FROM tb_satuan WHERE id = %s AND aktif = 'Y'", (id_satuan,))
-            result = sql.fetchone()
-            return result['satuan'] if result else "PCS"
-    except Exception as e:
-        print(f"Error get_nama_satuan: {e}")
-        return "PCS"
-    finally:
-        if conn and conn.open:
-            conn.close()
\ No newline at end of file
+    """Get unit name from tb_satuan (lewat kamus satuan di memori, lihat utils.satuan)"""
+    from utils.satuan import get_nama_satuan as nama_satuan_registry
+    return nama_satuan_registry(id_satuan)
@@ -0,0 +1,69 @@
+from config import config
+from database import purge_identity_cache, pool
+from utils.satuan import satuan_registry
+from utils.catalog import catalog_registry
+from utils.query_stats import query_stats
+
+def is_admin(user_id):
+    """Cek apakah ID Telegram termasuk ADMIN_IDS di config.txt"""
+    admin_ids = [i.strip() for i in str(config.get('ADMIN_IDS', '')).split(',') if i.strip()]
+    return str(user_id) in admin_ids
+
+def handle_purge_cache(message, bot):
+    """Handle /purgecache: kosongkan cache identitas dan katalog, lalu muat ulang kamus satuan"""
+    if not is_admin(message.from_user.id):
+        bot.reply_to(message, "Perintah ini hanya untuk admin.")
+        return
+    
+    total_identitas = purge_identity_cache()
+    total_katalog = catalog_registry.invalidate()
+    satuan_ok = satuan_registry.refresh()
+    
+    pesan = "CACHE DIBERSIHKAN\n\n"
+    pesan += f"Identitas dihapus: {total_identitas}\n"
+    pesan += f"Katalog supplier dihapus: {total_katalog}\n"
+    pesan += f"Kamus satuan: {'dimuat ulang' if satuan_ok else 'gagal dimuat ulang'}"
+    bot.reply_to(message, pesan)
+
+def handle_stats(message, bot, dispatcher=None):
+    """Handle /stats: metrik antrian update, pool database, dan cache"""
+    if not is_admin(message.from_user.id):
+        bot.reply_to(message, "Perintah ini hanya untuk admin.")
+        return
+    
+    pesan = "STATISTIK BOT\n\n"
+    if dispatcher is not None:
+        d = dispatcher.stats()
+        pesan += "Antrian update:\n"
+        pesan += f"  Antri: {d['depth']} (maks {d['max_depth']}), user menunggu: {d['users_waiting']}\n"
+        pesan += f"  Worker sibuk: {d['busy']}/{d['workers']}\n"
+        pesan += f"  Diproses: {d['processed']}, error: {d['errors']}, tertahan: {d['blocked']}, ditolak: {d['rejected']}\n"
+        pesan += f"  Tunggu p50/p95/maks: {d['wait_p50_ms']}/{d['wait_p95_ms']}/{d['wait_max_ms']} ms\n"
+        pesan += f"  Proses p50/p95: {d['run_p50_ms']}/{d['run_p95_ms']} ms\n\n"
+    
+    outbox = getattr(bot, 'outbox', None)
+    if outbox is not None:
+        o = outbox.stats()
+        pesan += "Antrian kirim:\n"
+        pesan += f"  Antri: {o['depth']} ({o['chats']} chat)\n"
+        pesan += f"  Terkirim: {o['sent']}, gagal: {o['failed']}, retry 429: {o['retried']}\n"
+        pesan += f"  Digabung: {o['coalesced']}, di-drop: {o['dropped']}\n"
+        pesan += f"  Latensi p50/p95/maks: {o['latency_p50_ms']}/{o['latency_p95_ms']}/{o['latency_max_ms']} ms\n\n"
+    
+    p = pool.stats()
+    pesan += "Pool database:\n"
+    pesan += f"  Koneksi: {p['in_use']} dipakai, {p['idle']} idle (maks {p['max_size']})\n"
+    pesan += f"  Tunggu rata-rata: {p['avg_wait_ms']} ms, timeout: {p['timeouts']}\n\n"
+    
+    queries = query_stats.snapshot(limit=3)
+    if queries:
+        pesan += "Query terberat (total waktu):\n"
+        for q in queries:
+            pesan += f"  {q['fingerprint'][:60]}\n"
+            pesan += f"    {q['count']}x, p95 {q['p95_ms']} ms, lambat: {q['slow']}\n"
+        pesan += "\n"
+    
+    k = catalog_registry.stats()
+    pesan += f"Katalog: {k['suppliers']} supplier, {k['produk']} produk\n"
+    pesan += f"Satuan: {satuan_registry.stats()['satuan']}"
+    bot.reply_to(message, pesan)
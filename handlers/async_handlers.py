@@ -0,0 +1,176 @@
+"""
+Handler async untuk jalur baca yang paling sering dipakai (cek saldo, upload terakhir,
+stok produk, riwayat penerimaan). Teks dan keyboard dibuat oleh fungsi render yang sama dengan handler sinkron;
+lookup yang tidak saling bergantung dijalankan bersamaan dengan asyncio.gather.
+"""
+import asyncio
+from async_database import db, get_nik_from_telegram
+from handlers.penerimaan import (
+    RIWAYAT_PER_PAGE, RIWAYAT_COUNT_SQL, parse_riwayat_callback, riwayat_page_query,
+    riwayat_page_result, riwayat_halaman, render_riwayat_page
+)
+from handlers.saldo import PESAN_BELUM_TERDAFTAR, format_saldo, format_last_upload
+from handlers.stok import (
+    PESAN_BELUM_TERDAFTAR as PESAN_BELUM_TERDAFTAR_STOK,
+    SUPPLIER_USER_SQL, NAMA_SUPPLIER_SQL, STOK_COUNT_SQL, STOK_SELECT_SQL,
+    render_supplier_list, render_stock_page
+)
+from utils.deposit_watcher import get_last_upload_async
+from utils.helpers import log
+from utils.pagination import (
+    count_cache, items_per_page, parse_page_callback,
+    KEYSET_NAMA_SQL, keyset_produk_query, keyset_produk_result
+)
+from utils.saldo_store import read_saldo_async
+
+async def handle_cek_saldo(message, bot):
+    """Handle cek saldo request (async)"""
+    user_data = await get_nik_from_telegram(message.from_user.id)
+    if not user_data:
+        await bot.reply_to(message, PESAN_BELUM_TERDAFTAR, parse_mode='Markdown')
+        return
+
+    nik = user_data['nik']
+    try:
+        saldo = await read_saldo_async(db, nik)
+    except Exception as e:
+        await bot.reply_to(message, f"Terjadi kesalahan: {str(e)}")
+        return
+
+    await bot.reply_to(message, format_saldo(user_data['nama'], nik, saldo), parse_mode='Markdown')
+    log(message, f'mysaldo_auto_{nik}')
+
+async def handle_last_upload(message, bot):
+    """Handle last upload command (async)"""
+    user_data = await get_nik_from_telegram(message.from_user.id)
+    if not user_data:
+        await bot.reply_to(
+            message,
+            "Data tidak ditemukan\n\n"
+            "ID Telegram Anda tidak terdaftar dalam sistem.",
+            parse_mode='Markdown'
+        )
+        return
+
+    nik = user_data['nik']
+    try:
+        hasil_sql = await get_last_upload_async(db, nik)
+    except Exception as e:
+        await bot.reply_to(message, f"Terjadi kesalahan: {str(e)}")
+        return
+
+    await bot.reply_to(message, format_last_upload(user_data['nama'], nik, hasil_sql), parse_mode='Markdown')
+    if hasil_sql:
+        log(message, f'lastupload_auto_{nik}')
+
+async def handle_stok_produk(message, bot):
+    """Handle stok produk request (async): identitas dan daftar supplier dibaca bersamaan"""
+    user_id = str(message.from_user.id)
+    try:
+        user_data, suppliers = await asyncio.gather(
+            get_nik_from_telegram(user_id),
+            db.fetchall(SUPPLIER_USER_SQL, (user_id,))
+        )
+    except Exception as e:
+        await bot.reply_to(message, f"Error: {str(e)}")
+        return
+
+    if not user_data:
+        await bot.reply_to(message, PESAN_BELUM_TERDAFTAR_STOK, parse_mode='Markdown')
+        return
+
+    pesan_balasan, keyboard = render_supplier_list(user_data, suppliers)
+    if keyboard is not None:
+        await bot.send_message(message.chat.id, pesan_balasan, parse_mode='Markdown', reply_markup=keyboard)
+    else:
+        await bot.reply_to(message, pesan_balasan, parse_mode='Markdown')
+
+async def _cached_count(key, query, params):
+    total = count_cache.get(key)
+    if total is None:
+        total = (await db.fetchone(query, params))['total']
+        count_cache.set(key, total)
+    return total
+
+async def _nama_batas(mode, key):
+    if mode is None:
+        return None
+    row = await db.fetchone(KEYSET_NAMA_SQL, (key,))
+    return row['nama_produk'] if row else None
+
+async def _edit_or_send(call, bot, text, keyboard):
+    try:
+        await bot.edit_message_text(
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            text=text,
+            parse_mode='Markdown',
+            reply_markup=keyboard
+        )
+    except Exception:
+        await bot.send_message(call.message.chat.id, text, parse_mode='Markdown', reply_markup=keyboard)
+
+async def handle_stock_callback(call, bot):
+    """
+    Handle stock callback with paging (async).
+    Nama supplier, jumlah produk dan nama baris batas keyset dibaca bersamaan,
+    lalu halaman produk dengan satu query keyset.
+    """
+    base, mode, page_number, key = parse_page_callback(call.data)
+    supplier_id = base.replace('stock_', '')
+    per_page = items_per_page()
+
+    try:
+        supplier_data, total_data, nama = await asyncio.gather(
+            db.fetchone(NAMA_SUPPLIER_SQL, (supplier_id,)),
+            _cached_count(('stok', str(supplier_id)), STOK_COUNT_SQL, (supplier_id,)),
+            _nama_batas(mode, key)
+        )
+        nama_supplier = supplier_data['namasuplier'] if supplier_data else "Supplier"
+        if nama is None:
+            mode = None
+
+        page = None
+        while page is None:
+            rows = await db.fetchall(*keyset_produk_query(STOK_SELECT_SQL, (supplier_id,), mode, nama, key, per_page))
+            page = keyset_produk_result(rows, mode, page_number, total_data, per_page)
+            # Key sudah tidak valid (data berubah), kembali ke halaman pertama
+            mode = None
+    except Exception as e:
+        await bot.answer_callback_query(call.id, f"Error: {str(e)}")
+        print(f"Error in handle_stock_callback: {e}")
+        return
+
+    await _edit_or_send(call, bot, *render_stock_page(nama_supplier, base, page))
+
+async def _riwayat_rows(supplier_id, mode, tgl, id_rcv, limit):
+    rows = await db.fetchall(*riwayat_page_query(supplier_id, mode, tgl, id_rcv, limit))
+    return riwayat_page_result(rows, mode, limit)
+
+async def handle_penerimaan_supplier(call, bot):
+    """
+    Handle riwayat penerimaan supplier dengan paging (async).
+    Nama supplier, jumlah riwayat dan halaman keyset (tgl, id) dibaca bersamaan.
+    """
+    supplier_id, mode, page, cursor_tgl, cursor_id = parse_riwayat_callback(call.data)
+    per_page = RIWAYAT_PER_PAGE
+
+    try:
+        supplier_data, total_data, (rows, has_more) = await asyncio.gather(
+            db.fetchone("SELECT namasuplier FROM tb_suplier WHERE id = %s", (supplier_id,)),
+            _cached_count(('riwayat', str(supplier_id)), RIWAYAT_COUNT_SQL, (supplier_id,)),
+            _riwayat_rows(supplier_id, mode, cursor_tgl, cursor_id, per_page)
+        )
+        nama_supplier = supplier_data['namasuplier'] if supplier_data else "Supplier"
+
+        # Cursor sudah tidak valid (data dihapus), kembali ke halaman pertama
+        if not rows and mode is not None:
+            mode, page = None, 1
+            rows, has_more = await _riwayat_rows(supplier_id, None, None, None, per_page)
+    except Exception as e:
+        await bot.answer_callback_query(call.id, f"Error: {str(e)}")
+        print(f"Error in handle_penerimaan_supplier: {e}")
+        return
+
+    halaman = riwayat_halaman(rows, has_more, mode, page, total_data, per_page)
+    await _edit_or_send(call, bot, *render_riwayat_page(nama_supplier, supplier_id, halaman))
@@ -1,78 +1,68 @@
 import datetime
+import time
 from telebot import types
-from database import connection, get_nik_from_telegram, get_nama_satuan
-from utils.faktur_generator import generate_nomor_faktur_otomatis
+from config import config
+from database import connection, get_nik_from_telegram
+from utils.faktur_generator import generate_nomor_faktur_otomatis, faktur_sequence
+from utils.satuan import satuan_registry
+from utils.catalog import catalog_registry
+from utils.sequence import allocate_norcv
 from utils.helpers import format_rupiah
+from utils.metrics import metrics
+from utils.navigation import show_screen, show_error
+from utils.pagination import (
+    Page, cached_count, invalidate_count, pack_callback, to_base36, from_base36,
+    encode_datetime, decode_datetime, parse_page_callback, first_page_callback,
+    refresh_callback, nav_buttons, add_nav_buttons, keyset_produk_page, sequence_page
+)
+from utils.state_store import create_state_store
 
-# State management untuk proses penerimaan barang
-user_states = {}
-paging_states = {}
+# Jumlah baris detail per INSERT saat menyimpan penerimaan
+DETAIL_INSERT_CHUNK = config.get_int('DETAIL_INSERT_CHUNK', 500)
 
-def tampilkan_produk_dengan_tombol(chat_id, user_state, page=1):
-    """Tampilkan produk dengan tombol paging"""
-    produk_data = user_state['produk_data']
-    
-    # Settings paging
-    items_per_page = 8
-    total_pages = max(1, (len(produk_data) + items_per_page - 1) // items_per_page)
-    
-    # Validasi page
-    if page < 1:
-        page = 1
-    elif page > total_pages:
-        page = total_pages
-    
-    # Calculate start dan end index
-    start_index = (page - 1) * items_per_page
-    end_index = start_index + items_per_page
-    produk_page = produk_data[start_index:end_index]
-    
-    # Simpan state paging
+# Jumlah penerimaan per halaman riwayat
+RIWAYAT_PER_PAGE = config.get_int('RIWAYAT_PER_PAGE', 5)
+
+# State management untuk proses penerimaan barang (key: user_id / chat_id)
+user_states = create_state_store('penerimaan')
+paging_states = create_state_store('paging')
+
+def tampilkan_produk_dengan_tombol(chat_id, user_state, mode=None, key=None):
+    """
+    Tampilkan produk dengan tombol paging.
+    mode/key: posisi keyset dari callback produk_* (None = halaman pertama).
+    """
+    # Snapshot katalog dipakai bersama semua user yang memilih supplier yang sama
+    katalog = catalog_registry.get(user_state['supplier_id'])
+    
+    # Halaman dicari dari posisi produk batas, bukan nomor halaman
+    page = sequence_page(katalog.records, katalog.position, lambda produk: produk.id_produk, mode, key)
+    
+    # Simpan state paging (produk pertama halaman ini untuk kembali ke halaman yang sama)
     paging_states[chat_id] = {
         'supplier_id': user_state['supplier_id'],
-        'current_page': page,
-        'total_pages': total_pages,
-        'produk_data': produk_data
+        'current_page': page.number,
+        'anchor': page.first_key
     }
     
     # Buat keyboard untuk produk
     keyboard = types.InlineKeyboardMarkup(row_width=2)
     
     # Tombol produk
-    for i, produk in enumerate(produk_page, 1):
-        global_index = start_index + i
-        id_produk = produk[0]
-        nama_produk = produk[1] or "Tidak ada nama"
+    for i, produk in enumerate(page.rows, 1):
+        global_index = page.offset + i
+        nama_produk = produk.nama_produk or "Tidak ada nama"
         
+        # Pakai id produk (bukan nomor urut) agar tetap benar walau katalog dimuat ulang
         button_text = f"{global_index}. {nama_produk[:20]}"
         button = types.InlineKeyboardButton(
             text=button_text,
-            callback_data=f"pilih_produk_{global_index}"
+            callback_data=f"pilih_produk_{produk.id_produk}"
         )
         keyboard.add(button)
     
-    # Tombol paging jika ada lebih dari 1 halaman
-    if total_pages > 1:
-        paging_buttons = []
-        
-        # Tombol Previous
-        if page > 1:
-            paging_buttons.append(
-                types.InlineKeyboardButton("⬅️ Prev", callback_data=f"produk_page_{page-1}")
-            )
-        
-        # Info halaman
-        paging_buttons.append(
-            types.InlineKeyboardButton(f"{page}/{total_pages}", callback_data="no_action")
-        )
-        
-        # Tombol Next
-        if page < total_pages:
-            paging_buttons.append(
-                types.InlineKeyboardButton("Next ➡️", callback_data=f"produk_page_{page+1}")
-            )
-        
-        keyboard.add(*paging_buttons)
+    # Tombol paging
+    add_nav_buttons(keyboard, 'produk', page)
     
     # Tombol aksi
     keyboard.row(
@@ -84,447 +74,462 @@ def tampilkan_produk_dengan_tombol(chat_id, user_state, page=1):
     )
     
     pesan_produk = f"🛒 PILIH PRODUK - {user_state['supplier_name']}\n\n"
-    pesan_produk += f"**Halaman:** {page}/{total_pages}\n"
-    pesan_produk += f"**Total produk:** {len(produk_data)} item\n"
-    pesan_produk += f"**Menampilkan:** {len(produk_page)} produk\n\n"
+    pesan_produk += f"**Halaman:** {page.number}/{page.total_pages}\n"
+    pesan_produk += f"**Total produk:** {len(katalog)} item\n"
+    pesan_produk += f"**Menampilkan:** {len(page.rows)} produk\n\n"
     pesan_produk += "Klik produk untuk menambahkan:"
     
     return pesan_produk, keyboard
 
-def handle_penerimaan_menu(message, bot):
-    """Handle menu penerimaan barang"""
-    user_id = str(message.from_user.id)
+def release_faktur_otomatis(user_state):
+    """Lepaskan pesanan nomor faktur otomatis milik proses penerimaan yang tidak jadi disimpan"""
+    if user_state and user_state.get('nofaktur_otomatis'):
+        faktur_sequence.release(user_state['supplier_id'], user_state['nofaktur_otomatis'])
+
+def restore_faktur_reservations():
+    """
+    Pesan ulang nomor faktur otomatis dari state penerimaan yang tersimpan (STATE_BACKEND=sqlite),
+    agar setelah restart nomor tersebut tidak dibagikan lagi ke user lain. Return jumlahnya.
+    """
+    jumlah = 0
+    for _, user_state in user_states.items():
+        if isinstance(user_state, dict) and user_state.get('nofaktur_otomatis'):
+            if faktur_sequence.restore(user_state.get('supplier_id'), user_state['nofaktur_otomatis']):
+                jumlah += 1
+    return jumlah
+
+def render_penerimaan_menu(user_data, suppliers):
+    """Teks dan keyboard menu penerimaan; keyboard None jika user bukan supplier aktif"""
+    if not suppliers:
+        pesan_balasan = f"📦 TIDAK ADA SUPPLIER\n\n"
+        pesan_balasan += f"Nama: **{user_data['nama']}**\n\n"
+        pesan_balasan += "Anda tidak terdaftar sebagai supplier aktif."
+        return pesan_balasan, None
+    
+    # Buat keyboard untuk menu penerimaan
+    keyboard = types.InlineKeyboardMarkup(row_width=2)
+    
+    for supplier in suppliers:
+        id_supplier = supplier['id_supplier']
+        nama_supplier = supplier['nama_supplier']
+        
+        btn_riwayat = types.InlineKeyboardButton(
+            text=f"📦 {nama_supplier[:20]}",
+            callback_data=f"penerimaan_{id_supplier}_page_1"
+        )
+        
+        btn_tambah = types.InlineKeyboardButton(
+            text=f"➕ {nama_supplier[:20]}",
+            callback_data=f"pilih_supplier_{id_supplier}"
+        )
+        
+        keyboard.add(btn_riwayat, btn_tambah)
+    
+    # Tombol refresh
+    keyboard.row(
+        types.InlineKeyboardButton("🔄 Refresh Data", callback_data="refresh_penerimaan")
+    )
+    
+    pesan_balasan = f"📦 PENERIMAAN BARANG\n\n"
+    pesan_balasan += f"Nama: **{user_data['nama']}**\n"
+    pesan_balasan += f"Total Supplier: **{len(suppliers)}**\n\n"
+    pesan_balasan += "**Pilih supplier:**\n"
+    pesan_balasan += "• 📦 Lihat riwayat penerimaan (dengan paging)\n"
+    pesan_balasan += "• ➕ Tambah penerimaan baru"
+    return pesan_balasan, keyboard
+
+def handle_penerimaan_menu(source, bot):
+    """Handle menu penerimaan barang (pesan menu, atau tombol kembali/refresh yang diedit di tempat)"""
+    user_id = str(source.from_user.id)
     
     # Cek apakah user terdaftar
     user_data = get_nik_from_telegram(user_id)
     if not user_data:
-        bot.reply_to(
-            message, 
-            "Data tidak ditemukan\n\nID Telegram Anda tidak terdaftar. Silakan daftar terlebih dahulu.",
-            parse_mode='Markdown'
+        show_error(
+            bot, source,
+            "Data tidak ditemukan\n\nID Telegram Anda tidak terdaftar. Silakan daftar terlebih dahulu."
         )
-        return
+        return False
     
-    conn = connection()
-    if conn is None:
-        bot.reply_to(message, "Koneksi database gagal", parse_mode='Markdown')
-        return
+    with connection() as conn:
+        if conn is None:
+            show_error(bot, source, "Koneksi database gagal")
+            return False
+        
+        try:
+            with conn.cursor() as sql:
+                sql.execute("""
+                    SELECT 
+                        s.id AS id_supplier,
+                        s.namasuplier AS nama_supplier
+                    FROM 
+                        tb_suplier s
+                    JOIN 
+                        tb_karyawan k ON s.id_karyawan = k.id
+                    WHERE 
+                        k.id_tele = %s
+                        AND s.aktif = 'Y'
+                        AND k.aktif = 'Y'
+                    ORDER BY s.namasuplier
+                """, (user_id,))
+                screen = render_penerimaan_menu(user_data, sql.fetchall())
+        except Exception as e:
+            show_error(bot, source, f"Error: {str(e)}", parse_mode=None)
+            return False
+    
+    show_screen(bot, source, screen, reply=screen[1] is None)
+    return True
+
+def parse_riwayat_position(position):
+    """
+    Posisi halaman riwayat (mode, page, tgl, id) dari bagian callback setelah supplier.
+
+    Format: {mode}{page}_{tgl}_{id}, dengan page/tgl/id dalam base36.
+    mode 'n' = halaman setelah key, 'p' = halaman sebelum key, 'r' = mulai dari key (refresh).
+    Format lama page_{n} (atau posisi tidak valid) selalu membuka halaman pertama.
+    """
+    parts = position.split('_')
+    if len(parts) == 3 and parts[0][:1] in ('n', 'p', 'r'):
+        try:
+            return (
+                parts[0][0],
+                max(1, from_base36(parts[0][1:])),
+                decode_datetime(parts[1]),
+                from_base36(parts[2])
+            )
+        except (ValueError, OverflowError):
+            pass
+    return None, 1, None, None
+
+def parse_riwayat_callback(data):
+    """Parse callback riwayat penerimaan_{supplier}_{posisi} menjadi (supplier_id, mode, page, tgl, id)"""
+    supplier_id, _, position = data.replace('penerimaan_', '', 1).partition('_')
+    return (supplier_id,) + parse_riwayat_position(position)
+
+def riwayat_callback(supplier_id, mode, page, penerimaan):
+    """callback_data untuk halaman riwayat relatif terhadap satu baris penerimaan"""
+    if penerimaan['tgl'] is None:
+        return f"penerimaan_{supplier_id}_page_1"
+    return pack_callback(
+        'penerimaan',
+        supplier_id,
+        f"{mode}{to_base36(page)}",
+        encode_datetime(penerimaan['tgl']),
+        to_base36(penerimaan['id'])
+    )
+
+# Riwayat penerimaan supplier untuk keyset paging (tanpa ORDER BY/LIMIT)
+RIWAYAT_SELECT_SQL = """
+    SELECT 
+        r.id,
+        r.norcv,
+        r.nofaktur,
+        r.tgl,
+        r.totalitem,
+        r.totalharga,
+        r.diskon,
+        r.totalfinal,
+        r.keterangan
+    FROM tb_riceve r
+    WHERE r.idsuplier = %s 
+        AND r.aktif = 'Y'
+"""
+
+RIWAYAT_COUNT_SQL = """
+    SELECT COUNT(*) as total
+    FROM tb_riceve r
+    WHERE r.idsuplier = %s AND r.aktif = 'Y'
+"""
+
+# Mapping produk supplier (produk aktif); MAPPING_STATUS_FILTER ditambahkan untuk filter status
+MAPPING_COUNT_SQL = """
+    SELECT COUNT(*) as total
+    FROM tb_suplieritem si
+    JOIN tbl_produk p ON si.iditem = p.id_produk
+    WHERE si.idsuplier = %s 
+        AND p.aktif = 'Y'
+"""
+
+# Untuk keyset paging (tanpa ORDER BY/LIMIT)
+MAPPING_SELECT_SQL = """
+    SELECT 
+        si.id as mapping_id,
+        p.id_produk,
+        p.nama_produk,
+        p.deskripsi,
+        si.harga as harga_beli,
+        s.satuan as nama_satuan,
+        si.isi,
+        si.aktif as status_mapping,
+        p.stok,
+        p.harga as harga_jual
+    FROM tb_suplieritem si
+    JOIN tbl_produk p ON si.iditem = p.id_produk
+    LEFT JOIN tb_satuan s ON si.satuan = s.id
+    WHERE si.idsuplier = %s 
+        AND p.aktif = 'Y'
+"""
+
+MAPPING_STATUS_FILTER = """
+        AND si.aktif = %s
+"""
+
+def riwayat_page_query(supplier_id, mode, tgl, id_rcv, limit):
+    """Query (sql, params) satu halaman riwayat keyset (tgl, id); mode None berarti halaman pertama"""
+    if mode is None:
+        return RIWAYAT_SELECT_SQL + """
+            ORDER BY r.tgl DESC, r.id DESC
+            LIMIT %s
+        """, (supplier_id, limit + 1)
+    if mode == 'p':
+        # Halaman sebelumnya: baca naik dari key, lalu dibalik
+        return RIWAYAT_SELECT_SQL + """
+                AND (r.tgl > %s OR (r.tgl = %s AND r.id > %s))
+            ORDER BY r.tgl ASC, r.id ASC
+            LIMIT %s
+        """, (supplier_id, tgl, tgl, id_rcv, limit + 1)
+    operator = '<=' if mode == 'r' else '<'
+    return RIWAYAT_SELECT_SQL + f"""
+            AND (r.tgl < %s OR (r.tgl = %s AND r.id {operator} %s))
+        ORDER BY r.tgl DESC, r.id DESC
+        LIMIT %s
+    """, (supplier_id, tgl, tgl, id_rcv, limit + 1)
+
+def riwayat_page_result(rows, mode, limit):
+    """(rows urut terbaru dulu, apakah masih ada data ke arah query) dari hasil riwayat_page_query"""
+    rows = list(rows)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if mode == 'p':
+        rows.reverse()
+    return rows, has_more
+
+def query_riwayat_page(sql, supplier_id, mode, tgl, id_rcv, limit):
+    """
+    Ambil satu halaman riwayat dengan keyset (tgl, id) tanpa OFFSET, sehingga
+    halaman mana pun cukup satu range scan di index (idsuplier, aktif, tgl, id).
+    Return (rows urut terbaru dulu, apakah masih ada data ke arah query).
+    """
+    sql.execute(*riwayat_page_query(supplier_id, mode, tgl, id_rcv, limit))
+    return riwayat_page_result(sql.fetchall(), mode, limit)
+
+def riwayat_halaman(rows, has_more, mode, page, total, per_page):
+    """Page riwayat dari hasil query; halaman 'p' tanpa data sebelumnya berarti halaman pertama"""
+    if mode == 'p':
+        has_prev, has_next = has_more, True
+        if not has_more:
+            page = 1
+    else:
+        has_prev, has_next = page > 1, has_more
+    return Page(rows, page, total, per_page, has_prev, has_next)
+
+def render_riwayat_page(nama_supplier, supplier_id, halaman):
+    """Teks dan keyboard satu halaman riwayat penerimaan supplier"""
+    hasil_penerimaan = halaman.rows
+    page = halaman.number
+    
+    if not hasil_penerimaan:
+        # Tidak ada data penerimaan sama sekali
+        keyboard_empty = types.InlineKeyboardMarkup()
+        keyboard_empty.row(
+            types.InlineKeyboardButton("➕ Tambah Penerimaan Pertama", callback_data=f"pilih_supplier_{supplier_id}")
+        )
+        keyboard_empty.row(
+            types.InlineKeyboardButton("🔙 Kembali ke Menu", callback_data="back_to_penerimaan_menu")
+        )
+        return (
+            f"📦 Belum Ada Penerimaan\n\nSupplier **{nama_supplier}** belum memiliki riwayat penerimaan barang.\n\nKlik tombol dibawah untuk menambahkan penerimaan pertama.",
+            keyboard_empty
+        )
     
-    try:
-        with conn.cursor() as sql:
-            sql.execute("""
-                SELECT 
-                    s.id AS id_supplier,
-                    s.namasuplier AS nama_supplier
-                FROM 
-                    tb_suplier s
-                JOIN 
-                    tb_karyawan k ON s.id_karyawan = k.id
-                WHERE 
-                    k.id_tele = %s
-                    AND s.aktif = 'Y'
-                    AND k.aktif = 'Y'
-                ORDER BY s.namasuplier
-            """, (user_id,))
-            
-            hasil_sql = sql.fetchall()
-            
-            if hasil_sql:
-                # Buat keyboard untuk menu penerimaan
-                keyboard = types.InlineKeyboardMarkup(row_width=2)
+    # Buat pesan riwayat penerimaan
+    riwayat_pesan = f"📦 RIWAYAT PENERIMAAN BARANG\n\n"
+    riwayat_pesan += f"**Supplier:** {nama_supplier}\n"
+    riwayat_pesan += f"**Halaman:** {page}/{halaman.total_pages}\n"
+    riwayat_pesan += f"**Total Data:** {halaman.total} penerimaan\n\n"
+    
+    for i, penerimaan in enumerate(hasil_penerimaan, 1):
+        no_rcv = penerimaan['norcv'] or "-"
+        no_faktur = penerimaan['nofaktur'] or "-"
+        tgl = penerimaan['tgl'].strftime('%d-%m-%Y') if penerimaan['tgl'] else "-"
+        total_item = penerimaan['totalitem'] or 0
+        total_final = penerimaan['totalfinal'] or 0
+        keterangan = penerimaan['keterangan'] or "-"
+        
+        total_final_rupiah = format_rupiah(total_final)
+        
+        nomor_urutan = i + halaman.offset
+        riwayat_pesan += f"**{nomor_urutan}. No. RCV:** `{no_rcv}`\n"
+        riwayat_pesan += f"   📅 Tgl: {tgl}\n"
+        riwayat_pesan += f"   📄 Faktur: `{no_faktur}`\n"
+        riwayat_pesan += f"   📦 Item: {total_item} produk\n"
+        riwayat_pesan += f"   💰 Total: {total_final_rupiah}\n"
+        if keterangan and keterangan != "-":
+            riwayat_pesan += f"   📝 Ket: {keterangan[:30]}{'...' if len(keterangan) > 30 else ''}\n"
+        riwayat_pesan += "   ──────────────\n"
+    
+    # Buat keyboard dengan paging
+    keyboard = types.InlineKeyboardMarkup(row_width=5)
+    
+    # Tombol paging (key riwayat berupa tgl+id, jadi callback dibuat sendiri)
+    paging_buttons = nav_buttons(
+        halaman,
+        f"penerimaan_{supplier_id}_page_1",
+        riwayat_callback(supplier_id, 'p', page - 1, hasil_penerimaan[0]),
+        riwayat_callback(supplier_id, 'n', page + 1, hasil_penerimaan[-1])
+    )
+    if paging_buttons:
+        keyboard.row(*paging_buttons)
+    
+    # Tombol aksi
+    action_buttons = []
+    action_buttons.append(
+        types.InlineKeyboardButton("🔄 Refresh", callback_data=riwayat_callback(supplier_id, 'r', page, hasil_penerimaan[0]))
+    )
+    action_buttons.append(
+        types.InlineKeyboardButton("➕ Tambah Baru", callback_data=f"pilih_supplier_{supplier_id}")
+    )
+    keyboard.add(*action_buttons)
+    
+    # Tombol kembali
+    keyboard.row(
+        types.InlineKeyboardButton("🔙 Kembali ke Menu", callback_data="back_to_penerimaan_menu")
+    )
+    return riwayat_pesan, keyboard
+
+def handle_penerimaan_supplier(call, bot, supplier_id, position):
+    """Handle riwayat penerimaan supplier dengan paging (keyset, tanpa OFFSET)"""
+    mode, page, cursor_tgl, cursor_id = parse_riwayat_position(position)
+    items_per_page = RIWAYAT_PER_PAGE
+    
+    with connection() as conn:
+        if conn is None:
+            show_error(bot, call, "Koneksi database gagal")
+            return
+        
+        try:
+            with conn.cursor() as sql:
+                # Query untuk mendapatkan nama supplier
+                sql.execute("SELECT namasuplier FROM tb_suplier WHERE id = %s", (supplier_id,))
+                supplier_data = sql.fetchone()
+                nama_supplier = supplier_data['namasuplier'] if supplier_data else "Supplier"
                 
-                for supplier in hasil_sql:
-                    id_supplier = supplier['id_supplier']
-                    nama_supplier = supplier['nama_supplier']
-                    
-                    btn_riwayat = types.InlineKeyboardButton(
-                        text=f"📦 {nama_supplier[:20]}",
-                        callback_data=f"penerimaan_{id_supplier}_page_1"
-                    )
-                    
-                    btn_tambah = types.InlineKeyboardButton(
-                        text=f"➕ {nama_supplier[:20]}",
-                        callback_data=f"pilih_supplier_{id_supplier}"
-                    )
-                    
-                    keyboard.add(btn_riwayat, btn_tambah)
+                # Total data untuk info halaman (dari cache, dihitung ulang berkala)
+                total_data = cached_count(sql, ('riwayat', str(supplier_id)), RIWAYAT_COUNT_SQL, (supplier_id,))
                 
-                # Tombol refresh
-                keyboard.row(
-                    types.InlineKeyboardButton("🔄 Refresh Data", callback_data="refresh_penerimaan")
+                # Query riwayat penerimaan barang dengan keyset paging
+                hasil_penerimaan, has_more = query_riwayat_page(
+                    sql, supplier_id, mode, cursor_tgl, cursor_id, items_per_page
                 )
                 
-                pesan_balasan = f"📦 PENERIMAAN BARANG\n\n"
-                pesan_balasan += f"Nama: **{user_data['nama']}**\n"
-                pesan_balasan += f"Total Supplier: **{len(hasil_sql)}**\n\n"
-                pesan_balasan += "**Pilih supplier:**\n"
-                pesan_balasan += "• 📦 Lihat riwayat penerimaan (dengan paging)\n"
-                pesan_balasan += "• ➕ Tambah penerimaan baru"
-                
-                bot.send_message(
-                    message.chat.id,
-                    pesan_balasan,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
+                # Cursor sudah tidak valid (data dihapus), kembali ke halaman pertama
+                if not hasil_penerimaan and mode is not None:
+                    mode, page = None, 1
+                    hasil_penerimaan, has_more = query_riwayat_page(
+                        sql, supplier_id, None, None, None, items_per_page
+                    )
                 
-            else:
-                pesan_balasan = f"📦 TIDAK ADA SUPPLIER\n\n"
-                pesan_balasan += f"Nama: **{user_data['nama']}**\n\n"
-                pesan_balasan += "Anda tidak terdaftar sebagai supplier aktif."
-                bot.reply_to(message, pesan_balasan, parse_mode='Markdown')
-            
-    except Exception as e:
-        bot.reply_to(message, f"Error: {str(e)}")
-    finally:
-        if conn and conn.open:
-            conn.close()
+                halaman = riwayat_halaman(hasil_penerimaan, has_more, mode, page, total_data, items_per_page)
+                screen = render_riwayat_page(nama_supplier, supplier_id, halaman)
+        except Exception as e:
+            show_error(bot, call, f"Error: {str(e)}", parse_mode=None)
+            print(f"Error in handle_penerimaan_supplier: {e}")
+            return
+    
+    show_screen(bot, call, screen)
 
-def handle_penerimaan_supplier(call, bot):
-    """Handle riwayat penerimaan supplier dengan paging"""
-    supplier_id = call.data.replace('penerimaan_', '')
-    
-    # Parse page number
-    page = 1
-    if '_page_' in supplier_id:
-        parts = supplier_id.split('_page_')
-        supplier_id = parts[0]
-        page = int(parts[1])
-    
-    conn = connection()
-    if conn is None:
-        bot.answer_callback_query(call.id, "Koneksi database gagal")
-        return
+def handle_pilih_supplier(call, bot, supplier_id):
+    """Handle pemilihan supplier untuk penerimaan baru"""
     
-    try:
-        with conn.cursor() as sql:
-            # Query untuk mendapatkan nama supplier
-            sql.execute("SELECT namasuplier FROM tb_suplier WHERE id = %s", (supplier_id,))
-            supplier_data = sql.fetchone()
-            nama_supplier = supplier_data['namasuplier'] if supplier_data else "Supplier"
-            
-            # Hitung total data untuk paging
-            sql.execute("""
-                SELECT COUNT(*) as total
-                FROM tb_riceve r
-                WHERE r.idsuplier = %s AND r.aktif = 'Y'
-            """, (supplier_id,))
-            
-            total_data = sql.fetchone()['total']
-            items_per_page = 5
-            total_pages = max(1, (total_data + items_per_page - 1) // items_per_page)
-            
-            # Validasi page number
-            if page < 1:
-                page = 1
-            elif page > total_pages:
-                page = total_pages
-            
-            # Calculate offset
-            offset = (page - 1) * items_per_page
-            
-            # Query riwayat penerimaan barang dengan paging
-            sql.execute("""
-                SELECT 
-                    r.id,
-                    r.norcv,
-                    r.nofaktur,
-                    r.tgl,
-                    r.totalitem,
-                    r.totalharga,
-                    r.diskon,
-                    r.totalfinal,
-                    r.keterangan
-                FROM tb_riceve r
-                WHERE r.idsuplier = %s 
-                    AND r.aktif = 'Y'
-                ORDER BY r.tgl DESC, r.id DESC
-                LIMIT %s OFFSET %s
-            """, (supplier_id, items_per_page, offset))
-            
-            hasil_penerimaan = sql.fetchall()
-            
-            if hasil_penerimaan or total_data > 0:
-                # Buat pesan riwayat penerimaan
-                riwayat_pesan = f"📦 RIWAYAT PENERIMAAN BARANG\n\n"
-                riwayat_pesan += f"**Supplier:** {nama_supplier}\n"
-                riwayat_pesan += f"**Halaman:** {page}/{total_pages}\n"
-                riwayat_pesan += f"**Total Data:** {total_data} penerimaan\n\n"
-                
-                if hasil_penerimaan:
-                    for i, penerimaan in enumerate(hasil_penerimaan, 1):
-                        id_rcv = penerimaan['id']
-                        no_rcv = penerimaan['norcv'] or "-"
-                        no_faktur = penerimaan['nofaktur'] or "-"
-                        tgl = penerimaan['tgl'].strftime('%d-%m-%Y') if penerimaan['tgl'] else "-"
-                        total_item = penerimaan['totalitem'] or 0
-                        total_harga = penerimaan['totalharga'] or 0
-                        diskon = penerimaan['diskon'] or 0
-                        total_final = penerimaan['totalfinal'] or 0
-                        keterangan = penerimaan['keterangan'] or "-"
-                        
-                        total_final_rupiah = format_rupiah(total_final)
-                        
-                        nomor_urutan = i + offset
-                        riwayat_pesan += f"**{nomor_urutan}. No. RCV:** `{no_rcv}`\n"
-                        riwayat_pesan += f"   📅 Tgl: {tgl}\n"
-                        riwayat_pesan += f"   📄 Faktur: `{no_faktur}`\n"
-                        riwayat_pesan += f"   📦 Item: {total_item} produk\n"
-                        riwayat_pesan += f"   💰 Total: {total_final_rupiah}\n"
-                        if keterangan and keterangan != "-":
-                            riwayat_pesan += f"   📝 Ket: {keterangan[:30]}{'...' if len(keterangan) > 30 else ''}\n"
-                        riwayat_pesan += "   ──────────────\n"
-                else:
-                    riwayat_pesan += "📭 Tidak ada data pada halaman ini\n\n"
+    with connection() as conn:
+        if conn is None:
+            bot.answer_callback_query(call.id, "Koneksi database gagal")
+            return
+        
+        try:
+            with conn.cursor() as sql:
+                # Query untuk mendapatkan nama supplier
+                sql.execute("SELECT namasuplier FROM tb_suplier WHERE id = %s", (supplier_id,))
+                supplier_data = sql.fetchone()
+                nama_supplier = supplier_data['namasuplier'] if supplier_data else "Supplier"
                 
-                # Buat keyboard dengan paging
-                keyboard = types.InlineKeyboardMarkup(row_width=5)
+                # Katalog produk supplier (snapshot bersama, dimuat jika belum ada)
+                katalog = catalog_registry.peek(supplier_id) or catalog_registry.load(sql, supplier_id)
                 
-                # Tombol paging hanya jika ada lebih dari 1 halaman
-                if total_pages > 1:
-                    paging_buttons = []
+                if len(katalog):
+                    # Lepaskan nomor faktur dari proses penerimaan sebelumnya yang belum selesai
+                    release_faktur_otomatis(user_states.get(str(call.from_user.id)))
                     
-                    # Tombol Previous
-                    if page > 1:
-                        paging_buttons.append(
-                            types.InlineKeyboardButton("⬅️", callback_data=f"penerimaan_{supplier_id}_page_{page-1}")
-                        )
-                    
-                    # Tombol nomor halaman
-                    start_page = max(1, page - 1)
-                    end_page = min(total_pages, page + 1)
+                    # Generate nomor faktur otomatis (memakai koneksi yang sama)
+                    nomor_faktur_otomatis = generate_nomor_faktur_otomatis(
+                        supplier_id,
+                        conn=conn,
+                        nama_supplier=supplier_data['namasuplier'] if supplier_data else None
+                    )
                     
-                    for p in range(start_page, end_page + 1):
-                        if p == page:
-                            paging_buttons.append(
-                                types.InlineKeyboardButton(f"•{p}•", callback_data=f"penerimaan_{supplier_id}_page_{p}")
-                            )
-                        else:
-                            paging_buttons.append(
-                                types.InlineKeyboardButton(str(p), callback_data=f"penerimaan_{supplier_id}_page_{p}")
-                            )
+                    # Simpan state user
+                    user_states[str(call.from_user.id)] = {
+                        'state': 'waiting_for_faktur',
+                        'supplier_id': supplier_id,
+                        'supplier_name': nama_supplier,
+                        'items': [],
+                        'nofaktur_otomatis': nomor_faktur_otomatis
+                    }
                     
-                    # Tombol Next
-                    if page < total_pages:
-                        paging_buttons.append(
-                            types.InlineKeyboardButton("➡️", callback_data=f"penerimaan_{supplier_id}_page_{page+1}")
-                        )
-                    
-                    if paging_buttons:
-                        keyboard.add(*paging_buttons)
-                
-                # Tombol aksi
-                action_buttons = []
-                action_buttons.append(
-                    types.InlineKeyboardButton("🔄 Refresh", callback_data=f"penerimaan_{supplier_id}_page_{page}")
-                )
-                action_buttons.append(
-                    types.InlineKeyboardButton("➕ Tambah Baru", callback_data=f"pilih_supplier_{supplier_id}")
-                )
-                keyboard.add(*action_buttons)
-                
-                # Tombol kembali
-                keyboard.row(
-                    types.InlineKeyboardButton("🔙 Kembali ke Menu", callback_data="back_to_penerimaan_menu")
-                )
-                
-                # Edit atau kirim pesan baru
-                try:
-                    bot.edit_message_text(
-                        chat_id=call.message.chat.id,
-                        message_id=call.message.message_id,
-                        text=riwayat_pesan,
-                        parse_mode='Markdown',
-                        reply_markup=keyboard
-                    )
-                except Exception as e:
-                    bot.send_message(
-                        call.message.chat.id,
-                        riwayat_pesan,
-                        parse_mode='Markdown',
-                        reply_markup=keyboard
-                    )
-                
-            else:
-                # Tidak ada data penerimaan sama sekali
-                keyboard_empty = types.InlineKeyboardMarkup()
-                keyboard_empty.row(
-                    types.InlineKeyboardButton("➕ Tambah Penerimaan Pertama", callback_data=f"pilih_supplier_{supplier_id}")
-                )
-                keyboard_empty.row(
-                    types.InlineKeyboardButton("🔙 Kembali ke Menu", callback_data="back_to_penerimaan_menu")
-                )
-                
-                try:
+                    # Hapus keyboard sebelumnya
                     bot.edit_message_text(
                         chat_id=call.message.chat.id,
                         message_id=call.message.message_id,
-                        text=f"📦 Belum Ada Penerimaan\n\nSupplier **{nama_supplier}** belum memiliki riwayat penerimaan barang.\n\nKlik tombol dibawah untuk menambahkan penerimaan pertama.",
-                        parse_mode='Markdown',
-                        reply_markup=keyboard_empty
-                    )
-                except Exception as e:
-                    bot.send_message(
-                        call.message.chat.id,
-                        f"📦 Belum Ada Penerimaan\n\nSupplier **{nama_supplier}** belum memiliki riwayat penerimaan barang.\n\nKlik tombol dibawah untuk menambahkan penerimaan pertama.",
-                        parse_mode='Markdown',
-                        reply_markup=keyboard_empty
-                    )
-                
-    except Exception as e:
-        bot.answer_callback_query(call.id, f"Error: {str(e)}")
-        print(f"Error in handle_penerimaan_supplier: {e}")
-    finally:
-        if conn and conn.open:
-            conn.close()
-
-def handle_pilih_supplier(call, bot):
-    """Handle pemilihan supplier untuk penerimaan baru"""
-    supplier_id = call.data.replace('pilih_supplier_', '')
-    
-    conn = connection()
-    if conn is None:
-        bot.answer_callback_query(call.id, "Koneksi database gagal")
-        return
-    
-    try:
-        with conn.cursor() as sql:
-            # Query untuk mendapatkan nama supplier
-            sql.execute("SELECT namasuplier FROM tb_suplier WHERE id = %s", (supplier_id,))
-            supplier_data = sql.fetchone()
-            nama_supplier = supplier_data['namasuplier'] if supplier_data else "Supplier"
-            
-            # Query produk yang tersedia
-            sql.execute("""
-                SELECT 
-                    p.id_produk,
-                    p.nama_produk,
-                    p.deskripsi,
-                    p.stok,
-                    CASE 
-                        WHEN si.harga IS NULL THEN 0
-                        WHEN si.harga = 0 THEN 0
-                        ELSE si.harga 
-                    END AS harga_beli,
-                    CASE 
-                        WHEN si.satuan IS NOT NULL AND si.satuan != '' THEN si.satuan
-                        ELSE p.satuanbesar 
-                    END AS satuan_besar_id,
-                    CASE 
-                        WHEN si.isi IS NOT NULL AND si.isi > 0 THEN si.isi
-                        ELSE COALESCE(p.isi, 1)
-                    END AS isi_supplier,
-                    p.satuanbesar AS satuan_besar_produk_id,
-                    p.satuankecil AS satuan_kecil_produk_id,
-                    p.isi AS isi_produk,
-                    p.harga AS harga_jual
-                FROM tbl_produk p
-                INNER JOIN tb_suplieritem si ON p.id_produk = si.iditem
-                WHERE si.idsuplier = %s 
-                    AND si.aktif = 'Y'
-                    AND p.aktif = 'Y'
-                ORDER BY p.nama_produk
-            """, (supplier_id,))
-            
-            produk_data_raw = sql.fetchall()
-            
-            # Process produk data untuk mendapatkan nama satuan
-            produk_data = []
-            for produk in produk_data_raw:
-                satuan_besar_id = produk['satuan_besar_id']
-                satuan_kecil_id = produk['satuan_kecil_produk_id']
-                
-                # Dapatkan nama satuan
-                satuan_besar = get_nama_satuan(satuan_besar_id)
-                satuan_kecil = get_nama_satuan(satuan_kecil_id)
-                
-                # Reconstruct produk data dengan nama satuan
-                processed_produk = (
-                    produk['id_produk'],
-                    produk['nama_produk'],
-                    produk['deskripsi'],
-                    produk['stok'],
-                    produk['harga_beli'],
-                    satuan_besar,
-                    produk['isi_supplier'],
-                    satuan_besar,
-                    satuan_kecil,
-                    produk['isi_produk'],
-                    produk['harga_jual']
-                )
-                produk_data.append(processed_produk)
-            
-            if produk_data:
-                # Generate nomor faktur otomatis
-                nomor_faktur_otomatis = generate_nomor_faktur_otomatis(supplier_id)
-                
-                # Simpan state user
-                user_states[str(call.from_user.id)] = {
-                    'state': 'waiting_for_faktur',
-                    'supplier_id': supplier_id,
-                    'supplier_name': nama_supplier,
-                    'produk_data': produk_data,
-                    'items': [],
-                    'nofaktur_otomatis': nomor_faktur_otomatis
-                }
-                
-                # Hapus keyboard sebelumnya
-                bot.edit_message_text(
-                    chat_id=call.message.chat.id,
-                    message_id=call.message.message_id,
-                    text=f"🛒 TAMBAH PENERIMAAN BARU\n\n**Supplier:** {nama_supplier}\n**Total Produk:** {len(produk_data)} item\n\nSilakan lanjutkan dengan mengisi data berikut:",
-                    parse_mode='Markdown'
-                )
-                
-                # Tampilkan nomor faktur otomatis dan minta konfirmasi
-                if nomor_faktur_otomatis:
-                    keyboard = types.InlineKeyboardMarkup()
-                    keyboard.row(
-                        types.InlineKeyboardButton(f"✅ Gunakan {nomor_faktur_otomatis}", callback_data="gunakan_faktur_otomatis")
-                    )
-                    keyboard.row(
-                        types.InlineKeyboardButton("✏️ Input Manual", callback_data="input_faktur_manual")
+                        text=f"🛒 TAMBAH PENERIMAAN BARU\n\n**Supplier:** {nama_supplier}\n**Total Produk:** {len(katalog)} item\n\nSilakan lanjutkan dengan mengisi data berikut:",
+                        parse_mode='Markdown'
                     )
                     
-                    bot.send_message(
-                        call.message.chat.id,
-                        f"📄 **NOMOR FAKTUR OTOMATIS**\n\n"
-                        f"Nomor faktur yang dihasilkan:\n"
-                        f"`{nomor_faktur_otomatis}`\n\n"
-                        f"Klik tombol untuk menggunakan nomor otomatis atau input manual:",
-                        parse_mode='Markdown',
-                        reply_markup=keyboard
-                    )
+                    # Tampilkan nomor faktur otomatis dan minta konfirmasi
+                    if nomor_faktur_otomatis:
+                        keyboard = types.InlineKeyboardMarkup()
+                        keyboard.row(
+                            types.InlineKeyboardButton(f"✅ Gunakan {nomor_faktur_otomatis}", callback_data="gunakan_faktur_otomatis")
+                        )
+                        keyboard.row(
+                            types.InlineKeyboardButton("✏️ Input Manual", callback_data="input_faktur_manual")
+                        )
+                        
+                        bot.send_message(
+                            call.message.chat.id,
+                            f"📄 **NOMOR FAKTUR OTOMATIS**\n\n"
+                            f"Nomor faktur yang dihasilkan:\n"
+                            f"`{nomor_faktur_otomatis}`\n\n"
+                            f"Klik tombol untuk menggunakan nomor otomatis atau input manual:",
+                            parse_mode='Markdown',
+                            reply_markup=keyboard
+                        )
+                    else:
+                        # Jika gagal generate otomatis, minta input manual
+                        bot.send_message(
+                            call.message.chat.id,
+                            "📄 **NOMOR FAKTUR**\n\nSilakan ketik nomor faktur:\nContoh: `FAK/2024/001`",
+                            parse_mode='Markdown'
+                        )
+                    
                 else:
-                    # Jika gagal generate otomatis, minta input manual
-                    bot.send_message(
-                        call.message.chat.id,
-                        "📄 **NOMOR FAKTUR**\n\nSilakan ketik nomor faktur:\nContoh: `FAK/2024/001`",
-                        parse_mode='Markdown'
-                    )
-                
-            else:
-                bot.answer_callback_query(call.id, f"❌ Tidak ada produk untuk {nama_supplier}")
-                
-    except Exception as e:
-        bot.answer_callback_query(call.id, f"Error: {str(e)}")
-    finally:
-        if conn and conn.open:
-            conn.close()
+                    bot.answer_callback_query(call.id, f"❌ Tidak ada produk untuk {nama_supplier}")
+                    
+        except Exception as e:
+            bot.answer_callback_query(call.id, f"Error: {str(e)}")
 
 def handle_gunakan_faktur_otomatis(call, bot):
     """Handle penggunaan faktur otomatis"""
     user_id = str(call.from_user.id)
     
-    if user_id not in user_states:
+    user_state = user_states.get(user_id)
+    if user_state is None:
         bot.answer_callback_query(call.id, "Tidak ada proses penerimaan aktif")
         return
     
-    user_state = user_states[user_id]
-    
     # Gunakan nomor faktur otomatis
     user_state['nofaktur'] = user_state['nofaktur_otomatis']
     user_state['state'] = 'waiting_for_keterangan'
+    user_states[user_id] = user_state
     
     # Hapus pesan sebelumnya
     bot.delete_message(call.message.chat.id, call.message.message_id)
@@ -547,21 +552,18 @@ def handle_input_faktur_manual(call, bot):
     """Handle input faktur manual"""
     user_id = str(call.from_user.id)
     
-    if user_id not in user_states:
+    user_state = user_states.get(user_id)
+    if user_state is None:
         bot.answer_callback_query(call.id, "Tidak ada proses penerimaan aktif")
         return
     
-    user_state = user_states[user_id]
     user_state['state'] = 'waiting_for_faktur'
+    user_states[user_id] = user_state
     
-    # Hapus pesan sebelumnya
-    bot.delete_message(call.message.chat.id, call.message.message_id)
-    
-    # Minta input nomor faktur manual
-    bot.send_message(
-        call.message.chat.id,
-        "📄 **NOMOR FAKTUR MANUAL**\n\nSilakan ketik nomor faktur:\nContoh: `FAK/2024/001`",
-        parse_mode='Markdown'
+    # Minta input nomor faktur manual (pesan pilihan faktur diganti, tombolnya hilang)
+    show_screen(
+        bot, call,
+        ("📄 **NOMOR FAKTUR MANUAL**\n\nSilakan ketik nomor faktur:\nContoh: `FAK/2024/001`", None)
     )
     
     bot.answer_callback_query(call.id, "Input nomor faktur manual")
@@ -570,15 +572,15 @@ def handle_penerimaan_input(message, bot):
     """Handle input selama proses penerimaan"""
     user_id = str(message.from_user.id)
     
-    if user_id not in user_states:
+    user_state = user_states.get(user_id)
+    if user_state is None:
         return
     
-    user_state = user_states[user_id]
-    
     if user_state['state'] == 'waiting_for_faktur':
         # Simpan nomor faktur
         user_state['nofaktur'] = message.text
         user_state['state'] = 'waiting_for_keterangan'
+        user_states[user_id] = user_state
         
         # Tampilkan tombol untuk keterangan
         keyboard = types.ReplyKeyboardMarkup(resize_keyboard=True)
@@ -595,13 +597,14 @@ def handle_penerimaan_input(message, bot):
         # Simpan keterangan
         user_state['keterangan'] = message.text if message.text != '-' else ''
         user_state['state'] = 'selecting_products'
+        user_states[user_id] = user_state
         
         # Hapus keyboard khusus
         remove_keyboard = types.ReplyKeyboardRemove()
         bot.send_message(message.chat.id, "Membuka menu produk...", reply_markup=remove_keyboard)
         
         # Tampilkan daftar produk dengan tombol dan paging
-        pesan_produk, keyboard = tampilkan_produk_dengan_tombol(message.chat.id, user_state, 1)
+        pesan_produk, keyboard = tampilkan_produk_dengan_tombol(message.chat.id, user_state)
         bot.send_message(
             message.chat.id,
             pesan_produk,
@@ -633,17 +636,18 @@ def handle_penerimaan_input(message, bot):
             
             # Kembali ke pemilihan produk
             user_state['state'] = 'selecting_products'
+            user_states[user_id] = user_state
             
             # Tampilkan konfirmasi
             harga_rupiah = format_rupiah(selected_product['harga_beli'])
             bot.reply_to(message, f"{selected_product['nama_produk']} ditambahkan: {qty} {selected_product['satuan_besar']}\nHarga: {harga_rupiah}")
             
             # Tampilkan kembali daftar produk dengan paging terakhir
-            current_page = 1
-            if message.chat.id in paging_states:
-                current_page = paging_states[message.chat.id]['current_page']
+            paging_state = paging_states.get(message.chat.id) or {}
             
-            pesan_produk, keyboard = tampilkan_produk_dengan_tombol(message.chat.id, user_state, current_page)
+            pesan_produk, keyboard = tampilkan_produk_dengan_tombol(
+                message.chat.id, user_state, 'r', paging_state.get('anchor')
+            )
             bot.send_message(
                 message.chat.id,
                 pesan_produk,
@@ -654,33 +658,28 @@ def handle_penerimaan_input(message, bot):
         except ValueError:
             bot.reply_to(message, "Quantity harus berupa angka")
 
-def handle_pilih_produk(call, bot):
+def handle_pilih_produk(call, bot, id_produk):
     """Handle pemilihan produk"""
     user_id = str(call.from_user.id)
     
-    if user_id not in user_states:
+    user_state = user_states.get(user_id)
+    if user_state is None:
         bot.answer_callback_query(call.id, "Tidak ada proses penerimaan aktif")
         return
     
-    user_state = user_states[user_id]
-    produk_data = user_state['produk_data']
-    
-    # Parse nomor produk (global index)
-    global_index = int(call.data.replace('pilih_produk_', '')) - 1
+    # Ambil produk dari katalog supplier berdasarkan id produk
+    produk = catalog_registry.get(user_state['supplier_id']).get(id_produk)
     
-    if global_index < 0 or global_index >= len(produk_data):
-        bot.answer_callback_query(call.id, "Produk tidak valid")
+    if produk is None:
+        bot.answer_callback_query(call.id, "Produk tidak valid atau sudah tidak aktif")
         return
     
-    # Ambil data produk berdasarkan index global
-    produk = produk_data[global_index]
-    
     # Ambil data satuan dan harga
-    harga_beli = produk[4]
-    satuan_besar = produk[5]
-    isi_supplier = produk[6]
-    satuan_kecil = produk[8]
-    isi_produk = produk[9]
+    harga_beli = produk.harga_beli
+    satuan_besar = produk.satuan_besar
+    isi_supplier = produk.isi_supplier
+    satuan_kecil = produk.satuan_kecil
+    isi_produk = produk.isi_produk
     
     # Pastikan isi tidak kosong
     if not isi_supplier or isi_supplier == 0:
@@ -692,8 +691,8 @@ def handle_pilih_produk(call, bot):
     
     # Simpan data produk yang dipilih
     user_state['selected_product'] = {
-        'id_produk': produk[0],
-        'nama_produk': produk[1],
+        'id_produk': produk.id_produk,
+        'nama_produk': produk.nama_produk,
         'harga_beli': float(harga_beli) if harga_beli else 0,
         'satuan_besar': satuan_besar,
         'satuan_kecil': satuan_kecil,
@@ -701,6 +700,7 @@ def handle_pilih_produk(call, bot):
     }
     
     user_state['state'] = 'waiting_for_qty'
+    user_states[user_id] = user_state
     
     # Minta input quantity
     harga_rupiah = format_rupiah(harga_beli)
@@ -709,7 +709,7 @@ def handle_pilih_produk(call, bot):
     bot.send_message(
         call.message.chat.id,
         f"🔢 **QUANTITY**\n\n"
-        f"**Produk:** {produk[1]}{status_harga}\n"
+        f"**Produk:** {produk.nama_produk}{status_harga}\n"
         f"**Harga Beli:** {harga_rupiah}\n"
         f"**Satuan Besar:** {satuan_besar}\n"
         f"**Satuan Kecil:** {satuan_kecil}\n"
@@ -718,23 +718,21 @@ def handle_pilih_produk(call, bot):
         parse_mode='Markdown'
     )
     
-    bot.answer_callback_query(call.id, f"Pilih {produk[1]}")
+    bot.answer_callback_query(call.id, f"Pilih {produk.nama_produk}")
 
-def handle_produk_paging(call, bot):
+def handle_produk_paging(call, bot, position):
     """Handle paging produk"""
     user_id = str(call.from_user.id)
     
-    if user_id not in user_states:
+    user_state = user_states.get(user_id)
+    if user_state is None:
         bot.answer_callback_query(call.id, "Tidak ada proses penerimaan aktif")
         return
     
-    # Parse page number
-    page = int(call.data.replace('produk_page_', ''))
-    
-    user_state = user_states[user_id]
+    mode, page, key = position
     
     # Tampilkan produk dengan halaman yang diminta
-    pesan_produk, keyboard = tampilkan_produk_dengan_tombol(call.message.chat.id, user_state, page)
+    pesan_produk, keyboard = tampilkan_produk_dengan_tombol(call.message.chat.id, user_state, mode, key)
     
     try:
         bot.edit_message_text(
@@ -752,11 +750,11 @@ def handle_lihat_item(call, bot):
     """Handle lihat item yang sudah dipilih"""
     user_id = str(call.from_user.id)
     
-    if user_id not in user_states:
+    user_state = user_states.get(user_id)
+    if user_state is None:
         bot.answer_callback_query(call.id, "Tidak ada proses penerimaan aktif")
         return
     
-    user_state = user_states[user_id]
     items = user_state['items']
     
     if not items:
@@ -814,33 +812,22 @@ def handle_kembali_ke_produk(call, bot):
     """Handle kembali ke menu produk"""
     user_id = str(call.from_user.id)
     
-    if user_id not in user_states:
+    user_state = user_states.get(user_id)
+    if user_state is None:
         bot.answer_callback_query(call.id, "Tidak ada proses penerimaan aktif")
         return
     
-    user_state = user_states[user_id]
     user_state['state'] = 'selecting_products'
+    user_states[user_id] = user_state
     
     # Dapatkan page terakhir atau mulai dari page 1
-    current_page = 1
-    if call.message.chat.id in paging_states:
-        current_page = paging_states[call.message.chat.id]['current_page']
+    paging_state = paging_states.get(call.message.chat.id) or {}
     
-    # Hapus pesan sebelumnya
-    try:
-        bot.delete_message(call.message.chat.id, call.message.message_id)
-    except:
-        pass
-    
-    # Tampilkan kembali daftar produk dengan paging
-    pesan_produk, keyboard = tampilkan_produk_dengan_tombol(call.message.chat.id, user_state, current_page)
-    
-    bot.send_message(
-        call.message.chat.id,
-        pesan_produk,
-        parse_mode='Markdown',
-        reply_markup=keyboard
+    # Tampilkan kembali daftar produk dengan paging di pesan yang sama
+    screen = tampilkan_produk_dengan_tombol(
+        call.message.chat.id, user_state, 'r', paging_state.get('anchor')
     )
+    show_screen(bot, call, screen)
     
     bot.answer_callback_query(call.id, "Kembali ke pilihan produk")
 
@@ -848,8 +835,9 @@ def handle_batal_penerimaan(call, bot):
     """Handle batal penerimaan"""
     user_id = str(call.from_user.id)
     
-    if user_id in user_states:
-        del user_states[user_id]
+    user_state = user_states.pop(user_id)
+    if user_state is not None:
+        release_faktur_otomatis(user_state)
     
     # Hapus keyboard custom
     remove_keyboard = types.ReplyKeyboardRemove()
@@ -872,11 +860,11 @@ def handle_simpan_penerimaan(call, bot):
     """Handle simpan penerimaan"""
     user_id = str(call.from_user.id)
     
-    if user_id not in user_states:
+    user_state = user_states.get(user_id)
+    if user_state is None:
         bot.answer_callback_query(call.id, "Tidak ada proses penerimaan aktif")
         return
     
-    user_state = user_states[user_id]
     items = user_state['items']
     
     if not items:
@@ -916,809 +904,546 @@ def handle_konfirmasi_simpan_harga_0(call, bot):
     """Handle konfirmasi simpan dengan harga 0"""
     user_id = str(call.from_user.id)
     
-    if user_id not in user_states:
+    user_state = user_states.get(user_id)
+    if user_state is None:
         bot.answer_callback_query(call.id, "Tidak ada proses penerimaan aktif")
         return
     
-    user_state = user_states[user_id]
-    
-    # Hapus pesan konfirmasi
-    try:
-        bot.delete_message(call.message.chat.id, call.message.message_id)
-    except Exception as e:
-        print(f"Gagal menghapus pesan: {e}")
-    
-    # Simpan ke database
+    # Simpan ke database; pesan konfirmasi diedit menjadi hasil simpan
     simpan_penerimaan_baru(user_id, user_state, call, bot)
 
+def insert_detail_penerimaan(sql, id_rcv, items, user_name, chunk_size=None):
+    """
+    Insert semua baris tb_ricevedetil dengan executemany (multi-row INSERT),
+    dipecah per chunk_size baris untuk keranjang yang sangat besar.
+    Return jumlah baris yang disimpan.
+    """
+    if not items:
+        return 0
+    chunk_size = chunk_size or DETAIL_INSERT_CHUNK
+    started = time.perf_counter()
+    
+    # Dapatkan ID satuan sekaligus dari kamus satuan (default ke 1 jika tidak ditemukan)
+    satuan_besar_ids = satuan_registry.get_id_many(item['satuan_besar'] for item in items)
+    satuan_kecil_ids = satuan_registry.get_id_many(item['satuan_kecil'] for item in items)
+    tgl = datetime.datetime.now().date()
+    
+    rows = [
+        (
+            id_rcv,
+            item['id_produk'],
+            satuan_besar_id,  # Gunakan ID, bukan nama
+            item['qty'],
+            satuan_kecil_id,  # Gunakan ID, bukan nama
+            item['isi'],
+            item['qty'] * item['isi'],  # qty2 (quantity dalam satuan kecil)
+            item['harga'],
+            item['subtotal'],
+            item['harga'],
+            'N',
+            user_name,
+            tgl
+        )
+        for item, satuan_besar_id, satuan_kecil_id in zip(items, satuan_besar_ids, satuan_kecil_ids)
+    ]
+    
+    # Semua nilai harus placeholder agar PyMySQL menggabungkan baris menjadi satu INSERT
+    for i in range(0, len(rows), chunk_size):
+        sql.executemany("""
+            INSERT INTO tb_ricevedetil (
+                idrcv, iditem, satuanbesar, qty1, satuankecil, isi, qty2,
+                hargabeli, subtotal, hargapokok, posting, user, tgl
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, rows[i:i + chunk_size])
+    
+    # Durasi dan baris/detik di bagian batches pada /metrics
+    metrics.record_batch('detail_penerimaan', len(rows), time.perf_counter() - started)
+    return len(rows)
+
 def simpan_penerimaan_baru(user_id, user_state, source, bot):
     """Simpan penerimaan baru ke database"""
-    conn = connection()
-    if conn is None:
-        if hasattr(source, 'answer_callback_query'):
-            bot.answer_callback_query(source.id, "Koneksi database gagal")
-        else:
-            bot.reply_to(source, "Koneksi database gagal")
-        return
-    
-    try:
-        with conn.cursor() as sql:
-            # Generate nomor RCV
-            tanggal_sekarang = datetime.datetime.now().strftime('%y%m%d')
-            
-            # Cari sequence number terakhir untuk hari ini
-            sql.execute("""
-                SELECT MAX(CAST(SUBSTRING(norcv, 7) AS UNSIGNED)) as last_sequence
-                FROM tb_riceve 
-                WHERE norcv LIKE %s
-            """, (f'TLE{tanggal_sekarang}%',))
-            
-            result = sql.fetchone()
-            last_sequence = result['last_sequence'] if result['last_sequence'] is not None else 0
-            
-            # Generate sequence berikutnya
-            sequence = last_sequence + 1
-            
-            # Jika sequence melebihi 999, reset ke 1
-            if sequence > 999:
-                sequence = 1
+    with connection() as conn:
+        if conn is None:
+            if hasattr(source, 'answer_callback_query'):
+                bot.answer_callback_query(source.id, "Koneksi database gagal")
+            else:
+                bot.reply_to(source, "Koneksi database gagal")
+            return
+        
+        try:
+            with conn.cursor() as sql:
+                # Generate nomor RCV dari counter atomik (aman untuk penyimpan yang bersamaan)
+                norcv = allocate_norcv(sql)
                 
-                # Cari sequence yang tersedia mulai dari 1
-                for i in range(1, 1000):
-                    norcv_candidate = f"TLE{tanggal_sekarang}{i:03d}"
-                    sql.execute("SELECT COUNT(*) as count FROM tb_riceve WHERE norcv = %s", (norcv_candidate,))
-                    if sql.fetchone()['count'] == 0:
-                        sequence = i
-                        break
-            
-            norcv = f"TLE{tanggal_sekarang}{sequence:03d}"
-            
-            # Hitung total
-            total_item = len(user_state['items'])
-            total_harga = sum(item['subtotal'] for item in user_state['items'])
-            diskon = 0
-            total_final = total_harga - diskon
-            
-            # Potong data jika melebihi panjang kolom
-            nofaktur = user_state['nofaktur'][:25] if len(user_state['nofaktur']) > 25 else user_state['nofaktur']
-            keterangan = user_state['keterangan'][:65535] if len(user_state['keterangan']) > 65535 else user_state['keterangan']
-            
-            # Dapatkan user data untuk log
-            user_data = get_nik_from_telegram(user_id)
-            user_name = user_data['nama'] if user_data else f"TG_{user_id}"
-            
-            # Insert header penerimaan
-            sql.execute("""
-                INSERT INTO tb_riceve (
-                    norcv, nofaktur, keterangan, idsuplier, tgl, jam, 
-                    totalitem, totalharga, diskon, totalfinal, user, aktif
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'Y')
-            """, (
-                norcv,
-                nofaktur,
-                keterangan,
-                user_state['supplier_id'],
-                datetime.datetime.now().date(),
-                datetime.datetime.now().time(),
-                total_item,
-                total_harga,
-                diskon,
-                total_final,
-                user_name
-            ))
-            
-            # Dapatkan ID penerimaan yang baru dibuat
-            id_rcv = sql.lastrowid
-            
-            # Insert detail penerimaan - PERBAIKAN: Gunakan ID satuan, bukan nama
-            for item in user_state['items']:
-                # Hitung qty2 (quantity dalam satuan kecil)
-                qty2 = item['qty'] * item['isi']
+                # Hitung total
+                total_item = len(user_state['items'])
+                total_harga = sum(item['subtotal'] for item in user_state['items'])
+                diskon = 0
+                total_final = total_harga - diskon
                 
-                # Dapatkan ID satuan dari database berdasarkan nama satuan
-                # Untuk satuanbesar
-                sql.execute("SELECT id FROM tb_satuan WHERE satuan = %s AND aktif = 'Y' LIMIT 1", (item['satuan_besar'],))
-                satuan_besar_result = sql.fetchone()
-                satuan_besar_id = satuan_besar_result['id'] if satuan_besar_result else 1  # Default ke 1 jika tidak ditemukan
+                # Potong data jika melebihi panjang kolom
+                nofaktur = user_state['nofaktur'][:25] if len(user_state['nofaktur']) > 25 else user_state['nofaktur']
+                keterangan = user_state['keterangan'][:65535] if len(user_state['keterangan']) > 65535 else user_state['keterangan']
                 
-                # Untuk satuankecil  
-                sql.execute("SELECT id FROM tb_satuan WHERE satuan = %s AND aktif = 'Y' LIMIT 1", (item['satuan_kecil'],))
-                satuan_kecil_result = sql.fetchone()
-                satuan_kecil_id = satuan_kecil_result['id'] if satuan_kecil_result else 1  # Default ke 1 jika tidak ditemukan
+                # Dapatkan user data untuk log (memakai koneksi & transaksi yang sama)
+                user_data = get_nik_from_telegram(user_id)
+                user_name = user_data['nama'] if user_data else f"TG_{user_id}"
                 
+                # Insert header penerimaan
                 sql.execute("""
-                    INSERT INTO tb_ricevedetil (
-                        idrcv, iditem, satuanbesar, qty1, satuankecil, isi, qty2,
-                        hargabeli, subtotal, hargapokok, posting, user, tgl
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'N', %s, %s)
+                    INSERT INTO tb_riceve (
+                        norcv, nofaktur, keterangan, idsuplier, tgl, jam, 
+                        totalitem, totalharga, diskon, totalfinal, user, aktif
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'Y')
                 """, (
-                    id_rcv,
-                    item['id_produk'],
-                    satuan_besar_id,  # Gunakan ID, bukan nama
-                    item['qty'],
-                    satuan_kecil_id,  # Gunakan ID, bukan nama
-                    item['isi'],
-                    qty2,
-                    item['harga'],
-                    item['subtotal'],
-                    item['harga'],
-                    user_name,
-                    datetime.datetime.now().date()
+                    norcv,
+                    nofaktur,
+                    keterangan,
+                    user_state['supplier_id'],
+                    datetime.datetime.now().date(),
+                    datetime.datetime.now().time(),
+                    total_item,
+                    total_harga,
+                    diskon,
+                    total_final,
+                    user_name
                 ))
-            
-            conn.commit()
-            
-            # Hapus state user
-            if user_id in user_states:
+                
+                # Dapatkan ID penerimaan yang baru dibuat
+                id_rcv = sql.lastrowid
+                
+                # Insert detail penerimaan sekaligus (multi-row insert)
+                insert_detail_penerimaan(sql, id_rcv, user_state['items'], user_name)
+                
+                conn.commit()
+                
+                # Jumlah riwayat supplier berubah, hitung ulang saat dibuka
+                invalidate_count('riwayat', user_state['supplier_id'])
+                
+                # Nomor faktur otomatis sudah terpakai (atau dilepas jika user input manual)
+                faktur_sequence.commit(user_state['supplier_id'], nofaktur)
+                if user_state.get('nofaktur_otomatis') != nofaktur:
+                    release_faktur_otomatis(user_state)
+                
+                # Hapus state user
                 del user_states[user_id]
-            
-            # Buat pesan sukses
-            total_final_rupiah = format_rupiah(total_final)
-            pesan_sukses = f"PENERIMAAN BARANG BERHASIL DIBUAT\n\n"
-            pesan_sukses += f"No. RCV: `{norcv}`\n"
-            pesan_sukses += f"No. Faktur: `{nofaktur}`\n"
-            pesan_sukses += f"Supplier: {user_state['supplier_name']}\n"
-            pesan_sukses += f"Total Item: {total_item} produk\n"
-            pesan_sukses += f"Total Harga: {total_final_rupiah}\n"
-            pesan_sukses += f"Keterangan: {keterangan[:100]}{'...' if len(keterangan) > 100 else ''}\n\n"
-            pesan_sukses += f"Dibuat pada: {datetime.datetime.now().strftime('%d-%m-%Y %H:%M')}"
-            
-            # Cek jika ada harga 0
-            items_dengan_harga_0 = [item for item in user_state['items'] if item['harga'] == 0]
-            if items_dengan_harga_0:
-                pesan_sukses += f"\n\nCatatan: {len(items_dengan_harga_0)} produk dengan harga beli 0"
-            
-            # Tombol lihat detail
-            keyboard = types.InlineKeyboardMarkup()
-            keyboard.row(
-                types.InlineKeyboardButton("Lihat Detail", callback_data=f"detail_rcv_{id_rcv}"),
-                types.InlineKeyboardButton("Document", callback_data=f"doc_rcv_{id_rcv}")
-            )
-            
-            # PERBAIKAN: Handle CallbackQuery dengan benar
-            if hasattr(source, 'message'):  # Ini adalah CallbackQuery
-                bot.edit_message_text(
-                    chat_id=source.message.chat.id,
-                    message_id=source.message.message_id,
-                    text=pesan_sukses,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
-            else:  # Ini adalah Message
-                bot.reply_to(
-                    source,
-                    pesan_sukses,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
+                
+                # Buat pesan sukses
+                total_final_rupiah = format_rupiah(total_final)
+                pesan_sukses = f"PENERIMAAN BARANG BERHASIL DIBUAT\n\n"
+                pesan_sukses += f"No. RCV: `{norcv}`\n"
+                pesan_sukses += f"No. Faktur: `{nofaktur}`\n"
+                pesan_sukses += f"Supplier: {user_state['supplier_name']}\n"
+                pesan_sukses += f"Total Item: {total_item} produk\n"
+                pesan_sukses += f"Total Harga: {total_final_rupiah}\n"
+                pesan_sukses += f"Keterangan: {keterangan[:100]}{'...' if len(keterangan) > 100 else ''}\n\n"
+                pesan_sukses += f"Dibuat pada: {datetime.datetime.now().strftime('%d-%m-%Y %H:%M')}"
+                
+                # Cek jika ada harga 0
+                items_dengan_harga_0 = [item for item in user_state['items'] if item['harga'] == 0]
+                if items_dengan_harga_0:
+                    pesan_sukses += f"\n\nCatatan: {len(items_dengan_harga_0)} produk dengan harga beli 0"
+                
+                # Tombol lihat detail
+                keyboard = types.InlineKeyboardMarkup()
+                keyboard.row(
+                    types.InlineKeyboardButton("Lihat Detail", callback_data=f"detail_rcv_{id_rcv}"),
+                    types.InlineKeyboardButton("Document", callback_data=f"doc_rcv_{id_rcv}")
                 )
-            
-    except Exception as e:
-        conn.rollback()
-        error_msg = f"Gagal menyimpan penerimaan: {str(e)}"
-        print(f"Error detail: {e}")
-        if hasattr(source, 'answer_callback_query'):
-            bot.answer_callback_query(source.id, error_msg)
-        else:
-            bot.reply_to(source, error_msg)
-    finally:
-        if conn and conn.open:
-            conn.close()
+                
+                # PERBAIKAN: Handle CallbackQuery dengan benar
+                if hasattr(source, 'message'):  # Ini adalah CallbackQuery
+                    bot.edit_message_text(
+                        chat_id=source.message.chat.id,
+                        message_id=source.message.message_id,
+                        text=pesan_sukses,
+                        parse_mode='Markdown',
+                        reply_markup=keyboard
+                    )
+                else:  # Ini adalah Message
+                    bot.reply_to(
+                        source,
+                        pesan_sukses,
+                        parse_mode='Markdown',
+                        reply_markup=keyboard
+                    )
+                
+        except Exception as e:
+            conn.rollback()
+            error_msg = f"Gagal menyimpan penerimaan: {str(e)}"
+            print(f"Error detail: {e}")
+            if hasattr(source, 'answer_callback_query'):
+                bot.answer_callback_query(source.id, error_msg)
+            else:
+                bot.reply_to(source, error_msg)
 
 # ============================ FITUR MANAJEMEN MAPPING PRODUK ============================
 
-def handle_manage_mapping_menu(message, bot):
-    """Menu utama manajemen mapping produk per supplier"""
-    user_id = str(message.from_user.id)
+def render_mapping_menu(user_data, suppliers):
+    """Teks dan keyboard menu manajemen mapping; keyboard None jika user bukan supplier aktif"""
+    if not suppliers:
+        pesan_balasan = f"⚙️ TIDAK ADA SUPPLIER\n\n"
+        pesan_balasan += f"Nama: **{user_data['nama']}**\n\n"
+        pesan_balasan += "Anda tidak terdaftar sebagai supplier aktif."
+        return pesan_balasan, None
+    
+    # Buat keyboard untuk menu manajemen mapping
+    keyboard = types.InlineKeyboardMarkup(row_width=1)
+    
+    for supplier in suppliers:
+        id_supplier = supplier['id_supplier']
+        nama_supplier = supplier['nama_supplier']
+        total_mapping = supplier['total_mapping'] or 0
+        aktif_mapping = supplier['aktif_mapping'] or 0
+        
+        button_text = f"📋 {nama_supplier[:20]} ({aktif_mapping}/{total_mapping})"
+        button = types.InlineKeyboardButton(
+            text=button_text,
+            callback_data=f"manage_mapping_{id_supplier}_page_1"
+        )
+        keyboard.add(button)
+    
+    # Tombol kembali
+    keyboard.row(
+        types.InlineKeyboardButton("🔙 Kembali ke Menu", callback_data="back_to_main_menu")
+    )
+    
+    pesan_balasan = f"⚙️ MANAJEMEN MAPPING PRODUK\n\n"
+    pesan_balasan += f"Nama: **{user_data['nama']}**\n"
+    pesan_balasan += f"Total Supplier: **{len(suppliers)}**\n\n"
+    pesan_balasan += "**Pilih supplier untuk kelola mapping:**\n"
+    pesan_balasan += "Format: Nama Supplier (Aktif/Total)\n\n"
+    pesan_balasan += "**Fitur:**\n"
+    pesan_balasan += "• Lihat semua mapping produk\n"
+    pesan_balasan += "• Aktifkan/nonaktifkan mapping\n"
+    pesan_balasan += "• Filter berdasarkan status"
+    return pesan_balasan, keyboard
+
+def handle_manage_mapping_menu(source, bot):
+    """Menu utama manajemen mapping produk per supplier (pesan menu atau tombol kembali)"""
+    user_id = str(source.from_user.id)
     
     # Cek apakah user terdaftar
     user_data = get_nik_from_telegram(user_id)
     if not user_data:
-        bot.reply_to(
-            message, 
-            "Data tidak ditemukan\n\nID Telegram Anda tidak terdaftar. Silakan daftar terlebih dahulu.",
-            parse_mode='Markdown'
+        show_error(
+            bot, source,
+            "Data tidak ditemukan\n\nID Telegram Anda tidak terdaftar. Silakan daftar terlebih dahulu."
         )
         return
     
-    conn = connection()
-    if conn is None:
-        bot.reply_to(message, "Koneksi database gagal", parse_mode='Markdown')
-        return
-    
-    try:
-        with conn.cursor() as sql:
-            sql.execute("""
-                SELECT 
-                    s.id AS id_supplier,
-                    s.namasuplier AS nama_supplier,
-                    COUNT(si.id) as total_mapping,
-                    SUM(CASE WHEN si.aktif = 'Y' THEN 1 ELSE 0 END) as aktif_mapping
-                FROM 
-                    tb_suplier s
-                JOIN 
-                    tb_karyawan k ON s.id_karyawan = k.id
-                LEFT JOIN 
-                    tb_suplieritem si ON s.id = si.idsuplier
-                WHERE 
-                    k.id_tele = %s
-                    AND s.aktif = 'Y'
-                    AND k.aktif = 'Y'
-                GROUP BY s.id, s.namasuplier
-                ORDER BY s.namasuplier
-            """, (user_id,))
-            
-            hasil_sql = sql.fetchall()
-            
-            if hasil_sql:
-                # Buat keyboard untuk menu manajemen mapping
-                keyboard = types.InlineKeyboardMarkup(row_width=1)
-                
-                for supplier in hasil_sql:
-                    id_supplier = supplier['id_supplier']
-                    nama_supplier = supplier['nama_supplier']
-                    total_mapping = supplier['total_mapping'] or 0
-                    aktif_mapping = supplier['aktif_mapping'] or 0
-                    
-                    button_text = f"📋 {nama_supplier[:20]} ({aktif_mapping}/{total_mapping})"
-                    button = types.InlineKeyboardButton(
-                        text=button_text,
-                        callback_data=f"manage_mapping_{id_supplier}_page_1"
-                    )
-                    keyboard.add(button)
-                
-                # Tombol kembali
-                keyboard.row(
-                    types.InlineKeyboardButton("🔙 Kembali ke Menu", callback_data="back_to_main_menu")
-                )
-                
-                pesan_balasan = f"⚙️ MANAJEMEN MAPPING PRODUK\n\n"
-                pesan_balasan += f"Nama: **{user_data['nama']}**\n"
-                pesan_balasan += f"Total Supplier: **{len(hasil_sql)}**\n\n"
-                pesan_balasan += "**Pilih supplier untuk kelola mapping:**\n"
-                pesan_balasan += "Format: Nama Supplier (Aktif/Total)\n\n"
-                pesan_balasan += "**Fitur:**\n"
-                pesan_balasan += "• Lihat semua mapping produk\n"
-                pesan_balasan += "• Aktifkan/nonaktifkan mapping\n"
-                pesan_balasan += "• Filter berdasarkan status"
-                
-                bot.send_message(
-                    message.chat.id,
-                    pesan_balasan,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
-                
-            else:
-                pesan_balasan = f"⚙️ TIDAK ADA SUPPLIER\n\n"
-                pesan_balasan += f"Nama: **{user_data['nama']}**\n\n"
-                pesan_balasan += "Anda tidak terdaftar sebagai supplier aktif."
-                bot.reply_to(message, pesan_balasan, parse_mode='Markdown')
-            
-    except Exception as e:
-        bot.reply_to(message, f"Error: {str(e)}")
-    finally:
-        if conn and conn.open:
-            conn.close()
+    with connection() as conn:
+        if conn is None:
+            show_error(bot, source, "Koneksi database gagal")
+            return
+        
+        try:
+            with conn.cursor() as sql:
+                sql.execute("""
+                    SELECT 
+                        s.id AS id_supplier,
+                        s.namasuplier AS nama_supplier,
+                        COUNT(si.id) as total_mapping,
+                        SUM(CASE WHEN si.aktif = 'Y' THEN 1 ELSE 0 END) as aktif_mapping
+                    FROM 
+                        tb_suplier s
+                    JOIN 
+                        tb_karyawan k ON s.id_karyawan = k.id
+                    LEFT JOIN 
+                        tb_suplieritem si ON s.id = si.idsuplier
+                    WHERE 
+                        k.id_tele = %s
+                        AND s.aktif = 'Y'
+                        AND k.aktif = 'Y'
+                    GROUP BY s.id, s.namasuplier
+                    ORDER BY s.namasuplier
+                """, (user_id,))
+                screen = render_mapping_menu(user_data, sql.fetchall())
+        except Exception as e:
+            show_error(bot, source, f"Error: {str(e)}", parse_mode=None)
+            return
+    
+    show_screen(bot, source, screen, reply=screen[1] is None)
 
 #modul tambahan maping item
 
-def handle_manage_mapping_supplier(call, bot):
-    """Handle daftar mapping produk per supplier"""
-    data_parts = call.data.replace('manage_mapping_', '').split('_page_')
-    supplier_id = data_parts[0]
-    page = int(data_parts[1]) if len(data_parts) > 1 else 1
+def parse_mapping_callback(data):
+    """
+    (supplier_id, status_filter, (mode, halaman, key)) dari callback manage_mapping_*
+    (status_filter None = semua) atau filter_mapping_{supplier}_{Y|N}; None jika tidak valid.
+    """
+    base, mode, page_number, key = parse_page_callback(data)
+    if base.startswith('filter_mapping_'):
+        data_parts = base.replace('filter_mapping_', '').split('_')
+        if len(data_parts) != 2:
+            return None
+        supplier_id, status_filter = data_parts
+    else:
+        supplier_id, status_filter = base.replace('manage_mapping_', ''), None
+    return supplier_id, status_filter, (mode, page_number, key)
+
+def render_mapping_page(nama_supplier, supplier_id, base, page, status_filter=None):
+    """Teks dan keyboard satu halaman mapping produk supplier (semua atau per status)"""
+    hasil_mapping = page.rows
+    offset = page.offset
+    
+    if not hasil_mapping and status_filter is None:
+        # Tidak ada mapping sama sekali
+        keyboard_empty = types.InlineKeyboardMarkup()
+        keyboard_empty.row(
+            types.InlineKeyboardButton("➕ Tambah Mapping Baru", callback_data=f"add_mapping_{supplier_id}")
+        )
+        keyboard_empty.row(
+            types.InlineKeyboardButton("🔙 Kembali ke List", callback_data="back_to_mapping_menu")
+        )
+        return (
+            f"📋 BELUM ADA MAPPING\n\nSupplier **{nama_supplier}** belum memiliki mapping produk.\n\nKlik tombol dibawah untuk menambahkan mapping baru.",
+            keyboard_empty
+        )
     
-    conn = connection()
-    if conn is None:
-        bot.answer_callback_query(call.id, "Koneksi database gagal")
-        return
+    # Buat pesan daftar mapping
+    filter_text = "AKTIF" if status_filter == 'Y' else "NON-AKTIF"
+    mapping_pesan = f"📋 MAPPING PRODUK - {nama_supplier}\n\n"
+    if status_filter is not None:
+        mapping_pesan += f"**Filter:** {filter_text}\n"
+    mapping_pesan += f"**Halaman:** {page.number}/{page.total_pages}\n"
+    mapping_pesan += f"**Total Mapping:** {page.total} produk\n\n"
+    
+    for i, mapping in enumerate(hasil_mapping, 1):
+        mapping_id = mapping['mapping_id']
+        nama_produk = mapping['nama_produk'] or "-"
+        deskripsi = mapping['deskripsi'] or "-"
+        harga_beli = mapping['harga_beli'] or 0
+        nama_satuan = mapping['nama_satuan'] or "PCS"
+        isi = mapping['isi'] or 1
+        status = mapping['status_mapping']
+        stok = mapping['stok'] or 0
+        harga_jual = mapping['harga_jual'] or 0
+        
+        # Format harga
+        harga_beli_rupiah = format_rupiah(harga_beli)
+        harga_jual_rupiah = format_rupiah(harga_jual)
+        
+        # Status icon
+        status_icon = "✅" if status == 'Y' else "❌"
+        status_text = "AKTIF" if status == 'Y' else "NON-AKTIF"
+        
+        nomor_urutan = i + offset
+        mapping_pesan += f"**{nomor_urutan}. {nama_produk} {status_icon}**\n"
+        mapping_pesan += f"   📝 {deskripsi[:30]}{'...' if len(deskripsi) > 30 else ''}\n"
+        mapping_pesan += f"   💰 Beli: {harga_beli_rupiah} | Jual: {harga_jual_rupiah}\n"
+        mapping_pesan += f"   📦 Stok: {stok} | Satuan: {nama_satuan} (isi: {isi})\n"
+        mapping_pesan += f"   🔧 Status: {status_text} | ID Mapping: `{mapping_id}`\n"
+        mapping_pesan += "   ──────────────\n"
+    
+    if not hasil_mapping:
+        mapping_pesan += f"📭 Tidak ada mapping {filter_text.lower()}\n\n"
+    
+    # Buat keyboard dengan tombol toggle untuk setiap produk
+    keyboard = types.InlineKeyboardMarkup(row_width=2)
     
-    try:
+    # Tombol untuk setiap produk
+    for i, mapping in enumerate(hasil_mapping, 1):
+        global_index = i + offset - 1
+        mapping_id = mapping['mapping_id']
+        nama_produk = mapping['nama_produk'] or "Produk"
+        status = mapping['status_mapping']
+        
+        status_icon = "✅" if status == 'Y' else "❌"
+        
+        button_text = f"{i}. {nama_produk[:15]} {status_icon}"
+        button = types.InlineKeyboardButton(
+            text=button_text,
+            callback_data=f"toggle_mapping_{mapping_id}_{global_index}"
+        )
+        keyboard.add(button)
+    
+    # Tombol paging
+    add_nav_buttons(keyboard, base, page)
+    
+    # Tombol filter dan aksi
+    action_buttons = []
+    action_buttons.append(
+        types.InlineKeyboardButton("🔄 Refresh", callback_data=refresh_callback(base, page))
+    )
+    if status_filter != 'Y':
+        action_buttons.append(
+            types.InlineKeyboardButton("📊 Filter Aktif", callback_data=f"filter_mapping_{supplier_id}_Y_page_1")
+        )
+    if status_filter != 'N':
+        action_buttons.append(
+            types.InlineKeyboardButton("📊 Filter Nonaktif", callback_data=f"filter_mapping_{supplier_id}_N_page_1")
+        )
+    action_buttons.append(
+        types.InlineKeyboardButton("📋 Semua", callback_data=f"manage_mapping_{supplier_id}_page_1")
+    )
+    keyboard.add(*action_buttons)
+    
+    # Tombol kembali
+    keyboard.row(
+        types.InlineKeyboardButton("🔙 Kembali ke List", callback_data="back_to_mapping_menu")
+    )
+    return mapping_pesan, keyboard
+
+def mapping_screen(chat_id, supplier_id, status_filter, position):
+    """
+    Layar (teks, keyboard) mapping supplier (status_filter None = semua, 'Y' atau 'N') pada
+    posisi (mode, halaman, key), sekaligus simpan posisi halaman di paging_states untuk
+    refresh setelah toggle status.
+    Raise ValueError jika filter tidak valid, ConnectionError jika koneksi database gagal.
+    """
+    if status_filter not in (None, 'Y', 'N'):
+        raise ValueError("Data filter tidak valid")
+    base = f"manage_mapping_{supplier_id}" if status_filter is None else f"filter_mapping_{supplier_id}_{status_filter}"
+    mode, page_number, key = position
+    
+    with connection() as conn:
+        if conn is None:
+            raise ConnectionError("Koneksi database gagal")
+        
         with conn.cursor() as sql:
             # Query untuk mendapatkan nama supplier
             sql.execute("SELECT namasuplier FROM tb_suplier WHERE id = %s", (supplier_id,))
             supplier_data = sql.fetchone()
             nama_supplier = supplier_data['namasuplier'] if supplier_data else "Supplier"
             
-            # Hitung total data untuk paging
-            sql.execute("""
-                SELECT COUNT(*) as total
-                FROM tb_suplieritem si
-                JOIN tbl_produk p ON si.iditem = p.id_produk
-                WHERE si.idsuplier = %s 
-                    AND p.aktif = 'Y'
-            """, (supplier_id,))
-            
-            total_data = sql.fetchone()['total']
-            items_per_page = 10
-            total_pages = max(1, (total_data + items_per_page - 1) // items_per_page)
-            
-            # Validasi page number
-            if page < 1:
-                page = 1
-            elif page > total_pages:
-                page = total_pages
-            
-            # Calculate offset
-            offset = (page - 1) * items_per_page
-            
-            # Query mapping produk dengan paging
-            sql.execute("""
-                SELECT 
-                    si.id as mapping_id,
-                    p.id_produk,
-                    p.nama_produk,
-                    p.deskripsi,
-                    si.harga as harga_beli,
-                    s.satuan as nama_satuan,
-                    si.isi,
-                    si.aktif as status_mapping,
-                    p.stok,
-                    p.harga as harga_jual
-                FROM tb_suplieritem si
-                JOIN tbl_produk p ON si.iditem = p.id_produk
-                LEFT JOIN tb_satuan s ON si.satuan = s.id
-                WHERE si.idsuplier = %s 
-                    AND p.aktif = 'Y'
-                ORDER BY p.nama_produk
-                LIMIT %s OFFSET %s
-            """, (supplier_id, items_per_page, offset))
+            if status_filter is None:
+                cache_key = ('mapping', str(supplier_id))
+                count_sql, select_sql, params = MAPPING_COUNT_SQL, MAPPING_SELECT_SQL, (supplier_id,)
+            else:
+                cache_key = ('mapping', str(supplier_id), status_filter)
+                count_sql = MAPPING_COUNT_SQL + MAPPING_STATUS_FILTER
+                select_sql = MAPPING_SELECT_SQL + MAPPING_STATUS_FILTER
+                params = (supplier_id, status_filter)
             
-            hasil_mapping = sql.fetchall()
+            # Total data untuk info halaman (dari cache)
+            total_data = cached_count(sql, cache_key, count_sql, params)
             
-            if hasil_mapping or total_data > 0:
-                # Buat pesan daftar mapping
-                mapping_pesan = f"📋 MAPPING PRODUK - {nama_supplier}\n\n"
-                mapping_pesan += f"**Halaman:** {page}/{total_pages}\n"
-                mapping_pesan += f"**Total Mapping:** {total_data} produk\n\n"
-                
-                if hasil_mapping:
-                    for i, mapping in enumerate(hasil_mapping, 1):
-                        mapping_id = mapping['mapping_id']
-                        nama_produk = mapping['nama_produk'] or "-"
-                        deskripsi = mapping['deskripsi'] or "-"
-                        harga_beli = mapping['harga_beli'] or 0
-                        nama_satuan = mapping['nama_satuan'] or "PCS"
-                        isi = mapping['isi'] or 1
-                        status = mapping['status_mapping']
-                        stok = mapping['stok'] or 0
-                        harga_jual = mapping['harga_jual'] or 0
-                        
-                        # Format harga
-                        harga_beli_rupiah = format_rupiah(harga_beli)
-                        harga_jual_rupiah = format_rupiah(harga_jual)
-                        
-                        # Status icon
-                        status_icon = "✅" if status == 'Y' else "❌"
-                        status_text = "AKTIF" if status == 'Y' else "NON-AKTIF"
-                        
-                        nomor_urutan = i + offset
-                        mapping_pesan += f"**{nomor_urutan}. {nama_produk} {status_icon}**\n"
-                        mapping_pesan += f"   📝 {deskripsi[:30]}{'...' if len(deskripsi) > 30 else ''}\n"
-                        mapping_pesan += f"   💰 Beli: {harga_beli_rupiah} | Jual: {harga_jual_rupiah}\n"
-                        mapping_pesan += f"   📦 Stok: {stok} | Satuan: {nama_satuan} (isi: {isi})\n"
-                        mapping_pesan += f"   🔧 Status: {status_text} | ID Mapping: `{mapping_id}`\n"
-                        mapping_pesan += "   ──────────────\n"
-                else:
-                    mapping_pesan += "📭 Tidak ada data pada halaman ini\n\n"
-                
-                # Buat keyboard dengan tombol toggle untuk setiap produk
-                keyboard = types.InlineKeyboardMarkup(row_width=2)
-                
-                # Tombol untuk setiap produk
-                for i, mapping in enumerate(hasil_mapping, 1):
-                    global_index = i + offset - 1
-                    mapping_id = mapping['mapping_id']
-                    nama_produk = mapping['nama_produk'] or "Produk"
-                    status = mapping['status_mapping']
-                    
-                    status_icon = "✅" if status == 'Y' else "❌"
-                    action = "Nonaktifkan" if status == 'Y' else "Aktifkan"
-                    
-                    button_text = f"{i}. {nama_produk[:15]} {status_icon}"
-                    button = types.InlineKeyboardButton(
-                        text=button_text,
-                        callback_data=f"toggle_mapping_{mapping_id}_{global_index}"
-                    )
-                    keyboard.add(button)
-                
-                # Tombol paging jika ada lebih dari 1 halaman
-                if total_pages > 1:
-                    paging_buttons = []
-                    
-                    # Tombol Previous
-                    if page > 1:
-                        paging_buttons.append(
-                            types.InlineKeyboardButton("⬅️", callback_data=f"manage_mapping_{supplier_id}_page_{page-1}")
-                        )
-                    
-                    # Info halaman
-                    paging_buttons.append(
-                        types.InlineKeyboardButton(f"{page}/{total_pages}", callback_data="no_action")
-                    )
-                    
-                    # Tombol Next
-                    if page < total_pages:
-                        paging_buttons.append(
-                            types.InlineKeyboardButton("➡️", callback_data=f"manage_mapping_{supplier_id}_page_{page+1}")
-                        )
-                    
-                    keyboard.add(*paging_buttons)
-                
-                # Tombol filter dan aksi
-                action_buttons = []
-                action_buttons.append(
-                    types.InlineKeyboardButton("🔄 Refresh", callback_data=f"manage_mapping_{supplier_id}_page_{page}")
-                )
-                action_buttons.append(
-                    types.InlineKeyboardButton("📊 Filter Aktif", callback_data=f"filter_mapping_{supplier_id}_Y_page_1")
-                )
-                action_buttons.append(
-                    types.InlineKeyboardButton("📊 Filter Nonaktif", callback_data=f"filter_mapping_{supplier_id}_N_page_1")
-                )
-                action_buttons.append(
-                    types.InlineKeyboardButton("📋 Semua", callback_data=f"manage_mapping_{supplier_id}_page_1")
-                )
-                keyboard.add(*action_buttons)
-                
-                # Tombol kembali
-                keyboard.row(
-                    types.InlineKeyboardButton("🔙 Kembali ke List", callback_data="back_to_mapping_menu")
-                )
-                
-                # Edit atau kirim pesan baru
-                try:
-                    bot.edit_message_text(
-                        chat_id=call.message.chat.id,
-                        message_id=call.message.message_id,
-                        text=mapping_pesan,
-                        parse_mode='Markdown',
-                        reply_markup=keyboard
-                    )
-                except Exception as e:
-                    bot.send_message(
-                        call.message.chat.id,
-                        mapping_pesan,
-                        parse_mode='Markdown',
-                        reply_markup=keyboard
-                    )
-                
-            else:
-                # Tidak ada mapping sama sekali
-                keyboard_empty = types.InlineKeyboardMarkup()
-                keyboard_empty.row(
-                    types.InlineKeyboardButton("➕ Tambah Mapping Baru", callback_data=f"add_mapping_{supplier_id}")
-                )
-                keyboard_empty.row(
-                    types.InlineKeyboardButton("🔙 Kembali ke List", callback_data="back_to_mapping_menu")
-                )
-                
-                try:
-                    bot.edit_message_text(
-                        chat_id=call.message.chat.id,
-                        message_id=call.message.message_id,
-                        text=f"📋 BELUM ADA MAPPING\n\nSupplier **{nama_supplier}** belum memiliki mapping produk.\n\nKlik tombol dibawah untuk menambahkan mapping baru.",
-                        parse_mode='Markdown',
-                        reply_markup=keyboard_empty
-                    )
-                except Exception as e:
-                    bot.send_message(
-                        call.message.chat.id,
-                        f"📋 BELUM ADA MAPPING\n\nSupplier **{nama_supplier}** belum memiliki mapping produk.\n\nKlik tombol dibawah untuk menambahkan mapping baru.",
-                        parse_mode='Markdown',
-                        reply_markup=keyboard_empty
-                    )
-                
+            # Query mapping produk dengan keyset paging
+            page = keyset_produk_page(sql, select_sql, params, mode, page_number, key, total_data)
+    
+    # Posisi halaman untuk refresh setelah toggle status
+    paging_states[chat_id] = {
+        'supplier_id': supplier_id,
+        'current_page': page.number,
+        'refresh': refresh_callback(base, page)
+    }
+    return render_mapping_page(nama_supplier, supplier_id, base, page, status_filter)
+
+def show_mapping_screen(call, bot, supplier_id, status_filter, position):
+    """Tampilkan layar mapping untuk tombol yang ditekan"""
+    try:
+        show_screen(bot, call, mapping_screen(call.message.chat.id, supplier_id, status_filter, position))
+    except (ValueError, ConnectionError) as e:
+        bot.answer_callback_query(call.id, str(e))
     except Exception as e:
         bot.answer_callback_query(call.id, f"Error: {str(e)}")
-        print(f"Error in handle_manage_mapping_supplier: {e}")
-    finally:
-        if conn and conn.open:
-            conn.close()
+        print(f"Error in show_mapping_screen: {e}")
+
+def handle_manage_mapping_supplier(call, bot, supplier_id, position):
+    """Handle daftar mapping produk per supplier"""
+    show_mapping_screen(call, bot, supplier_id, None, position)
 
-def handle_toggle_mapping(call, bot):
+def handle_toggle_mapping(call, bot, mapping_id):
     """Handle toggle status mapping produk"""
-    data_parts = call.data.replace('toggle_mapping_', '').split('_')
-    if len(data_parts) >= 2:
-        mapping_id = data_parts[0]
-        global_index = int(data_parts[1])
-    else:
-        bot.answer_callback_query(call.id, "Data tidak valid")
-        return
-    
     # Toggle status di database
-    success, new_status = toggle_mapping_status(mapping_id)
+    success, new_status, supplier_id = toggle_mapping_status(mapping_id)
     
     if success:
-        # Cari supplier_id dari paging state
-        supplier_id = None
-        current_page = 1
-        if call.message.chat.id in paging_states:
-            supplier_id = paging_states[call.message.chat.id].get('supplier_id')
-            current_page = paging_states[call.message.chat.id].get('current_page', 1)
+        # Halaman yang sedang dibuka (daftar semua atau filter) dari paging state
+        refresh_data = None
+        paging_state = paging_states.get(call.message.chat.id)
+        if paging_state:
+            supplier_id = supplier_id or paging_state.get('supplier_id')
+            if str(paging_state.get('supplier_id')) == str(supplier_id):
+                refresh_data = paging_state.get('refresh')
         
         if supplier_id:
             status_text = "diaktifkan" if new_status == 'Y' else "dinonaktifkan"
             bot.answer_callback_query(call.id, f"✅ Mapping {status_text}")
             
-            # Refresh tampilan
-            handle_manage_mapping_supplier(
-                types.CallbackQuery(
-                    id=call.id,
-                    from_user=call.from_user,
-                    message=call.message,
-                    chat_instance=call.chat_instance,
-                    data=f"manage_mapping_{supplier_id}_page_{current_page}"
-                ),
-                bot
-            )
+            if not refresh_data:
+                refresh_data = first_page_callback(f"manage_mapping_{supplier_id}")
+            
+            # Refresh tampilan di pesan yang sama
+            try:
+                parsed = parse_mapping_callback(refresh_data)
+                if parsed is None:
+                    raise ValueError("Data filter tidak valid")
+                show_screen(bot, call, mapping_screen(call.message.chat.id, *parsed))
+            except Exception as e:
+                print(f"Error refresh mapping: {e}")
         else:
             bot.answer_callback_query(call.id, "Status diubah, refresh manual")
     else:
         bot.answer_callback_query(call.id, "❌ Gagal mengubah status")
 
 def toggle_mapping_status(mapping_id):
-    """Toggle status aktif/non-aktif mapping di database"""
-    conn = connection()
-    if conn is None:
-        return False, None
-    
-    try:
-        with conn.cursor() as sql:
-            # Cek status saat ini
-            sql.execute("""
-                SELECT aktif FROM tb_suplieritem 
-                WHERE id = %s
-            """, (mapping_id,))
-            
-            result = sql.fetchone()
-            if not result:
-                return False, None
-            
-            current_status = result['aktif']
-            new_status = 'N' if current_status == 'Y' else 'Y'
-            
-            # Update status
-            sql.execute("""
-                UPDATE tb_suplieritem 
-                SET aktif = %s 
-                WHERE id = %s
-            """, (new_status, mapping_id))
-            
-            conn.commit()
-            return True, new_status
-            
-    except Exception as e:
-        conn.rollback()
-        print(f"Error toggling mapping status: {e}")
-        return False, None
-    finally:
-        if conn and conn.open:
-            conn.close()
-
-def handle_filter_mapping(call, bot):
-    """Handle filter mapping berdasarkan status"""
-    data_parts = call.data.replace('filter_mapping_', '').split('_')
-    if len(data_parts) >= 3:
-        supplier_id = data_parts[0]
-        status_filter = data_parts[1]  # 'Y' atau 'N'
-        page = int(data_parts[3]) if len(data_parts) > 3 else 1
-    else:
-        bot.answer_callback_query(call.id, "Data filter tidak valid")
-        return
-    
-    conn = connection()
-    if conn is None:
-        bot.answer_callback_query(call.id, "Koneksi database gagal")
-        return
-    
-    try:
-        with conn.cursor() as sql:
-            # Query untuk mendapatkan nama supplier
-            sql.execute("SELECT namasuplier FROM tb_suplier WHERE id = %s", (supplier_id,))
-            supplier_data = sql.fetchone()
-            nama_supplier = supplier_data['namasuplier'] if supplier_data else "Supplier"
-            
-            # Hitung total data untuk paging dengan filter
-            sql.execute("""
-                SELECT COUNT(*) as total
-                FROM tb_suplieritem si
-                JOIN tbl_produk p ON si.iditem = p.id_produk
-                WHERE si.idsuplier = %s 
-                    AND p.aktif = 'Y'
-                    AND si.aktif = %s
-            """, (supplier_id, status_filter))
-            
-            total_data = sql.fetchone()['total']
-            items_per_page = 10
-            total_pages = max(1, (total_data + items_per_page - 1) // items_per_page)
-            
-            # Validasi page number
-            if page < 1:
-                page = 1
-            elif page > total_pages:
-                page = total_pages
-            
-            # Calculate offset
-            offset = (page - 1) * items_per_page
-            
-            # Query mapping produk dengan filter status
-            sql.execute("""
-                SELECT 
-                    si.id as mapping_id,
-                    p.id_produk,
-                    p.nama_produk,
-                    p.deskripsi,
-                    si.harga as harga_beli,
-                    s.satuan as nama_satuan,
-                    si.isi,
-                    si.aktif as status_mapping,
-                    p.stok,
-                    p.harga as harga_jual
-                FROM tb_suplieritem si
-                JOIN tbl_produk p ON si.iditem = p.id_produk
-                LEFT JOIN tb_satuan s ON si.satuan = s.id
-                WHERE si.idsuplier = %s 
-                    AND p.aktif = 'Y'
-                    AND si.aktif = %s
-                ORDER BY p.nama_produk
-                LIMIT %s OFFSET %s
-            """, (supplier_id, status_filter, items_per_page, offset))
-            
-            hasil_mapping = sql.fetchall()
-            
-            # Buat pesan dengan filter info
-            filter_text = "AKTIF" if status_filter == 'Y' else "NON-AKTIF"
-            mapping_pesan = f"📋 MAPPING PRODUK - {nama_supplier}\n\n"
-            mapping_pesan += f"**Filter:** {filter_text}\n"
-            mapping_pesan += f"**Halaman:** {page}/{total_pages}\n"
-            mapping_pesan += f"**Total Mapping:** {total_data} produk\n\n"
-            
-            if hasil_mapping:
-                for i, mapping in enumerate(hasil_mapping, 1):
-                    mapping_id = mapping['mapping_id']
-                    nama_produk = mapping['nama_produk'] or "-"
-                    deskripsi = mapping['deskripsi'] or "-"
-                    harga_beli = mapping['harga_beli'] or 0
-                    nama_satuan = mapping['nama_satuan'] or "PCS"
-                    isi = mapping['isi'] or 1
-                    status = mapping['status_mapping']
-                    stok = mapping['stok'] or 0
-                    harga_jual = mapping['harga_jual'] or 0
-                    
-                    # Format harga
-                    harga_beli_rupiah = format_rupiah(harga_beli)
-                    harga_jual_rupiah = format_rupiah(harga_jual)
-                    
-                    # Status icon
-                    status_icon = "✅" if status == 'Y' else "❌"
-                    status_text = "AKTIF" if status == 'Y' else "NON-AKTIF"
-                    
-                    nomor_urutan = i + offset
-                    mapping_pesan += f"**{nomor_urutan}. {nama_produk} {status_icon}**\n"
-                    mapping_pesan += f"   📝 {deskripsi[:30]}{'...' if len(deskripsi) > 30 else ''}\n"
-                    mapping_pesan += f"   💰 Beli: {harga_beli_rupiah} | Jual: {harga_jual_rupiah}\n"
-                    mapping_pesan += f"   📦 Stok: {stok} | Satuan: {nama_satuan} (isi: {isi})\n"
-                    mapping_pesan += f"   🔧 Status: {status_text} | ID Mapping: `{mapping_id}`\n"
-                    mapping_pesan += "   ──────────────\n"
-            else:
-                mapping_pesan += f"📭 Tidak ada mapping {filter_text.lower()}\n\n"
-            
-            # Buat keyboard dengan tombol toggle
-            keyboard = types.InlineKeyboardMarkup(row_width=2)
-            
-            # Tombol untuk setiap produk
-            for i, mapping in enumerate(hasil_mapping, 1):
-                global_index = i + offset - 1
-                mapping_id = mapping['mapping_id']
-                nama_produk = mapping['nama_produk'] or "Produk"
-                status = mapping['status_mapping']
-                
-                status_icon = "✅" if status == 'Y' else "❌"
+    """
+    Toggle status aktif/non-aktif mapping di database.
+    Return (berhasil, status_baru, supplier_id) dan buang snapshot katalog supplier tersebut.
+    """
+    with connection() as conn:
+        if conn is None:
+            return False, None, None
+        
+        try:
+            with conn.cursor() as sql:
+                # Cek status saat ini
+                sql.execute("""
+                    SELECT aktif, idsuplier FROM tb_suplieritem 
+                    WHERE id = %s
+                """, (mapping_id,))
                 
-                button_text = f"{i}. {nama_produk[:15]} {status_icon}"
-                button = types.InlineKeyboardButton(
-                    text=button_text,
-                    callback_data=f"toggle_mapping_{mapping_id}_{global_index}"
-                )
-                keyboard.add(button)
-            
-            # Tombol paging jika ada lebih dari 1 halaman
-            if total_pages > 1:
-                paging_buttons = []
+                result = sql.fetchone()
+                if not result:
+                    return False, None, None
                 
-                # Tombol Previous
-                if page > 1:
-                    paging_buttons.append(
-                        types.InlineKeyboardButton("⬅️", callback_data=f"filter_mapping_{supplier_id}_{status_filter}_page_{page-1}")
-                    )
+                current_status = result['aktif']
+                new_status = 'N' if current_status == 'Y' else 'Y'
                 
-                # Info halaman
-                paging_buttons.append(
-                    types.InlineKeyboardButton(f"{page}/{total_pages}", callback_data="no_action")
-                )
+                # Update status
+                sql.execute("""
+                    UPDATE tb_suplieritem 
+                    SET aktif = %s 
+                    WHERE id = %s
+                """, (new_status, mapping_id))
                 
-                # Tombol Next
-                if page < total_pages:
-                    paging_buttons.append(
-                        types.InlineKeyboardButton("➡️", callback_data=f"filter_mapping_{supplier_id}_{status_filter}_page_{page+1}")
-                    )
+                conn.commit()
+                catalog_registry.invalidate(result['idsuplier'])
+                invalidate_count('mapping', result['idsuplier'])
+                invalidate_count('stok', result['idsuplier'])
+                return True, new_status, result['idsuplier']
                 
-                keyboard.add(*paging_buttons)
-            
-            # Tombol filter dan aksi
-            action_buttons = []
-            action_buttons.append(
-                types.InlineKeyboardButton("🔄 Refresh", callback_data=f"filter_mapping_{supplier_id}_{status_filter}_page_{page}")
-            )
-            
-            # Tombol filter lain
-            if status_filter == 'Y':
-                action_buttons.append(
-                    types.InlineKeyboardButton("📊 Filter Nonaktif", callback_data=f"filter_mapping_{supplier_id}_N_page_1")
-                )
-            else:
-                action_buttons.append(
-                    types.InlineKeyboardButton("📊 Filter Aktif", callback_data=f"filter_mapping_{supplier_id}_Y_page_1")
-                )
-            
-            action_buttons.append(
-                types.InlineKeyboardButton("📋 Semua", callback_data=f"manage_mapping_{supplier_id}_page_1")
-            )
-            keyboard.add(*action_buttons)
-            
-            # Tombol kembali
-            keyboard.row(
-                types.InlineKeyboardButton("🔙 Kembali ke List", callback_data="back_to_mapping_menu")
-            )
-            
-            # Edit atau kirim pesan baru
-            try:
-                bot.edit_message_text(
-                    chat_id=call.message.chat.id,
-                    message_id=call.message.message_id,
-                    text=mapping_pesan,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
-            except Exception as e:
-                bot.send_message(
-                    call.message.chat.id,
-                    mapping_pesan,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
-            
-    except Exception as e:
-        bot.answer_callback_query(call.id, f"Error: {str(e)}")
-        print(f"Error in handle_filter_mapping: {e}")
-    finally:
-        if conn and conn.open:
-            conn.close()
+        except Exception as e:
+            conn.rollback()
+            print(f"Error toggling mapping status: {e}")
+            return False, None, None
+
+def handle_filter_mapping(call, bot, supplier_id, status, position):
+    """Handle filter mapping berdasarkan status"""
+    show_mapping_screen(call, bot, supplier_id, status, position)
 
 # ============================ FUNGSI BANTUAN MAPPING ============================
 
 def get_mapping_stats(supplier_id):
     """Get statistics for mapping produk"""
-    conn = connection()
-    if conn is None:
-        return None
-    
-    try:
-        with conn.cursor() as sql:
-            sql.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN aktif = 'Y' THEN 1 ELSE 0 END) as aktif,
-                    SUM(CASE WHEN aktif = 'N' THEN 1 ELSE 0 END) as nonaktif
-                FROM tb_suplieritem 
-                WHERE idsuplier = %s
-            """, (supplier_id,))
-            
-            return sql.fetchone()
-    except Exception as e:
-        print(f"Error getting mapping stats: {e}")
-        return None
-    finally:
-        if conn and conn.open:
-            conn.close()
\ No newline at end of file
+    with connection() as conn:
+        if conn is None:
+            return None
+        
+        try:
+            with conn.cursor() as sql:
+                sql.execute("""
+                    SELECT 
+                        COUNT(*) as total,
+                        SUM(CASE WHEN aktif = 'Y' THEN 1 ELSE 0 END) as aktif,
+                        SUM(CASE WHEN aktif = 'N' THEN 1 ELSE 0 END) as nonaktif
+                    FROM tb_suplieritem 
+                    WHERE idsuplier = %s
+                """, (supplier_id,))
+                
+                return sql.fetchone()
+        except Exception as e:
+            print(f"Error getting mapping stats: {e}")
+            return None
\ No newline at end of file
@@ -1,10 +1,11 @@
 import datetime
 from telebot import types
-from database import connection, get_nik_from_telegram
+from database import connection, get_nik_from_telegram, invalidate_identity
 from utils.helpers import validate_nik
+from utils.state_store import create_state_store
 
 # State management
-user_states = {}
+user_states = create_state_store('registration')
 
 def handle_start_registration(message, bot):
     """Start registration process"""
@@ -39,11 +40,10 @@ def handle_registration_input(message, bot):
     """Handle registration input"""
     user_id = str(message.from_user.id)
     
-    if user_id not in user_states or user_states[user_id].get('type') != 'registration':
+    user_state = user_states.get(user_id)
+    if user_state is None or user_state.get('type') != 'registration':
         return
     
-    user_state = user_states[user_id]
-    
     if user_state['state'] == 'waiting_for_nik':
         # Validasi NIK
         nik = message.text.strip()
@@ -53,31 +53,32 @@ def handle_registration_input(message, bot):
             return
         
         # Cek apakah NIK ada di database
-        conn = connection()
-        if conn is None:
-            bot.reply_to(message, "Koneksi database gagal. Silakan coba lagi.")
-            return
-        
-        try:
-            with conn.cursor() as sql:
-                sql.execute("""
-                    SELECT nik, nama
-                    FROM tb_karyawan 
-                    WHERE nik = %s AND aktif = 'Y'
-                """, (nik,))
-                
-                result = sql.fetchone()
-                
-                if result:
-                    # NIK ditemukan, simpan data dan minta konfirmasi
-                    user_state['data'] = {
-                        'nik': result['nik'],
-                        'nama': result['nama']
-                    }
-                    user_state['state'] = 'waiting_for_confirmation'
+        with connection() as conn:
+            if conn is None:
+                bot.reply_to(message, "Koneksi database gagal. Silakan coba lagi.")
+                return
+            
+            try:
+                with conn.cursor() as sql:
+                    sql.execute("""
+                        SELECT nik, nama
+                        FROM tb_karyawan 
+                        WHERE nik = %s AND aktif = 'Y'
+                    """, (nik,))
+                    
+                    result = sql.fetchone()
                     
-                    # Tampilkan data untuk konfirmasi
-                    confirm_text = f"""
+                    if result:
+                        # NIK ditemukan, simpan data dan minta konfirmasi
+                        user_state['data'] = {
+                            'nik': result['nik'],
+                            'nama': result['nama']
+                        }
+                        user_state['state'] = 'waiting_for_confirmation'
+                        user_states[user_id] = user_state
+                        
+                        # Tampilkan data untuk konfirmasi
+                        confirm_text = f"""
 DATA DITEMUKAN
 
 Silakan konfirmasi data berikut:
@@ -87,36 +88,33 @@ Nama: {result['nama']}
 
 Apakah data di atas benar?
 """
-                    keyboard = types.InlineKeyboardMarkup()
-                    keyboard.row(
-                        types.InlineKeyboardButton("Ya, Data Benar", callback_data="confirm_registration"),
-                        types.InlineKeyboardButton("Tidak, Ubah NIK", callback_data="change_nik")
-                    )
-                    
-                    bot.send_message(
-                        message.chat.id,
-                        confirm_text,
-                        parse_mode='Markdown',
-                        reply_markup=keyboard
-                    )
-                    
-                else:
-                    # NIK tidak ditemukan
-                    bot.reply_to(
-                        message,
-                        f"NIK {nik} tidak ditemukan dalam database karyawan aktif.\n\n"
-                        "Pastikan:\n"
-                        "• NIK yang dimasukkan benar (10 digit)\n"
-                        "• Anda adalah karyawan aktif\n"
-                        "• Data sudah terdaftar di sistem\n\n"
-                        "Silakan masukkan NIK kembali atau hubungi admin untuk bantuan:"
-                    )
-                    
-        except Exception as e:
-            bot.reply_to(message, f"Error: {str(e)}")
-        finally:
-            if conn and conn.open:
-                conn.close()
+                        keyboard = types.InlineKeyboardMarkup()
+                        keyboard.row(
+                            types.InlineKeyboardButton("Ya, Data Benar", callback_data="confirm_registration"),
+                            types.InlineKeyboardButton("Tidak, Ubah NIK", callback_data="change_nik")
+                        )
+                        
+                        bot.send_message(
+                            message.chat.id,
+                            confirm_text,
+                            parse_mode='Markdown',
+                            reply_markup=keyboard
+                        )
+                        
+                    else:
+                        # NIK tidak ditemukan
+                        bot.reply_to(
+                            message,
+                            f"NIK {nik} tidak ditemukan dalam database karyawan aktif.\n\n"
+                            "Pastikan:\n"
+                            "• NIK yang dimasukkan benar (10 digit)\n"
+                            "• Anda adalah karyawan aktif\n"
+                            "• Data sudah terdaftar di sistem\n\n"
+                            "Silakan masukkan NIK kembali atau hubungi admin untuk bantuan:"
+                        )
+                        
+            except Exception as e:
+                bot.reply_to(message, f"Error: {str(e)}")
     
     elif user_state['state'] == 'waiting_for_confirmation':
         # Handle konfirmasi manual (jika user mengetik)
@@ -124,37 +122,44 @@ Apakah data di atas benar?
             complete_registration(user_id, message.chat.id, bot)
         elif message.text.lower() in ['tidak', 'no', 'salah', 'wrong']:
             user_state['state'] = 'waiting_for_nik'
+            user_states[user_id] = user_state
             bot.reply_to(message, "Silakan masukkan NIK yang benar:")
         else:
             bot.reply_to(message, "Silakan pilih 'Ya' atau 'Tidak' untuk konfirmasi data.")
 
 def complete_registration(user_id, chat_id, bot):
     """Complete registration process"""
-    user_state = user_states[user_id]
-    user_data = user_state['data']
-    
-    conn = connection()
-    if conn is None:
-        bot.send_message(chat_id, "Koneksi database gagal. Silakan coba lagi.")
+    user_state = user_states.get(user_id)
+    if user_state is None:
+        bot.send_message(chat_id, "Tidak ada proses pendaftaran aktif")
         return
+    user_data = user_state['data']
     
-    try:
-        with conn.cursor() as sql:
-            # Update ID Telegram di database
-            sql.execute("""
-                UPDATE tb_karyawan 
-                SET id_tele = %s 
-                WHERE nik = %s AND aktif = 'Y'
-            """, (user_id, user_data['nik']))
-            
-            if sql.rowcount > 0:
-                conn.commit()
-                
-                # Hapus state user
-                del user_states[user_id]
+    with connection() as conn:
+        if conn is None:
+            bot.send_message(chat_id, "Koneksi database gagal. Silakan coba lagi.")
+            return
+        
+        try:
+            with conn.cursor() as sql:
+                # Update ID Telegram di database
+                sql.execute("""
+                    UPDATE tb_karyawan 
+                    SET id_tele = %s 
+                    WHERE nik = %s AND aktif = 'Y'
+                """, (user_id, user_data['nik']))
                 
-                # Kirim pesan sukses
-                success_text = f"""
+                if sql.rowcount > 0:
+                    conn.commit()
+                    
+                    # Hapus cache identitas (termasuk cache negatif "belum terdaftar")
+                    invalidate_identity(user_id, nik=user_data['nik'])
+                    
+                    # Hapus state user
+                    del user_states[user_id]
+                    
+                    # Kirim pesan sukses
+                    success_text = f"""
 PENDAFTARAN BERHASIL! ✅
 
 Selamat {user_data['nama']}, 
@@ -166,23 +171,21 @@ Nama: {user_data['nama']}
 
 Sekarang Anda dapat mengakses semua fitur bot.
 """
-                bot.send_message(chat_id, success_text, parse_mode='Markdown')
-                
-            else:
-                bot.send_message(chat_id, "Gagal menyimpan data. Silakan hubungi admin.")
-                
-    except Exception as e:
-        conn.rollback()
-        bot.send_message(chat_id, f"Error saat menyimpan data: {str(e)}")
-    finally:
-        if conn and conn.open:
-            conn.close()
+                    bot.send_message(chat_id, success_text, parse_mode='Markdown')
+                    
+                else:
+                    bot.send_message(chat_id, "Gagal menyimpan data. Silakan hubungi admin.")
+                    
+        except Exception as e:
+            conn.rollback()
+            bot.send_message(chat_id, f"Error saat menyimpan data: {str(e)}")
 
 def handle_registration_callbacks(call, bot):
     """Handle registration callbacks"""
     user_id = str(call.from_user.id)
     
-    if user_id not in user_states or user_states[user_id].get('type') != 'registration':
+    user_state = user_states.get(user_id)
+    if user_state is None or user_state.get('type') != 'registration':
         bot.answer_callback_query(call.id, "Tidak ada proses pendaftaran aktif")
         return
     
@@ -193,8 +196,9 @@ def handle_registration_callbacks(call, bot):
         
     elif call.data == 'change_nik':
         # Ubah NIK
-        user_states[user_id]['state'] = 'waiting_for_nik'
-        user_states[user_id]['data'] = {}
+        user_state['state'] = 'waiting_for_nik'
+        user_state['data'] = {}
+        user_states[user_id] = user_state
         
         bot.edit_message_text(
             chat_id=call.message.chat.id,
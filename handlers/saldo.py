@@ -1,6 +1,44 @@
 import datetime
 from database import get_nik_from_telegram, connection
 from utils.helpers import log, format_rupiah
+from utils.saldo_store import get_saldo
+from utils.deposit_watcher import get_last_upload
+
+PESAN_BELUM_TERDAFTAR = (
+    "Data tidak ditemukan\n\n"
+    "ID Telegram Anda tidak terdaftar dalam sistem.\n"
+    "Silakan daftar terlebih dahulu dengan klik 'Daftar Sekarang'."
+)
+
+def format_saldo(nama, nik, saldo):
+    """Pesan balasan cek saldo"""
+    pesan_balasan = f"SALDO KOPERASI SINDHU ARTHA WIGUNA\n\n"
+    pesan_balasan += f"Nama: {nama}\n"
+    pesan_balasan += f"NIK: `{nik}`\n"
+    pesan_balasan += f"Saldo: *{format_rupiah(saldo)}*\n\n"
+    pesan_balasan += f"Update: {datetime.datetime.now().strftime('%d-%m-%Y %H:%M')}"
+    return pesan_balasan
+
+def format_last_upload(nama, nik, hasil_sql):
+    """Pesan balasan upload terakhir ({keterangan, setor} atau None)"""
+    if not hasil_sql:
+        return (
+            f"Tidak Ada Data Upload\n\n"
+            f"Nama: {nama}\n"
+            f"NIK: `{nik}`\n\n"
+            f"Belum ada data upload untuk NIK Anda."
+        )
+    
+    keterangan = hasil_sql['keterangan'] or "Tidak ada keterangan"
+    setor_rupiah = format_rupiah(hasil_sql['setor'] or 0)
+    
+    pesan_balasan = f"SALDO TERAKHIR DIUPLOAD\n\n"
+    pesan_balasan += f"Nama: {nama}\n"
+    pesan_balasan += f"NIK: `{nik}`\n"
+    pesan_balasan += f"Keterangan: {keterangan}\n"
+    pesan_balasan += f"Jumlah: *{setor_rupiah}*\n\n"
+    pesan_balasan += f"Tanggal Update: {datetime.datetime.now().strftime('%d-%m-%Y %H:%M')}"
+    return pesan_balasan
 
 def handle_cek_saldo(message, bot):
     """Handle cek saldo request"""
@@ -10,13 +48,7 @@ def handle_cek_saldo(message, bot):
     user_data = get_nik_from_telegram(user_id)
     
     if not user_data:
-        bot.reply_to(
-            message, 
-            "Data tidak ditemukan\n\n"
-            "ID Telegram Anda tidak terdaftar dalam sistem.\n"
-            "Silakan daftar terlebih dahulu dengan klik 'Daftar Sekarang'.",
-            parse_mode='Markdown'
-        )
+        bot.reply_to(message, PESAN_BELUM_TERDAFTAR, parse_mode='Markdown')
         return
     
     nik = user_data['nik']
@@ -24,32 +56,16 @@ def handle_cek_saldo(message, bot):
     
     # Proses cek saldo
     try:
-        conn = connection()
-        if conn is None:
-            bot.reply_to(message, "Koneksi database gagal")
-            return
+        with connection() as conn:
+            if conn is None:
+                bot.reply_to(message, "Koneksi database gagal")
+                return
         
-        with conn.cursor() as sql:
-            # Query saldo
-            sql.execute("""
-                SELECT COALESCE(SUM(setor) - SUM(tarik), 0) as saldo_anda 
-                FROM tb_deposit_detil 
-                WHERE nik = %s
-            """, (nik,))
-            
-            hasil_sql = sql.fetchone()
-            saldo = hasil_sql['saldo_anda'] if hasil_sql else 0
+            # Saldo dari tabel saldo member + baris baru, tanpa lock dan tanpa menulis
+            saldo = get_saldo(conn, nik)
 
-            saldo_rupiah = format_rupiah(saldo)
-            
-            pesan_balasan = f"SALDO KOPERASI SINDHU ARTHA WIGUNA\n\n"
-            pesan_balasan += f"Nama: {nama}\n"
-            pesan_balasan += f"NIK: `{nik}`\n"
-            pesan_balasan += f"Saldo: *{saldo_rupiah}*\n\n"
-            pesan_balasan += f"Update: {datetime.datetime.now().strftime('%d-%m-%Y %H:%M')}"
-
-            bot.reply_to(message, pesan_balasan, parse_mode='Markdown')
-            
+            bot.reply_to(message, format_saldo(nama, nik, saldo), parse_mode='Markdown')
+        
             # Log activity
             log(message, f'mysaldo_auto_{nik}')
 
@@ -76,50 +92,21 @@ def handle_last_upload(message, bot):
     nama = user_data['nama']
     
     try:
-        conn = connection()
-        if conn is None:
-            bot.reply_to(message, "Koneksi database gagal")
-            return
-        
-        with conn.cursor() as sql:
-            # Query last upload
-            sql.execute("""
-                SELECT keterangan, setor 
-                FROM tb_deposit_detil 
-                WHERE jenis = 'setor' AND nik = %s 
-                ORDER BY id DESC 
-                LIMIT 1
-            """, (nik,))
-            
-            hasil_sql = sql.fetchone()
-
-            if not hasil_sql:
-                bot.reply_to(
-                    message,
-                    f"Tidak Ada Data Upload\n\n"
-                    f"Nama: {nama}\n"
-                    f"NIK: `{nik}`\n\n"
-                    f"Belum ada data upload untuk NIK Anda.",
-                    parse_mode='Markdown'
-                )
+        with connection() as conn:
+            if conn is None:
+                bot.reply_to(message, "Koneksi database gagal")
                 return
+        
+            with conn.cursor() as sql:
+                # Upload terakhir (dari cache yang diperbarui watcher mutasi)
+                hasil_sql = get_last_upload(sql, nik)
 
-            keterangan = hasil_sql['keterangan'] or "Tidak ada keterangan"
-            setor = hasil_sql['setor'] or 0
-
-            setor_rupiah = format_rupiah(setor)
-
-            pesan_balasan = f"SALDO TERAKHIR DIUPLOAD\n\n"
-            pesan_balasan += f"Nama: {nama}\n"
-            pesan_balasan += f"NIK: `{nik}`\n"
-            pesan_balasan += f"Keterangan: {keterangan}\n"
-            pesan_balasan += f"Jumlah: *{setor_rupiah}*\n\n"
-            pesan_balasan += f"Tanggal Update: {datetime.datetime.now().strftime('%d-%m-%Y %H:%M')}"
-
-            bot.reply_to(message, pesan_balasan, parse_mode='Markdown')
+                bot.reply_to(message, format_last_upload(nama, nik, hasil_sql), parse_mode='Markdown')
+                if not hasil_sql:
+                    return
             
-            # Log activity
-            log(message, f'lastupload_auto_{nik}')
+                # Log activity
+                log(message, f'lastupload_auto_{nik}')
 
     except Exception as e:
         bot.reply_to(message, f"Terjadi kesalahan: {str(e)}")
\ No newline at end of file
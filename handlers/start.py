@@ -1,8 +1,9 @@
 from telebot import types
 from database import get_nik_from_telegram
+from utils.navigation import is_callback, show_screen
 
-def show_registration_menu(message, bot):
-    """Show registration menu for new users"""
+def render_registration_menu():
+    """Teks dan keyboard balasan menu pendaftaran"""
     keyboard = types.ReplyKeyboardMarkup(row_width=2, resize_keyboard=True)
     buttons = [
         types.KeyboardButton("Daftar Sekarang"),
@@ -25,10 +26,15 @@ Fitur yang tersedia setelah pendaftaran:
 
 Klik "Daftar Sekarang" untuk memulai pendaftaran.
 """
-    bot.reply_to(message, welcome_text, parse_mode='Markdown', reply_markup=keyboard)
+    return welcome_text, keyboard
 
-def show_main_menu(message, bot):
-    """Show main menu for registered users"""
+def show_registration_menu(source, bot):
+    """Show registration menu for new users"""
+    # Keyboard balasan tidak bisa dipasang lewat edit, show_screen mengirim pesan baru
+    show_screen(bot, source, render_registration_menu(), reply=True)
+
+def render_main_menu():
+    """Teks dan keyboard balasan menu utama"""
     keyboard = types.ReplyKeyboardMarkup(row_width=2, resize_keyboard=True)
     
     buttons = [
@@ -57,18 +63,26 @@ Silakan pilih menu yang tersedia:
 Fitur otomatis:
 Saldo dan data akan ditampilkan secara otomatis berdasarkan ID Telegram Anda.
 """
-    bot.reply_to(message, welcome_text, parse_mode='Markdown', reply_markup=keyboard)
+    return welcome_text, keyboard
+
+def show_main_menu(source, bot):
+    """Show main menu for registered users"""
+    welcome_text, keyboard = render_main_menu()
+    if is_callback(source):
+        # Dari tombol inline: keyboard balasan menu utama masih tampil, cukup edit pesannya
+        keyboard = None
+    show_screen(bot, source, (welcome_text, keyboard), reply=True)
 
-def handle_start(message, bot):
-    """Handle /start command"""
-    user_id = str(message.from_user.id)
+def handle_start(source, bot):
+    """Handle /start command (atau tombol kembali ke menu utama)"""
+    user_id = str(source.from_user.id)
     
     # Cek apakah user sudah terdaftar
     user_data = get_nik_from_telegram(user_id)
     
     if not user_data:
         # User belum terdaftar, tampilkan menu pendaftaran
-        show_registration_menu(message, bot)
+        show_registration_menu(source, bot)
     else:
         # User sudah terdaftar, tampilkan menu utama
-        show_main_menu(message, bot)
\ No newline at end of file
+        show_main_menu(source, bot)
\ No newline at end of file
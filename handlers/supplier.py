@@ -1,154 +1,140 @@
 from telebot import types
 from database import get_nik_from_telegram, connection
 from utils.helpers import log
+from utils.navigation import is_callback, show_screen, show_error
 
-def handle_mysupplier(message, bot):
-    """Handle supplier list request"""
-    log(message, 'mysupplier')
+def render_supplier_menu(user_data, suppliers):
+    """Teks dan keyboard daftar supplier user; keyboard None jika bukan supplier aktif"""
+    if not suppliers:
+        pesan_balasan = f"TIDAK ADA SUPPLIER\n\n"
+        pesan_balasan += f"Nama: {user_data['nama']}\n"
+        pesan_balasan += f"NIK: `{user_data['nik']}`\n\n"
+        pesan_balasan += "Anda tidak terdaftar sebagai supplier aktif."
+        return pesan_balasan, None
     
-    user_id = str(message.from_user.id)
+    # Buat tombol inline untuk supplier
+    keyboard = types.InlineKeyboardMarkup(row_width=1)
+    for supplier in suppliers:
+        button = types.InlineKeyboardButton(
+            text=supplier['nama_supplier'],
+            callback_data=f"supplier_{supplier['id_supplier']}"
+        )
+        keyboard.add(button)
+    
+    pesan_balasan = f"SUPPLIER SAYA\n\n"
+    pesan_balasan += f"Nama: {user_data['nama']}\n"
+    pesan_balasan += f"NIK: `{user_data['nik']}`\n\n"
+    pesan_balasan += f"Total {len(suppliers)} supplier aktif\nKlik untuk melihat detail:"
+    return pesan_balasan, keyboard
+
+def handle_mysupplier(source, bot):
+    """Handle supplier list request (pesan menu atau tombol kembali, diedit di tempat)"""
+    log(source.message if is_callback(source) else source, 'mysupplier')
+    
+    user_id = str(source.from_user.id)
     
     # Cek apakah user terdaftar
     user_data = get_nik_from_telegram(user_id)
     if not user_data:
-        bot.reply_to(
-            message, 
-            "Data tidak ditemukan\n\nID Telegram Anda tidak terdaftar. Silakan daftar terlebih dahulu.",
-            parse_mode='Markdown'
+        show_error(
+            bot, source,
+            "Data tidak ditemukan\n\nID Telegram Anda tidak terdaftar. Silakan daftar terlebih dahulu."
         )
         return
     
-    conn = connection()
-    if conn is None:
-        bot.reply_to(message, "Koneksi database gagal", parse_mode='Markdown')
-        return
+    with connection() as conn:
+        if conn is None:
+            show_error(bot, source, "Koneksi database gagal")
+            return
+        
+        try:
+            with conn.cursor() as sql:
+                sql.execute("""
+                    SELECT 
+                        s.id AS id_supplier,
+                        s.namasuplier AS nama_supplier,
+                        s.alamat,
+                        s.notlp,
+                        s.person
+                    FROM 
+                        tb_suplier s
+                    JOIN 
+                        tb_karyawan k ON s.id_karyawan = k.id
+                    WHERE 
+                        k.id_tele = %s
+                        AND s.aktif = 'Y'
+                        AND k.aktif = 'Y'
+                    ORDER BY s.namasuplier
+                """, (user_id,))
+                screen = render_supplier_menu(user_data, sql.fetchall())
+        except Exception as e:
+            show_error(bot, source, f"Error: {str(e)}", parse_mode=None)
+            return
     
-    try:
-        with conn.cursor() as sql:
-            sql.execute("""
-                SELECT 
-                    s.id AS id_supplier,
-                    s.namasuplier AS nama_supplier,
-                    s.alamat,
-                    s.notlp,
-                    s.person
-                FROM 
-                    tb_suplier s
-                JOIN 
-                    tb_karyawan k ON s.id_karyawan = k.id
-                WHERE 
-                    k.id_tele = %s
-                    AND s.aktif = 'Y'
-                    AND k.aktif = 'Y'
-                ORDER BY s.namasuplier
-            """, (user_id,))
-            
-            hasil_sql = sql.fetchall()
-            
-            if hasil_sql:
-                # Buat tombol inline untuk supplier
-                keyboard = types.InlineKeyboardMarkup(row_width=1)
-                
-                for supplier in hasil_sql:
-                    id_supplier = supplier['id_supplier']
-                    nama_supplier = supplier['nama_supplier']
-                    button = types.InlineKeyboardButton(
-                        text=nama_supplier,
-                        callback_data=f"supplier_{id_supplier}"
-                    )
-                    keyboard.add(button)
-                
-                pesan_balasan = f"SUPPLIER SAYA\n\n"
-                pesan_balasan += f"Nama: {user_data['nama']}\n"
-                pesan_balasan += f"NIK: `{user_data['nik']}`\n\n"
-                pesan_balasan += f"Total {len(hasil_sql)} supplier aktif\nKlik untuk melihat detail:"
-                
-                bot.send_message(
-                    message.chat.id,
-                    pesan_balasan,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
-                
-            else:
-                pesan_balasan = f"TIDAK ADA SUPPLIER\n\n"
-                pesan_balasan += f"Nama: {user_data['nama']}\n"
-                pesan_balasan += f"NIK: `{user_data['nik']}`\n\n"
-                pesan_balasan += "Anda tidak terdaftar sebagai supplier aktif."
-                bot.reply_to(message, pesan_balasan, parse_mode='Markdown')
-            
-    except Exception as e:
-        bot.reply_to(message, f"Error: {str(e)}")
-    finally:
-        if conn and conn.open:
-            conn.close()
+    show_screen(bot, source, screen, reply=screen[1] is None)
 
-def handle_supplier_callback(call, bot):
+def handle_supplier_callback(call, bot, supplier_id):
     """Handle supplier detail callback"""
-    supplier_id = call.data.replace('supplier_', '')
-    
-    conn = connection()
-    if conn is None:
-        bot.answer_callback_query(call.id, "Koneksi database gagal")
-        return
     
-    try:
-        with conn.cursor() as sql:
-            # Query detail supplier berdasarkan ID
-            sql.execute("""
-                SELECT 
-                    s.namasuplier,
-                    s.alamat,
-                    s.email,
-                    s.notlp,
-                    s.person,
-                    s.aktif
-                FROM tb_suplier s
-                WHERE s.id = %s
-            """, (supplier_id,))
-            
-            supplier_data = sql.fetchone()
-            
-            if supplier_data:
-                nama_supplier = supplier_data['namasuplier'] or "Tidak ada"
-                alamat = supplier_data['alamat'] or "Tidak ada"
-                email = supplier_data['email'] or "Tidak ada"
-                telepon = supplier_data['notlp'] or "Tidak ada"
-                contact_person = supplier_data['person'] or "Tidak ada"
-                status = "Aktif" if supplier_data['aktif'] == 'Y' else "Non-aktif"
-                
-                # Buat pesan detail
-                detail_pesan = f"DETAIL SUPPLIER\n\n"
-                detail_pesan += f"Nama: {nama_supplier}\n"
-                detail_pesan += f"Contact Person: {contact_person}\n"
-                detail_pesan += f"Alamat: {alamat}\n"
-                detail_pesan += f"Telepon: {telepon}\n"
-                detail_pesan += f"Email: {email}\n"
-                detail_pesan += f"Status: {status}\n"
-                
-                # Tombol aksi untuk supplier
-                keyboard = types.InlineKeyboardMarkup()
-                keyboard.row(
-                    types.InlineKeyboardButton("Lihat Stok", callback_data=f"stock_{supplier_id}_page_1")
-                )
-                keyboard.row(
-                    types.InlineKeyboardButton("Kembali ke List", callback_data="back_to_list")
-                )
+    with connection() as conn:
+        if conn is None:
+            bot.answer_callback_query(call.id, "Koneksi database gagal")
+            return
+        
+        try:
+            with conn.cursor() as sql:
+                # Query detail supplier berdasarkan ID
+                sql.execute("""
+                    SELECT 
+                        s.namasuplier,
+                        s.alamat,
+                        s.email,
+                        s.notlp,
+                        s.person,
+                        s.aktif
+                    FROM tb_suplier s
+                    WHERE s.id = %s
+                """, (supplier_id,))
                 
-                # Edit pesan sebelumnya
-                bot.edit_message_text(
-                    chat_id=call.message.chat.id,
-                    message_id=call.message.message_id,
-                    text=detail_pesan,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
+                supplier_data = sql.fetchone()
                 
-            else:
-                bot.answer_callback_query(call.id, "Data supplier tidak ditemukan")
-                
-    except Exception as e:
-        bot.answer_callback_query(call.id, f"Error: {str(e)}")
-    finally:
-        if conn and conn.open:
-            conn.close()
\ No newline at end of file
+                if supplier_data:
+                    nama_supplier = supplier_data['namasuplier'] or "Tidak ada"
+                    alamat = supplier_data['alamat'] or "Tidak ada"
+                    email = supplier_data['email'] or "Tidak ada"
+                    telepon = supplier_data['notlp'] or "Tidak ada"
+                    contact_person = supplier_data['person'] or "Tidak ada"
+                    status = "Aktif" if supplier_data['aktif'] == 'Y' else "Non-aktif"
+                    
+                    # Buat pesan detail
+                    detail_pesan = f"DETAIL SUPPLIER\n\n"
+                    detail_pesan += f"Nama: {nama_supplier}\n"
+                    detail_pesan += f"Contact Person: {contact_person}\n"
+                    detail_pesan += f"Alamat: {alamat}\n"
+                    detail_pesan += f"Telepon: {telepon}\n"
+                    detail_pesan += f"Email: {email}\n"
+                    detail_pesan += f"Status: {status}\n"
+                    
+                    # Tombol aksi untuk supplier
+                    keyboard = types.InlineKeyboardMarkup()
+                    keyboard.row(
+                        types.InlineKeyboardButton("Lihat Stok", callback_data=f"stock_{supplier_id}_page_1")
+                    )
+                    keyboard.row(
+                        types.InlineKeyboardButton("Kembali ke List", callback_data="back_to_list")
+                    )
+                    
+                    # Edit pesan sebelumnya
+                    bot.edit_message_text(
+                        chat_id=call.message.chat.id,
+                        message_id=call.message.message_id,
+                        text=detail_pesan,
+                        parse_mode='Markdown',
+                        reply_markup=keyboard
+                    )
+                    
+                else:
+                    bot.answer_callback_query(call.id, "Data supplier tidak ditemukan")
+                    
+        except Exception as e:
+            bot.answer_callback_query(call.id, f"Error: {str(e)}")
\ No newline at end of file
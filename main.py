@@ -1,11 +1,11 @@
+import threading
 import telebot
-from telebot import types
 
 # Import config
 from config import config
 
 # Import handlers
-from handlers.start import handle_start, show_registration_menu, show_main_menu
+from handlers.start import handle_start, show_registration_menu
 from handlers.registration import handle_start_registration, handle_registration_input, handle_registration_callbacks
 from handlers.saldo import handle_cek_saldo, handle_last_upload
 from handlers.supplier import handle_mysupplier, handle_supplier_callback
@@ -16,294 +16,292 @@ from handlers.penerimaan import (
     handle_lihat_item, handle_simpan_penerimaan, handle_batal_penerimaan,
     handle_konfirmasi_simpan_harga_0, handle_gunakan_faktur_otomatis,
     handle_input_faktur_manual, handle_kembali_ke_produk,
-    user_states, paging_states
+    restore_faktur_reservations, user_states
 )
+from handlers.registration import user_states as registration_states
 from handlers.help import handle_help
 
 # Import database
-from database import get_nik_from_telegram
+from database import get_nik_from_telegram, pool, request_session
+from utils.satuan import satuan_registry
+from utils.saldo_store import start_saldo_worker
+from utils.schema import ensure_tables_on_startup
+from utils.deposit_watcher import start_deposit_watcher
+from utils.dispatcher import UpdateDispatcher
+from utils.webhook import WebhookServer
+from utils.outbox import OutboundQueue, QueuedBot
+from utils.router import Router
+from utils.activity_log import activity_log
+from utils.metrics import metrics, InstrumentedBot, MetricsServer
+from utils.query_stats import query_stats
+
+# Server Bot API alternatif, misal fake Telegram lokal untuk pengujian (tools/fake_telegram_client.py)
+if config.get('TELEGRAM_API_URL'):
+    telebot.apihelper.API_URL = config.get('TELEGRAM_API_URL')
+
+# Initialize bot (handler dijalankan oleh dispatcher, bukan thread bawaan TeleBot)
+bot = telebot.TeleBot(config.BOT_TOKEN, threaded=False)
+
+# Update diproses paralel antar user, berurutan per user
+dispatcher = UpdateDispatcher.for_bot(
+    bot,
+    workers=config.get_int('DISPATCHER_WORKERS', 8),
+    max_queue=config.get_int('DISPATCHER_MAX_QUEUE', 1000)
+)
+
+# Pesan keluar lewat antrian dengan batas laju Telegram (global dan per chat)
+outbox = None
+if config.get_bool('OUTBOX_ENABLED', True):
+    outbox = OutboundQueue.from_config(bot)
+    bot = QueuedBot(bot, outbox)
+
+# Waktu setiap pemanggilan Bot API dari handler dicatat ke span update (utils.metrics)
+bot = InstrumentedBot(bot)
 
-# Initialize bot
-bot = telebot.TeleBot(config.BOT_TOKEN)
+# Semua message dan callback masuk lewat satu handler router (satu session database per update);
+# setiap handler dibungkus span metrik: waktu database, Telegram dan Python per update
+router = Router(instrument=metrics.instrument).register(bot, wrap=request_session)
 
 # ============================ MAIN MESSAGE HANDLERS ============================
 
-@bot.message_handler(commands=['start'])
+@router.command('start')
 def handle_start_command(message):
     handle_start(message, bot)
 
-@bot.message_handler(commands=['lastupload'])
+@router.command('lastupload')
 def handle_last_upload_command(message):
     from handlers.saldo import handle_last_upload
     handle_last_upload(message, bot)
 
-@bot.message_handler(func=lambda message: True)
+@router.command('purgecache')
+def handle_purge_cache_command(message):
+    from handlers.admin import handle_purge_cache
+    handle_purge_cache(message, bot)
+
+@router.command('stats')
+def handle_stats_command(message):
+    from handlers.admin import handle_stats
+    handle_stats(message, bot, dispatcher)
+
+@router.text("Daftar Sekarang")
+def handle_daftar_text(message):
+    handle_start_registration(message, bot)
+
+@router.text("Cek Saldo")
+def handle_cek_saldo_text(message):
+    handle_cek_saldo(message, bot)
+
+@router.text("Supplier Saya")
+def handle_supplier_text(message):
+    handle_mysupplier(message, bot)
+
+@router.text("Penerimaan Barang")
+def handle_penerimaan_text(message):
+    handle_penerimaan_menu(message, bot)
+
+@router.text("Stok Produk")
+def handle_stok_text(message):
+    handle_stok_produk(message, bot)
+
+@router.text("Kelola Mapping")
+def handle_mapping_text(message):
+    from handlers.penerimaan import handle_manage_mapping_menu
+    handle_manage_mapping_menu(message, bot)
+
+@router.text("Bantuan")
+def handle_bantuan_text(message):
+    handle_help(message, bot)
+
+@router.fallback_message
 def handle_text_messages(message):
+    """Pesan selain perintah dan tombol menu: input proses penerimaan/pendaftaran"""
     user_id = str(message.from_user.id)
     
-    if message.text == "Daftar Sekarang":
-        from handlers.registration import handle_start_registration
-        handle_start_registration(message, bot)
-    elif message.text == "Cek Saldo":
-        from handlers.saldo import handle_cek_saldo
-        handle_cek_saldo(message, bot)
-    elif message.text == "Supplier Saya":
-        from handlers.supplier import handle_mysupplier
-        handle_mysupplier(message, bot)
-    elif message.text == "Penerimaan Barang":
-        from handlers.penerimaan import handle_penerimaan_menu
-        handle_penerimaan_menu(message, bot)
-    elif message.text == "Stok Produk":
-        from handlers.stok import handle_stok_produk
-        handle_stok_produk(message, bot)
-    elif message.text == "Kelola Mapping":
-        from handlers.penerimaan import handle_manage_mapping_menu
-        handle_manage_mapping_menu(message, bot)
-    elif message.text == "Bantuan":
-        from handlers.help import handle_help
-        handle_help(message, bot)
-    elif user_id in user_states:
-        # Handle input selama proses penerimaan atau pendaftaran
-        if user_states[user_id].get('type') == 'registration':
-            from handlers.registration import handle_registration_input
-            handle_registration_input(message, bot)
-        else:
-            from handlers.penerimaan import handle_penerimaan_input
-            handle_penerimaan_input(message, bot)
+    if user_id in user_states:
+        # Handle input selama proses penerimaan
+        handle_penerimaan_input(message, bot)
+    elif user_id in registration_states:
+        # Handle input selama proses pendaftaran
+        handle_registration_input(message, bot)
     else:
         # Cek status user
         user_data = get_nik_from_telegram(user_id)
         if not user_data:
-            from handlers.start import show_registration_menu
             show_registration_menu(message, bot)
         else:
             bot.reply_to(message, "Perintah tidak dikenali\n\nGunakan tombol menu atau ketik /start untuk melihat menu utama.", parse_mode='Markdown')
 
 # ============================ CALLBACK QUERY HANDLERS ============================
 
-@bot.callback_query_handler(func=lambda call: call.data == "no_action")
+@router.callback("no_action")
 def handle_no_action(call):
     """Handler untuk tombol yang tidak melakukan action"""
     bot.answer_callback_query(call.id, "Halaman saat ini", show_alert=False)
 
-@bot.callback_query_handler(func=lambda call: call.data in ['confirm_registration', 'change_nik'])
+@router.callback('confirm_registration', 'change_nik')
 def handle_registration_callback(call):
     from handlers.registration import handle_registration_callbacks
     handle_registration_callbacks(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('supplier_'))
-def handle_supplier_callback_wrapper(call):
+@router.callback('supplier_{supplier_id:int}')
+def handle_supplier_callback_wrapper(call, supplier_id):
     from handlers.supplier import handle_supplier_callback
-    handle_supplier_callback(call, bot)
+    handle_supplier_callback(call, bot, supplier_id)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('stock_'))
-def handle_stock_callback_wrapper(call):
+@router.callback('stock_{supplier_id:int}_{page:page}')
+def handle_stock_callback_wrapper(call, supplier_id, page):
     from handlers.stok import handle_stock_callback
-    handle_stock_callback(call, bot)
+    handle_stock_callback(call, bot, supplier_id, page)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('penerimaan_'))
-def handle_penerimaan_callback(call):
+@router.callback('penerimaan_{supplier_id:int}_{page:rest}')
+def handle_penerimaan_callback(call, supplier_id, page):
     from handlers.penerimaan import handle_penerimaan_supplier
-    handle_penerimaan_supplier(call, bot)
+    handle_penerimaan_supplier(call, bot, supplier_id, page)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('pilih_supplier_'))
-def handle_pilih_supplier_callback(call):
+@router.callback('pilih_supplier_{supplier_id:int}')
+def handle_pilih_supplier_callback(call, supplier_id):
     from handlers.penerimaan import handle_pilih_supplier
-    handle_pilih_supplier(call, bot)
+    handle_pilih_supplier(call, bot, supplier_id)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('pilih_produk_'))
-def handle_pilih_produk_callback(call):
+@router.callback('pilih_produk_{id_produk:int}')
+def handle_pilih_produk_callback(call, id_produk):
     from handlers.penerimaan import handle_pilih_produk
-    handle_pilih_produk(call, bot)
+    handle_pilih_produk(call, bot, id_produk)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('produk_page_'))
-def handle_produk_paging_callback(call):
+@router.callback('produk_{page:page}')
+def handle_produk_paging_callback(call, page):
     from handlers.penerimaan import handle_produk_paging
-    handle_produk_paging(call, bot)
+    handle_produk_paging(call, bot, page)
 
-@bot.callback_query_handler(func=lambda call: call.data == 'lihat_item')
+@router.callback('lihat_item')
 def handle_lihat_item_callback(call):
     from handlers.penerimaan import handle_lihat_item
     handle_lihat_item(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data == 'simpan_penerimaan')
+@router.callback('simpan_penerimaan')
 def handle_simpan_penerimaan_callback(call):
     from handlers.penerimaan import handle_simpan_penerimaan
     handle_simpan_penerimaan(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data == 'batal_penerimaan')
+@router.callback('batal_penerimaan')
 def handle_batal_penerimaan_callback(call):
     from handlers.penerimaan import handle_batal_penerimaan
     handle_batal_penerimaan(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data == 'konfirmasi_simpan_harga_0')
+@router.callback('konfirmasi_simpan_harga_0')
 def handle_konfirmasi_simpan_callback(call):
     from handlers.penerimaan import handle_konfirmasi_simpan_harga_0
     handle_konfirmasi_simpan_harga_0(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data == 'gunakan_faktur_otomatis')
+@router.callback('gunakan_faktur_otomatis')
 def handle_gunakan_faktur_callback(call):
     from handlers.penerimaan import handle_gunakan_faktur_otomatis
     handle_gunakan_faktur_otomatis(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data == 'input_faktur_manual')
+@router.callback('input_faktur_manual')
 def handle_input_faktur_callback(call):
     from handlers.penerimaan import handle_input_faktur_manual
     handle_input_faktur_manual(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data == "kembali_ke_produk")
+@router.callback("kembali_ke_produk")
 def handle_kembali_ke_produk_callback(call):
     from handlers.penerimaan import handle_kembali_ke_produk
     handle_kembali_ke_produk(call, bot)
 
 # ============================ HANDLER UNTUK KELOLA MAPPING ============================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('manage_mapping_'))
-def handle_manage_mapping_callback(call):
+@router.callback('manage_mapping_{supplier_id:int}_{page:page}')
+def handle_manage_mapping_callback(call, supplier_id, page):
     from handlers.penerimaan import handle_manage_mapping_supplier
-    handle_manage_mapping_supplier(call, bot)
+    handle_manage_mapping_supplier(call, bot, supplier_id, page)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('toggle_mapping_'))
-def handle_toggle_mapping_callback(call):
+@router.callback('toggle_mapping_{mapping_id:int}_{index:int}')
+def handle_toggle_mapping_callback(call, mapping_id, index):
     from handlers.penerimaan import handle_toggle_mapping
-    handle_toggle_mapping(call, bot)
+    handle_toggle_mapping(call, bot, mapping_id)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('filter_mapping_'))
-def handle_filter_mapping_callback(call):
+@router.callback('filter_mapping_{supplier_id:int}_{status:str}_{page:page}')
+def handle_filter_mapping_callback(call, supplier_id, status, page):
     from handlers.penerimaan import handle_filter_mapping
-    handle_filter_mapping(call, bot)
+    handle_filter_mapping(call, bot, supplier_id, status, page)
 
-@bot.callback_query_handler(func=lambda call: call.data == 'back_to_mapping_menu')
+@router.callback('back_to_mapping_menu')
 def handle_back_to_mapping_menu(call):
-    """Handler untuk kembali ke menu mapping"""
-    # Buat pesan baru untuk trigger mapping menu
-    message = types.Message(
-        message_id=call.message.message_id + 1,
-        from_user=call.from_user,
-        date=call.message.date,
-        chat=call.message.chat,
-        content_type='text',
-        options=[],
-        json_string=''
-    )
-    message.text = 'Kelola Mapping'
-    
-    # Panggil handler mapping menu
+    """Handler untuk kembali ke menu mapping (pesan diedit di tempat)"""
     from handlers.penerimaan import handle_manage_mapping_menu
-    handle_manage_mapping_menu(message, bot)
+    handle_manage_mapping_menu(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data == 'back_to_main_menu')
+@router.callback('back_to_main_menu')
 def handle_back_to_main_menu(call):
     """Handler untuk kembali ke menu utama"""
-    # Buat pesan baru untuk trigger start
-    message = types.Message(
-        message_id=call.message.message_id + 1,
-        from_user=call.from_user,
-        date=call.message.date,
-        chat=call.message.chat,
-        content_type='text',
-        options=[],
-        json_string=''
-    )
-    message.text = '/start'
-    
-    # Panggil handler start
-    handle_start(message, bot)
+    handle_start(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('add_mapping_'))
-def handle_add_mapping(call):
+@router.callback('add_mapping_{supplier_id:int}')
+def handle_add_mapping(call, supplier_id):
     """Handler untuk tambah mapping baru"""
-    supplier_id = call.data.replace('add_mapping_', '')
     bot.answer_callback_query(call.id, "Fitur tambah mapping sedang dikembangan")
 
-# Additional callback handlers
-@bot.callback_query_handler(func=lambda call: call.data == "refresh_penerimaan")
+# Additional callback handlers: layar menu dirender ulang dan diedit di pesan yang sama
+@router.callback("refresh_penerimaan")
 def handle_refresh_penerimaan(call):
     """Handler untuk refresh data penerimaan"""
-    bot.delete_message(call.message.chat.id, call.message.message_id)
-    message = types.Message(
-        message_id=call.message.message_id + 1,
-        from_user=call.from_user,
-        date=call.message.date,
-        chat=call.message.chat,
-        content_type='text',
-        options=[],
-        json_string=''
-    )
-    message.text = 'Penerimaan Barang'
     from handlers.penerimaan import handle_penerimaan_menu
-    handle_penerimaan_menu(message, bot)
-    bot.answer_callback_query(call.id, "Data diperbarui")
+    if handle_penerimaan_menu(call, bot):
+        bot.answer_callback_query(call.id, "Data diperbarui")
 
-@bot.callback_query_handler(func=lambda call: call.data == "back_to_stok_menu")
+@router.callback("back_to_stok_menu")
 def handle_back_to_stok_menu(call):
     """Handler untuk kembali ke menu stok"""
-    bot.delete_message(call.message.chat.id, call.message.message_id)
-    message = types.Message(
-        message_id=call.message.message_id + 1,
-        from_user=call.from_user,
-        date=call.message.date,
-        chat=call.message.chat,
-        content_type='text',
-        options=[],
-        json_string=''
-    )
-    message.text = 'Stok Produk'
     from handlers.stok import handle_stok_produk
-    handle_stok_produk(message, bot)
+    handle_stok_produk(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data == "back_to_penerimaan_menu")
+@router.callback("back_to_penerimaan_menu")
 def handle_back_to_penerimaan_menu(call):
     """Handler untuk kembali ke menu penerimaan"""
-    bot.delete_message(call.message.chat.id, call.message.message_id)
-    message = types.Message(
-        message_id=call.message.message_id + 1,
-        from_user=call.from_user,
-        date=call.message.date,
-        chat=call.message.chat,
-        content_type='text',
-        options=[],
-        json_string=''
-    )
-    message.text = 'Penerimaan Barang'
     from handlers.penerimaan import handle_penerimaan_menu
-    handle_penerimaan_menu(message, bot)
+    handle_penerimaan_menu(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data == "back_to_list")
+@router.callback("back_to_list")
 def handle_back_to_list(call):
     """Handler untuk kembali ke list supplier"""
-    bot.delete_message(call.message.chat.id, call.message.message_id)
-    message = types.Message(
-        message_id=call.message.message_id + 1,
-        from_user=call.from_user,
-        date=call.message.date,
-        chat=call.message.chat,
-        content_type='text',
-        options=[],
-        json_string=''
-    )
-    message.text = 'Supplier Saya'
     from handlers.supplier import handle_mysupplier
-    handle_mysupplier(message, bot)
+    handle_mysupplier(call, bot)
 
-@bot.callback_query_handler(func=lambda call: call.data == "refresh_supplier")
+@router.callback("refresh_supplier")
 def handle_refresh_supplier(call):
     """Handler untuk refresh data supplier"""
-    bot.delete_message(call.message.chat.id, call.message.message_id)
-    message = types.Message(
-        message_id=call.message.message_id + 1,
-        from_user=call.from_user,
-        date=call.message.date,
-        chat=call.message.chat,
-        content_type='text',
-        options=[],
-        json_string=''
-    )
-    message.text = '/start'
-    handle_start(message, bot)
+    handle_start(call, bot)
+
+@router.fallback_callback
+def handle_unknown_callback(call):
+    """Tombol tanpa handler (misal detail_rcv_*, doc_rcv_*) tetap dijawab agar loading di klien berhenti"""
+    bot.answer_callback_query(call.id, "Fitur belum tersedia")
 
 # ============================ START BOT ============================
 
+def health_metrics():
+    """Metrik tambahan untuk endpoint /health"""
+    result = {'db_pool': pool.stats()}
+    if outbox is not None:
+        result['outbox'] = outbox.stats()
+    result['activity_log'] = activity_log.stats()
+    return result
+
+def run_webhook():
+    """Terima update lewat webhook (BOT_MODE=webhook) sampai proses dihentikan"""
+    server = WebhookServer.from_config(dispatcher, health=health_metrics, metrics=metrics.snapshot).start()
+    print(f'Webhook mendengarkan di {server.host}:{server.port}{server.path}')
+    
+    # Daftarkan URL publik ke Telegram; kosongkan WEBHOOK_URL jika didaftarkan manual
+    url = config.get('WEBHOOK_URL')
+    if url:
+        # Koneksi paralel dari Telegram dibatasi sebanyak thread penerima (koneksi keep-alive memegang thread)
+        bot.set_webhook(url=url, secret_token=server.secret or None, max_connections=server.threads)
+    try:
+        threading.Event().wait()
+    finally:
+        server.stop()
+
 if __name__ == "__main__":
     print('Bot KSA berhasil dijalankan!')
     
@@ -312,7 +310,43 @@ if __name__ == "__main__":
         print("ERROR: Bot token belum dikonfigurasi. Silakan edit file config.txt")
         exit(1)
     
+    # Buka koneksi awal pool database dan muat kamus satuan
+    pool.warmup()
+    satuan_registry.refresh()
+    
+    # Tabel counter dan saldo milik bot (DDL di luar transaksi handler)
+    ensure_tables_on_startup()
+    
+    # Nomor faktur otomatis milik penerimaan yang tersimpan sebelum restart
+    restore_faktur_reservations()
+    
+    # Worker yang menjaga tabel saldo member tetap terbaru
+    start_saldo_worker()
+    
+    # Notifikasi otomatis saat ada mutasi saldo baru
+    start_deposit_watcher(bot)
+    
+    activity_log.start()
+    metrics.start_reporter(config.get_float('METRICS_LOG_INTERVAL', 60))
+    metrics_server = MetricsServer.from_config(extra=health_metrics)
+    if metrics_server is not None:
+        metrics_server.start()
+    if outbox is not None:
+        outbox.start()
+    dispatcher.start()
     try:
-        bot.polling(none_stop=True)
+        if config.get('BOT_MODE', 'polling').strip().lower() == 'webhook':
+            run_webhook()
+        else:
+            bot.polling(none_stop=True)
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
-        print(f'Bot error: {e}')
\ No newline at end of file
+        print(f'Bot error: {e}')
+    finally:
+        # Selesaikan update dan pesan yang masih antri sebelum keluar
+        dispatcher.stop()
+        if outbox is not None:
+            outbox.stop()
+        activity_log.stop()
+        query_stats.slow_log.stop()
@@ -0,0 +1,192 @@
+"""
+Varian asyncio bot KSA: AsyncTeleBot + pool MySQL async (aiomysql).
+
+Jalur baca yang paling sering dipakai (Cek Saldo, /lastupload, Stok Produk, paging stok dan
+riwayat penerimaan) dijalankan sebagai handler async di event loop, sehingga satu proses bisa
+melayani banyak user sekaligus tanpa satu thread per update. Alur lain (input penerimaan,
+pendaftaran, mapping, dll) tetap memakai handler sinkron dari main.py lewat UpdateDispatcher.
+Update dari user yang sama tetap diproses berurutan, baik async maupun sinkron.
+
+Jalankan: python main_async.py (butuh aiohttp dan aiomysql, lihat requirements.txt)
+"""
+import asyncio
+from telebot import asyncio_helper, util
+from telebot.async_telebot import AsyncTeleBot
+
+from config import config
+from async_database import db
+from utils.dispatcher import update_key
+from utils.metrics import metrics, InstrumentedBot
+from handlers.async_handlers import (
+    handle_cek_saldo, handle_last_upload, handle_stok_produk, handle_stock_callback,
+    handle_penerimaan_supplier
+)
+
+# Bot sinkron beserta semua handler dan dispatcher-nya, untuk alur yang belum async
+import main as legacy
+
+if config.get('TELEGRAM_API_URL'):
+    asyncio_helper.API_URL = config.get('TELEGRAM_API_URL')
+
+# Routing handler async (dibungkus span metrik); update lain diteruskan ke bot sinkron
+ASYNC_COMMANDS = {
+    'lastupload': metrics.instrument_async(handle_last_upload),
+}
+ASYNC_TEXTS = {
+    'Cek Saldo': metrics.instrument_async(handle_cek_saldo),
+    'Stok Produk': metrics.instrument_async(handle_stok_produk),
+}
+ASYNC_CALLBACK_PREFIXES = (
+    ('stock_', metrics.instrument_async(handle_stock_callback)),
+    ('penerimaan_', metrics.instrument_async(handle_penerimaan_supplier)),
+)
+
+abot = AsyncTeleBot(config.BOT_TOKEN)
+# Bot untuk handler async: waktu pemanggilan Bot API masuk ke span update
+_handler_bot = InstrumentedBot(abot)
+
+# Batas handler async yang berjalan bersamaan
+_slots = asyncio.Semaphore(config.get_int('ASYNC_MAX_TASKS', 200))
+_legacy_lock = asyncio.Lock()
+_tasks = set()
+# Kunci user (update_key) -> Future yang selesai saat update terakhir user itu selesai diproses
+_tails = {}
+# Future update sinkron yang sudah masuk dispatcher (urutan per user dijaga dispatcher sendiri)
+_in_dispatcher = set()
+
+def async_route(update):
+    """(handler, argumen) untuk update yang ditangani async, atau None"""
+    message = update.message
+    if message is not None and message.text:
+        command = util.extract_command(message.text)
+        if command is not None:
+            handler = ASYNC_COMMANDS.get(command.split('@', 1)[0])
+        else:
+            handler = ASYNC_TEXTS.get(message.text)
+        return (handler, message) if handler else None
+    call = update.callback_query
+    if call is not None and call.data and call.message is not None:
+        for prefix, handler in ASYNC_CALLBACK_PREFIXES:
+            if call.data.startswith(prefix):
+                return handler, call
+    return None
+
+def _chain(key):
+    """
+    Sambungkan update baru ke antrian user: return (Future update sebelumnya atau None,
+    Future update ini). Update ini baru boleh diproses setelah Future sebelumnya selesai.
+    """
+    previous = _tails.get(key)
+    done = asyncio.get_running_loop().create_future()
+    _tails[key] = done
+    done.add_done_callback(lambda future: _tails.pop(key) if _tails.get(key) is future else None)
+    return previous, done
+
+def _finish(done):
+    if not done.done():
+        done.set_result(None)
+
+def _legacy_done(done):
+    """Tandai update sinkron masuk dispatcher; return callback (dari thread worker) saat selesai"""
+    _in_dispatcher.add(done)
+    done.add_done_callback(_in_dispatcher.discard)
+    loop = asyncio.get_running_loop()
+    return lambda: loop.call_soon_threadsafe(_finish, done)
+
+def _submit_legacy(items):
+    for update, done in items:
+        legacy.dispatcher.submit(update, done=done)
+
+async def _run(previous, handler, arg, done):
+    try:
+        if previous is not None:
+            await previous
+        async with _slots:
+            await handler(arg, _handler_bot)
+    except Exception as e:
+        print(f"Error handler async {handler.__name__}: {e}")
+    finally:
+        _finish(done)
+
+async def _run_legacy(previous, update, done):
+    """Update sinkron yang menunggu update async user yang sama selesai"""
+    try:
+        await previous
+        async with _legacy_lock:
+            await asyncio.to_thread(_submit_legacy, [(update, _legacy_done(done))])
+    except BaseException:
+        _finish(done)
+        raise
+
+def _spawn(coroutine):
+    task = asyncio.create_task(coroutine)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+async def process_new_updates(updates):
+    """
+    Pengganti AsyncTeleBot.process_new_updates: pilah update ke handler async atau bot sinkron.
+
+    Setiap update disambungkan ke antrian user-nya (_chain) sebelum dipilah, sehingga urutan
+    per user tetap terjaga saat update async dan sinkron bercampur. Update sinkron yang hanya
+    didahului update sinkron (sudah di dispatcher, yang juga berurutan per user) langsung
+    masuk dispatcher dalam satu batch; yang didahului update async menunggu update itu selesai.
+    """
+    legacy_updates = []
+    for update in updates:
+        previous, done = _chain(update_key(update))
+        route = async_route(update)
+        if route is not None:
+            _spawn(_run(previous, *route, done))
+        elif previous is None or previous.done() or previous in _in_dispatcher:
+            legacy_updates.append((update, _legacy_done(done)))
+        else:
+            _spawn(_run_legacy(previous, update, done))
+
+    if legacy_updates:
+        # Lock menjaga urutan antar batch; submit bisa menunggu jika antrian dispatcher penuh
+        async with _legacy_lock:
+            await asyncio.to_thread(_submit_legacy, legacy_updates)
+
+async def main():
+    if not config.BOT_TOKEN or config.BOT_TOKEN == 'your_bot_token_here':
+        print("ERROR: Bot token belum dikonfigurasi. Silakan edit file config.txt")
+        return 1
+
+    await db.start()
+    legacy.pool.warmup()
+    legacy.satuan_registry.refresh()
+    await asyncio.to_thread(legacy.ensure_tables_on_startup)
+    legacy.restore_faktur_reservations()
+    legacy.start_saldo_worker()
+    legacy.start_deposit_watcher(legacy.bot)
+    if legacy.outbox is not None:
+        legacy.outbox.start()
+    legacy.dispatcher.start()
+    legacy.activity_log.start()
+    metrics.start_reporter(config.get_float('METRICS_LOG_INTERVAL', 60))
+    metrics_server = legacy.MetricsServer.from_config(extra=legacy.health_metrics)
+    if metrics_server is not None:
+        metrics_server.start()
+
+    abot.process_new_updates = process_new_updates
+    print('Bot KSA (asyncio) berhasil dijalankan!')
+    try:
+        await abot.polling(non_stop=True)
+    finally:
+        if _tasks:
+            await asyncio.wait(list(_tasks), timeout=10)
+        await asyncio.to_thread(legacy.dispatcher.stop)
+        if legacy.outbox is not None:
+            await asyncio.to_thread(legacy.outbox.stop)
+        await asyncio.to_thread(legacy.activity_log.stop)
+        await asyncio.to_thread(legacy.query_stats.slow_log.stop)
+        await db.close()
+        await abot.close_session()
+    return 0
+
+if __name__ == "__main__":
+    try:
+        exit(asyncio.run(main()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,55 @@
+"""
+Fixture bersama. Test yang butuh database memakai MySQL/MariaDB lokal (scratch) dari env:
+    TEST_DB_HOST, TEST_DB_PORT, TEST_DB_USER, TEST_DB_PASSWORD, TEST_DB_NAME (harus mengandung 'test')
+dan dilewati (skip) jika server tidak bisa dihubungi.
+"""
+import os
+import pymysql
+import pytest
+from database import InstrumentedCursor
+from tools.bench_seed import create_schema
+from utils.schema import ensure_tables
+
+def _connect():
+    return pymysql.connect(
+        host=os.environ.get('TEST_DB_HOST', '127.0.0.1'),
+        port=int(os.environ.get('TEST_DB_PORT', 3306)),
+        user=os.environ.get('TEST_DB_USER', 'root'),
+        password=os.environ.get('TEST_DB_PASSWORD', ''),
+        db=os.environ.get('TEST_DB_NAME', 'ksa_test'),
+        charset='utf8mb4',
+        cursorclass=InstrumentedCursor
+    )
+
+@pytest.fixture
+def mysql_connect():
+    """Pembuat koneksi baru ke database test (skema bench dan tabel bot sudah dibuat)"""
+    if 'test' not in os.environ.get('TEST_DB_NAME', 'ksa_test').lower():
+        pytest.skip("TEST_DB_NAME harus database scratch (mengandung 'test')")
+    try:
+        conn = _connect()
+    except pymysql.MySQLError as e:
+        pytest.skip(f"MySQL test tidak tersedia: {e}")
+
+    opened = [conn]
+    with conn.cursor() as sql:
+        create_schema(sql)
+        ensure_tables(sql, apply=True, report=lambda line: None)
+    conn.commit()
+
+    def connect():
+        extra = _connect()
+        opened.append(extra)
+        return extra
+
+    yield connect
+    for item in opened:
+        try:
+            item.close()
+        except Exception:
+            pass
+
+@pytest.fixture
+def mysql(mysql_connect):
+    """Satu koneksi ke database test"""
+    return mysql_connect()
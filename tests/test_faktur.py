@@ -0,0 +1,35 @@
+import datetime
+from utils.faktur_generator import FakturSequence, generate_kode_supplier
+from utils.state_store import SqliteStateStore
+
+NAMA_SUPPLIER = 'TESTFAKTUR'
+
+def _supplier(conn):
+    with conn.cursor() as sql:
+        sql.execute("DELETE FROM tb_suplier WHERE namasuplier = %s", (NAMA_SUPPLIER,))
+        sql.execute("INSERT INTO tb_suplier (namasuplier) VALUES (%s)", (NAMA_SUPPLIER,))
+        supplier_id = sql.lastrowid
+    conn.commit()
+    return supplier_id
+
+def test_restored_reservation_not_reissued_after_restart(mysql, tmp_path):
+    supplier_id = _supplier(mysql)
+    bulan = datetime.datetime.now().strftime('%Y/%m')
+    kode = generate_kode_supplier(NAMA_SUPPLIER)
+
+    # Proses lama: nomor 001 dipesan dan tersimpan di state SQLite, lalu bot restart
+    sebelum = FakturSequence()
+    nofaktur = sebelum.reserve(supplier_id, conn=mysql)
+    assert nofaktur == f"{kode}/{bulan}/001"
+    states = SqliteStateStore('penerimaan', path=str(tmp_path / 'state.db'))
+    states['1'] = {'supplier_id': supplier_id, 'nofaktur_otomatis': nofaktur}
+
+    sesudah = FakturSequence()
+    for _, state in states.items():
+        assert sesudah.restore(state['supplier_id'], state['nofaktur_otomatis'])
+    assert sesudah.reserve(supplier_id, conn=mysql) == f"{kode}/{bulan}/002"
+
+def test_restore_ignores_manual_numbers():
+    sequence = FakturSequence()
+    assert not sequence.restore(1, 'FAKTUR-MANUAL')
+    assert not sequence.restore(1, None)
@@ -0,0 +1,42 @@
+from utils.indexes import INDEXES, EXPLAIN_QUERIES, ensure_indexes, explain_plans
+
+def _quiet(line):
+    pass
+
+def test_explain_queries_placeholders_match_params():
+    for name, query, params in EXPLAIN_QUERIES:
+        assert query.count('%s') == len(params), name
+
+def test_ensure_indexes_check_create_check_idempotent(mysql):
+    with mysql.cursor() as sql:
+        # Mulai dari kondisi tanpa index bot
+        for table, name, _, _ in INDEXES:
+            sql.execute(
+                "SELECT 1 FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+                (table, name)
+            )
+            if sql.fetchone():
+                sql.execute(f"ALTER TABLE `{table}` DROP INDEX `{name}`")
+
+        checked = ensure_indexes(sql, report=_quiet)
+        created = ensure_indexes(sql, apply=True, report=_quiet)
+        mysql.commit()
+        rechecked = ensure_indexes(sql, report=_quiet)
+        again = ensure_indexes(sql, apply=True, report=_quiet)
+
+    statuses = lambda results: [status for _, _, status in results]
+    assert 'missing' in statuses(checked)
+    assert 'error' not in statuses(created) and 'conflict' not in statuses(created)
+    # Yang tadinya missing sekarang dibuat (kecuali dipenuhi index lain yang baru dibuat)
+    for before, after in zip(checked, created):
+        if before[2] == 'missing':
+            assert after[2] in ('created', 'ok')
+    assert set(statuses(rechecked)) <= {'ok', 'skip'}
+    assert rechecked == again
+
+def test_explain_plans_run_real_queries(mysql):
+    with mysql.cursor() as sql:
+        plans = explain_plans(sql)
+    errors = [(name, rows) for name, rows in plans if isinstance(rows, str)]
+    assert not errors
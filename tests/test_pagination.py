@@ -0,0 +1,123 @@
+import datetime
+import pytest
+from handlers.penerimaan import parse_riwayat_callback, parse_riwayat_position, riwayat_callback
+from utils.pagination import (
+    CALLBACK_DATA_MAX, Page, decode_datetime, encode_datetime, first_page_callback, from_base36,
+    keyset_produk_query, keyset_produk_result, pack_callback, page_callback, parse_page_callback,
+    refresh_callback, sequence_page, to_base36
+)
+
+@pytest.mark.parametrize('number', [0, 1, 35, 36, 1295, 1296, 2 ** 31 - 1, 2 ** 63, -1, -36])
+def test_base36_round_trip(number):
+    text = to_base36(number)
+    assert from_base36(text) == number
+    assert text == text.lower()
+
+def test_base36_known_values_and_invalid():
+    assert to_base36(0) == '0'
+    assert to_base36(35) == 'z'
+    assert to_base36(36) == '10'
+    for text in ('', '!', 'a_b', ' 5', '-'):
+        with pytest.raises(ValueError):
+            from_base36(text)
+
+def test_datetime_round_trip_to_the_second():
+    value = datetime.datetime(2025, 10, 18, 13, 45, 7, 999999)
+    assert decode_datetime(encode_datetime(value)) == value.replace(microsecond=0)
+    # date dianggap tengah malam
+    assert decode_datetime(encode_datetime(datetime.date(2024, 2, 29))) == datetime.datetime(2024, 2, 29)
+    assert decode_datetime(encode_datetime(datetime.datetime(1970, 1, 1))) == datetime.datetime(1970, 1, 1)
+
+def test_pack_callback_limit_in_bytes():
+    exact = 'x' * (CALLBACK_DATA_MAX - 2)
+    assert pack_callback('a', exact) == f"a_{exact}"
+    with pytest.raises(ValueError):
+        pack_callback('ab', exact)
+    # Batas Telegram dihitung dalam byte UTF-8, bukan karakter
+    with pytest.raises(ValueError):
+        pack_callback('é' * (CALLBACK_DATA_MAX // 2 + 1))
+    assert pack_callback('penerimaan', 12, 'n2') == 'penerimaan_12_n2'
+
+def test_page_callback_round_trip():
+    assert first_page_callback('stock_5') == 'stock_5_page_1'
+    assert page_callback('stock_5', 'n', 3, None) == 'stock_5_page_1'
+    for mode in ('n', 'p', 'r'):
+        data = page_callback('manage_mapping_5', mode, 40, 98765)
+        assert parse_page_callback(data) == ('manage_mapping_5', mode, 40, '98765')
+    assert parse_page_callback('stock_5_page_3') == ('stock_5', None, 1, None)
+    page = Page([], 7, 100, 10, True, True, first_key=11, last_key=22)
+    assert parse_page_callback(refresh_callback('stock_5', page)) == ('stock_5', 'r', 7, '11')
+
+def test_parse_page_callback_falls_back_to_first_page():
+    for data in ('stock_5', 'stock_5_x2_9', 'stock_5_n!_9', 'stock_5_n_9', 'stock_5_n2_'):
+        base, mode, number, key = parse_page_callback(data)
+        assert (mode, number, key) == (None, 1, None)
+
+def test_page_callbacks_fit_with_large_values():
+    data = page_callback('filter_mapping_2147483647_N', 'n', 10 ** 6, 2 ** 31 - 1)
+    assert len(data.encode('utf-8')) <= CALLBACK_DATA_MAX
+    penerimaan = {'tgl': datetime.datetime(2099, 12, 31, 23, 59, 59), 'id': 2 ** 63 - 1}
+    data = riwayat_callback(2147483647, 'n', 10 ** 6, penerimaan)
+    assert len(data.encode('utf-8')) <= CALLBACK_DATA_MAX
+    assert parse_riwayat_callback(data) == ('2147483647', 'n', 10 ** 6, penerimaan['tgl'], penerimaan['id'])
+
+def test_parse_riwayat_callback_invalid_opens_first_page():
+    assert parse_riwayat_callback('penerimaan_5_page_1') == ('5', None, 1, None, None)
+    assert parse_riwayat_callback('penerimaan_5_n2_!!_1') == ('5', None, 1, None, None)
+
+def test_parse_riwayat_position_matches_router_rest():
+    # Router memberikan posisi sebagai sisa callback setelah 'penerimaan_{supplier}_'
+    penerimaan = {'tgl': datetime.datetime(2024, 5, 1, 8, 30), 'id': 77}
+    data = riwayat_callback(9, 'p', 3, penerimaan)
+    position = data.split('_', 2)[2]
+    assert parse_riwayat_position(position) == ('p', 3, penerimaan['tgl'], 77)
+    assert parse_riwayat_position('page_1') == (None, 1, None, None)
+
+def test_page_total_pages_never_below_current():
+    assert Page([], 1, 0, 10, False, False).total_pages == 1
+    assert Page([], 2, 11, 10, True, False).total_pages == 2
+    # Total dari cache basi lebih kecil dari posisi sekarang
+    assert Page([], 5, 12, 10, True, True).total_pages == 5
+    assert Page([], 3, 100, 10, True, True).offset == 20
+
+def test_keyset_produk_query_modes():
+    select = "SELECT p.id_produk FROM tbl_produk p WHERE p.aktif = %s"
+    sql, params = keyset_produk_query(select, ('Y',), None, None, None, 10)
+    assert params == ('Y', 11) and 'ORDER BY p.nama_produk, p.id_produk' in sql
+    sql, params = keyset_produk_query(select, ('Y',), 'p', 'Kopi', 5, 10)
+    assert params == ('Y', 'Kopi', 'Kopi', 5, 11) and 'DESC' in sql
+    sql, params = keyset_produk_query(select, ('Y',), 'n', 'Kopi', 5, 10)
+    assert 'p.id_produk > %s' in sql
+    sql, params = keyset_produk_query(select, ('Y',), 'r', 'Kopi', 5, 10)
+    assert 'p.id_produk >= %s' in sql
+    for mode in (None, 'p', 'n', 'r'):
+        sql, params = keyset_produk_query(select, ('Y',), mode, 'Kopi', 5, 10)
+        assert sql.count('%s') == len(params)
+
+def test_keyset_produk_result():
+    rows = [{'id_produk': i} for i in range(1, 5)]
+    page = keyset_produk_result(rows, 'n', 2, 30, 3)
+    assert [row['id_produk'] for row in page.rows] == [1, 2, 3]
+    assert (page.has_prev, page.has_next, page.first_key, page.last_key) == (True, True, 1, 3)
+    # Halaman sebelumnya dibaca mundur lalu dibalik
+    page = keyset_produk_result(list(reversed(rows[:2])), 'p', 3, 30, 3)
+    assert [row['id_produk'] for row in page.rows] == [1, 2]
+    assert (page.number, page.has_prev, page.has_next) == (1, False, True)
+    assert keyset_produk_result([], 'n', 2, 30, 3) is None
+    assert keyset_produk_result([], None, 1, 0, 3).rows == []
+
+def test_sequence_page_navigation():
+    records = list(range(25))
+    position_of = lambda key: int(key) if key is not None and int(key) < len(records) else None
+    first = sequence_page(records, position_of, str, None, None, per_page=10)
+    assert (first.rows, first.number, first.has_prev, first.has_next) == (list(range(10)), 1, False, True)
+    second = sequence_page(records, position_of, str, 'n', first.last_key, per_page=10)
+    assert (second.rows[0], second.number) == (10, 2)
+    last = sequence_page(records, position_of, str, 'n', '19', per_page=10)
+    assert (last.rows, last.number, last.has_next) == (list(range(20, 25)), 3, False)
+    back = sequence_page(records, position_of, str, 'p', last.first_key, per_page=10)
+    assert back.number == 2
+    refresh = sequence_page(records, position_of, str, 'r', '13', per_page=10)
+    assert refresh.number == 2
+    # Key yang sudah tidak ada kembali ke halaman pertama
+    assert sequence_page(records, position_of, str, 'n', '99', per_page=10).number == 1
@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+import pytest
+from utils.pagination import page_callback, to_base36
+from utils.router import Route, Router
+
+def _handler(name):
+    def handler(*args, **kwargs):
+        return name
+    handler.__name__ = name
+    return handler
+
+@pytest.fixture
+def router():
+    router = Router()
+    for name in ('start', 'stats'):
+        router.command(name)(_handler(name))
+    router.text("Cek Saldo")(_handler('saldo'))
+    router.callback('no_action', 'back_to_main_menu')(_handler('exact'))
+    router.callback('supplier_{supplier_id:int}')(_handler('supplier'))
+    router.callback('pilih_supplier_{supplier_id:int}')(_handler('pilih_supplier'))
+    router.callback('stock_{supplier_id:int}_{page:page}')(_handler('stock'))
+    router.callback('penerimaan_{supplier_id:int}_{page:rest}')(_handler('penerimaan'))
+    router.callback('toggle_mapping_{mapping_id:int}_{index:int}')(_handler('toggle'))
+    router.callback('filter_mapping_{supplier_id:int}_{status:str}_{page:page}')(_handler('filter'))
+    router.callback('cursor_{id:b36}')(_handler('cursor'))
+    return router
+
+def _resolve(router, data):
+    handler, params = router.resolve_callback(data)
+    return (handler.__name__ if handler else None), params
+
+def test_resolve_message_commands_and_texts(router):
+    assert router.resolve_message('/start').__name__ == 'start'
+    assert router.resolve_message('/stats@ksa_bot').__name__ == 'stats'
+    assert router.resolve_message('/unknown') is None
+    assert router.resolve_message('Cek Saldo').__name__ == 'saldo'
+    assert router.resolve_message('cek saldo') is None
+    assert router.resolve_message(None) is None
+
+def test_exact_callbacks(router):
+    assert _resolve(router, 'no_action') == ('exact', {})
+    assert _resolve(router, 'back_to_main_menu') == ('exact', {})
+
+def test_int_converter(router):
+    assert _resolve(router, 'supplier_12') == ('supplier', {'supplier_id': 12})
+    assert _resolve(router, 'supplier_x') == (None, None)
+    assert _resolve(router, 'supplier_-1') == (None, None)
+    assert _resolve(router, 'supplier_12_3') == (None, None)
+    assert _resolve(router, 'supplier_') == (None, None)
+
+def test_longer_literal_prefix_is_separate_route(router):
+    assert _resolve(router, 'pilih_supplier_7') == ('pilih_supplier', {'supplier_id': 7})
+    assert _resolve(router, 'toggle_mapping_5_10') == ('toggle', {'mapping_id': 5, 'index': 10})
+
+def test_page_converter_first_page_and_keyset(router):
+    assert _resolve(router, 'stock_3_page_1') == ('stock', {'supplier_id': 3, 'page': (None, 1, None)})
+    data = page_callback('stock_3', 'n', 40, '981')
+    assert _resolve(router, data) == ('stock', {'supplier_id': 3, 'page': ('n', 40, '981')})
+    assert _resolve(router, f"stock_3_p{to_base36(2)}_5") == ('stock', {'supplier_id': 3, 'page': ('p', 2, '5')})
+    assert _resolve(router, 'stock_3_r0_5')[1]['page'] == ('r', 1, '5')
+
+def test_page_converter_rejects_malformed(router):
+    assert _resolve(router, 'stock_3_page_x') == (None, None)
+    assert _resolve(router, 'stock_3_x2_5') == (None, None)
+    assert _resolve(router, 'stock_3_n!_5') == (None, None)
+    assert _resolve(router, 'stock_3_n2') == (None, None)
+    assert _resolve(router, 'stock_3_n2_') == (None, None)
+
+def test_str_and_page_segments(router):
+    assert _resolve(router, 'filter_mapping_4_Y_page_1') == (
+        'filter', {'supplier_id': 4, 'status': 'Y', 'page': (None, 1, None)}
+    )
+    assert _resolve(router, 'filter_mapping_4__page_1') == (None, None)
+
+def test_rest_converter_takes_remaining_segments(router):
+    assert _resolve(router, 'penerimaan_9_n2_abc_def') == ('penerimaan', {'supplier_id': 9, 'page': 'n2_abc_def'})
+    assert _resolve(router, 'penerimaan_9_page_1') == ('penerimaan', {'supplier_id': 9, 'page': 'page_1'})
+
+def test_b36_converter(router):
+    assert _resolve(router, f"cursor_{to_base36(123456)}") == ('cursor', {'id': 123456})
+    assert _resolve(router, 'cursor_!') == (None, None)
+
+def test_longest_prefix_first_then_shorter():
+    router = Router()
+    router.callback('a_{rest:rest}')(_handler('short'))
+    router.callback('a_b_{n:int}')(_handler('long'))
+    assert _resolve(router, 'a_b_1') == ('long', {'n': 1})
+    # Route terpanjang tidak cocok, jatuh ke awalan yang lebih pendek
+    assert _resolve(router, 'a_b_x') == ('short', {'rest': 'b_x'})
+
+@pytest.mark.parametrize('pattern', [
+    'abc{x:int}',              # awalan literal tidak diakhiri '_'
+    'a_{x:float}',             # konverter tidak dikenal
+    'a_{x:rest}_{y:int}',      # rest bukan di akhir
+    'a_{x:int}y',              # parameter bukan satu segmen penuh
+])
+def test_invalid_patterns(pattern):
+    with pytest.raises(ValueError):
+        Route(pattern, _handler('x'))
+
+def test_dispatch_passes_params_and_uses_fallbacks():
+    calls = []
+    router = Router(instrument=lambda handler: lambda *args, **kwargs: calls.append(('wrapped', handler(*args, **kwargs))))
+
+    def toggle(call, mapping_id, index):
+        return (call.data, mapping_id, index)
+
+    assert router.callback('toggle_{mapping_id:int}_{index:int}')(toggle) is toggle
+    router.fallback_callback(lambda call: ('fallback', call.data))
+    router.fallback_message(lambda message: ('fallback', message.text))
+
+    router.dispatch_callback(SimpleNamespace(data='toggle_5_2'))
+    router.dispatch_callback(SimpleNamespace(data='nothing_here'))
+    router.dispatch_callback(SimpleNamespace(data=None))
+    router.dispatch_message(SimpleNamespace(text='halo'))
+    assert calls == [
+        ('wrapped', ('toggle_5_2', 5, 2)),
+        ('wrapped', ('fallback', 'nothing_here')),
+        ('wrapped', ('fallback', None)),
+        ('wrapped', ('fallback', 'halo')),
+    ]
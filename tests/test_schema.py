@@ -0,0 +1,13 @@
+from utils.schema import TABLES, ensure_tables
+
+def _quiet(line):
+    pass
+
+def test_ensure_tables_idempotent(mysql):
+    with mysql.cursor() as sql:
+        first = ensure_tables(sql, apply=True, report=_quiet)
+        again = ensure_tables(sql, apply=True, report=_quiet)
+        checked = ensure_tables(sql, report=_quiet)
+    assert [table for table, _ in first] == [table for table, _ in TABLES]
+    assert all(status in ('ok', 'created') for _, status in first)
+    assert again == checked == [(table, 'ok') for table, _ in TABLES]
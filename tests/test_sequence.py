@@ -0,0 +1,66 @@
+import datetime
+import threading
+from utils.sequence import allocate_norcv, reserve_norcv_block
+
+# Tanggal jauh di depan agar tidak bentrok dengan data lain di database test
+TANGGAL = datetime.datetime(2099, 1, 1)
+PREFIX = 'TLE990101'
+
+def _reset(conn, existing=None):
+    with conn.cursor() as sql:
+        sql.execute("DELETE FROM tb_sequence WHERE nama = %s", (f"norcv_{PREFIX}",))
+        sql.execute("DELETE FROM tb_riceve WHERE norcv LIKE %s", (f"{PREFIX}%",))
+        if existing:
+            sql.execute(
+                "INSERT INTO tb_riceve (norcv, keterangan, tgl) VALUES (%s, 'TEST', %s)",
+                (existing, TANGGAL.date())
+            )
+    conn.commit()
+
+def test_norcv_seeded_from_existing_receipts(mysql):
+    _reset(mysql, existing=f"{PREFIX}007")
+    with mysql.cursor() as sql:
+        assert allocate_norcv(sql, TANGGAL) == f"{PREFIX}008"
+        assert reserve_norcv_block(sql, 3, TANGGAL) == [f"{PREFIX}009", f"{PREFIX}010", f"{PREFIX}011"]
+    mysql.commit()
+
+def test_norcv_concurrent_allocation_unique_and_gapless(mysql, mysql_connect):
+    _reset(mysql)
+    # Counter hari itu sudah ada (jalur normal); seed dari tb_riceve diuji terpisah di atas
+    with mysql.cursor() as sql:
+        sql.execute("INSERT INTO tb_sequence (nama, nilai) VALUES (%s, 0)", (f"norcv_{PREFIX}",))
+    mysql.commit()
+    workers, per_worker = 8, 25
+    issued, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(workers)
+
+    def worker(index):
+        conn = mysql_connect()
+        start.wait()
+        try:
+            for i in range(per_worker):
+                with conn.cursor() as sql:
+                    norcv = allocate_norcv(sql, TANGGAL)
+                # Sebagian transaksi batal: nomornya harus kembali dipakai, bukan hilang
+                if (index + i) % 5 == 0:
+                    conn.rollback()
+                    continue
+                conn.commit()
+                with lock:
+                    issued.append(norcv)
+        except Exception as e:
+            conn.rollback()
+            with lock:
+                errors.append(repr(e))
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(issued) == len(set(issued))
+    numbers = sorted(int(norcv[len(PREFIX):]) for norcv in issued)
+    assert numbers == list(range(1, len(issued) + 1))
@@ -0,0 +1,33 @@
+import time
+import pytest
+from utils.state_store import MemoryStateStore, SqliteStateStore, StateStore
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store_factory(request, tmp_path):
+    def make(ttl):
+        if request.param == 'memory':
+            return MemoryStateStore('test', ttl=ttl)
+        return SqliteStateStore('test', path=str(tmp_path / 'state.db'), ttl=ttl)
+    return make
+
+def test_base_is_abstract():
+    with pytest.raises(TypeError):
+        StateStore('test')
+
+def test_expired_entries_not_counted_or_listed(store_factory):
+    store = store_factory(ttl=0.05)
+    store['1'] = {'state': 'a'}
+    store[2] = {'state': 'b'}
+    assert len(store) == 2
+    assert sorted(key for key, _ in store.items()) == ['1', '2']
+    time.sleep(0.1)
+    assert len(store) == 0
+    assert store.items() == []
+    assert '1' not in store
+
+def test_items_return_saved_state(store_factory):
+    store = store_factory(ttl=60)
+    store['7'] = {'supplier_id': 3, 'items': []}
+    assert store.items() == [('7', {'supplier_id': 3, 'items': []})]
+    del store['7']
+    assert len(store) == 0
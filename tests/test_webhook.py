@@ -0,0 +1,97 @@
+import http.client
+import json
+import pytest
+from tools.fake_telegram_client import message_update, post_update
+from utils.webhook import SECRET_HEADER, WebhookServer
+
+SECRET = 'rahasia'
+
+class FakeDispatcher:
+    """Dispatcher yang mencatat update; full=True meniru antrian penuh (submit gagal)"""
+
+    running = True
+
+    def __init__(self):
+        self.updates = []
+        self.full = False
+
+    def submit(self, update, timeout=None):
+        if self.full:
+            return False
+        self.updates.append(update)
+        return True
+
+    def stats(self):
+        return {'depth': len(self.updates)}
+
+@pytest.fixture
+def webhook():
+    dispatcher = FakeDispatcher()
+    server = WebhookServer(
+        dispatcher, port=0, secret=SECRET, max_body=1024, queue_timeout=0,
+        metrics=lambda: {'handlers': {}}
+    ).start()
+    server.url = f"http://127.0.0.1:{server.port}{server.path}"
+    yield server
+    server.stop()
+
+def _request(server, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+    try:
+        conn.putrequest(method, path)
+        for name, value in (headers or {}).items():
+            conn.putheader(name, value)
+        conn.endheaders(body)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+def test_update_accepted_and_duplicate_ignored(webhook):
+    update = message_update(1001, 900000001, '/start')
+    assert post_update(webhook.url, update, SECRET)[0] == 200
+    assert post_update(webhook.url, update, SECRET)[0] == 200
+    assert [u.update_id for u in webhook.dispatcher.updates] == [1001]
+    assert webhook.stats()['duplicate'] == 1
+
+def test_wrong_or_missing_secret_rejected(webhook):
+    update = message_update(1002, 900000001, '/start')
+    assert post_update(webhook.url, update, 'salah')[0] == 403
+    assert post_update(webhook.url, update)[0] == 403
+    assert webhook.dispatcher.updates == []
+    assert webhook.stats()['unauthorized'] == 2
+
+def test_invalid_json_is_bad_request(webhook):
+    for body in (b'{bukan json', b'{"message": {}}'):
+        headers = {SECRET_HEADER: SECRET, 'Content-Length': str(len(body))}
+        assert _request(webhook, 'POST', webhook.path, body, headers)[0] == 400
+    assert webhook.stats()['bad_request'] == 2
+
+def test_missing_content_length_and_large_body(webhook):
+    assert _request(webhook, 'POST', webhook.path, headers={SECRET_HEADER: SECRET})[0] == 411
+    body = json.dumps(message_update(1003, 900000001, 'x' * 2000)).encode('utf-8')
+    headers = {SECRET_HEADER: SECRET, 'Content-Length': str(len(body))}
+    assert _request(webhook, 'POST', webhook.path, body, headers)[0] == 413
+    assert webhook.stats()['too_large'] == 1
+
+def test_full_queue_returns_503_and_allows_retry(webhook):
+    update = message_update(1004, 900000001, '/start')
+    webhook.dispatcher.full = True
+    assert post_update(webhook.url, update, SECRET)[0] == 503
+    # Kiriman ulang Telegram setelah 503 tidak dianggap duplikat
+    webhook.dispatcher.full = False
+    assert post_update(webhook.url, update, SECRET)[0] == 200
+    assert [u.update_id for u in webhook.dispatcher.updates] == [1004]
+
+def test_status_endpoints_require_secret(webhook):
+    for path in ('/health', '/metrics'):
+        assert _request(webhook, 'GET', path)[0] == 403
+        status, body = _request(webhook, 'GET', path, headers={SECRET_HEADER: SECRET})
+        assert status == 200
+        assert json.loads(body)
+
+def test_status_endpoints_local_only_without_secret():
+    server = WebhookServer(FakeDispatcher())
+    assert server.can_view_status(None, '127.0.0.1')
+    assert server.can_view_status(None, '::1')
+    assert not server.can_view_status(None, '203.0.113.5')
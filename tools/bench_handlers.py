@@ -0,0 +1,325 @@
+"""
+Benchmark handler main.py end-to-end tanpa Telegram: update sintetis (Message/CallbackQuery)
+masuk ke router main.py seperti dari dispatcher (satu session database per update), balasan
+bot ditangkap TeleBot palsu (tools/fake_bot.py) dan query berjalan ke database lokal yang
+diisi tools/bench_seed.py. User bench mengikuti tombol dari balasan bot seperti user asli.
+
+Alur: saldo (Cek Saldo), stok (menu Stok Produk lalu paging halaman berikutnya), penerimaan
+(pilih supplier sampai simpan), mapping (buka daftar mapping, toggle lalu kembalikan).
+Per alur dilaporkan update/detik, latensi per update (p50/p95/p99), query SQL dan panggilan
+Bot API per update, serta peak RSS. Setiap alur dijalankan di proses terpisah agar peak RSS
+tidak tercampur (--same-process untuk satu proses).
+
+Jalankan dari folder bot dengan config.txt yang menunjuk database scratch:
+    python -m tools.bench_seed
+    python -m tools.bench_handlers
+    python -m tools.bench_handlers --flow stok --iterations 500 --concurrency 8 --pages 10
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import telebot
+from tools.bench_seed import bench_user_id, require_scratch_db
+from tools.fake_bot import BENCH_TOKEN, RecordingApi, make_callback, make_message
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+FLOWS = ('saldo', 'stok', 'penerimaan', 'mapping')
+
+# Penanda baris hasil JSON dari proses anak (output handler bot ikut tercetak di stdout)
+RESULT_MARK = 'BENCH_RESULT '
+
+class FlowError(Exception):
+    """Balasan bot tidak sesuai langkah alur (tombol yang diharapkan tidak ada)"""
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+def peak_rss_mb():
+    """Peak RSS proses ini (MB), None jika tidak tersedia"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS byte
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+class Harness:
+    """
+    main.py dengan bot palsu: handler main.py memakai global `bot`, jadi cukup diganti
+    InstrumentedBot di atas TeleBot yang request-nya ditangkap RecordingApi (tanpa outbox).
+    """
+
+    def __init__(self, api_latency=0.0):
+        self.recorder = RecordingApi(latency=api_latency).install()
+        import main
+        from database import request_session
+        from utils.metrics import InstrumentedBot
+        from utils.query_stats import query_stats
+        main.bot = InstrumentedBot(telebot.TeleBot(BENCH_TOKEN, threaded=False))
+        # Tanpa startup main.py, jadi tabel counter/saldo dibuat di sini
+        from utils.schema import ensure_tables_on_startup
+        ensure_tables_on_startup()
+        self.query_stats = query_stats
+        self.dispatch_message = request_session(main.router.dispatch_message)
+        self.dispatch_callback = request_session(main.router.dispatch_callback)
+
+    def query_count(self):
+        return sum(stats['count'] for stats in self.query_stats.snapshot(limit=None))
+
+    def reset(self):
+        self.query_stats.reset()
+        self.recorder.reset()
+
+class BenchClient:
+    """
+    Satu user bench. send()/press() mengirim satu update dan mencatat latensinya (juga per
+    langkah jika diberi step); think=(min, max) detik jeda sebelum setiap update (tidak
+    termasuk latensi).
+    """
+
+    def __init__(self, harness, user_id, rng=None, think=None):
+        self.harness = harness
+        self.user_id = user_id
+        self.rng = rng or random.Random(user_id)
+        self.think = think
+        self.latencies = []
+        self.steps = {}
+        self.updates = 0
+
+    def _run(self, dispatch, update, step=None):
+        if self.think and self.think[1] > 0:
+            time.sleep(self.rng.uniform(*self.think))
+        started = time.perf_counter()
+        try:
+            dispatch(update)
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            self.latencies.append(ms)
+            if step is not None:
+                self.steps.setdefault(step, []).append(ms)
+            self.updates += 1
+
+    def send(self, text, step=None):
+        self._run(self.harness.dispatch_message, make_message(self.user_id, text), step)
+
+    def press(self, data, step=None):
+        message_id, text, _ = self.harness.recorder.screen(self.user_id)
+        self._run(self.harness.dispatch_callback, make_callback(self.user_id, data, message_id, text), step)
+
+    def buttons(self, prefix=''):
+        return [data for data in self.harness.recorder.screen(self.user_id)[2] if data.startswith(prefix)]
+
+    def button(self, prefix):
+        """Salah satu tombol berawalan prefix di layar terakhir (acak), FlowError jika tidak ada"""
+        found = self.buttons(prefix)
+        if not found:
+            raise FlowError(f"tidak ada tombol {prefix}* di layar: {self.harness.recorder.screen(self.user_id)[1][:80]!r}")
+        return self.rng.choice(found)
+
+    def screen_text(self):
+        return self.harness.recorder.screen(self.user_id)[1]
+
+# ------------------------------------------------------------------ alur
+
+def flow_saldo(client, options):
+    client.send("Cek Saldo")
+
+def flow_stok(client, options):
+    client.send("Stok Produk")
+    data = client.button('stock_')
+    client.press(data)
+    base = data.rsplit('_page_', 1)[0]
+    for _ in range(options.pages - 1):
+        next_pages = client.buttons(f"{base}_n")
+        if not next_pages:
+            break
+        client.press(next_pages[0])
+
+def flow_penerimaan(client, options):
+    """
+    Penerimaan lengkap sampai simpan. Return (norcv, nofaktur, supplier_id) dari pesan sukses.
+    options.supplier_ids (opsional): pilih acak dari supplier bersama, bukan dari menu user.
+    """
+    client.send("Penerimaan Barang", 'menu')
+    shared = getattr(options, 'supplier_ids', None)
+    if shared:
+        # Supplier bersama: satu supplier hanya punya satu pemilik, jadi tidak ada di menu
+        # semua kasir; callback pilih_supplier_ dikirim langsung seperti tombolnya ditekan
+        supplier = f"pilih_supplier_{client.rng.choice(shared)}"
+    else:
+        supplier = client.button('pilih_supplier_')
+    client.press(supplier, 'pilih_supplier')
+    client.press(client.button('gunakan_faktur_otomatis'), 'faktur')
+    client.send("-", 'keterangan')
+    cart = options.cart if isinstance(options.cart, int) else client.rng.randint(*options.cart)
+    for _ in range(cart):
+        produk = client.buttons('pilih_produk_')
+        next_pages = client.buttons('produk_n')
+        # Sesekali pindah halaman produk seperti user mencari barang
+        if next_pages and (not produk or client.rng.random() < 0.3):
+            client.press(next_pages[0], 'paging_produk')
+        client.press(client.button('pilih_produk_'), 'pilih_produk')
+        client.send(str(client.rng.randint(1, 20)), 'qty')
+    client.press(client.button('simpan_penerimaan'), 'simpan')
+    if client.buttons('konfirmasi_simpan_harga_0'):
+        client.press('konfirmasi_simpan_harga_0', 'simpan')
+
+    # Pesan sukses menggantikan layar terakhir (edit), jadi tidak tertukar dengan putaran sebelumnya
+    sukses = client.screen_text()
+    if 'No. RCV' not in sukses:
+        raise FlowError(f"penerimaan tidak tersimpan: {sukses[:80]!r}")
+    fields = {}
+    for line in sukses.splitlines():
+        if line.startswith(('No. RCV:', 'No. Faktur:')):
+            name, _, value = line.partition(':')
+            fields[name] = value.strip().strip('`')
+    return fields.get('No. RCV'), fields.get('No. Faktur'), int(supplier.rsplit('_', 1)[1])
+
+def flow_mapping(client, options):
+    client.send("Kelola Mapping")
+    client.press(client.button('manage_mapping_'))
+    toggle = client.button('toggle_mapping_')
+    # Toggle dua kali agar status mapping kembali seperti semula
+    client.press(toggle)
+    client.press(toggle)
+
+FLOW_FUNCTIONS = {
+    'saldo': flow_saldo,
+    'stok': flow_stok,
+    'penerimaan': flow_penerimaan,
+    'mapping': flow_mapping,
+}
+
+# ------------------------------------------------------------------ runner
+
+def run_clients(func, clients, iterations, options):
+    """
+    Jalankan `iterations` putaran alur func(client, options) dibagi rata ke clients (satu
+    thread per client). Return (detik, [(client, hasil alur)], [error]).
+    """
+    results, errors = [], []
+    lock = threading.Lock()
+
+    def worker(client, count):
+        for _ in range(count):
+            try:
+                result = func(client, options)
+                with lock:
+                    results.append((client, result))
+            except Exception as e:
+                with lock:
+                    errors.append(f"{client.user_id}: {e}")
+
+    shares = [iterations // len(clients) + (1 if i < iterations % len(clients) else 0) for i in range(len(clients))]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+        for future in [executor.submit(worker, client, share) for client, share in zip(clients, shares)]:
+            future.result()
+    return time.perf_counter() - started, results, errors
+
+def run_flow(harness, flow, options):
+    clients = [BenchClient(harness, bench_user_id(i)) for i in range(options.concurrency)]
+
+    # Pemanasan (cache, katalog, koneksi pool) tidak dihitung
+    if options.warmup:
+        run_clients(FLOW_FUNCTIONS[flow], clients, options.warmup * len(clients), options)
+    harness.reset()
+    for client in clients:
+        client.latencies, client.steps, client.updates = [], {}, 0
+
+    elapsed, results, errors = run_clients(FLOW_FUNCTIONS[flow], clients, options.iterations, options)
+    latencies = sorted(ms for client in clients for ms in client.latencies)
+    updates = len(latencies)
+    return {
+        'flow': flow,
+        'iterations': options.iterations,
+        'concurrency': options.concurrency,
+        'updates': updates,
+        'seconds': round(elapsed, 3),
+        'updates_per_sec': round(updates / elapsed, 1) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'max_ms': round(latencies[-1], 2) if latencies else 0.0,
+        'queries_per_update': round(harness.query_count() / updates, 2) if updates else 0.0,
+        'api_calls_per_update': round(harness.recorder.total_calls() / updates, 2) if updates else 0.0,
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def print_results(results):
+    print(f"\n{'alur':<11} {'update':>7} {'upd/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'query/upd':>9} {'api/upd':>8} {'error':>6} {'RSS MB':>7}")
+    for r in results:
+        rss = '-' if r.get('peak_rss_mb') is None else f"{r['peak_rss_mb']:.1f}"
+        print(f"{r['flow']:<11} {r['updates']:>7} {r['updates_per_sec']:>8.1f} {r['p50_ms']:>8.2f} "
+              f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['queries_per_update']:>9.2f} "
+              f"{r['api_calls_per_update']:>8.2f} {r['errors']:>6} {rss:>7}")
+    for r in results:
+        if r.get('first_error'):
+            print(f"{r['flow']}: contoh error: {r['first_error']}")
+
+def _child_args(args, flow):
+    argv = ['--flow', flow, '--json', '--iterations', str(args.iterations), '--concurrency', str(args.concurrency),
+            '--warmup', str(args.warmup), '--pages', str(args.pages), '--cart', str(args.cart),
+            '--api-latency', str(args.api_latency)]
+    if args.force:
+        argv.append('--force')
+    return argv
+
+def run_subprocess(args, flow):
+    """Satu alur di proses baru (peak RSS per alur). Return hasil dict atau None."""
+    completed = subprocess.run(
+        [sys.executable, '-m', 'tools.bench_handlers'] + _child_args(args, flow),
+        stdout=subprocess.PIPE, text=True
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_MARK):
+            return json.loads(line[len(RESULT_MARK):])
+    print(f"Alur {flow} gagal (exit {completed.returncode}):\n{completed.stdout[-2000:]}")
+    return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark handler main.py dengan bot palsu dan database seed")
+    parser.add_argument('--flow', action='append', choices=FLOWS, help="alur yang diukur (boleh berulang, default semua)")
+    parser.add_argument('--iterations', type=int, default=200, help="putaran alur (dibagi ke semua user)")
+    parser.add_argument('--concurrency', type=int, default=1, help="user bench paralel (maksimal jumlah user seed)")
+    parser.add_argument('--warmup', type=int, default=1, help="putaran pemanasan per user (tidak diukur)")
+    parser.add_argument('--pages', type=int, default=5, help="halaman stok yang dibuka per putaran")
+    parser.add_argument('--cart', type=int, default=5, help="item per penerimaan")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="jeda buatan per panggilan Bot API (detik)")
+    parser.add_argument('--same-process', action='store_true', help="semua alur di proses ini")
+    parser.add_argument('--json', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--force', action='store_true', help="izinkan DB_NAME yang bukan scratch")
+    args = parser.parse_args(argv)
+
+    if not require_scratch_db(args.force):
+        return 2
+    flows = args.flow or list(FLOWS)
+
+    if len(flows) > 1 and not args.same_process:
+        results = [r for r in (run_subprocess(args, flow) for flow in flows) if r is not None]
+    else:
+        harness = Harness(api_latency=args.api_latency)
+        results = [run_flow(harness, flow, args) for flow in flows]
+
+    if args.json:
+        for result in results:
+            print(RESULT_MARK + json.dumps(result))
+    else:
+        print_results(results)
+    return 0 if len(results) == len(flows) and not any(r['errors'] for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Microbenchmark biaya dispatch per update: router (dict + trie, satu handler) dibanding
+handler telebot dengan filter lambda berurutan seperti main.py sebelumnya.
+Handler tidak melakukan apa-apa, jadi yang diukur hanya biaya pemilihan handler.
+
+Jalankan dari folder bot:
+    python -m tools.bench_router
+    python -m tools.bench_router --updates 50000
+"""
+import argparse
+import random
+import sys
+import time
+import telebot
+from telebot import types
+from utils.router import Router
+
+# Filter callback lama (urutan sama dengan main.py sebelum memakai router)
+LEGACY_CALLBACK_FILTERS = [
+    lambda data: data == "no_action",
+    lambda data: data in ['confirm_registration', 'change_nik'],
+    lambda data: data.startswith('supplier_'),
+    lambda data: data.startswith('stock_'),
+    lambda data: data.startswith('penerimaan_'),
+    lambda data: data.startswith('pilih_supplier_'),
+    lambda data: data.startswith('pilih_produk_'),
+    lambda data: data.startswith('produk_'),
+    lambda data: data == 'lihat_item',
+    lambda data: data == 'simpan_penerimaan',
+    lambda data: data == 'batal_penerimaan',
+    lambda data: data == 'konfirmasi_simpan_harga_0',
+    lambda data: data == 'gunakan_faktur_otomatis',
+    lambda data: data == 'input_faktur_manual',
+    lambda data: data == "kembali_ke_produk",
+    lambda data: data.startswith('manage_mapping_'),
+    lambda data: data.startswith('toggle_mapping_'),
+    lambda data: data.startswith('filter_mapping_'),
+    lambda data: data == 'back_to_mapping_menu',
+    lambda data: data == 'back_to_main_menu',
+    lambda data: data.startswith('add_mapping_'),
+    lambda data: data == "refresh_penerimaan",
+    lambda data: data == "back_to_stok_menu",
+    lambda data: data == "back_to_penerimaan_menu",
+    lambda data: data == "back_to_list",
+    lambda data: data == "refresh_supplier",
+]
+
+MENU_TEXTS = ["Daftar Sekarang", "Cek Saldo", "Supplier Saya", "Penerimaan Barang",
+              "Stok Produk", "Kelola Mapping", "Bantuan"]
+
+# Route router (sama dengan main.py)
+CALLBACK_PATTERNS = [
+    'no_action', 'confirm_registration', 'change_nik', 'supplier_{supplier_id:int}',
+    'stock_{supplier_id:int}_{page:page}', 'penerimaan_{supplier_id:int}_{page:rest}',
+    'pilih_supplier_{supplier_id:int}', 'pilih_produk_{id_produk:int}', 'produk_{page:page}',
+    'lihat_item', 'simpan_penerimaan', 'batal_penerimaan', 'konfirmasi_simpan_harga_0',
+    'gunakan_faktur_otomatis', 'input_faktur_manual', 'kembali_ke_produk',
+    'manage_mapping_{supplier_id:int}_{page:page}', 'toggle_mapping_{mapping_id:int}_{index:int}',
+    'filter_mapping_{supplier_id:int}_{status:str}_{page:page}', 'back_to_mapping_menu',
+    'back_to_main_menu', 'add_mapping_{supplier_id:int}', 'refresh_penerimaan',
+    'back_to_stok_menu', 'back_to_penerimaan_menu', 'back_to_list', 'refresh_supplier',
+]
+
+# Contoh callback_data yang sering muncul (paging dan pilih produk mendominasi)
+SAMPLE_CALLBACKS = [
+    'produk_n2_4f', 'produk_p1_4f', 'pilih_produk_1234', 'pilih_produk_98', 'stock_12_n3_1ab',
+    'stock_12_page_1', 'filter_mapping_7_Y_n2_3k', 'toggle_mapping_554_3', 'manage_mapping_7_r2_2z',
+    'penerimaan_7_n2_sx1k2_4c', 'lihat_item', 'simpan_penerimaan', 'back_to_stok_menu',
+    'refresh_supplier', 'no_action', 'kembali_ke_produk',
+]
+SAMPLE_TEXTS = ["Cek Saldo", "Stok Produk", "12", "5000", "FKT-001", "/start"]
+
+def _noop(*args, **kwargs):
+    pass
+
+def build_legacy_bot():
+    bot = telebot.TeleBot('123456:BENCH', threaded=False)
+    for command in ('start', 'lastupload', 'purgecache', 'stats'):
+        bot.message_handler(commands=[command])(_noop)
+
+    def text_chain(message):
+        # Rantai if/elif lama sebelum jatuh ke input state
+        for text in MENU_TEXTS:
+            if message.text == text:
+                return
+    bot.message_handler(func=lambda message: True)(text_chain)
+    for test in LEGACY_CALLBACK_FILTERS:
+        bot.callback_query_handler(func=lambda call, test=test: test(call.data))(_noop)
+    return bot
+
+def build_router():
+    router = Router()
+    router.command('start', 'lastupload', 'purgecache', 'stats')(_noop)
+    router.text(*MENU_TEXTS)(_noop)
+    router.fallback_message(_noop)
+    router.callback(*CALLBACK_PATTERNS)(_noop)
+    return router
+
+def build_router_bot():
+    bot = telebot.TeleBot('123456:BENCH', threaded=False)
+    build_router().register(bot)
+    return bot
+
+def make_updates(count, seed=1):
+    rng = random.Random(seed)
+    user = {'id': 42, 'is_bot': False, 'first_name': 'Bench'}
+    chat = {'id': 42, 'type': 'private'}
+    updates = []
+    for i in range(count):
+        if rng.random() < 0.7:
+            data = rng.choice(SAMPLE_CALLBACKS)
+            update = {'update_id': i, 'callback_query': {
+                'id': str(i), 'from': user, 'chat_instance': '1', 'data': data,
+                'message': {'message_id': 1, 'date': 0, 'chat': chat, 'text': 'x'}
+            }}
+        else:
+            text = rng.choice(SAMPLE_TEXTS)
+            message = {'message_id': i, 'date': 0, 'chat': chat, 'from': user, 'text': text}
+            if text.startswith('/'):
+                message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+            update = {'update_id': i, 'message': message}
+        updates.append(types.Update.de_json(update))
+    return updates
+
+def bench(label, func, items, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            func(item)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    per_item = best / len(items) * 1e6
+    print(f"{label:<40} {per_item:8.2f} µs/update")
+    return per_item
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dispatch router vs filter lambda")
+    parser.add_argument('--updates', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    updates = make_updates(args.updates)
+    callbacks = [u.callback_query.data for u in updates if u.callback_query]
+
+    # Pemilihan handler saja (tanpa telebot)
+    router = build_router()
+    def legacy_resolve(data):
+        for test in LEGACY_CALLBACK_FILTERS:
+            if test(data):
+                return test
+    bench("resolve callback: filter berurutan", legacy_resolve, callbacks, args.repeat)
+    bench("resolve callback: router", router.resolve_callback, callbacks, args.repeat)
+
+    # Jalur lengkap telebot.process_new_updates (satu update per panggilan, seperti dispatcher)
+    legacy_bot, router_bot = build_legacy_bot(), build_router_bot()
+    legacy = bench("process_new_updates: filter berurutan", lambda u: legacy_bot.process_new_updates([u]), updates, args.repeat)
+    routed = bench("process_new_updates: router", lambda u: router_bot.process_new_updates([u]), updates, args.repeat)
+    print(f"Percepatan dispatch: {legacy / routed:.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
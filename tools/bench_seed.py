@@ -0,0 +1,359 @@
+"""
+Isi database lokal (scratch) dengan data sintetis untuk tools/bench_handlers.py dan
+tools/load_penerimaan.py: user bench (id_tele mulai BASE_USER_ID + 1), supplier, produk
+beserta mapping, riwayat penerimaan dan mutasi deposit. Tabel yang belum ada dibuat dengan
+kolom minimal yang dipakai bot. Data bench lama dihapus dulu, data lain tidak disentuh.
+
+Supplier bersama (--shared-suppliers, ditandai person SHARED_PERSON) dipakai
+tools/load_penerimaan.py agar beberapa kasir menyimpan penerimaan ke supplier yang sama.
+
+Hanya berjalan jika DB_NAME di config.txt mengandung 'bench' atau 'test' (atau --force):
+    python -m tools.bench_seed --users 20 --suppliers 40 --products 200 --receipts 300 --deposits 500
+    python -m tools.bench_seed --clean        # hapus data bench saja
+Setelah seed, jalankan python -m tools.ensure_indexes --apply agar index sama dengan produksi.
+"""
+import argparse
+import datetime
+import random
+import sys
+from config import config
+from database import create_connection
+from tools.fake_telegram_client import BASE_USER_ID
+from utils.sequence import NORCV_PREFIX
+
+# Penanda baris bench (nik, alamat supplier, barcode produk, keterangan)
+TAG = 'BENCH'
+# Penanda supplier bersama (kolom person)
+SHARED_PERSON = 'Bench Bersama'
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS tb_karyawan (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        nik VARCHAR(20) NOT NULL,
+        nama VARCHAR(100),
+        id_tele VARCHAR(20),
+        aktif CHAR(1) NOT NULL DEFAULT 'Y'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tb_suplier (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        namasuplier VARCHAR(100),
+        alamat VARCHAR(255),
+        email VARCHAR(100),
+        notlp VARCHAR(30),
+        person VARCHAR(100),
+        aktif CHAR(1) NOT NULL DEFAULT 'Y',
+        id_karyawan INT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tb_satuan (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        satuan VARCHAR(30),
+        aktif CHAR(1) NOT NULL DEFAULT 'Y'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_produk (
+        id_produk INT AUTO_INCREMENT PRIMARY KEY,
+        nama_produk VARCHAR(150),
+        deskripsi TEXT,
+        stok INT DEFAULT 0,
+        harga DECIMAL(15,2) DEFAULT 0,
+        satuanbesar INT,
+        satuankecil INT,
+        isi INT DEFAULT 1,
+        kategori VARCHAR(50),
+        barcode VARCHAR(50),
+        min INT DEFAULT 0,
+        max INT DEFAULT 0,
+        aktif CHAR(1) NOT NULL DEFAULT 'Y'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tb_suplieritem (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        idsuplier INT NOT NULL,
+        iditem INT NOT NULL,
+        harga DECIMAL(15,2) DEFAULT 0,
+        satuan INT,
+        isi INT DEFAULT 1,
+        aktif CHAR(1) NOT NULL DEFAULT 'Y'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tb_riceve (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        norcv VARCHAR(20),
+        nofaktur VARCHAR(25),
+        keterangan TEXT,
+        idsuplier INT,
+        tgl DATE,
+        jam TIME,
+        totalitem INT DEFAULT 0,
+        totalharga DECIMAL(15,2) DEFAULT 0,
+        diskon DECIMAL(15,2) DEFAULT 0,
+        totalfinal DECIMAL(15,2) DEFAULT 0,
+        user VARCHAR(100),
+        aktif CHAR(1) NOT NULL DEFAULT 'Y'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tb_ricevedetil (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        idrcv INT NOT NULL,
+        iditem INT,
+        satuanbesar INT,
+        qty1 INT,
+        satuankecil INT,
+        isi INT,
+        qty2 INT,
+        hargabeli DECIMAL(15,2),
+        subtotal DECIMAL(15,2),
+        hargapokok DECIMAL(15,2),
+        posting CHAR(1) DEFAULT 'N',
+        user VARCHAR(100),
+        tgl DATE,
+        KEY idx_ricevedetil_rcv (idrcv)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tb_deposit_detil (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        nik VARCHAR(20),
+        jenis VARCHAR(10),
+        setor DECIMAL(15,2) DEFAULT 0,
+        tarik DECIMAL(15,2) DEFAULT 0,
+        keterangan VARCHAR(255)
+    )
+    """,
+]
+
+SATUAN = ['PCS', 'BOX', 'PAK', 'KARTON', 'LUSIN']
+
+def is_scratch_db():
+    name = (config.DB_NAME or '').lower()
+    return 'bench' in name or 'test' in name
+
+def require_scratch_db(force=False):
+    """Tolak menulis data sintetis ke database yang bukan scratch. Return True jika boleh."""
+    if force or is_scratch_db():
+        return True
+    print(
+        f"DB_NAME={config.DB_NAME} bukan database scratch (nama harus mengandung 'bench' atau 'test'). "
+        f"Pakai config.txt tersendiri atau --force."
+    )
+    return False
+
+def bench_user_id(index):
+    """ID Telegram user bench ke-index (mulai 0)"""
+    return BASE_USER_ID + index + 1
+
+def _kode(index):
+    """Kode 3 huruf unik per supplier (AAA, AAB, ...) agar nomor faktur otomatis tidak sama"""
+    letters = ''
+    for _ in range(3):
+        index, rest = divmod(index, 26)
+        letters = chr(ord('A') + rest) + letters
+    return letters
+
+def create_schema(sql):
+    for statement in SCHEMA:
+        sql.execute(statement)
+
+def clean(sql):
+    """Hapus semua data bench (termasuk penerimaan yang dibuat saat benchmark)"""
+    sql.execute("SELECT id FROM tb_suplier WHERE alamat = %s", (TAG,))
+    supplier_ids = [row['id'] for row in sql.fetchall()]
+    if supplier_ids:
+        marks = ', '.join(['%s'] * len(supplier_ids))
+        sql.execute(f"""
+            DELETE d FROM tb_ricevedetil d
+            JOIN tb_riceve r ON r.id = d.idrcv
+            WHERE r.idsuplier IN ({marks})
+        """, supplier_ids)
+        sql.execute(f"DELETE FROM tb_riceve WHERE idsuplier IN ({marks})", supplier_ids)
+        sql.execute(f"DELETE FROM tb_suplieritem WHERE idsuplier IN ({marks})", supplier_ids)
+        sql.execute(f"DELETE FROM tb_suplier WHERE id IN ({marks})", supplier_ids)
+    sql.execute("DELETE FROM tbl_produk WHERE barcode LIKE %s", (f"{TAG}%",))
+    sql.execute("DELETE FROM tb_deposit_detil WHERE nik LIKE %s", (f"{TAG}%",))
+    sql.execute("DELETE FROM tb_karyawan WHERE nik LIKE %s", (f"{TAG}%",))
+    try:
+        sql.execute("DELETE FROM tb_saldo_member WHERE nik LIKE %s", (f"{TAG}%",))
+    except Exception:
+        pass    # tabel dibuat bot saat pertama jalan
+
+def _satuan_ids(sql):
+    sql.execute("SELECT id, satuan FROM tb_satuan WHERE aktif = 'Y'")
+    ids = {row['satuan'].upper(): row['id'] for row in sql.fetchall() if row['satuan']}
+    missing = [nama for nama in SATUAN if nama not in ids]
+    if missing:
+        sql.executemany("INSERT INTO tb_satuan (satuan, aktif) VALUES (%s, 'Y')", [(nama,) for nama in missing])
+        return _satuan_ids(sql)
+    return [ids[nama] for nama in SATUAN]
+
+def seed(sql, users=20, suppliers=40, products=200, receipts=300, receipt_items=5,
+         deposits=500, inactive_every=10, shared_suppliers=0, rng=None, report=print):
+    """
+    Buat data bench. Jumlah products, receipts per supplier; deposits per user.
+    Supplier dibagi rata ke user; setiap inactive_every mapping dibuat nonaktif.
+    shared_suppliers: supplier tambahan yang dipakai bersama semua user di load test.
+    """
+    rng = rng or random.Random(1)
+    today = datetime.date.today()
+    satuan_ids = _satuan_ids(sql)
+
+    # ID baris baru dibaca ulang lewat penanda (tidak mengandalkan lastrowid executemany)
+    sql.executemany("""
+        INSERT INTO tb_karyawan (nik, nama, id_tele, aktif) VALUES (%s, %s, %s, %s)
+    """, [(f"{TAG}{i:05d}", f"Bench User {i}", str(bench_user_id(i)), 'Y') for i in range(users)])
+    sql.execute("SELECT id FROM tb_karyawan WHERE nik LIKE %s ORDER BY nik", (f"{TAG}%",))
+    karyawan_ids = [row['id'] for row in sql.fetchall()]
+    report(f"{users} user (id_tele {bench_user_id(0)}..{bench_user_id(users - 1)})")
+
+    sql.executemany("""
+        INSERT INTO tb_suplier (namasuplier, alamat, email, notlp, person, aktif, id_karyawan)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, [
+        (
+            f"{_kode(i)} {TAG} {i}", TAG, f"sup{i}@bench.invalid", '0800000000',
+            SHARED_PERSON if i >= suppliers else 'Bench', 'Y', karyawan_ids[i % users]
+        )
+        for i in range(suppliers + shared_suppliers)
+    ])
+    sql.execute("SELECT id FROM tb_suplier WHERE alamat = %s ORDER BY id", (TAG,))
+    supplier_ids = [row['id'] for row in sql.fetchall()]
+    report(f"{suppliers} supplier, {shared_suppliers} supplier bersama")
+
+    mapping_count = 0
+    katalog = {}
+    for n, supplier_id in enumerate(supplier_ids):
+        produk_rows = []
+        for i in range(products):
+            besar, kecil = rng.choice(satuan_ids[1:]), satuan_ids[0]
+            produk_rows.append((
+                f"Produk {_kode(n)} {i:05d}", f"Produk sintetis {i} supplier {supplier_id}",
+                rng.randint(0, 500), rng.randint(1, 500) * 100, besar, kecil, rng.choice([6, 12, 24, 48]),
+                TAG, f"{TAG}{supplier_id}-{i:05d}", 10, 100, 'Y'
+            ))
+        sql.executemany("""
+            INSERT INTO tbl_produk (
+                nama_produk, deskripsi, stok, harga, satuanbesar, satuankecil, isi,
+                kategori, barcode, min, max, aktif
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, produk_rows)
+        sql.execute("SELECT id_produk, barcode FROM tbl_produk WHERE barcode LIKE %s", (f"{TAG}{supplier_id}-%",))
+        by_barcode = {row['barcode']: row['id_produk'] for row in sql.fetchall()}
+        produk_ids = [by_barcode[row[8]] for row in produk_rows]
+        mapping_rows = [
+            (supplier_id, produk_id, row[3] * 0.8, row[4], row[6],
+             'N' if inactive_every and i % inactive_every == inactive_every - 1 else 'Y')
+            for i, (produk_id, row) in enumerate(zip(produk_ids, produk_rows))
+        ]
+        sql.executemany("""
+            INSERT INTO tb_suplieritem (idsuplier, iditem, harga, satuan, isi, aktif)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, mapping_rows)
+        mapping_count += len(mapping_rows)
+        katalog[supplier_id] = [(produk_id, row[0], row[3] * 0.8, row[4], row[5], row[6])
+                                for produk_id, row in zip(produk_ids, produk_rows)]
+    report(f"{mapping_count} produk + mapping")
+
+    # Riwayat penerimaan di hari-hari sebelumnya (nomor hari ini tetap dari counter bot)
+    nomor = 0
+    faktur_seq = {}
+    for n, supplier_id in enumerate(supplier_ids):
+        for i in range(receipts):
+            tgl = today - datetime.timedelta(days=1 + nomor // 500)
+            norcv = f"{NORCV_PREFIX}{tgl.strftime('%y%m%d')}{nomor % 500 + 1:03d}"
+            nomor += 1
+            key = (supplier_id, tgl.strftime('%Y/%m'))
+            faktur_seq[key] = faktur_seq.get(key, 0) + 1
+            nofaktur = f"{_kode(n)}/{key[1]}/{faktur_seq[key]:03d}"
+            items = rng.sample(katalog[supplier_id], min(receipt_items, len(katalog[supplier_id])))
+            total = sum(harga * 10 for _, _, harga, _, _, _ in items)
+            sql.execute("""
+                INSERT INTO tb_riceve (
+                    norcv, nofaktur, keterangan, idsuplier, tgl, jam,
+                    totalitem, totalharga, diskon, totalfinal, user, aktif
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 0, %s, %s, 'Y')
+            """, (norcv, nofaktur, TAG, supplier_id, tgl, datetime.time(9, 0), len(items), total, total, 'Bench'))
+            id_rcv = sql.lastrowid
+            sql.executemany("""
+                INSERT INTO tb_ricevedetil (
+                    idrcv, iditem, satuanbesar, qty1, satuankecil, isi, qty2,
+                    hargabeli, subtotal, hargapokok, posting, user, tgl
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, [
+                (id_rcv, produk_id, besar, 10, kecil, isi, 10 * isi, harga, harga * 10, harga, 'N', 'Bench', tgl)
+                for produk_id, _, harga, besar, kecil, isi in items
+            ])
+    report(f"{nomor} penerimaan ({receipt_items} item)")
+
+    deposit_rows = []
+    for i in range(users):
+        for j in range(deposits):
+            if j % 3 == 2:
+                deposit_rows.append((f"{TAG}{i:05d}", 'tarik', 0, rng.randint(1, 50) * 1000, f"Tarik {TAG}"))
+            else:
+                deposit_rows.append((f"{TAG}{i:05d}", 'setor', rng.randint(1, 200) * 1000, 0, f"Setor {TAG} {j}"))
+    for start in range(0, len(deposit_rows), 1000):
+        sql.executemany("""
+            INSERT INTO tb_deposit_detil (nik, jenis, setor, tarik, keterangan) VALUES (%s, %s, %s, %s, %s)
+        """, deposit_rows[start:start + 1000])
+    report(f"{len(deposit_rows)} mutasi deposit")
+
+def shared_supplier_ids(sql):
+    """ID supplier bersama hasil seed, urut id"""
+    sql.execute(
+        "SELECT id FROM tb_suplier WHERE alamat = %s AND person = %s AND aktif = 'Y' ORDER BY id",
+        (TAG, SHARED_PERSON)
+    )
+    return [row['id'] for row in sql.fetchall()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Isi database scratch dengan data bench")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--suppliers', type=int, default=40, help="total supplier, dibagi rata ke user")
+    parser.add_argument('--products', type=int, default=200, help="produk per supplier")
+    parser.add_argument('--receipts', type=int, default=300, help="riwayat penerimaan per supplier")
+    parser.add_argument('--receipt-items', type=int, default=5, help="item per penerimaan")
+    parser.add_argument('--deposits', type=int, default=500, help="mutasi deposit per user")
+    parser.add_argument('--shared-suppliers', type=int, default=2,
+                        help="supplier tambahan yang dipakai bersama semua user (load_penerimaan)")
+    parser.add_argument('--clean', action='store_true', help="hapus data bench saja")
+    parser.add_argument('--force', action='store_true', help="izinkan DB_NAME yang bukan scratch")
+    args = parser.parse_args(argv)
+
+    if not require_scratch_db(args.force):
+        return 2
+    if args.users < 1:
+        parser.error("--users minimal 1")
+
+    try:
+        conn = create_connection()
+    except Exception as e:
+        print(f"Koneksi database gagal: {e}")
+        return 2
+
+    try:
+        with conn.cursor() as sql:
+            create_schema(sql)
+            clean(sql)
+            if not args.clean:
+                seed(sql, args.users, args.suppliers, args.products, args.receipts,
+                     args.receipt_items, args.deposits, shared_suppliers=args.shared_suppliers)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Seed gagal: {e}")
+        return 1
+    finally:
+        conn.close()
+    print("Data bench dihapus" if args.clean else "Seed selesai")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Cek dan buat tabel milik bot (utils/schema.py) dan index yang dibutuhkan query handler
+(utils/indexes.py), dengan laporan EXPLAIN sebelum dan sesudah. Aman dijalankan berulang:
+tabel dan index yang sudah ada dilewati.
+
+Jalankan dari folder bot (tempat config.txt), bisa diarahkan ke MySQL/MariaDB lokal
+dengan config.txt tersendiri:
+    python -m tools.ensure_indexes              # cek saja, exit 1 jika ada tabel/index yang belum ada
+    python -m tools.ensure_indexes --apply      # buat tabel dan index yang belum ada
+    python -m tools.ensure_indexes --apply --explain
+"""
+import argparse
+import sys
+from database import create_connection
+from utils.indexes import ensure_indexes, explain_plans, format_plan
+from utils.schema import ensure_tables
+
+def print_plans(judul, plans):
+    print(f"\n== EXPLAIN {judul} ==")
+    for name, rows in plans:
+        print(f"  {name}")
+        for line in format_plan(rows):
+            print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cek/buat tabel bot dan index untuk query bot")
+    parser.add_argument('--apply', action='store_true', help="buat tabel dan index yang belum ada")
+    parser.add_argument('--explain', action='store_true', help="tampilkan EXPLAIN sebelum dan sesudah")
+    args = parser.parse_args(argv)
+
+    try:
+        conn = create_connection()
+    except Exception as e:
+        print(f"Koneksi database gagal: {e}")
+        return 2
+
+    try:
+        with conn.cursor() as sql:
+            if args.explain:
+                print_plans("sebelum", explain_plans(sql))
+
+            print("\n== Tabel bot ==")
+            tables = ensure_tables(sql, apply=args.apply)
+            conn.commit()
+
+            print("\n== Index ==")
+            results = ensure_indexes(sql, apply=args.apply)
+            conn.commit()
+
+            if args.explain and args.apply:
+                print_plans("sesudah", explain_plans(sql))
+    finally:
+        conn.close()
+
+    statuses = [status for _, status in tables] + [status for _, _, status in results]
+    print(
+        f"\n{statuses.count('ok')} sudah ada, {statuses.count('created')} dibuat, "
+        f"{statuses.count('missing')} belum ada, {statuses.count('conflict')} konflik nama, "
+        f"{statuses.count('skip')} dilewati, {statuses.count('error')} gagal"
+    )
+    if 'error' in statuses or 'missing' in statuses or 'conflict' in statuses:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
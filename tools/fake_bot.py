@@ -0,0 +1,163 @@
+"""
+TeleBot palsu di dalam proses untuk benchmark dan load test handler (tanpa Telegram dan
+tanpa HTTP): TeleBot asli dengan apihelper.CUSTOM_REQUEST_SENDER yang mencatat setiap
+pemanggilan Bot API dan membalas dengan hasil sintetis. Serialisasi parameter (keyboard,
+parse_mode, dll) tetap dijalankan telebot seperti di produksi.
+
+    recorder = RecordingApi().install()
+    bot = telebot.TeleBot(BENCH_TOKEN, threaded=False)
+    bot.send_message(900000001, "halo")
+    recorder.screen(900000001)      # (message_id, teks, [callback_data...]) pesan terakhir
+
+Update sintetis dibuat dengan make_message() dan make_callback().
+"""
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from telebot import apihelper, types
+from tools.fake_telegram_client import BASE_USER_ID
+
+BENCH_TOKEN = '123456:BENCH'
+
+_message_ids = itertools.count(1)
+_update_ids = itertools.count(1)
+
+def _user(user_id):
+    return {'id': user_id, 'is_bot': False, 'first_name': f"Tester{user_id - BASE_USER_ID}"}
+
+def _chat(user_id):
+    return {'id': user_id, 'type': 'private', 'first_name': _user(user_id)['first_name']}
+
+def make_message(user_id, text):
+    """Message teks dari chat pribadi user_id; perintah /xxx diberi entity bot_command"""
+    message = {
+        'message_id': next(_message_ids),
+        'date': int(time.time()),
+        'chat': _chat(user_id),
+        'from': _user(user_id),
+        'text': text
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return types.Message.de_json(message)
+
+def make_callback(user_id, data, message_id=None, text="pesan bot"):
+    """CallbackQuery tombol inline pada pesan bot message_id (default pesan baru)"""
+    return types.CallbackQuery.de_json({
+        'id': str(next(_update_ids)),
+        'from': _user(user_id),
+        'chat_instance': str(user_id),
+        'data': data,
+        'message': {
+            'message_id': message_id or next(_message_ids),
+            'date': int(time.time()),
+            'chat': _chat(user_id),
+            'from': {'id': 1, 'is_bot': True, 'first_name': 'Bot'},
+            'text': text
+        }
+    })
+
+class _Response:
+    """Cukup untuk apihelper._check_result"""
+    status_code = 200
+    reason = 'OK'
+
+    def __init__(self, payload):
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return json.loads(self.text)
+
+def _callback_data(reply_markup):
+    if not reply_markup:
+        return []
+    if isinstance(reply_markup, str):
+        reply_markup = json.loads(reply_markup)
+    return [
+        button['callback_data']
+        for row in reply_markup.get('inline_keyboard', [])
+        for button in row
+        if button.get('callback_data')
+    ]
+
+class RecordingApi:
+    """
+    Pengganti HTTP Bot API. Per chat disimpan pesan terakhir yang dikirim/diedit bot
+    (untuk mengikuti tombol seperti user sungguhan) dan history teks terakhir.
+    """
+
+    def __init__(self, history=20, latency=0.0):
+        self.history = history
+        self.latency = latency          # jeda buatan per panggilan (detik) untuk mensimulasikan jaringan
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._screens = {}              # chat_id -> (message_id, teks, [callback_data])
+        self._texts = {}                # chat_id -> deque teks terakhir
+        self._previous = None
+
+    def install(self):
+        self._previous = apihelper.CUSTOM_REQUEST_SENDER
+        apihelper.CUSTOM_REQUEST_SENDER = self
+        return self
+
+    def uninstall(self):
+        apihelper.CUSTOM_REQUEST_SENDER = self._previous
+
+    def __call__(self, method, url, params=None, files=None, **kwargs):
+        name = url.rstrip('/').rsplit('/', 1)[-1]
+        if self.latency:
+            time.sleep(self.latency)
+        return _Response({'ok': True, 'result': self.handle(name, dict(params or {}))})
+
+    def handle(self, method, params):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        lowered = method.lower()
+        if lowered == 'getme':
+            return {'id': 1, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot'}
+        if not lowered.startswith(('send', 'edit')):
+            return True
+
+        chat_id = int(params.get('chat_id') or 0)
+        message_id = int(params.get('message_id') or next(_message_ids))
+        text = params.get('text', '')
+        buttons = _callback_data(params.get('reply_markup'))
+        with self._lock:
+            if lowered in ('sendmessage', 'editmessagetext'):
+                texts = self._texts.get(chat_id)
+                if texts is None:
+                    texts = self._texts[chat_id] = deque(maxlen=self.history)
+                texts.append(text)
+            if buttons or lowered == 'editmessagetext':
+                if lowered == 'editmessagereplymarkup':
+                    text = self._screens.get(chat_id, (None, '', []))[1]
+                self._screens[chat_id] = (message_id, text, buttons)
+        return {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': 1, 'is_bot': True, 'first_name': 'FakeBot'},
+            'text': text
+        }
+
+    def screen(self, chat_id):
+        """(message_id, teks, [callback_data]) pesan bot terakhir yang punya tombol inline"""
+        with self._lock:
+            return self._screens.get(chat_id, (None, '', []))
+
+    def texts(self, chat_id):
+        """Teks pesan yang dikirim/diedit bot ke chat, terlama dulu"""
+        with self._lock:
+            return list(self._texts.get(chat_id, ()))
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self._screens.clear()
+            self._texts.clear()
@@ -0,0 +1,205 @@
+"""
+Fake Telegram untuk menguji mode webhook secara lokal tanpa server Telegram.
+
+1. Jalankan fake Bot API agar balasan bot tidak dikirim ke Telegram:
+       python -m tools.fake_telegram_client --serve-api 8081
+   lalu di config.txt bot: TELEGRAM_API_URL=http://127.0.0.1:8081/bot{0}/{1}
+
+2. Jalankan bot dengan BOT_MODE=webhook, lalu kirim update palsu:
+       python -m tools.fake_telegram_client --url http://127.0.0.1:8080/telegram \\
+           --secret rahasia --users 20 --updates 200 --text /start --text "Cek Saldo"
+       python -m tools.fake_telegram_client --url ... --callback stock_12_page_1
+"""
+import argparse
+import itertools
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# ID user palsu dimulai dari sini agar tidak bentrok dengan user sungguhan
+BASE_USER_ID = 900000000
+
+_message_ids = itertools.count(1)
+
+def _user(user_id):
+    return {'id': user_id, 'is_bot': False, 'first_name': f"Tester{user_id - BASE_USER_ID}"}
+
+def _message(user_id, text):
+    return {
+        'message_id': next(_message_ids),
+        'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private', 'first_name': _user(user_id)['first_name']},
+        'from': _user(user_id),
+        'text': text
+    }
+
+def message_update(update_id, user_id, text):
+    """Update pesan teks dari chat pribadi; perintah /xxx diberi entity bot_command"""
+    message = _message(user_id, text)
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return {'update_id': update_id, 'message': message}
+
+def callback_update(update_id, user_id, data):
+    """Update tombol inline ditekan pada pesan bot sebelumnya"""
+    message = _message(user_id, "pesan bot")
+    message['from'] = {'id': 1, 'is_bot': True, 'first_name': 'Bot'}
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': _user(user_id),
+            'chat_instance': str(user_id),
+            'message': message,
+            'data': data
+        }
+    }
+
+def post_update(url, update, secret=None, timeout=10):
+    """Kirim satu update ke webhook. Return (status HTTP, detik)."""
+    body = json.dumps(update).encode('utf-8')
+    request = urllib.request.Request(url, data=body, method='POST')
+    request.add_header('Content-Type', 'application/json')
+    if secret:
+        request.add_header('X-Telegram-Bot-Api-Secret-Token', secret)
+    started = time.monotonic()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception as e:
+        print(f"Gagal kirim update {update['update_id']}: {e}")
+        status = 0
+    return status, time.monotonic() - started
+
+def run_client(args):
+    payloads = [('text', t) for t in args.text] + [('callback', c) for c in args.callback]
+    if not payloads:
+        payloads = [('text', '/start')]
+
+    updates = []
+    update_id = int(time.time())
+    for i in range(args.updates):
+        user_id = BASE_USER_ID + (i % args.users) + 1
+        kind, value = payloads[(i // args.users) % len(payloads)]
+        update_id += 1
+        if kind == 'text':
+            updates.append(message_update(update_id, user_id, value))
+        else:
+            updates.append(callback_update(update_id, user_id, value))
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda u: post_update(args.url, u, args.secret), updates))
+    elapsed = time.monotonic() - started
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = sorted(seconds for _, seconds in results)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0
+
+    print(f"{len(updates)} update dalam {elapsed:.2f} detik ({len(updates) / max(elapsed, 1e-9):.1f}/detik)")
+    print(f"Status HTTP: {statuses}")
+    print(f"Latensi p95: {p95 * 1000:.1f} ms")
+    return 0 if set(statuses) == {200} else 1
+
+class FakeBotApi:
+    """
+    Bot API palsu: semua method dibalas sukses. Method send*/edit* dibalas dengan Message
+    sederhana, lainnya dengan True. Panggilan dicatat untuk dilihat di console.
+    """
+
+    def __init__(self, verbose=True):
+        self.verbose = verbose
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def result_for(self, method, params):
+        if method.lower() == 'getme':
+            return {'id': 1, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot'}
+        if method.lower().startswith(('send', 'edit')):
+            chat_id = int(params.get('chat_id') or 0)
+            return {
+                'message_id': int(params.get('message_id') or next(_message_ids)),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': params.get('text', '')
+            }
+        return True
+
+    def handle(self, method, params):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if self.verbose:
+            print(f"{method} chat={params.get('chat_id', '-')}: {params.get('text', '')[:60]!r}")
+        return {'ok': True, 'result': self.result_for(method, params)}
+
+    def serve(self, host, port):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _params(self):
+                params = dict(parse_qsl(urlsplit(self.path).query))
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    body = self.rfile.read(length).decode('utf-8', 'replace')
+                    if self.headers.get('Content-Type', '').startswith('application/json'):
+                        params.update(json.loads(body))
+                    else:
+                        params.update(parse_qsl(body))
+                return params
+
+            def _handle(self):
+                method = urlsplit(self.path).path.rstrip('/').rsplit('/', 1)[-1]
+                body = json.dumps(api.handle(method, self._params())).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        print(f"Fake Bot API di http://{host}:{port}/bot{{0}}/{{1}}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            print(f"Panggilan API: {api.calls}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Telegram untuk menguji webhook bot")
+    parser.add_argument('--url', default='http://127.0.0.1:8080/telegram', help="URL webhook bot")
+    parser.add_argument('--secret', help="WEBHOOK_SECRET bot")
+    parser.add_argument('--users', type=int, default=5, help="jumlah user palsu")
+    parser.add_argument('--updates', type=int, default=20, help="jumlah update yang dikirim")
+    parser.add_argument('--concurrency', type=int, default=8, help="request paralel")
+    parser.add_argument('--text', action='append', default=[], help="isi pesan (boleh berulang)")
+    parser.add_argument('--callback', action='append', default=[], help="callback_data (boleh berulang)")
+    parser.add_argument('--serve-api', type=int, metavar='PORT', help="jalankan fake Bot API di port ini")
+    parser.add_argument('--host', default='127.0.0.1', help="host fake Bot API")
+    parser.add_argument('--quiet', action='store_true', help="jangan cetak setiap panggilan API")
+    args = parser.parse_args(argv)
+
+    if args.serve_api:
+        FakeBotApi(verbose=not args.quiet).serve(args.host, args.serve_api)
+        return 0
+    args.users = max(1, args.users)
+    return run_client(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
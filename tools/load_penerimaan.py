@@ -0,0 +1,227 @@
+"""
+Load test alur penerimaan: N user bench (kasir) bersamaan menyelesaikan penerimaan
+pilih_supplier -> faktur otomatis -> keterangan -> pilih_produk/qty berulang -> simpan,
+dengan ukuran keranjang dan jeda berpikir acak, lewat handler main.py dan bot palsu
+(tools/bench_handlers.py).
+
+--supplier-mode shared (default): setiap penerimaan memilih acak salah satu supplier bersama
+hasil seed (--shared-suppliers), jadi beberapa kasir memperebutkan nomor faktur supplier yang
+sama selain nomor RCV harian. --supplier-mode own: setiap user memakai supplier miliknya
+sendiri (hanya nomor RCV dan database yang diperebutkan).
+
+Dilaporkan: throughput (penerimaan dan update per detik), distribusi latensi per update dan
+per langkah, waktu satu penerimaan (termasuk jeda), row lock wait InnoDB, sisa state di
+memori dan peak RSS. Pemeriksaan kebenaran: tidak ada norcv yang terbit dua kali, tidak ada
+nofaktur ganda per supplier (dari pesan bot dan dari tb_riceve), dan jumlah baris tersimpan
+sama dengan penerimaan yang sukses. Exit 1 jika ada duplikat atau error.
+
+    python -m tools.bench_seed --users 50 --shared-suppliers 2
+    python -m tools.load_penerimaan --users 50 --receipts 20 --cart 3-10 --think 0.2-1.5
+    python -m tools.load_penerimaan --users 50 --supplier-mode own
+"""
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from database import connection
+from tools.bench_handlers import (
+    BenchClient, Harness, flow_penerimaan, peak_rss_mb, percentile, run_clients
+)
+from tools.bench_seed import TAG, bench_user_id, require_scratch_db, shared_supplier_ids
+from handlers.penerimaan import paging_states, user_states
+from utils.metrics import BUCKETS_MS
+
+def parse_range(text, cast):
+    """'5' -> (5, 5), '3-10' -> (3, 10)"""
+    low, _, high = text.partition('-')
+    low = cast(low)
+    high = cast(high) if high else low
+    if high < low:
+        raise argparse.ArgumentTypeError(f"rentang tidak valid: {text}")
+    return low, high
+
+def receipt(client, options):
+    """Satu penerimaan lengkap: (norcv, nofaktur, supplier_id, detik termasuk jeda)"""
+    started = time.perf_counter()
+    norcv, nofaktur, supplier_id = flow_penerimaan(client, options)
+    return norcv, nofaktur, supplier_id, time.perf_counter() - started
+
+def db_counts(sql):
+    """Jumlah penerimaan supplier bench dan status row lock InnoDB"""
+    sql.execute("""
+        SELECT COUNT(*) AS total
+        FROM tb_riceve r
+        JOIN tb_suplier s ON s.id = r.idsuplier
+        WHERE s.alamat = %s
+    """, (TAG,))
+    result = {'receipts': sql.fetchone()['total']}
+    try:
+        sql.execute("SHOW GLOBAL STATUS LIKE 'Innodb_row_lock_%%'")
+        for row in sql.fetchall():
+            result[row['Variable_name']] = int(row['Value'])
+    except Exception as e:
+        print(f"Status InnoDB tidak bisa dibaca: {e}")
+    return result
+
+def db_duplicates(sql):
+    """Duplikat norcv (semua penerimaan) dan nofaktur per supplier bench di tb_riceve"""
+    sql.execute("""
+        SELECT norcv, COUNT(*) AS jumlah
+        FROM tb_riceve
+        WHERE norcv IS NOT NULL
+        GROUP BY norcv
+        HAVING COUNT(*) > 1
+    """)
+    norcv = [(row['norcv'], row['jumlah']) for row in sql.fetchall()]
+    sql.execute("""
+        SELECT r.idsuplier, r.nofaktur, COUNT(*) AS jumlah
+        FROM tb_riceve r
+        JOIN tb_suplier s ON s.id = r.idsuplier
+        WHERE s.alamat = %s
+        GROUP BY r.idsuplier, r.nofaktur
+        HAVING COUNT(*) > 1
+    """, (TAG,))
+    nofaktur = [(row['idsuplier'], row['nofaktur'], row['jumlah']) for row in sql.fetchall()]
+    return norcv, nofaktur
+
+def with_db(func):
+    with connection() as conn:
+        if conn is None:
+            print("Koneksi database gagal")
+            return None
+        try:
+            with conn.cursor() as sql:
+                return func(sql)
+        finally:
+            conn.rollback()
+
+def print_distribution(judul, values):
+    values = sorted(values)
+    if not values:
+        print(f"{judul:<16} -")
+        return
+    print(f"{judul:<16} n={len(values):<6} p50={percentile(values, 0.50):8.2f}  p95={percentile(values, 0.95):8.2f}  "
+          f"p99={percentile(values, 0.99):8.2f}  max={values[-1]:8.2f}")
+
+def print_histogram(values):
+    counts = Counter()
+    for ms in values:
+        counts[next((bucket for bucket in BUCKETS_MS if ms <= bucket), None)] += 1
+    total = len(values) or 1
+    for bucket in list(BUCKETS_MS) + [None]:
+        if counts[bucket]:
+            label = f"<= {bucket} ms" if bucket is not None else f"> {BUCKETS_MS[-1]} ms"
+            share = counts[bucket] / total
+            print(f"  {label:>12} {counts[bucket]:>7} {share * 100:6.1f}% {'#' * int(share * 50)}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test penerimaan dengan banyak user bersamaan")
+    parser.add_argument('--users', type=int, default=10, help="user bersamaan (maksimal jumlah user seed)")
+    parser.add_argument('--receipts', type=int, default=10, help="penerimaan per user")
+    parser.add_argument('--cart', type=lambda t: parse_range(t, int), default=(3, 8), help="item per penerimaan, misal 5 atau 3-10")
+    parser.add_argument('--think', type=lambda t: parse_range(t, float), default=(0.0, 0.0), help="jeda antar langkah (detik), misal 0.2-1.5")
+    parser.add_argument('--warmup', type=int, default=0, help="penerimaan pemanasan per user (tidak diukur)")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="jeda buatan per panggilan Bot API (detik)")
+    parser.add_argument('--supplier-mode', choices=('shared', 'own'), default='shared',
+                        help="shared: semua user memakai supplier bersama; own: supplier milik sendiri")
+    parser.add_argument('--seed', type=int, default=1, help="seed acak")
+    parser.add_argument('--force', action='store_true', help="izinkan DB_NAME yang bukan scratch")
+    args = parser.parse_args(argv)
+
+    if not require_scratch_db(args.force):
+        return 2
+    if args.users < 1 or args.receipts < 1:
+        parser.error("--users dan --receipts minimal 1")
+
+    args.supplier_ids = None
+    if args.supplier_mode == 'shared':
+        args.supplier_ids = with_db(shared_supplier_ids)
+        if args.supplier_ids is None:
+            return 2
+        if not args.supplier_ids:
+            print("Belum ada supplier bersama; jalankan python -m tools.bench_seed --shared-suppliers 2 "
+                  "atau pakai --supplier-mode own")
+            return 2
+
+    harness = Harness(api_latency=args.api_latency)
+    clients = [
+        BenchClient(harness, bench_user_id(i), rng=random.Random(args.seed * 100003 + i), think=args.think)
+        for i in range(args.users)
+    ]
+    if args.warmup:
+        run_clients(receipt, clients, args.warmup * len(clients), args)
+    harness.reset()
+    for client in clients:
+        client.latencies, client.steps, client.updates = [], {}, 0
+
+    before = with_db(db_counts) or {}
+    rss_before = peak_rss_mb()
+    supplier_text = f"{len(args.supplier_ids)} supplier bersama" if args.supplier_ids else "supplier sendiri"
+    print(f"{args.users} user x {args.receipts} penerimaan, keranjang {args.cart[0]}-{args.cart[1]} item, "
+          f"jeda {args.think[0]}-{args.think[1]} detik, {supplier_text}")
+
+    elapsed, results, errors = run_clients(receipt, clients, args.users * args.receipts, args)
+    after = with_db(db_counts) or {}
+
+    # ---------------------------------------------------------------- throughput dan latensi
+    updates = sum(client.updates for client in clients)
+    print(f"\n{len(results)} penerimaan sukses, {len(errors)} gagal dalam {elapsed:.2f} detik")
+    print(f"Throughput: {len(results) / elapsed:.2f} penerimaan/detik, {updates / elapsed:.1f} update/detik")
+    if updates:
+        print(f"Query per update: {harness.query_count() / updates:.2f}, "
+              f"Bot API per update: {harness.recorder.total_calls() / updates:.2f}")
+
+    print("\nLatensi per update (ms):")
+    latencies = [ms for client in clients for ms in client.latencies]
+    print_distribution("semua", latencies)
+    steps = {}
+    for client in clients:
+        for step, values in client.steps.items():
+            steps.setdefault(step, []).extend(values)
+    for step in ('menu', 'pilih_supplier', 'faktur', 'keterangan', 'paging_produk', 'pilih_produk', 'qty', 'simpan'):
+        if step in steps:
+            print_distribution(step, steps[step])
+    print_histogram(latencies)
+    print()
+    print_distribution("penerimaan (s)", [seconds for _, (_, _, _, seconds) in results])
+
+    # ---------------------------------------------------------------- database dan memori
+    if before and after:
+        print(f"\nBaris tb_riceve baru: {after['receipts'] - before['receipts']} (sukses menurut bot: {len(results)})")
+        if 'Innodb_row_lock_waits' in after and 'Innodb_row_lock_waits' in before:
+            print(f"Row lock wait InnoDB: {after['Innodb_row_lock_waits'] - before['Innodb_row_lock_waits']} kali, "
+                  f"{after['Innodb_row_lock_time'] - before['Innodb_row_lock_time']} ms total, "
+                  f"maks {after.get('Innodb_row_lock_time_max', 0)} ms")
+    print(f"State tersisa: penerimaan {len(user_states)}, paging {len(paging_states)}")
+    print(f"Peak RSS: {rss_before} MB sebelum, {peak_rss_mb()} MB sesudah")
+
+    # ---------------------------------------------------------------- kebenaran
+    ok = not errors
+    norcv_counts = Counter(norcv for _, (norcv, _, _, _) in results)
+    faktur_counts = Counter((supplier_id, nofaktur) for _, (_, nofaktur, supplier_id, _) in results)
+    dup_norcv = {k: v for k, v in norcv_counts.items() if v > 1 or k is None}
+    dup_faktur = {k: v for k, v in faktur_counts.items() if v > 1 or k[1] is None}
+    print(f"\nnorcv unik: {len(norcv_counts)} dari {len(results)}, duplikat/kosong: {dup_norcv or 'tidak ada'}")
+    print(f"nofaktur unik per supplier: {len(faktur_counts)} dari {len(results)}, duplikat/kosong: {dup_faktur or 'tidak ada'}")
+    ok = ok and not dup_norcv and not dup_faktur
+
+    duplicates = with_db(db_duplicates)
+    if duplicates is not None:
+        db_norcv, db_faktur = duplicates
+        print(f"tb_riceve: {len(db_norcv)} norcv ganda, {len(db_faktur)} nofaktur ganda per supplier bench")
+        for row in (db_norcv + db_faktur)[:10]:
+            print(f"  {row}")
+        ok = ok and not db_norcv and not db_faktur
+        if before and after and after['receipts'] - before['receipts'] != len(results):
+            ok = False
+
+    if errors:
+        print(f"\nContoh error ({len(errors)}):")
+        for error in errors[:5]:
+            print(f"  {error}")
+    print("\nOK" if ok else "\nGAGAL")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
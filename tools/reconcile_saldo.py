@@ -0,0 +1,45 @@
+"""
+Rekonsiliasi tabel saldo member (tb_saldo_member) dengan SUM penuh tb_deposit_detil.
+
+Jalankan dari folder bot (tempat config.txt):
+    python -m tools.reconcile_saldo            # proses baris baru lalu laporkan selisih
+    python -m tools.reconcile_saldo --fix      # sekaligus perbaiki saldo yang selisih
+    python -m tools.reconcile_saldo --nik 1234567890
+"""
+import argparse
+import sys
+from utils.helpers import format_rupiah
+from utils.saldo_store import apply_new_rows, reconcile
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rekonsiliasi saldo member")
+    parser.add_argument('--fix', action='store_true', help="perbaiki saldo yang selisih")
+    parser.add_argument('--nik', help="hanya cek satu NIK")
+    parser.add_argument('--skip-update', action='store_true', help="jangan proses baris baru dulu")
+    args = parser.parse_args(argv)
+
+    if not args.skip_update:
+        total_nik = 0
+        while True:
+            diperbarui = apply_new_rows()
+            if not diperbarui:
+                break
+            total_nik += diperbarui
+        print(f"Saldo diperbarui untuk {total_nik} NIK")
+
+    selisih = reconcile(fix=args.fix, nik=args.nik)
+    if selisih is None:
+        print("Rekonsiliasi gagal, cek koneksi database")
+        return 2
+
+    for row in selisih:
+        print(
+            f"{row['nik']}: tersimpan {format_rupiah(row['saldo'])}, "
+            f"seharusnya {format_rupiah(row['saldo_penuh'])} (last_id {row['last_id']})"
+        )
+    status = "diperbaiki" if args.fix else "ditemukan"
+    print(f"{len(selisih)} selisih {status}")
+    return 1 if selisih and not args.fix else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
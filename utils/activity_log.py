@@ -0,0 +1,156 @@
+import atexit
+import datetime
+import json
+import os
+import threading
+from collections import deque
+from config import config
+
+class ActivityLogger:
+    """
+    Log aktivitas user (JSON-lines) tanpa menulis ke disk di thread handler.
+
+    - record() hanya menambah dict ke ring buffer di memori; jika buffer penuh, record
+      tertua dibuang (dihitung di stats 'dropped') sehingga handler tidak pernah menunggu.
+    - Thread flusher menulis isi buffer sekaligus setiap flush_interval detik, atau lebih
+      cepat jika buffer sudah mencapai batch_size.
+    - File dirotasi jika melebihi max_bytes atau (rotate_daily) berganti hari:
+      log_bot.txt -> log_bot.txt.1 -> ... -> log_bot.txt.<backup_count>.
+    - stop() menulis sisa buffer; dipanggil saat bot berhenti dan lewat atexit.
+    """
+
+    def __init__(self, path, capacity=10000, batch_size=500, flush_interval=1.0,
+                 max_bytes=10 * 1024 * 1024, backup_count=5, rotate_daily=True):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_daily = rotate_daily
+
+        self._buffer = deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._lock = threading.Lock()          # satu penulis file (flusher atau flush() manual)
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self._day = None
+        self._stats = {'recorded': 0, 'written': 0, 'dropped': 0, 'batches': 0, 'rotations': 0, 'errors': 0}
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            config.get('LOG_FILE', 'log_bot.txt'),
+            capacity=config.get_int('ACTIVITY_LOG_BUFFER', 10000),
+            batch_size=config.get_int('ACTIVITY_LOG_BATCH', 500),
+            flush_interval=config.get_float('ACTIVITY_LOG_FLUSH_INTERVAL', 1.0),
+            max_bytes=config.get_int('ACTIVITY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backup_count=config.get_int('ACTIVITY_LOG_BACKUPS', 5),
+            rotate_daily=config.get_bool('ACTIVITY_LOG_ROTATE_DAILY', True)
+        )
+
+    def start(self):
+        with self._start_lock:
+            if self._running:
+                return self
+            self._running = True
+            self._thread = threading.Thread(target=self._flusher, name='activity-log', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout=5):
+        """Hentikan flusher dan tulis semua record yang masih di buffer"""
+        with self._start_lock:
+            thread, self._running = self._thread, False
+            self._thread = None
+        if thread is not None:
+            self._wake.set()
+            thread.join(timeout)
+        self.flush()
+
+    def record(self, event, **fields):
+        """Tambahkan satu record ke buffer (tidak menyentuh disk)"""
+        if not self._running:
+            self.start()
+        entry = {'ts': datetime.datetime.now().isoformat(timespec='seconds'), 'event': event}
+        entry.update(fields)
+        if len(self._buffer) == self._buffer.maxlen:
+            self._stats['dropped'] += 1
+        self._buffer.append(entry)
+        self._stats['recorded'] += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _flusher(self):
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _drain(self):
+        entries = []
+        try:
+            while True:
+                entries.append(self._buffer.popleft())
+        except IndexError:
+            pass
+        return entries
+
+    def flush(self):
+        """Tulis isi buffer ke file dalam satu batch. Return jumlah record yang ditulis."""
+        with self._lock:
+            entries = self._drain()
+            if not entries:
+                return 0
+            data = ''.join(json.dumps(entry, ensure_ascii=False, default=str) + '\n' for entry in entries)
+            try:
+                self._rotate_if_needed(len(data.encode('utf-8')))
+                with open(self.path, 'a', encoding='utf-8') as log_file:
+                    log_file.write(data)
+            except Exception as e:
+                self._stats['errors'] += 1
+                print(f"Error writing log: {e}")
+                return 0
+            self._stats['written'] += len(entries)
+            self._stats['batches'] += 1
+            return len(entries)
+
+    def _rotate_if_needed(self, incoming):
+        today = datetime.date.today()
+        if self._day is None:
+            # Hari file yang sudah ada (saat bot baru jalan) dari waktu modifikasinya
+            try:
+                self._day = datetime.date.fromtimestamp(os.path.getmtime(self.path))
+            except OSError:
+                self._day = today
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            self._day = today
+            return
+        if size == 0:
+            self._day = today
+            return
+        if (self.max_bytes and size + incoming > self.max_bytes) or (self.rotate_daily and self._day != today):
+            self._rotate()
+        self._day = today
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.path)
+        else:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._stats['rotations'] += 1
+
+    def stats(self):
+        result = dict(self._stats)
+        result['buffered'] = len(self._buffer)
+        return result
+
+# Global activity logger
+activity_log = ActivityLogger.from_config()
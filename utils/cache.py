@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Cache LRU yang thread-safe dengan batas jumlah entry dan masa berlaku (TTL).
+    TTL bisa diatur per entry, misalnya lebih pendek untuk hasil negatif.
+    """
+
+    def __init__(self, maxsize=1000, ttl=300):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+
+    def get(self, key, default=None):
+        """Ambil nilai; entry yang kedaluwarsa dianggap tidak ada"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._stats['misses'] += 1
+                return default
+            value, expires_at = item
+            if expires_at <= now:
+                del self._data[key]
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Simpan nilai; entry yang paling lama tidak dipakai dibuang jika penuh"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def delete(self, key):
+        """Hapus satu entry. Return True jika entry ada."""
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def delete_where(self, predicate):
+        """Hapus semua entry yang predicate(key, value)-nya True. Return jumlah yang dihapus."""
+        with self._lock:
+            keys = [k for k, (v, _) in self._data.items() if predicate(k, v)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self):
+        """Kosongkan cache. Return jumlah entry yang dihapus."""
+        with self._lock:
+            total = len(self._data)
+            self._data.clear()
+        return total
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Statistik cache untuk monitoring"""
+        with self._lock:
+            result = dict(self._stats)
+            result['size'] = len(self._data)
+        result['maxsize'] = self.maxsize
+        return result
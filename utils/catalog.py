@@ -0,0 +1,216 @@
+import itertools
+import threading
+import time
+from config import config
+from database import connection
+from utils.satuan import satuan_registry
+
+class ProdukRecord:
+    """Satu produk di katalog supplier (read-only, memakai __slots__ agar hemat memori)"""
+
+    __slots__ = (
+        'id_produk', 'nama_produk', 'deskripsi', 'stok', 'harga_beli',
+        'satuan_besar', 'isi_supplier', 'satuan_kecil', 'isi_produk', 'harga_jual',
+    )
+
+    def __init__(self, id_produk, nama_produk, deskripsi, stok, harga_beli,
+                 satuan_besar, isi_supplier, satuan_kecil, isi_produk, harga_jual):
+        setattr_ = object.__setattr__
+        setattr_(self, 'id_produk', id_produk)
+        setattr_(self, 'nama_produk', nama_produk)
+        setattr_(self, 'deskripsi', deskripsi)
+        setattr_(self, 'stok', stok)
+        setattr_(self, 'harga_beli', harga_beli)
+        setattr_(self, 'satuan_besar', satuan_besar)
+        setattr_(self, 'isi_supplier', isi_supplier)
+        setattr_(self, 'satuan_kecil', satuan_kecil)
+        setattr_(self, 'isi_produk', isi_produk)
+        setattr_(self, 'harga_jual', harga_jual)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ProdukRecord tidak bisa diubah, muat ulang katalog")
+
+    def __delattr__(self, name):
+        raise AttributeError("ProdukRecord tidak bisa diubah, muat ulang katalog")
+
+    def __repr__(self):
+        return f"ProdukRecord({self.id_produk!r}, {self.nama_produk!r})"
+
+class CatalogSnapshot:
+    """
+    Katalog produk aktif satu supplier pada satu waktu. Tidak pernah diubah setelah dibuat,
+    sehingga aman dibagi ke semua user yang sedang memilih produk dari supplier yang sama.
+    Perubahan data menghasilkan snapshot baru dengan version yang lebih besar.
+    """
+
+    __slots__ = ('supplier_id', 'version', 'loaded_at', 'records', '_by_id', '_position')
+
+    def __init__(self, supplier_id, version, records):
+        self.supplier_id = str(supplier_id)
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.records = tuple(records)
+        self._by_id = {str(r.id_produk): r for r in self.records}
+        self._position = {str(r.id_produk): i for i, r in enumerate(self.records)}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def page(self, start, end):
+        """Potongan records[start:end] untuk satu halaman"""
+        return self.records[start:end]
+
+    def get(self, id_produk):
+        """Produk berdasarkan id_produk, None jika tidak ada di katalog"""
+        return self._by_id.get(str(id_produk))
+
+    def position(self, id_produk):
+        """Index produk di katalog (urut nama, id), None jika tidak ada"""
+        return self._position.get(str(id_produk))
+
+    def age(self):
+        return time.monotonic() - self.loaded_at
+
+class CatalogRegistry:
+    """
+    Snapshot katalog per supplier yang dipakai bersama. Snapshot dibuang saat mapping
+    supplier berubah (invalidate) atau setelah `ttl` detik, untuk menangkap perubahan
+    harga yang dilakukan di luar bot.
+    """
+
+    def __init__(self, ttl=300, max_suppliers=200):
+        self.ttl = ttl
+        self.max_suppliers = max(1, max_suppliers)
+        self._snapshots = {}
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._versions = itertools.count(1)
+        self._stats = {'hits': 0, 'loads': 0, 'invalidations': 0}
+
+    def load(self, sql, supplier_id):
+        """Query katalog supplier dengan cursor yang sudah ada, simpan dan return snapshot baru"""
+        key = str(supplier_id)
+        with self._lock:
+            generation = (self._epoch, self._generations.get(key, 0))
+
+        sql.execute("""
+            SELECT
+                p.id_produk,
+                p.nama_produk,
+                p.deskripsi,
+                p.stok,
+                CASE
+                    WHEN si.harga IS NULL THEN 0
+                    WHEN si.harga = 0 THEN 0
+                    ELSE si.harga
+                END AS harga_beli,
+                CASE
+                    WHEN si.satuan IS NOT NULL AND si.satuan != '' THEN si.satuan
+                    ELSE p.satuanbesar
+                END AS satuan_besar_id,
+                CASE
+                    WHEN si.isi IS NOT NULL AND si.isi > 0 THEN si.isi
+                    ELSE COALESCE(p.isi, 1)
+                END AS isi_supplier,
+                p.satuankecil AS satuan_kecil_produk_id,
+                p.isi AS isi_produk,
+                p.harga AS harga_jual
+            FROM tbl_produk p
+            INNER JOIN tb_suplieritem si ON p.id_produk = si.iditem
+            WHERE si.idsuplier = %s
+                AND si.aktif = 'Y'
+                AND p.aktif = 'Y'
+            ORDER BY p.nama_produk, p.id_produk
+        """, (supplier_id,))
+        rows = sql.fetchall()
+
+        # Nama satuan diambil sekaligus dari kamus satuan di memori
+        nama_satuan_besar = satuan_registry.get_nama_many(r['satuan_besar_id'] for r in rows)
+        nama_satuan_kecil = satuan_registry.get_nama_many(r['satuan_kecil_produk_id'] for r in rows)
+
+        records = [
+            ProdukRecord(
+                r['id_produk'],
+                r['nama_produk'],
+                r['deskripsi'],
+                r['stok'],
+                r['harga_beli'],
+                satuan_besar,
+                r['isi_supplier'],
+                satuan_kecil,
+                r['isi_produk'],
+                r['harga_jual']
+            )
+            for r, satuan_besar, satuan_kecil in zip(rows, nama_satuan_besar, nama_satuan_kecil)
+        ]
+        snapshot = CatalogSnapshot(key, next(self._versions), records)
+
+        with self._lock:
+            self._stats['loads'] += 1
+            # Jangan pasang snapshot jika supplier di-invalidate selama query berjalan
+            if (self._epoch, self._generations.get(key, 0)) == generation:
+                self._snapshots.pop(key, None)
+                self._snapshots[key] = snapshot
+                while len(self._snapshots) > self.max_suppliers:
+                    self._snapshots.pop(next(iter(self._snapshots)))
+        return snapshot
+
+    def peek(self, supplier_id):
+        """Snapshot yang masih berlaku tanpa menyentuh database, None jika tidak ada"""
+        key = str(supplier_id)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                return None
+            if snapshot.age() >= self.ttl:
+                del self._snapshots[key]
+                return None
+            self._stats['hits'] += 1
+            return snapshot
+
+    def get(self, supplier_id):
+        """Snapshot katalog supplier, dimuat dari database jika belum ada/kedaluwarsa"""
+        snapshot = self.peek(supplier_id)
+        if snapshot is not None:
+            return snapshot
+
+        with connection() as conn:
+            if conn is None:
+                return CatalogSnapshot(supplier_id, 0, ())
+            try:
+                with conn.cursor() as sql:
+                    return self.load(sql, supplier_id)
+            except Exception as e:
+                print(f"Error load katalog supplier {supplier_id}: {e}")
+                return CatalogSnapshot(supplier_id, 0, ())
+
+    def invalidate(self, supplier_id=None):
+        """Buang snapshot satu supplier (atau semua jika supplier_id None). Return jumlah yang dibuang."""
+        with self._lock:
+            self._stats['invalidations'] += 1
+            if supplier_id is None:
+                self._epoch += 1
+                total = len(self._snapshots)
+                self._snapshots.clear()
+                return total
+            key = str(supplier_id)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            return 1 if self._snapshots.pop(key, None) is not None else 0
+
+    def stats(self):
+        """Statistik katalog untuk monitoring"""
+        with self._lock:
+            result = dict(self._stats)
+            result['suppliers'] = len(self._snapshots)
+            result['produk'] = sum(len(s) for s in self._snapshots.values())
+        return result
+
+# Global catalog registry
+catalog_registry = CatalogRegistry(
+    ttl=config.get_float('PRODUK_CACHE_TTL', 300),
+    max_suppliers=config.get_int('PRODUK_CACHE_SIZE', 200)
+)
@@ -0,0 +1,208 @@
+import threading
+import time
+from config import config
+from database import connection
+from utils import sequence
+from utils.cache import TTLCache
+from utils.helpers import format_rupiah
+from utils.ratelimit import TokenBucket
+from utils.saldo_store import refresh_saldo
+
+# Nama counter high-water mark di tb_sequence (id tb_deposit_detil terakhir yang sudah dinotifikasi)
+DEPOSIT_NOTIF_HWM = 'deposit_notif_hwm'
+
+# Maksimal baris mutasi yang ditampilkan per member dalam satu notifikasi
+MAX_BARIS_NOTIF = 10
+
+# Upload (setor) terakhir per NIK untuk /lastupload, diperbarui oleh watcher saat ada data baru
+last_upload_cache = TTLCache(
+    maxsize=config.get_int('LAST_UPLOAD_CACHE_SIZE', 5000),
+    ttl=config.get_float('LAST_UPLOAD_CACHE_TTL', 300)
+)
+
+_lock = threading.Lock()
+_watcher_thread = None
+
+LAST_UPLOAD_SQL = """
+    SELECT keterangan, setor
+    FROM tb_deposit_detil
+    WHERE jenis = 'setor' AND nik = %s
+    ORDER BY id DESC
+    LIMIT 1
+"""
+
+def _nik_key(nik):
+    """
+    Kunci NIK untuk mencocokkan tb_deposit_detil dengan tb_karyawan seperti IN (...) di MySQL:
+    collation _ci tidak membedakan huruf besar/kecil dan spasi di akhir, dan angka vs teks
+    """
+    return str(nik).rstrip().lower()
+
+def get_last_upload(sql, nik):
+    """Setor terakhir NIK ({keterangan, setor}) dari cache, atau query jika belum ada. None jika tidak ada."""
+    cached = last_upload_cache.get(_nik_key(nik), False)
+    if cached is not False:
+        return cached
+    sql.execute(LAST_UPLOAD_SQL, (nik,))
+    result = sql.fetchone()
+    last_upload_cache.set(_nik_key(nik), result)
+    return result
+
+async def get_last_upload_async(db, nik):
+    """Versi async get_last_upload lewat AsyncDatabase (cache yang sama)"""
+    cached = last_upload_cache.get(_nik_key(nik), False)
+    if cached is not False:
+        return cached
+    result = await db.fetchone(LAST_UPLOAD_SQL, (nik,))
+    last_upload_cache.set(_nik_key(nik), result)
+    return result
+
+def _member_telegram(sql, niks):
+    """
+    Peta _nik_key(NIK) -> {nik, id_tele, nama} member aktif yang sudah terdaftar di bot (satu
+    query), urut NIK menurut collation database (urutan yang sama dengan worker saldo)
+    """
+    if not niks:
+        return {}
+    placeholders = ', '.join(['%s'] * len(niks))
+    sql.execute(f"""
+        SELECT nik, nama, id_tele
+        FROM tb_karyawan
+        WHERE aktif = 'Y'
+            AND id_tele IS NOT NULL AND id_tele <> ''
+            AND nik IN ({placeholders})
+        ORDER BY nik
+    """, tuple(niks))
+    return {_nik_key(row['nik']): row for row in sql.fetchall()}
+
+def _format_notifikasi(member, mutasi, saldo):
+    pesan = "MUTASI SALDO KOPERASI\n\n"
+    pesan += f"Nama: {member['nama']}\n"
+    pesan += f"NIK: `{member['nik']}`\n\n"
+    for row in mutasi[-MAX_BARIS_NOTIF:]:
+        keterangan = row['keterangan'] or row['jenis'] or "-"
+        if row['setor']:
+            pesan += f"+ {format_rupiah(row['setor'])} {keterangan}\n"
+        if row['tarik']:
+            pesan += f"- {format_rupiah(row['tarik'])} {keterangan}\n"
+    if len(mutasi) > MAX_BARIS_NOTIF:
+        pesan += f"... dan {len(mutasi) - MAX_BARIS_NOTIF} mutasi lainnya\n"
+    pesan += f"\nSaldo: *{format_rupiah(saldo)}*"
+    return pesan
+
+def collect_notifications(batch_size=None):
+    """
+    Baca batch baris tb_deposit_detil baru sejak high-water mark dan susun notifikasi
+    per member terdaftar. High-water mark langsung dimajukan (notifikasi paling banyak sekali).
+    Return list (id_tele, pesan), atau None jika tidak ada data baru / database gagal.
+    """
+    batch_size = batch_size or config.get_int('DEPOSIT_WATCH_BATCH', 1000)
+    with connection() as conn:
+        if conn is None:
+            return None
+        try:
+            with conn.cursor() as sql:
+                hwm = sequence.get_value(sql, DEPOSIT_NOTIF_HWM, default=None)
+                if hwm is None:
+                    # Pertama kali dijalankan: mulai dari data terbaru, jangan kirim riwayat lama
+                    sql.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM tb_deposit_detil")
+                    sequence.set_value(sql, DEPOSIT_NOTIF_HWM, sql.fetchone()['max_id'])
+                    conn.commit()
+                    return None
+
+                sql.execute("""
+                    SELECT id, nik, jenis, setor, tarik, keterangan
+                    FROM tb_deposit_detil
+                    WHERE id > %s
+                    ORDER BY id
+                    LIMIT %s
+                """, (hwm, batch_size))
+                rows = sql.fetchall()
+                if not rows:
+                    conn.rollback()
+                    return None
+
+                mutasi_per_nik = {}
+                setor_terakhir = {}
+                for row in rows:
+                    if row['nik']:
+                        mutasi_per_nik.setdefault(_nik_key(row['nik']), []).append(row)
+                        if row['jenis'] == 'setor':
+                            setor_terakhir[_nik_key(row['nik'])] = {'keterangan': row['keterangan'], 'setor': row['setor']}
+
+                niks = list(dict.fromkeys(row['nik'] for row in rows if row['nik']))
+                members = _member_telegram(sql, niks)
+                notifikasi = []
+                # Kunci baris saldo diambil urut NIK seperti saldo_store.apply_new_rows agar tidak deadlock
+                for key, member in members.items():
+                    mutasi = mutasi_per_nik.get(key)
+                    if not mutasi:
+                        continue
+                    # Saldo terbaru dari tabel saldo member (sekalian diperbarui), dengan NIK
+                    # seperti tertulis di tb_deposit_detil (sama dengan worker saldo)
+                    saldo, _ = refresh_saldo(sql, mutasi[0]['nik'])
+                    notifikasi.append((member['id_tele'], _format_notifikasi(member, mutasi, saldo)))
+
+                sequence.set_value(sql, DEPOSIT_NOTIF_HWM, rows[-1]['id'])
+            conn.commit()
+            # Cache /lastupload baru diisi setelah commit (batch yang di-rollback akan dibaca ulang)
+            for nik, setor in setor_terakhir.items():
+                last_upload_cache.set(nik, setor)
+            return notifikasi
+        except Exception as e:
+            conn.rollback()
+            print(f"Error deposit watcher: {e}")
+            return None
+
+def send_notifications(bot, notifikasi, limiter):
+    """
+    Kirim notifikasi dengan pembatas laju. Return (terkirim, gagal).
+    Lewat outbox (utils.outbox.QueuedBot) terkirim berarti masuk antrian: 429 (retry_after),
+    kirim ulang dan error pengiriman ditangani serta dicatat oleh outbox.
+    """
+    terkirim = gagal = 0
+    for chat_id, pesan in notifikasi:
+        limiter.acquire()
+        try:
+            bot.send_message(chat_id, pesan, parse_mode='Markdown')
+            terkirim += 1
+        except Exception as e:
+            print(f"Gagal kirim notifikasi ke {chat_id}: {e}")
+            gagal += 1
+    return terkirim, gagal
+
+def _watcher(bot, interval, limiter):
+    while True:
+        try:
+            # Habiskan semua batch yang tertunda, lalu tunggu interval berikutnya
+            while True:
+                notifikasi = collect_notifications()
+                if notifikasi is None:
+                    break
+                if notifikasi:
+                    terkirim, gagal = send_notifications(bot, notifikasi, limiter)
+                    print(f"Notifikasi mutasi: {terkirim} terkirim, {gagal} gagal")
+        except Exception as e:
+            print(f"Error deposit watcher: {e}")
+        time.sleep(interval)
+
+def start_deposit_watcher(bot):
+    """
+    Jalankan thread yang memantau tb_deposit_detil setiap DEPOSIT_WATCH_INTERVAL detik
+    (0 = mati) dan mengirim notifikasi ke member maksimal NOTIF_RATE pesan per detik.
+    """
+    global _watcher_thread
+    interval = config.get_float('DEPOSIT_WATCH_INTERVAL', 30)
+    if interval <= 0:
+        return None
+    limiter = TokenBucket(config.get_float('NOTIF_RATE', 20))
+    with _lock:
+        if _watcher_thread is None:
+            _watcher_thread = threading.Thread(
+                target=_watcher,
+                args=(bot, interval, limiter),
+                name='deposit-watcher',
+                daemon=True
+            )
+            _watcher_thread.start()
+    return _watcher_thread
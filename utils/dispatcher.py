@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import deque
+
+def update_key(update):
+    """
+    Kunci serialisasi update: ID user pengirim, sehingga update dari user yang sama
+    selalu diproses berurutan. Update tanpa user diproses bebas (kunci unik).
+    """
+    for field in ('message', 'edited_message', 'callback_query', 'inline_query',
+                  'chosen_inline_result', 'shipping_query', 'pre_checkout_query'):
+        obj = getattr(update, field, None)
+        if obj is not None and getattr(obj, 'from_user', None) is not None:
+            return obj.from_user.id
+    for field in ('channel_post', 'edited_channel_post'):
+        obj = getattr(update, field, None)
+        if obj is not None:
+            return f"chat:{obj.chat.id}"
+    return f"update:{getattr(update, 'update_id', id(update))}"
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class UpdateDispatcher:
+    """
+    Memproses update Telegram di pool worker berukuran tetap.
+
+    Update dari user yang sama diproses satu per satu sesuai urutan datang (state machine
+    penerimaan tetap benar), sedangkan update dari user berbeda berjalan paralel.
+    Antrian dibatasi max_queue: jika penuh, submit() menunggu sehingga polling ikut melambat.
+    """
+
+    def __init__(self, process, workers=8, max_queue=1000, key_func=update_key, sample_size=1000):
+        self.process = process
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.key_func = key_func
+        self._pending = {}          # key -> deque[(update, waktu_masuk, done)]
+        self._ready = deque()       # key yang siap diproses (tidak sedang dikerjakan worker lain)
+        self._size = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+        self._busy = 0
+        self._wait_samples = deque(maxlen=sample_size)
+        self._run_samples = deque(maxlen=sample_size)
+        self._stats = {'submitted': 0, 'processed': 0, 'errors': 0, 'blocked': 0, 'rejected': 0, 'max_depth': 0}
+
+    @classmethod
+    def for_bot(cls, bot, workers=8, max_queue=1000):
+        """
+        Pasang dispatcher pada TeleBot (sebaiknya dibuat dengan threaded=False): update dari
+        polling masuk ke antrian dispatcher, lalu diproses handler bot di thread worker.
+        """
+        process_updates = bot.process_new_updates
+        dispatcher = cls(lambda update: process_updates([update]), workers, max_queue)
+        bot.process_new_updates = dispatcher.submit_many
+        return dispatcher
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'dispatcher-{i + 1}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=10):
+        """Selesaikan update yang sudah antri, lalu hentikan worker"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while (self._size or self._busy) and time.monotonic() < deadline:
+                self._cond.wait(max(0.0, deadline - time.monotonic()))
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def submit(self, update, timeout=None, done=None):
+        """
+        Masukkan update ke antrian. Jika antrian penuh, tunggu sampai ada tempat;
+        dengan timeout, return False jika tetap penuh (update tidak dimasukkan).
+        done: fungsi tanpa argumen yang dipanggil di thread worker setelah update selesai diproses.
+        """
+        key = self.key_func(update)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._size >= self.max_queue:
+                self._stats['blocked'] += 1
+                while self._size >= self.max_queue:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._stats['rejected'] += 1
+                        return False
+                    self._cond.wait(remaining)
+            queue = self._pending.get(key)
+            if queue is None:
+                # Key belum punya antrian dan tidak sedang diproses: langsung siap
+                queue = self._pending[key] = deque()
+                self._ready.append(key)
+            queue.append((update, time.monotonic(), done))
+            self._size += 1
+            self._stats['submitted'] += 1
+            self._stats['max_depth'] = max(self._stats['max_depth'], self._size)
+            self._cond.notify_all()
+        return True
+
+    def submit_many(self, updates):
+        for update in updates:
+            self.submit(update)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and not self._ready:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                key = self._ready.popleft()
+                update, enqueued_at, done = self._pending[key].popleft()
+                self._size -= 1
+                self._busy += 1
+                self._cond.notify_all()
+
+            started = time.monotonic()
+            failed = False
+            try:
+                self.process(update)
+            except Exception as e:
+                failed = True
+                print(f"Error memproses update: {e}")
+            finished = time.monotonic()
+
+            with self._cond:
+                self._busy -= 1
+                self._wait_samples.append(started - enqueued_at)
+                self._run_samples.append(finished - started)
+                self._stats['processed'] += 1
+                if failed:
+                    self._stats['errors'] += 1
+                # Update berikutnya dari user yang sama baru boleh jalan setelah yang ini selesai
+                if self._pending[key]:
+                    self._ready.append(key)
+                else:
+                    del self._pending[key]
+                self._cond.notify_all()
+
+            if done is not None:
+                try:
+                    done()
+                except Exception as e:
+                    print(f"Error callback update selesai: {e}")
+
+    @property
+    def running(self):
+        return self._running
+
+    def stats(self):
+        """Metrik antrian: kedalaman, worker sibuk, dan waktu tunggu/proses (ms)"""
+        with self._cond:
+            result = dict(self._stats)
+            result['depth'] = self._size
+            result['busy'] = self._busy
+            result['workers'] = self.workers
+            result['users_waiting'] = len(self._pending)
+            waits = sorted(self._wait_samples)
+            runs = sorted(self._run_samples)
+        result['wait_p50_ms'] = round(_percentile(waits, 0.50) * 1000, 1)
+        result['wait_p95_ms'] = round(_percentile(waits, 0.95) * 1000, 1)
+        result['wait_max_ms'] = round((waits[-1] if waits else 0) * 1000, 1)
+        result['run_p50_ms'] = round(_percentile(runs, 0.50) * 1000, 1)
+        result['run_p95_ms'] = round(_percentile(runs, 0.95) * 1000, 1)
+        return result
@@ -1,4 +1,7 @@
 import datetime
+import threading
+import time
+from config import config
 from database import connection
 
 def generate_kode_supplier(nama_supplier):
@@ -21,67 +24,189 @@ def generate_kode_supplier(nama_supplier):
     
     return kode
 
-def generate_nomor_faktur_otomatis(supplier_id):
+# Nomor faktur terakhir supplier di bulan berjalan. Filter range pada tgl (bukan
+# YEAR()/MONTH()) agar index (idsuplier, tgl) bisa dipakai
+FAKTUR_TERAKHIR_SQL = """
+    SELECT nofaktur 
+    FROM tb_riceve 
+    WHERE idsuplier = %s 
+        AND tgl >= %s 
+        AND tgl < %s 
+        AND nofaktur LIKE %s
+    ORDER BY id DESC 
+    LIMIT 1
+"""
+
+def _awal_bulan(sekarang):
+    """Tanggal awal bulan ini dan awal bulan berikutnya (untuk filter range tgl)"""
+    awal = sekarang.date().replace(day=1)
+    if awal.month == 12:
+        akhir = awal.replace(year=awal.year + 1, month=1)
+    else:
+        akhir = awal.replace(month=awal.month + 1)
+    return awal, akhir
+
+def _parse_sequence(nofaktur):
+    """Nomor urut dari nomor faktur KODE/TAHUN/BULAN/SEQUENCE, atau None"""
+    try:
+        return int(str(nofaktur).rsplit('/', 1)[-1])
+    except (TypeError, ValueError):
+        return None
+
+class FakturSequence:
     """
-    Generate nomor faktur otomatis berdasarkan format: KODE_SUPPLIER/TAHUN/BULAN/SEQUENCE
-    Contoh: WIR/2024/12/001
+    Nomor faktur otomatis per supplier per bulan dengan format KODE_SUPPLIER/TAHUN/BULAN/SEQUENCE.
+
+    Nomor terakhir diambil dari database sekali (lalu diperbarui setiap seed_ttl detik),
+    selanjutnya nomor dibagikan dari counter di memori:
+    - reserve(): ambil nomor berikutnya dan tandai sebagai "dipesan" agar user lain
+      yang membuka penerimaan untuk supplier yang sama tidak mendapat nomor yang sama
+    - commit(): nomor sudah tersimpan di tb_riceve
+    - release(): nomor tidak jadi dipakai (batal atau input manual)
+    - restore(): pesan ulang nomor dari state yang tersimpan (setelah restart)
+    Pesanan yang ditinggalkan kedaluwarsa setelah reservation_ttl detik.
     """
-    conn = connection()
-    if conn is None:
-        return None
-    
-    try:
-        with conn.cursor() as sql:
-            # Ambil nama supplier
+
+    def __init__(self, seed_ttl=300, reservation_ttl=3600):
+        self.seed_ttl = seed_ttl
+        self.reservation_ttl = reservation_ttl
+        self._lock = threading.Lock()
+        self._terakhir = {}
+        self._reserved = {}
+        self._kode = {}
+
+    @staticmethod
+    def _key(supplier_id, sekarang):
+        return str(supplier_id), sekarang.strftime('%Y/%m')
+
+    def _load(self, sql, supplier_id, sekarang):
+        """Ambil kode supplier dan nomor urut terakhir bulan ini dari database"""
+        kode_supplier = self._kode.get(str(supplier_id))
+        if kode_supplier is None:
             sql.execute("SELECT namasuplier FROM tb_suplier WHERE id = %s", (supplier_id,))
             supplier_data = sql.fetchone()
-            
             if not supplier_data:
-                return None
-                
-            nama_supplier = supplier_data['namasuplier']
-            kode_supplier = generate_kode_supplier(nama_supplier)
-            
-            # Dapatkan tahun dan bulan sekarang
-            sekarang = datetime.datetime.now()
-            tahun = sekarang.strftime('%Y')
-            bulan = sekarang.strftime('%m')
-            
-            # Cari sequence terakhir untuk supplier, tahun, dan bulan ini
-            sql.execute("""
-                SELECT nofaktur 
-                FROM tb_riceve 
-                WHERE idsuplier = %s 
-                    AND YEAR(tgl) = %s 
-                    AND MONTH(tgl) = %s 
-                    AND nofaktur LIKE %s
-                ORDER BY id DESC 
-                LIMIT 1
-            """, (supplier_id, tahun, bulan, f"{kode_supplier}/{tahun}/{bulan}/%"))
-            
-            last_faktur = sql.fetchone()
-            
-            if last_faktur:
-                # Extract sequence number dari nomor faktur terakhir
-                last_sequence = last_faktur['nofaktur'].split('/')[-1]
-                try:
-                    sequence = int(last_sequence) + 1
-                except ValueError:
-                    sequence = 1
+                return None, None
+            kode_supplier = generate_kode_supplier(supplier_data['namasuplier'])
+
+        tahun = sekarang.strftime('%Y')
+        bulan = sekarang.strftime('%m')
+        awal, akhir = _awal_bulan(sekarang)
+
+        sql.execute(FAKTUR_TERAKHIR_SQL, (supplier_id, awal, akhir, f"{kode_supplier}/{tahun}/{bulan}/%"))
+
+        last_faktur = sql.fetchone()
+        sequence = _parse_sequence(last_faktur['nofaktur']) if last_faktur else 0
+        return kode_supplier, sequence or 0
+
+    def _next_locked(self, key, now):
+        reserved = self._reserved.setdefault(key, {})
+        for seq in [s for s, expires_at in reserved.items() if expires_at <= now]:
+            del reserved[seq]
+        terakhir = self._terakhir[key][0]
+        sequence = max([terakhir] + list(reserved)) + 1
+        reserved[sequence] = now + self.reservation_ttl
+        return sequence
+
+    def reserve(self, supplier_id, conn=None, nama_supplier=None):
+        """
+        Pesan nomor faktur berikutnya untuk supplier, contoh WIR/2024/12/001.
+        conn: koneksi pemanggil (opsional) agar tidak perlu checkout koneksi baru.
+        Return None jika gagal.
+        """
+        sekarang = datetime.datetime.now()
+        key = self._key(supplier_id, sekarang)
+        now = time.monotonic()
+
+        if nama_supplier:
+            self._kode.setdefault(str(supplier_id), generate_kode_supplier(nama_supplier))
+
+        with self._lock:
+            cached = self._terakhir.get(key)
+            if cached is not None and now - cached[1] < self.seed_ttl:
+                sequence = self._next_locked(key, now)
+                return f"{self._kode[str(supplier_id)]}/{key[1]}/{sequence:03d}"
+
+        try:
+            if conn is not None:
+                with conn.cursor() as sql:
+                    kode_supplier, terakhir = self._load(sql, supplier_id, sekarang)
             else:
-                sequence = 1
-            
-            # Format sequence menjadi 3 digit
-            sequence_str = f"{sequence:03d}"
-            
-            # Buat nomor faktur
-            nomor_faktur = f"{kode_supplier}/{tahun}/{bulan}/{sequence_str}"
-            
-            return nomor_faktur
-            
-    except Exception as e:
-        print(f"Error generate_nomor_faktur_otomatis: {e}")
-        return None
-    finally:
-        if conn and conn.open:
-            conn.close()
\ No newline at end of file
+                with connection() as own_conn:
+                    if own_conn is None:
+                        return None
+                    with own_conn.cursor() as sql:
+                        kode_supplier, terakhir = self._load(sql, supplier_id, sekarang)
+        except Exception as e:
+            print(f"Error generate_nomor_faktur_otomatis: {e}")
+            return None
+
+        if kode_supplier is None:
+            return None
+
+        with self._lock:
+            self._kode[str(supplier_id)] = kode_supplier
+            cached = self._terakhir.get(key)
+            # Jangan mundur jika di memori sudah ada nomor yang lebih besar
+            if cached is not None:
+                terakhir = max(terakhir, cached[0])
+            self._terakhir[key] = (terakhir, now)
+            sequence = self._next_locked(key, now)
+        return f"{kode_supplier}/{key[1]}/{sequence:03d}"
+
+    def commit(self, supplier_id, nofaktur):
+        """Tandai nomor faktur sudah tersimpan"""
+        self._finish(supplier_id, nofaktur, simpan=True)
+
+    def release(self, supplier_id, nofaktur):
+        """Batalkan pesanan nomor faktur"""
+        self._finish(supplier_id, nofaktur, simpan=False)
+
+    def restore(self, supplier_id, nofaktur):
+        """
+        Tandai ulang nomor otomatis milik state penerimaan yang masih berjalan sebagai dipesan.
+        Pesanan hanya ada di memori, jadi setelah restart nomor dari state persisten
+        (STATE_BACKEND=sqlite) harus dipesan ulang agar tidak dibagikan ke user lain.
+        """
+        parts = str(nofaktur or '').split('/')
+        sequence = _parse_sequence(nofaktur)
+        if len(parts) != 4 or sequence is None:
+            return False
+        with self._lock:
+            self._kode.setdefault(str(supplier_id), parts[0])
+            if parts[0] != self._kode[str(supplier_id)]:
+                return False
+            key = (str(supplier_id), f"{parts[1]}/{parts[2]}")
+            self._reserved.setdefault(key, {})[sequence] = time.monotonic() + self.reservation_ttl
+        return True
+
+    def _finish(self, supplier_id, nofaktur, simpan):
+        kode_supplier = self._kode.get(str(supplier_id))
+        if not nofaktur or kode_supplier is None:
+            return
+        parts = str(nofaktur).split('/')
+        if len(parts) != 4 or parts[0] != kode_supplier:
+            # Bukan nomor otomatis (input manual)
+            return
+        key = (str(supplier_id), f"{parts[1]}/{parts[2]}")
+        sequence = _parse_sequence(nofaktur)
+        if sequence is None:
+            return
+        with self._lock:
+            self._reserved.get(key, {}).pop(sequence, None)
+            if simpan and key in self._terakhir:
+                terakhir, seeded_at = self._terakhir[key]
+                self._terakhir[key] = (max(terakhir, sequence), seeded_at)
+
+# Global instance
+faktur_sequence = FakturSequence(
+    seed_ttl=config.get_float('FAKTUR_SEED_TTL', 300),
+    reservation_ttl=config.get_float('FAKTUR_RESERVATION_TTL', 3600)
+)
+
+def generate_nomor_faktur_otomatis(supplier_id, conn=None, nama_supplier=None):
+    """
+    Generate nomor faktur otomatis berdasarkan format: KODE_SUPPLIER/TAHUN/BULAN/SEQUENCE
+    Contoh: WIR/2024/12/001
+    """
+    return faktur_sequence.reserve(supplier_id, conn=conn, nama_supplier=nama_supplier)
@@ -1,18 +1,13 @@
-import datetime
-from config import config
+from utils.activity_log import activity_log
 
 def log(message, perintah):
-    """Log user activity"""
+    """Log user activity (masuk buffer, ditulis ke LOG_FILE oleh thread activity_log)"""
     try:
-        tanggal = datetime.datetime.now().strftime('%d-%B-%Y')
-        nama_awal = message.chat.first_name or ''
-        nama_akhir = message.chat.last_name or ''
-        id_user = message.chat.id
-        
-        text_log = f'{tanggal}, {id_user}, {nama_awal} {nama_akhir}, {perintah}\n'
-        
-        with open(config.LOG_FILE, 'a', encoding='utf-8') as log_bot:
-            log_bot.write(text_log)
+        activity_log.record(
+            perintah,
+            chat_id=message.chat.id,
+            nama=f"{message.chat.first_name or ''} {message.chat.last_name or ''}".strip()
+        )
     except Exception as e:
         print(f"Error writing log: {e}")
 
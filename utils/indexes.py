@@ -0,0 +1,165 @@
+"""
+Index yang dibutuhkan query handler bot, beserta pengecekan dan pembuatannya (idempotent).
+Dipakai oleh tools/ensure_indexes.py.
+"""
+from database import IDENTITY_SQL
+from handlers.stok import SUPPLIER_USER_SQL, STOK_COUNT_SQL, STOK_SELECT_SQL
+from handlers.penerimaan import (
+    MAPPING_COUNT_SQL, MAPPING_SELECT_SQL, MAPPING_STATUS_FILTER, riwayat_page_query
+)
+from utils.deposit_watcher import LAST_UPLOAD_SQL
+from utils.faktur_generator import FAKTUR_TERAKHIR_SQL
+from utils.pagination import keyset_produk_query
+from utils.saldo_store import DELTA_SALDO_SQL
+from utils.sequence import norcv_seed_sql
+
+# (tabel, nama index, kolom, query yang dilayani)
+INDEXES = [
+    ('tb_karyawan', 'idx_karyawan_tele', ('id_tele', 'aktif', 'nik'),
+     "identitas user dari ID Telegram (setiap update)"),
+    ('tb_karyawan', 'idx_karyawan_nik', ('nik', 'aktif'),
+     "pendaftaran: cek NIK"),
+    ('tb_suplier', 'idx_suplier_karyawan', ('id_karyawan', 'aktif'),
+     "daftar supplier milik user (Supplier Saya, Stok, Penerimaan, Mapping)"),
+    ('tb_suplieritem', 'idx_suplieritem_supplier', ('idsuplier', 'aktif', 'iditem'),
+     "stok, katalog produk dan daftar mapping per supplier"),
+    ('tb_suplieritem', 'idx_suplieritem_item', ('iditem', 'idsuplier', 'aktif'),
+     "join dari tbl_produk ke mapping supplier saat produk dibaca urut nama"),
+    ('tbl_produk', 'idx_produk_nama', ('nama_produk', 'id_produk'),
+     "keyset stok/mapping ORDER BY nama_produk, id_produk (tanpa filesort, berhenti di LIMIT)"),
+    ('tb_riceve', 'idx_riceve_riwayat', ('idsuplier', 'aktif', 'tgl', 'id'),
+     "riwayat penerimaan (keyset tgl, id)"),
+    ('tb_riceve', 'idx_riceve_faktur', ('idsuplier', 'tgl', 'nofaktur'),
+     "nomor faktur otomatis terakhir per supplier per bulan"),
+    ('tb_riceve', 'idx_riceve_norcv', ('norcv',),
+     "seed nomor RCV harian (norcv LIKE 'prefix%')"),
+    ('tb_deposit_detil', 'idx_deposit_nik_jenis', ('nik', 'jenis', 'id'),
+     "setor terakhir (/lastupload, notifikasi deposit)"),
+    ('tb_deposit_detil', 'idx_deposit_nik', ('nik', 'id'),
+     "saldo member: baris baru per NIK (id > last_id)"),
+]
+
+# Query yang benar-benar dijalankan handler (konstanta/pembentuk query yang sama),
+# dengan parameter dummy; yang dilihat rencana eksekusinya
+_PREFIX_NORCV = "TLE000101"
+_TGL = '2000-01-01'
+
+EXPLAIN_QUERIES = [
+    ("identitas user", IDENTITY_SQL, ('0',)),
+    ("supplier milik user", SUPPLIER_USER_SQL, ('0',)),
+    ("jumlah stok supplier", STOK_COUNT_SQL, (0,)),
+    ("stok halaman pertama", *keyset_produk_query(STOK_SELECT_SQL, (0,), None, None, None, 10)),
+    ("stok halaman berikutnya", *keyset_produk_query(STOK_SELECT_SQL, (0,), 'n', '', 0, 10)),
+    ("jumlah mapping supplier", MAPPING_COUNT_SQL, (0,)),
+    ("mapping halaman berikutnya", *keyset_produk_query(MAPPING_SELECT_SQL, (0,), 'n', '', 0, 10)),
+    ("mapping per status", *keyset_produk_query(
+        MAPPING_SELECT_SQL + MAPPING_STATUS_FILTER, (0, 'Y'), None, None, None, 10
+    )),
+    ("riwayat penerimaan", *riwayat_page_query(0, 'n', _TGL, 0, 5)),
+    ("faktur terakhir", FAKTUR_TERAKHIR_SQL, (0, _TGL, '2000-02-01', 'X/2000/01/%')),
+    ("seed norcv", norcv_seed_sql(_PREFIX_NORCV), (f"norcv_{_PREFIX_NORCV}", f"{_PREFIX_NORCV}%")),
+    ("setor terakhir", LAST_UPLOAD_SQL, ('0',)),
+    ("delta saldo", DELTA_SALDO_SQL, ('0', 0)),
+]
+
+# Kolom bertipe ini hanya bisa di-index dengan prefix
+_PREFIX_TYPES = ('tinytext', 'text', 'mediumtext', 'longtext', 'tinyblob', 'blob', 'mediumblob', 'longblob')
+PREFIX_LENGTH = 64
+
+def existing_indexes(sql, table):
+    """{nama_index: [kolom, ...]} untuk tabel di database aktif"""
+    sql.execute("""
+        SELECT INDEX_NAME, COLUMN_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+    """, (table,))
+    result = {}
+    for row in sql.fetchall():
+        result.setdefault(row['INDEX_NAME'], []).append(row['COLUMN_NAME'].lower())
+    return result
+
+def table_columns(sql, table):
+    """{kolom: tipe data} untuk tabel di database aktif (kosong jika tabel tidak ada)"""
+    sql.execute("""
+        SELECT COLUMN_NAME, DATA_TYPE
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return {row['COLUMN_NAME'].lower(): row['DATA_TYPE'].lower() for row in sql.fetchall()}
+
+def check_index(sql, table, name, columns):
+    """
+    Status satu index yang dibutuhkan: (status, keterangan).
+    status: 'ok' (sudah ada index dengan kolom awal yang sama), 'missing', 'conflict'
+    (nama dipakai index lain) atau 'skip' (tabel/kolom tidak ada).
+    """
+    tipe = table_columns(sql, table)
+    if not tipe:
+        return 'skip', f"tabel {table} tidak ada"
+    hilang = [c for c in columns if c.lower() not in tipe]
+    if hilang:
+        return 'skip', f"kolom tidak ada: {', '.join(hilang)}"
+
+    wanted = [c.lower() for c in columns]
+    indexes = existing_indexes(sql, table)
+    for index_name, index_columns in indexes.items():
+        if index_columns[:len(wanted)] == wanted:
+            return 'ok', f"dipenuhi oleh {index_name} ({', '.join(index_columns)})"
+    if name in indexes:
+        return 'conflict', f"nama {name} sudah dipakai untuk ({', '.join(indexes[name])})"
+    return 'missing', "belum ada"
+
+def create_index_sql(sql, table, name, columns):
+    """ALTER TABLE untuk index; kolom TEXT/BLOB memakai prefix PREFIX_LENGTH"""
+    tipe = table_columns(sql, table)
+    parts = []
+    for column in columns:
+        if tipe.get(column.lower()) in _PREFIX_TYPES:
+            parts.append(f"`{column}`({PREFIX_LENGTH})")
+        else:
+            parts.append(f"`{column}`")
+    return f"ALTER TABLE `{table}` ADD INDEX `{name}` ({', '.join(parts)})"
+
+def ensure_indexes(sql, apply=False, report=print):
+    """
+    Cek (dan jika apply, buat) semua index di INDEXES. Aman dijalankan berulang:
+    index yang sudah terpenuhi dilewati. Return daftar (tabel, nama, status akhir).
+    """
+    results = []
+    for table, name, columns, keterangan in INDEXES:
+        status, detail = check_index(sql, table, name, columns)
+        label = f"{table}.{name} ({', '.join(columns)})"
+        if status == 'missing' and apply:
+            statement = create_index_sql(sql, table, name, columns)
+            try:
+                sql.execute(statement)
+                status, detail = 'created', statement
+            except Exception as e:
+                status, detail = 'error', str(e)
+        report(f"[{status}] {label}: {detail}  -- {keterangan}")
+        results.append((table, name, status))
+    return results
+
+def explain_plans(sql):
+    """Rencana eksekusi EXPLAIN_QUERIES: [(nama, [baris EXPLAIN] atau pesan error)]"""
+    plans = []
+    for name, query, params in EXPLAIN_QUERIES:
+        try:
+            sql.execute("EXPLAIN " + query, params)
+            plans.append((name, sql.fetchall()))
+        except Exception as e:
+            plans.append((name, str(e)))
+    return plans
+
+def format_plan(rows):
+    """Ringkas baris EXPLAIN: tabel, tipe akses, index dipakai, perkiraan baris, Extra"""
+    if isinstance(rows, str):
+        return [f"    error: {rows}"]
+    lines = []
+    for row in rows:
+        lines.append(
+            f"    {row.get('table')}: type={row.get('type')} key={row.get('key')} "
+            f"rows={row.get('rows')} {row.get('Extra') or ''}".rstrip()
+        )
+    return lines
@@ -0,0 +1,426 @@
+"""
+Instrumentasi latensi per update: berapa lama handler menunggu MySQL, Telegram dan
+sisanya (Python/render).
+
+- instrument(handler) membuka span per update dan mencatat histogram per handler.
+- database.InstrumentedCursor mencatat setiap cursor.execute lewat utils.query_stats, yang
+  menambahkan waktunya ke span (record_query) dan menyimpan statistik per statement.
+- InstrumentedBot memanggil record_api() untuk setiap pemanggilan Bot API (bot.send_message, dll).
+- snapshot() untuk endpoint /metrics, start_reporter() mencetak ringkasan berkala.
+"""
+import bisect
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import config
+
+# Batas atas bucket histogram (ms); bucket terakhir tanpa batas
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+METRICS_PATH = '/metrics'
+
+class Histogram:
+    """Histogram latensi dengan bucket tetap (tidak menyimpan setiap sampel)"""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, fraction):
+        """Perkiraan persentil: batas atas bucket tempat persentil jatuh (maksimal nilai max)"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                upper = BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max
+                return min(upper, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count, 2) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.50), 2),
+            'p95_ms': round(self.percentile(0.95), 2),
+            'p99_ms': round(self.percentile(0.99), 2),
+            'max_ms': round(self.max, 2),
+        }
+
+class Span:
+    """Waktu satu update, dipecah menjadi database, Telegram dan sisanya"""
+
+    __slots__ = ('name', 'started', 'db', 'telegram', 'queries', 'api_calls')
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.telegram = 0.0
+        self.queries = 0
+        self.api_calls = 0
+
+# Span aktif (per thread / per task asyncio)
+_current = contextvars.ContextVar('metrics_span', default=None)
+
+class _HandlerStats:
+    __slots__ = ('total', 'db', 'telegram', 'python', 'errors', 'queries', 'api_calls')
+
+    def __init__(self):
+        self.total = Histogram()
+        self.db = Histogram()
+        self.telegram = Histogram()
+        self.python = Histogram()
+        self.errors = 0
+        self.queries = 0
+        self.api_calls = 0
+
+class _BatchStats:
+    """Durasi dan jumlah baris batch tulis (misal insert detail penerimaan)"""
+    __slots__ = ('duration', 'rows', 'seconds')
+
+    def __init__(self):
+        self.duration = Histogram()
+        self.rows = 0
+        self.seconds = 0.0
+
+    def summary(self):
+        return dict(
+            self.duration.summary(),
+            rows=self.rows,
+            rows_per_batch=round(self.rows / self.duration.count, 1) if self.duration.count else 0.0,
+            rows_per_sec=round(self.rows / self.seconds, 1) if self.seconds else 0.0,
+        )
+
+class Metrics:
+    """Kumpulan histogram per handler, per method Bot API dan per batch tulis"""
+
+    def __init__(self, recent_size=50):
+        self._lock = threading.Lock()
+        self._handlers = {}
+        self._telegram = {}
+        self._batches = {}
+        self._sections = {}
+        self._window = {}           # handler -> _HandlerStats sejak ringkasan terakhir
+        self._window_started = time.monotonic()
+        self._recent = deque(maxlen=recent_size)
+        self._started = time.time()
+
+    # ------------------------------------------------------------------ span
+
+    def instrument(self, handler, name=None):
+        """Bungkus handler: satu span per pemanggilan, dicatat dengan nama handler"""
+        name = name or handler.__name__
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            if _current.get() is not None:
+                # Handler dipanggil dari handler lain, sudah tercatat di span luar
+                return handler(*args, **kwargs)
+            span = Span(name)
+            token = _current.set(span)
+            error = False
+            try:
+                return handler(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                _current.reset(token)
+                self.finish(span, error)
+        return wrapper
+
+    def instrument_async(self, handler, name=None):
+        """Versi instrument() untuk handler async"""
+        name = name or handler.__name__
+
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            span = Span(name)
+            token = _current.set(span)
+            error = False
+            try:
+                return await handler(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                _current.reset(token)
+                self.finish(span, error)
+        return wrapper
+
+    def finish(self, span, error=False):
+        total = (time.perf_counter() - span.started) * 1000
+        db, telegram = span.db * 1000, span.telegram * 1000
+        # Lookup async yang berjalan bersamaan bisa membuat db + telegram > total
+        python = max(0.0, total - db - telegram)
+        with self._lock:
+            stats = self._handlers.get(span.name)
+            if stats is None:
+                stats = self._handlers[span.name] = _HandlerStats()
+            stats.total.add(total)
+            stats.db.add(db)
+            stats.telegram.add(telegram)
+            stats.python.add(python)
+            stats.queries += span.queries
+            stats.api_calls += span.api_calls
+            if error:
+                stats.errors += 1
+            window = self._window.get(span.name)
+            if window is None:
+                window = self._window[span.name] = _HandlerStats()
+            window.total.add(total)
+            window.db.add(db)
+            window.telegram.add(telegram)
+            window.python.add(python)
+            self._recent.append({
+                'handler': span.name,
+                'at': round(time.time(), 3),
+                'total_ms': round(total, 2),
+                'db_ms': round(db, 2),
+                'telegram_ms': round(telegram, 2),
+                'python_ms': round(python, 2),
+                'queries': span.queries,
+                'api_calls': span.api_calls,
+                'error': error,
+            })
+
+    # ------------------------------------------------------------------ sumber waktu
+
+    def current_handler(self):
+        """Nama handler dari span yang sedang aktif, atau None"""
+        span = _current.get()
+        return span.name if span is not None else None
+
+    def record_query(self, seconds):
+        """Tambahkan waktu satu query ke span aktif (statistik per statement: utils.query_stats)"""
+        span = _current.get()
+        if span is not None:
+            span.db += seconds
+            span.queries += 1
+
+    def record_api(self, method, seconds):
+        span = _current.get()
+        if span is not None:
+            span.telegram += seconds
+            span.api_calls += 1
+        with self._lock:
+            histogram = self._telegram.get(method)
+            if histogram is None:
+                histogram = self._telegram[method] = Histogram()
+            histogram.add(seconds * 1000)
+
+    def record_batch(self, name, rows, seconds):
+        """Catat satu batch tulis `name`: durasi (histogram) dan jumlah baris, untuk baris/detik"""
+        with self._lock:
+            stats = self._batches.get(name)
+            if stats is None:
+                stats = self._batches[name] = _BatchStats()
+            stats.duration.add(seconds * 1000)
+            stats.rows += rows
+            stats.seconds += seconds
+
+    # ------------------------------------------------------------------ laporan
+
+    def add_section(self, name, provider):
+        """Tambahkan bagian snapshot() dari modul lain, misal 'sql' dari utils.query_stats"""
+        self._sections[name] = provider
+
+    def snapshot(self):
+        """Isi endpoint /metrics (JSON)"""
+        with self._lock:
+            handlers = {
+                name: dict(
+                    stats.total.summary(),
+                    errors=stats.errors,
+                    db_avg_ms=round(stats.db.total / stats.db.count, 2) if stats.db.count else 0.0,
+                    telegram_avg_ms=round(stats.telegram.total / stats.telegram.count, 2) if stats.telegram.count else 0.0,
+                    python_avg_ms=round(stats.python.total / stats.python.count, 2) if stats.python.count else 0.0,
+                    queries_per_update=round(stats.queries / stats.total.count, 2) if stats.total.count else 0.0,
+                    api_calls_per_update=round(stats.api_calls / stats.total.count, 2) if stats.total.count else 0.0,
+                )
+                for name, stats in self._handlers.items()
+            }
+            telegram = {method: histogram.summary() for method, histogram in self._telegram.items()}
+            batches = {name: stats.summary() for name, stats in self._batches.items()}
+            recent = list(self._recent)
+        result = {
+            'uptime': int(time.time() - self._started),
+            'buckets_ms': list(BUCKETS_MS),
+            'handlers': handlers,
+            'telegram': telegram,
+            'batches': batches,
+            'recent': recent,
+        }
+        for name, provider in list(self._sections.items()):
+            try:
+                result[name] = provider()
+            except Exception as e:
+                result[name] = {'error': str(e)}
+        return result
+
+    def summary_line(self, reset=True):
+        """Ringkasan satu baris sejak ringkasan sebelumnya"""
+        with self._lock:
+            window, started = self._window, self._window_started
+            if reset:
+                self._window, self._window_started = {}, time.monotonic()
+        elapsed = time.monotonic() - started
+        if not window:
+            return f"Metrik {elapsed:.0f}s: tidak ada update"
+
+        total = Histogram()
+        db = telegram = python = 0.0
+        for stats in window.values():
+            for index, count in enumerate(stats.total.counts):
+                total.counts[index] += count
+            total.count += stats.total.count
+            total.total += stats.total.total
+            total.max = max(total.max, stats.total.max)
+            db += stats.db.total
+            telegram += stats.telegram.total
+            python += stats.python.total
+        spent = (db + telegram + python) or 1.0
+        slowest_name, slowest = max(window.items(), key=lambda item: item[1].total.percentile(0.95))
+        return (
+            f"Metrik {elapsed:.0f}s: {total.count} update, "
+            f"p50/p95/maks {total.percentile(0.5):.0f}/{total.percentile(0.95):.0f}/{total.max:.0f} ms, "
+            f"db {db * 100 / spent:.0f}% telegram {telegram * 100 / spent:.0f}% python {python * 100 / spent:.0f}%, "
+            f"terlambat: {slowest_name} p95 {slowest.total.percentile(0.95):.0f} ms"
+        )
+
+    def start_reporter(self, interval):
+        """Cetak summary_line() setiap interval detik (0 = tidak). Return thread atau None."""
+        if interval <= 0:
+            return None
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    print(self.summary_line())
+                except Exception as e:
+                    print(f"Error metrik: {e}")
+
+        thread = threading.Thread(target=loop, name='metrics-reporter', daemon=True)
+        thread.start()
+        return thread
+
+# Global metrics instance
+metrics = Metrics()
+
+# Method TeleBot yang memanggil Bot API (selain itu: decorator handler, polling, dll)
+def _api_methods():
+    from telebot import apihelper
+    names = {name for name in dir(apihelper) if not name.startswith('_') and callable(getattr(apihelper, name))}
+    return names | {'reply_to'}
+
+class InstrumentedBot:
+    """
+    Pembungkus bot (TeleBot, QueuedBot atau AsyncTeleBot): setiap pemanggilan Bot API
+    dicatat waktunya ke span update yang aktif
+    """
+
+    def __init__(self, bot, registry=None):
+        self._bot = bot
+        self._metrics = registry or metrics
+        self._api = _api_methods()
+
+    def __getattr__(self, name):
+        attr = getattr(self._bot, name)
+        if name not in self._api or not callable(attr):
+            return attr
+        record_api = self._metrics.record_api
+
+        if inspect.iscoroutinefunction(attr):
+            async def timed_async(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await attr(*args, **kwargs)
+                finally:
+                    record_api(name, time.perf_counter() - started)
+            return timed_async
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                record_api(name, time.perf_counter() - started)
+        return timed
+
+class MetricsServer:
+    """Endpoint HTTP lokal GET /metrics (JSON) untuk mode polling; mode webhook memakai WebhookServer"""
+
+    def __init__(self, host='127.0.0.1', port=9100, extra=None, registry=None):
+        self.host = host
+        self.port = port
+        self.extra = extra
+        self.registry = registry or metrics
+        self._server = None
+
+    @classmethod
+    def from_config(cls, extra=None):
+        """Server dari METRICS_HOST/METRICS_PORT, atau None jika METRICS_PORT 0 (default)"""
+        port = config.get_int('METRICS_PORT', 0)
+        if port <= 0:
+            return None
+        return cls(config.get('METRICS_HOST', '127.0.0.1'), port, extra=extra)
+
+    def payload(self):
+        result = self.registry.snapshot()
+        if self.extra is not None:
+            try:
+                result.update(self.extra())
+            except Exception as e:
+                result['error'] = str(e)
+        return result
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != METRICS_PATH:
+                    status, payload = 404, {'ok': False}
+                else:
+                    status, payload = 200, server.payload()
+                body = json.dumps(payload, default=str).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,49 @@
+from telebot import types
+from utils.helpers import get_chat_info_from_source
+
+def is_callback(source):
+    """True jika source adalah CallbackQuery (tombol inline), bukan Message"""
+    return hasattr(source, 'message')
+
+def _not_modified(error):
+    return 'message is not modified' in str(error)
+
+def show_screen(bot, source, screen, reply=False, parse_mode='Markdown'):
+    """
+    Tampilkan layar (teks, keyboard) hasil fungsi render.
+
+    - Dari tombol inline (CallbackQuery): pesan yang sama diedit di tempat, satu panggilan API
+      tanpa hapus + kirim ulang. Keyboard balasan (ReplyKeyboardMarkup) tidak bisa dipasang
+      lewat edit, jadi layar seperti itu dikirim sebagai pesan baru.
+    - Dari pesan teks (Message): kirim pesan baru, sebagai balasan jika reply=True.
+    """
+    text, keyboard = screen
+    chat_id, message_id = get_chat_info_from_source(source)
+
+    if is_callback(source):
+        if keyboard is None or isinstance(keyboard, types.InlineKeyboardMarkup):
+            try:
+                bot.edit_message_text(
+                    chat_id=chat_id,
+                    message_id=message_id,
+                    text=text,
+                    parse_mode=parse_mode,
+                    reply_markup=keyboard
+                )
+                return
+            except Exception as e:
+                # Isi sama (misal refresh tanpa perubahan data), tidak perlu kirim ulang
+                if _not_modified(e):
+                    return
+        bot.send_message(chat_id, text, parse_mode=parse_mode, reply_markup=keyboard)
+    elif reply:
+        bot.reply_to(source, text, parse_mode=parse_mode, reply_markup=keyboard)
+    else:
+        bot.send_message(chat_id, text, parse_mode=parse_mode, reply_markup=keyboard)
+
+def show_error(bot, source, text, parse_mode='Markdown'):
+    """Pesan error singkat: notifikasi callback untuk tombol inline, balasan untuk pesan teks"""
+    if is_callback(source):
+        bot.answer_callback_query(source.id, text)
+    else:
+        bot.reply_to(source, text, parse_mode=parse_mode)
@@ -0,0 +1,311 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from config import config
+from utils.ratelimit import TokenBucket
+
+class OutboxFull(Exception):
+    """Pesan tidak masuk antrian kirim (antrian chat/global penuh atau pesan kedaluwarsa)"""
+
+def retry_after(error):
+    """Detik retry_after dari error 429 Telegram, atau None jika bukan 429"""
+    if getattr(error, 'error_code', None) != 429:
+        return None
+    result = getattr(error, 'result_json', None) or {}
+    return result.get('parameters', {}).get('retry_after') or 1
+
+def _not_modified(error):
+    return 'message is not modified' in str(error)
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+class _Job:
+    __slots__ = ('method', 'args', 'kwargs', 'futures', 'key', 'fallback', 'created', 'retries')
+
+    def __init__(self, method, args, kwargs, key=None, fallback=None):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.futures = [Future()]
+        self.key = key
+        self.fallback = fallback
+        self.created = time.monotonic()
+        self.retries = 0
+
+class OutboundQueue:
+    """
+    Antrian pesan keluar ke Telegram dengan batas laju global dan per chat (token bucket).
+
+    - Pesan ke chat yang sama dikirim berurutan, satu per satu.
+    - Balasan 429 tidak dibuang: chat ditahan selama retry_after lalu pesan dikirim ulang.
+    - Edit ke pesan yang sama yang masih antri digabung, hanya isi terakhir yang dikirim.
+    - Pesan yang menunggu lebih dari max_age detik, atau melebihi batas antrian, di-drop.
+    """
+
+    def __init__(self, bot, global_rate=30, chat_rate=1, chat_burst=3, group_rate=0.33,
+                 workers=4, max_pending=10000, chat_max_pending=20, max_age=60, max_retries=3,
+                 sample_size=1000):
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.chat_max_pending = chat_max_pending
+        self.max_age = max_age
+        self.max_retries = max_retries
+
+        self._cond = threading.Condition()
+        self._chats = {}            # chat_id -> deque[_Job]
+        self._buckets = {}          # chat_id -> TokenBucket
+        self._ready = []            # heap (waktu_siap, urutan, chat_id); chat yang sedang dikirim tidak ada di sini
+        self._seq = itertools.count()
+        self._size = 0
+        self._threads = []
+        self._running = False
+        self._latency = deque(maxlen=sample_size)
+        self._stats = {'submitted': 0, 'sent': 0, 'failed': 0, 'retried': 0, 'coalesced': 0, 'dropped': 0}
+
+    @classmethod
+    def from_config(cls, bot):
+        return cls(
+            bot,
+            global_rate=config.get_float('OUTBOX_GLOBAL_RATE', 30),
+            chat_rate=config.get_float('OUTBOX_CHAT_RATE', 1),
+            chat_burst=config.get_float('OUTBOX_CHAT_BURST', 3),
+            group_rate=config.get_float('OUTBOX_GROUP_RATE', 0.33),
+            workers=config.get_int('OUTBOX_WORKERS', 4),
+            max_pending=config.get_int('OUTBOX_MAX_PENDING', 10000),
+            chat_max_pending=config.get_int('OUTBOX_CHAT_MAX_PENDING', 20),
+            max_age=config.get_float('OUTBOX_MAX_AGE', 60),
+            max_retries=config.get_int('OUTBOX_MAX_RETRIES', 3)
+        )
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'outbox-{i + 1}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=10):
+        """Kirim pesan yang masih antri (sampai timeout), lalu hentikan worker"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._size and time.monotonic() < deadline:
+                self._cond.wait(max(0.0, min(0.5, deadline - time.monotonic())))
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def _bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            # Chat grup/channel (id negatif) dibatasi lebih ketat dari chat pribadi
+            if isinstance(chat_id, int) and chat_id < 0:
+                bucket = TokenBucket(self.group_rate, burst=1)
+            else:
+                bucket = TokenBucket(self.chat_rate, burst=self.chat_burst)
+            self._buckets[chat_id] = bucket
+        return bucket
+
+    def submit(self, chat_id, method, args=(), kwargs=None, key=None, fallback=None):
+        """
+        Antrikan pemanggilan bot.<method>(*args, **kwargs) untuk chat_id. Return Future.
+        key: pemanggilan dengan key sama yang masih antri digabung (isi terakhir menang).
+        fallback: (method, args, kwargs) yang diantrikan jika pemanggilan gagal.
+        """
+        job = _Job(method, tuple(args), dict(kwargs or {}), key, fallback)
+        with self._cond:
+            self._stats['submitted'] += 1
+            queue = self._chats.get(chat_id)
+            if key is not None and queue:
+                for pending in queue:
+                    if pending.key == key:
+                        pending.args, pending.kwargs, pending.fallback = job.args, job.kwargs, job.fallback
+                        pending.futures.extend(job.futures)
+                        self._stats['coalesced'] += 1
+                        return job.futures[0]
+            if self._size >= self.max_pending or (queue is not None and len(queue) >= self.chat_max_pending):
+                self._stats['dropped'] += 1
+                job.futures[0].set_exception(OutboxFull(f"Antrian kirim penuh untuk chat {chat_id}"))
+                return job.futures[0]
+            if queue is None:
+                queue = self._chats[chat_id] = deque()
+                heapq.heappush(self._ready, (time.monotonic(), next(self._seq), chat_id))
+            queue.append(job)
+            self._size += 1
+            self._cond.notify()
+        return job.futures[0]
+
+    def _next_chat(self):
+        """Ambil chat berikutnya yang boleh dikirimi (di bawah lock). Return (chat_id, job) atau None."""
+        while self._running:
+            now = time.monotonic()
+            if not self._ready:
+                self._cond.wait()
+                continue
+            ready_at, _, chat_id = self._ready[0]
+            if ready_at > now:
+                self._cond.wait(ready_at - now)
+                continue
+            heapq.heappop(self._ready)
+            wait = self._bucket(chat_id).try_acquire()
+            if wait:
+                heapq.heappush(self._ready, (now + wait, next(self._seq), chat_id))
+                continue
+            job = self._chats[chat_id].popleft()
+            self._size -= 1
+            return chat_id, job
+        return None
+
+    def _finish(self, chat_id, job, requeue=None):
+        """Kembalikan chat ke jadwal setelah pengiriman selesai (di bawah lock)"""
+        queue = self._chats[chat_id]
+        if requeue is not None:
+            queue.appendleft(requeue)
+            self._size += 1
+        if queue:
+            heapq.heappush(self._ready, (time.monotonic(), next(self._seq), chat_id))
+        else:
+            del self._chats[chat_id]
+        self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                item = self._next_chat()
+                if item is None:
+                    return
+            chat_id, job = item
+
+            if time.monotonic() - job.created > self.max_age:
+                # Terlalu lama antri (misal retry_after panjang), pesan sudah tidak relevan
+                with self._cond:
+                    self._stats['dropped'] += 1
+                    self._finish(chat_id, job)
+                for future in job.futures:
+                    future.set_exception(OutboxFull(f"Pesan ke chat {chat_id} kedaluwarsa di antrian"))
+                continue
+
+            self.global_bucket.acquire()
+            result = error = None
+            try:
+                result = getattr(self.bot, job.method)(*job.args, **job.kwargs)
+            except Exception as e:
+                error = e
+
+            requeue = None
+            wait = retry_after(error) if error is not None else None
+            if wait and job.retries < self.max_retries:
+                job.retries += 1
+                self._bucket(chat_id).penalize(wait)
+                requeue = job
+            elif error is not None and job.fallback is not None and not _not_modified(error):
+                method, args, kwargs = job.fallback
+                requeue = _Job(method, args, kwargs)
+                requeue.futures = job.futures
+                requeue.created = job.created
+
+            with self._cond:
+                if requeue is not None:
+                    self._stats['retried' if requeue is job else 'failed'] += 1
+                elif error is not None:
+                    self._stats['failed'] += 1
+                else:
+                    self._stats['sent'] += 1
+                    self._latency.append(time.monotonic() - job.created)
+                self._finish(chat_id, job, requeue)
+
+            if requeue is None:
+                for future in job.futures:
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(result)
+
+    def stats(self):
+        """Metrik antrian kirim: jumlah terkirim/gagal/di-drop/digabung dan latensi (ms)"""
+        with self._cond:
+            result = dict(self._stats)
+            result['depth'] = self._size
+            result['chats'] = len(self._chats)
+            latency = sorted(self._latency)
+        result['latency_p50_ms'] = round(_percentile(latency, 0.50) * 1000, 1)
+        result['latency_p95_ms'] = round(_percentile(latency, 0.95) * 1000, 1)
+        result['latency_max_ms'] = round((latency[-1] if latency else 0) * 1000, 1)
+        return result
+
+def _log_failure(description):
+    """Callback Future: cetak error pengiriman yang tidak ditunggu pemanggil"""
+    def callback(future):
+        error = future.exception()
+        if error is not None:
+            print(f"Gagal kirim {description}: {error}")
+    return callback
+
+class QueuedBot:
+    """
+    Pengganti TeleBot untuk handler: pengiriman pesan lewat OutboundQueue, atribut lain
+    (handler decorator, polling, answer_callback_query, dll) diteruskan ke TeleBot asli.
+
+    Semua pengiriman tidak menunggu: handler selesai (worker dispatcher dan session database
+    dilepas) begitu pesan masuk antrian, meski chat sedang ditahan retry_after.
+    send_message/reply_to mengembalikan Future berisi Message untuk pemanggil yang butuh
+    message_id (future.result(timeout)); error yang tidak diambil pemanggil dicetak ke log.
+    edit yang gagal dikirim ulang sebagai pesan baru, seperti pola fallback di handler.
+    """
+
+    def __init__(self, bot, outbox):
+        self._bot = bot
+        self._outbox = outbox
+
+    def __getattr__(self, name):
+        return getattr(self._bot, name)
+
+    @property
+    def outbox(self):
+        return self._outbox
+
+    def send_message(self, chat_id, text, *args, **kwargs):
+        future = self._outbox.submit(chat_id, 'send_message', (chat_id, text) + args, kwargs)
+        future.add_done_callback(_log_failure(f"pesan ke chat {chat_id}"))
+        return future
+
+    def reply_to(self, message, text, *args, **kwargs):
+        chat_id = message.chat.id
+        future = self._outbox.submit(chat_id, 'reply_to', (message, text) + args, kwargs)
+        future.add_done_callback(_log_failure(f"balasan ke chat {chat_id}"))
+        return future
+
+    def edit_message_text(self, text=None, chat_id=None, message_id=None, **kwargs):
+        kwargs.update(text=text, chat_id=chat_id, message_id=message_id)
+        fallback = None
+        if chat_id is not None and message_id is not None:
+            fallback = ('send_message', (chat_id, text), {
+                k: v for k, v in kwargs.items() if k in ('parse_mode', 'reply_markup')
+            })
+        self._outbox.submit(chat_id, 'edit_message_text', (), kwargs, key=('edit_text', message_id), fallback=fallback)
+        return None
+
+    def edit_message_reply_markup(self, chat_id=None, message_id=None, **kwargs):
+        kwargs.update(chat_id=chat_id, message_id=message_id)
+        self._outbox.submit(chat_id, 'edit_message_reply_markup', (), kwargs, key=('edit_markup', message_id))
+        return None
+
+    def delete_message(self, chat_id, message_id, *args, **kwargs):
+        self._outbox.submit(chat_id, 'delete_message', (chat_id, message_id) + args, kwargs)
+        return True
@@ -0,0 +1,268 @@
+import calendar
+import datetime
+from telebot import types
+from config import config
+from utils.cache import TTLCache
+
+# Batas panjang callback_data dari Telegram (dalam byte)
+CALLBACK_DATA_MAX = 64
+
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+# Cache jumlah total baris untuk info "Halaman x/y", cukup perkiraan sehingga boleh sedikit basi
+count_cache = TTLCache(
+    maxsize=config.get_int('PAGING_COUNT_CACHE_SIZE', 2000),
+    ttl=config.get_float('PAGING_COUNT_TTL', 60)
+)
+
+def to_base36(number):
+    """Integer ke string base36 (lebih pendek dari desimal untuk callback_data)"""
+    number = int(number)
+    if number < 0:
+        return '-' + to_base36(-number)
+    result = ''
+    while True:
+        number, rest = divmod(number, 36)
+        result = _DIGITS[rest] + result
+        if number == 0:
+            return result
+
+def from_base36(text):
+    """Kebalikan dari to_base36, ValueError jika tidak valid"""
+    # int() juga menerima '_' dan spasi, yang tidak pernah dihasilkan to_base36
+    if not text.lstrip('-').isalnum():
+        raise ValueError(f"base36 tidak valid: {text!r}")
+    return int(text, 36)
+
+def encode_datetime(value):
+    """Tanggal/datetime ke base36 detik sejak epoch (tanpa zona waktu)"""
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return to_base36(calendar.timegm(value.timetuple()))
+
+def decode_datetime(text):
+    """Kebalikan dari encode_datetime"""
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=from_base36(text))
+
+def pack_callback(*parts):
+    """Gabungkan bagian callback_data dengan '_' dan pastikan muat dalam batas Telegram"""
+    data = '_'.join(str(part) for part in parts)
+    if len(data.encode('utf-8')) > CALLBACK_DATA_MAX:
+        raise ValueError(f"callback_data terlalu panjang: {data}")
+    return data
+
+def cached_count(sql, key, query, params=()):
+    """Jumlah baris dari query COUNT(*) AS total, disimpan di count_cache dengan key tertentu"""
+    total = count_cache.get(key)
+    if total is None:
+        sql.execute(query, params)
+        total = sql.fetchone()['total']
+        count_cache.set(key, total)
+    return total
+
+def invalidate_count(name, *args):
+    """Buang jumlah tersimpan untuk key yang diawali (name, *args), misal setelah insert"""
+    prefix = (name,) + tuple(str(a) for a in args)
+    return count_cache.delete_where(lambda key, value: key[:len(prefix)] == prefix)
+
+def total_pages(total, per_page):
+    return max(1, (total + per_page - 1) // per_page)
+
+def items_per_page():
+    """Jumlah baris per halaman dari ITEMS_PER_PAGE di config.txt"""
+    return max(1, config.get_int('ITEMS_PER_PAGE', 10))
+
+class Page:
+    """Satu halaman hasil paging beserta informasi untuk tombol navigasi"""
+
+    __slots__ = ('rows', 'number', 'total', 'per_page', 'has_prev', 'has_next', 'first_key', 'last_key')
+
+    def __init__(self, rows, number, total, per_page, has_prev, has_next, first_key=None, last_key=None):
+        self.rows = rows
+        self.number = number
+        self.total = total
+        self.per_page = per_page
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.first_key = first_key
+        self.last_key = last_key
+
+    @property
+    def offset(self):
+        """Jumlah baris sebelum halaman ini (untuk nomor urut)"""
+        return (self.number - 1) * self.per_page
+
+    @property
+    def total_pages(self):
+        # Total dari cache bisa sedikit basi, jangan sampai lebih kecil dari halaman saat ini
+        return max(total_pages(self.total, self.per_page), self.number)
+
+# ---------------------------------------------------------------------------
+# Callback paging standar: {base}_{mode}{halaman}_{key}
+#   mode 'n' = setelah key, 'p' = sebelum key, 'r' = mulai dari key (refresh)
+#   {base}_page_{n} (format lama) selalu membuka halaman pertama
+# ---------------------------------------------------------------------------
+
+def first_page_callback(base):
+    return f"{base}_page_1"
+
+def page_callback(base, mode, number, key):
+    if key is None:
+        return first_page_callback(base)
+    return pack_callback(base, f"{mode}{to_base36(number)}", key)
+
+def refresh_callback(base, page):
+    """callback_data untuk menampilkan ulang halaman yang sama"""
+    return page_callback(base, 'r', page.number, page.first_key)
+
+def parse_page_callback(data):
+    """Return (base, mode, halaman, key); mode None berarti halaman pertama"""
+    base, sep, number = data.rpartition('_page_')
+    if sep and number.isdigit():
+        return base, None, 1, None
+    parts = data.rsplit('_', 2)
+    if len(parts) == 3 and parts[1][:1] in ('n', 'p', 'r') and parts[2]:
+        try:
+            return parts[0], parts[1][0], max(1, from_base36(parts[1][1:])), parts[2]
+        except ValueError:
+            pass
+    return data, None, 1, None
+
+def nav_buttons(page, first_data, prev_data, next_data):
+    """Tombol navigasi standar: ⏮ ⬅️ x/y ➡️ (kosong jika hanya ada satu halaman)"""
+    if not (page.has_prev or page.has_next):
+        return []
+    buttons = []
+    if page.has_prev:
+        if page.number > 2:
+            buttons.append(types.InlineKeyboardButton("⏮", callback_data=first_data))
+        buttons.append(types.InlineKeyboardButton("⬅️", callback_data=prev_data))
+    buttons.append(types.InlineKeyboardButton(f"{page.number}/{page.total_pages}", callback_data="no_action"))
+    if page.has_next:
+        buttons.append(types.InlineKeyboardButton("➡️", callback_data=next_data))
+    return buttons
+
+def add_nav_buttons(keyboard, base, page):
+    """Tambahkan satu baris tombol navigasi standar ke keyboard"""
+    buttons = nav_buttons(
+        page,
+        first_page_callback(base),
+        page_callback(base, 'p', page.number - 1, page.first_key),
+        page_callback(base, 'n', page.number + 1, page.last_key)
+    )
+    if buttons:
+        keyboard.row(*buttons)
+    return keyboard
+
+# ---------------------------------------------------------------------------
+# Sumber data
+# ---------------------------------------------------------------------------
+
+def keyset_produk_query(select_sql, params, mode, nama, key, per_page):
+    """
+    Query (sql, params) satu halaman keyset urut (p.nama_produk, p.id_produk).
+    nama: nama produk baris batas (key); mode None berarti halaman pertama.
+    Dipisah agar bisa dijalankan lewat cursor sinkron maupun async.
+    """
+    if mode is None:
+        return select_sql + """
+            ORDER BY p.nama_produk, p.id_produk
+            LIMIT %s
+        """, tuple(params) + (per_page + 1,)
+    if mode == 'p':
+        # Halaman sebelumnya: baca mundur dari key, lalu dibalik
+        return select_sql + """
+                AND (p.nama_produk < %s OR (p.nama_produk = %s AND p.id_produk < %s))
+            ORDER BY p.nama_produk DESC, p.id_produk DESC
+            LIMIT %s
+        """, tuple(params) + (nama, nama, key, per_page + 1)
+    operator = '>=' if mode == 'r' else '>'
+    return select_sql + f"""
+            AND (p.nama_produk > %s OR (p.nama_produk = %s AND p.id_produk {operator} %s))
+        ORDER BY p.nama_produk, p.id_produk
+        LIMIT %s
+    """, tuple(params) + (nama, nama, key, per_page + 1)
+
+def keyset_produk_result(rows, mode, number, total, per_page):
+    """Page dari hasil keyset_produk_query, atau None jika key sudah tidak valid (data berubah)"""
+    rows = list(rows)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if mode == 'p':
+        rows.reverse()
+        has_prev, has_next = has_more, True
+        number = number if has_more else 1
+    elif mode is None:
+        has_prev, has_next = False, has_more
+        number = 1
+    else:
+        has_prev, has_next = number > 1, has_more
+
+    if not rows and mode is not None:
+        return None
+
+    return Page(
+        rows, number, total, per_page, has_prev, has_next,
+        rows[0]['id_produk'] if rows else None,
+        rows[-1]['id_produk'] if rows else None
+    )
+
+# Nama produk baris batas keyset (dibaca lewat primary key)
+KEYSET_NAMA_SQL = "SELECT nama_produk FROM tbl_produk WHERE id_produk = %s"
+
+def keyset_produk_page(sql, select_sql, params, mode, number, key, total, per_page=None):
+    """
+    Satu halaman daftar produk urut (p.nama_produk, p.id_produk) dengan keyset, tanpa OFFSET.
+
+    select_sql: SELECT ... FROM ... (alias p untuk tbl_produk) WHERE ..., tanpa ORDER BY/LIMIT.
+    key: id_produk baris batas dari callback; nama produknya dibaca lewat primary key
+    karena nama terlalu panjang untuk callback_data.
+    """
+    per_page = per_page or items_per_page()
+
+    nama = None
+    if mode is not None:
+        sql.execute(KEYSET_NAMA_SQL, (key,))
+        row = sql.fetchone()
+        nama = row['nama_produk'] if row else None
+        if nama is None:
+            mode = None
+
+    sql.execute(*keyset_produk_query(select_sql, params, mode, nama, key, per_page))
+    page = keyset_produk_result(sql.fetchall(), mode, number, total, per_page)
+
+    # Key sudah tidak valid (data berubah), kembali ke halaman pertama
+    if page is None:
+        return keyset_produk_page(sql, select_sql, params, None, 1, None, total, per_page)
+    return page
+
+def sequence_page(records, position_of, key_of, mode, key, per_page=None):
+    """
+    Halaman dari list di memori yang sudah terurut (misal snapshot katalog).
+    position_of(key) -> index baris batas atau None; key_of(record) -> key untuk callback.
+    """
+    per_page = per_page or items_per_page()
+    position = position_of(key) if mode is not None else None
+
+    if position is None:
+        start = 0
+    elif mode == 'n':
+        start = position + 1
+    elif mode == 'p':
+        start = max(0, position - per_page)
+    else:
+        start = position
+    # Jangan sampai halaman terakhir kosong
+    if start >= len(records):
+        start = max(0, len(records) - per_page)
+    # Selaraskan ke batas halaman agar nomor halaman tetap konsisten
+    start -= start % per_page
+
+    rows = records[start:start + per_page]
+    return Page(
+        rows, start // per_page + 1, len(records), per_page,
+        start > 0, start + per_page < len(records),
+        key_of(rows[0]) if rows else None,
+        key_of(rows[-1]) if rows else None
+    )
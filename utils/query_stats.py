@@ -0,0 +1,211 @@
+"""
+Registry query SQL: setiap statement yang dijalankan lewat cursor database di-fingerprint
+(nilai literal dan parameter diganti '?'), lalu dicatat jumlah eksekusi, baris hasil,
+durasi p50/p95/p99 dan handler yang menjalankannya.
+
+Statement yang lebih lambat dari SLOW_QUERY_MS ditulis ke SLOW_QUERY_LOG_FILE (JSON-lines)
+beserta parameternya, dan jika SLOW_QUERY_EXPLAIN=Y juga hasil EXPLAIN-nya, untuk mencari
+query handler yang butuh index.
+"""
+import re
+import threading
+import time
+from collections import deque
+from config import config
+from utils.activity_log import ActivityLogger
+from utils.metrics import metrics
+
+_COMMENT = re.compile(r'/\*.*?\*/|--[^\n]*', re.S)
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PARAM = re.compile(r'%s|%\(\w+\)s')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.I)
+_VALUES_LIST = re.compile(r'\bVALUES\s*\((?:[^()]|\([^()]*\))*\)(?:\s*,\s*\((?:[^()]|\([^()]*\))*\))*', re.I)
+_SPACE = re.compile(r'\s+')
+
+# Statement yang bisa di-EXPLAIN
+_EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+
+def fingerprint(query):
+    """
+    Bentuk normal statement: komentar dan spasi dirapikan, literal dan parameter menjadi '?',
+    daftar IN (...) dan VALUES (...),(...) dipadatkan sehingga jumlah elemen tidak berpengaruh.
+    """
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    text = _COMMENT.sub(' ', query)
+    text = _STRING.sub('?', text)
+    text = _PARAM.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _SPACE.sub(' ', text).strip()
+    text = _IN_LIST.sub('IN (...)', text)
+    text = _VALUES_LIST.sub('VALUES (...)', text)
+    return text
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+def _short(value, limit=500):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+class _QueryStats:
+    __slots__ = ('count', 'rows', 'total', 'max', 'slow', 'errors', 'samples', 'handlers', 'last_explain')
+
+    def __init__(self, sample_size):
+        self.count = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.errors = 0
+        self.samples = deque(maxlen=sample_size)
+        self.handlers = {}
+        self.last_explain = 0.0
+
+class QueryRegistry:
+    """
+    Statistik per fingerprint statement SQL.
+
+    - slow_ms: statement yang lebih lama dari ini (ms) ditulis ke slow_log (0 = tidak dicatat)
+    - explain: jalankan EXPLAIN untuk statement lambat, paling sering sekali per
+      explain_interval detik per fingerprint
+    """
+
+    def __init__(self, slow_ms=200, explain=False, explain_interval=300, slow_log=None,
+                 sample_size=500, cache_size=5000, max_statements=1000):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.slow_log = slow_log
+        self.sample_size = sample_size
+        self.cache_size = cache_size
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self._fingerprints = {}      # teks query mentah -> fingerprint
+        self._stats = {}             # fingerprint -> _QueryStats
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            slow_ms=config.get_float('SLOW_QUERY_MS', 200),
+            explain=config.get_bool('SLOW_QUERY_EXPLAIN', False),
+            explain_interval=config.get_float('SLOW_QUERY_EXPLAIN_INTERVAL', 300),
+            slow_log=ActivityLogger(
+                config.get('SLOW_QUERY_LOG_FILE', 'slow_query.log'),
+                max_bytes=config.get_int('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+                backup_count=config.get_int('SLOW_QUERY_LOG_BACKUPS', 3)
+            )
+        )
+
+    def fingerprint(self, query):
+        result = self._fingerprints.get(query)
+        if result is None:
+            result = fingerprint(query)
+            # Cache dibatasi: query dengan literal di dalam teks (bukan %s) selalu berbeda
+            if len(self._fingerprints) < self.cache_size:
+                self._fingerprints[query] = result
+        return result
+
+    def record(self, query, args, seconds, rows=None, error=False, explain=None):
+        """
+        Catat satu eksekusi. explain: fungsi tanpa argumen yang mengembalikan baris EXPLAIN,
+        dipanggil hanya untuk statement lambat.
+        """
+        metrics.record_query(seconds)
+        key = self.fingerprint(query)
+        ms = seconds * 1000
+        handler = metrics.current_handler()
+        slow = bool(self.slow_ms) and ms >= self.slow_ms
+        run_explain = False
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_statements:
+                    key = '(lainnya)'
+                    stats = self._stats.get(key)
+                if stats is None:
+                    stats = self._stats[key] = _QueryStats(self.sample_size)
+            stats.count += 1
+            stats.rows += rows if rows and rows > 0 else 0
+            stats.total += ms
+            stats.samples.append(ms)
+            if ms > stats.max:
+                stats.max = ms
+            if error:
+                stats.errors += 1
+            if handler is not None:
+                stats.handlers[handler] = stats.handlers.get(handler, 0) + 1
+            if slow:
+                stats.slow += 1
+                now = time.monotonic()
+                if self.explain and explain is not None and now - stats.last_explain >= self.explain_interval:
+                    stats.last_explain = now
+                    run_explain = True
+
+        if slow and self.slow_log is not None:
+            entry = {
+                'fingerprint': key,
+                'duration_ms': round(ms, 2),
+                'rows': rows,
+                'handler': handler,
+                'params': _short(args),
+            }
+            if run_explain:
+                try:
+                    entry['explain'] = explain()
+                except Exception as e:
+                    entry['explain_error'] = str(e)
+            self.slow_log.record('slow_query', **entry)
+
+    def snapshot(self, limit=50):
+        """Statement terurut dari total waktu terbesar, untuk /metrics"""
+        with self._lock:
+            items = [
+                (key, stats.count, stats.rows, stats.total, stats.max, stats.slow, stats.errors,
+                 sorted(stats.samples), dict(stats.handlers))
+                for key, stats in self._stats.items()
+            ]
+        items.sort(key=lambda item: item[3], reverse=True)
+        result = []
+        for key, count, rows, total, max_ms, slow, errors, samples, handlers in items[:limit]:
+            result.append({
+                'fingerprint': key,
+                'count': count,
+                'rows': rows,
+                'rows_avg': round(rows / count, 2) if count else 0.0,
+                'total_ms': round(total, 2),
+                'avg_ms': round(total / count, 2) if count else 0.0,
+                'p50_ms': round(_percentile(samples, 0.50), 2),
+                'p95_ms': round(_percentile(samples, 0.95), 2),
+                'p99_ms': round(_percentile(samples, 0.99), 2),
+                'max_ms': round(max_ms, 2),
+                'slow': slow,
+                'errors': errors,
+                'handlers': handlers,
+            })
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+# Global query registry; statistiknya tampil di bagian 'sql' /metrics
+query_stats = QueryRegistry.from_config()
+metrics.add_section('sql', query_stats.snapshot)
+
+def explain_rows(conn, query, args, cursor_class=None):
+    """Hasil EXPLAIN statement (cursor terpisah, tidak mengganggu hasil cursor pemanggil)"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    if not query.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    cursor = conn.cursor(cursor_class) if cursor_class is not None else conn.cursor()
+    try:
+        cursor.execute('EXPLAIN ' + query, args)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
@@ -0,0 +1,47 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Pembatas laju sederhana: `rate` token per detik dengan kapasitas `burst`.
+    Thread-safe; acquire() menunggu sampai token tersedia.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Ambil token tanpa menunggu. Return 0 jika berhasil, atau lama tunggu (detik) jika belum ada."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1, timeout=None):
+        """Tunggu sampai token tersedia. Return False jika melewati timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def penalize(self, seconds):
+        """Kosongkan bucket selama `seconds` detik (misal setelah Telegram membalas retry_after)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
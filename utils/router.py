@@ -0,0 +1,235 @@
+import re
+from telebot import util
+from utils.pagination import from_base36
+
+def _int(token):
+    return int(token) if token.isdigit() else None
+
+def _str(token):
+    return token or None
+
+def _b36(token):
+    try:
+        return from_base36(token) if token else None
+    except ValueError:
+        return None
+
+# Konverter parameter satu segmen (dipisah '_'); return None jika tidak cocok
+CONVERTERS = {
+    'int': _int,
+    'str': _str,
+    'b36': _b36,
+}
+
+# Konverter khusus: 'page' memakai dua segmen akhiran paging standar -> (mode, halaman, key),
+# lihat utils.pagination; 'rest' mengambil sisa data apa adanya
+MULTI_CONVERTERS = ('page', 'rest')
+
+_PARAM = re.compile(r'\{(\w+)(?::(\w+))?\}')
+
+def _parse_page(first, second):
+    if first == 'page':
+        return (None, 1, None) if second.isdigit() else None
+    if len(first) > 1 and first[0] in ('n', 'p', 'r') and second:
+        number = _b36(first[1:])
+        if number is not None:
+            return first[0], max(1, number), second
+    return None
+
+class Route:
+    """Pola callback_data seperti 'pilih_supplier_{supplier_id:int}' beserta handler-nya"""
+
+    __slots__ = ('pattern', 'prefix', 'depth', 'handler', 'segments')
+
+    def __init__(self, pattern, handler):
+        self.pattern = pattern
+        self.handler = handler
+        match = _PARAM.search(pattern)
+        self.prefix = pattern[:match.start()] if match else pattern
+        if match and self.prefix and not self.prefix.endswith('_'):
+            raise ValueError(f"Awalan literal harus diakhiri '_': {pattern}")
+        self.depth = self.prefix.count('_')
+
+        # Sisa pola setelah awalan: daftar (jenis, nama/literal) per segmen
+        self.segments = []
+        if match:
+            params = []
+            def placeholder(found):
+                params.append((found.group(2) or 'str', found.group(1)))
+                return f"\0{len(params) - 1}\0"
+            rest = _PARAM.sub(placeholder, pattern[len(self.prefix):])
+            for token in rest.split('_'):
+                if token.startswith('\0') and token.endswith('\0'):
+                    kind, name = params[int(token[1:-1])]
+                    if kind not in CONVERTERS and kind not in MULTI_CONVERTERS:
+                        raise ValueError(f"Konverter tidak dikenal: {kind} di {pattern}")
+                    self.segments.append((kind, name))
+                elif '\0' in token:
+                    raise ValueError(f"Parameter harus satu segmen penuh: {pattern}")
+                else:
+                    self.segments.append((None, token))
+            if self.segments[-1][0] != 'rest' and any(kind == 'rest' for kind, _ in self.segments):
+                raise ValueError(f"{{...:rest}} hanya boleh di akhir pola: {pattern}")
+
+    def parse(self, tokens):
+        """Parameter bertipe dari segmen callback_data (hasil split '_'), atau None jika tidak cocok"""
+        params = {}
+        index = self.depth
+        for kind, name in self.segments:
+            if kind == 'rest':
+                params[name] = '_'.join(tokens[index:])
+                return params
+            if kind == 'page':
+                if index + 2 > len(tokens):
+                    return None
+                value = _parse_page(tokens[index], tokens[index + 1])
+                index += 2
+            elif index >= len(tokens):
+                return None
+            elif kind is None:
+                if tokens[index] != name:
+                    return None
+                index += 1
+                continue
+            else:
+                value = CONVERTERS[kind](tokens[index])
+                index += 1
+            if value is None:
+                return None
+            params[name] = value
+        return params if index == len(tokens) else None
+
+class _TrieNode:
+    __slots__ = ('children', 'routes')
+
+    def __init__(self):
+        self.children = {}
+        self.routes = []
+
+class Router:
+    """
+    Tabel routing update Telegram, didaftarkan ke bot sebagai satu handler message dan
+    satu handler callback.
+
+    - Perintah (/start) dan teks menu dicari di dict (O(1)).
+    - callback_data tanpa parameter dicari di dict; pola berparameter disimpan di trie
+      per segmen '_' dari awalan literalnya, sehingga biaya pencarian sebanding jumlah
+      segmen data, bukan jumlah handler. Awalan terpanjang dicoba lebih dulu.
+    - Parameter dikonversi sesuai tipe ({id:int}) dan dikirim ke handler sebagai keyword.
+
+    instrument: fungsi pembungkus untuk setiap handler yang didaftarkan (misal
+    utils.metrics.metrics.instrument); decorator tetap mengembalikan handler aslinya.
+    """
+
+    def __init__(self, instrument=None):
+        self._instrument = instrument
+        self._commands = {}
+        self._texts = {}
+        self._exact = {}
+        self._trie = _TrieNode()
+        self._fallback_message = None
+        self._fallback_callback = None
+
+    # ------------------------------------------------------------------ registrasi
+
+    def _wrap(self, handler):
+        return self._instrument(handler) if self._instrument is not None else handler
+
+    def command(self, *names):
+        def decorator(handler):
+            wrapped = self._wrap(handler)
+            for name in names:
+                self._commands[name] = wrapped
+            return handler
+        return decorator
+
+    def text(self, *values):
+        def decorator(handler):
+            wrapped = self._wrap(handler)
+            for value in values:
+                self._texts[value] = wrapped
+            return handler
+        return decorator
+
+    def callback(self, *patterns):
+        def decorator(handler):
+            wrapped = self._wrap(handler)
+            for pattern in patterns:
+                route = Route(pattern, wrapped)
+                if not route.segments:
+                    self._exact[pattern] = route
+                    continue
+                node = self._trie
+                for token in route.prefix.split('_')[:-1]:
+                    node = node.children.setdefault(token, _TrieNode())
+                node.routes.append(route)
+            return handler
+        return decorator
+
+    def fallback_message(self, handler):
+        """Handler pesan yang tidak cocok dengan perintah/teks mana pun"""
+        self._fallback_message = self._wrap(handler)
+        return handler
+
+    def fallback_callback(self, handler):
+        """Handler callback yang tidak cocok dengan route mana pun"""
+        self._fallback_callback = self._wrap(handler)
+        return handler
+
+    # ------------------------------------------------------------------ pencarian
+
+    def resolve_message(self, text):
+        """Handler untuk teks pesan (perintah atau teks menu), atau None"""
+        if text is None:
+            return None
+        command = util.extract_command(text)
+        if command is not None:
+            return self._commands.get(command.split('@', 1)[0])
+        return self._texts.get(text)
+
+    def resolve_callback(self, data):
+        """(handler, parameter) untuk callback_data, atau (None, None)"""
+        route = self._exact.get(data)
+        if route is not None:
+            return route.handler, {}
+        # Trie per segmen '_'; kumpulkan route di sepanjang jalur, coba dari awalan terpanjang
+        node = self._trie
+        candidates = [node.routes] if node.routes else []
+        tokens = data.split('_')
+        for token in tokens:
+            node = node.children.get(token)
+            if node is None:
+                break
+            if node.routes:
+                candidates.append(node.routes)
+        for routes in reversed(candidates):
+            for route in routes:
+                params = route.parse(tokens)
+                if params is not None:
+                    return route.handler, params
+        return None, None
+
+    # ------------------------------------------------------------------ dispatch
+
+    def dispatch_message(self, message):
+        handler = self.resolve_message(message.text)
+        if handler is None:
+            handler = self._fallback_message
+        if handler is not None:
+            handler(message)
+
+    def dispatch_callback(self, call):
+        handler, params = self.resolve_callback(call.data or '')
+        if handler is not None:
+            handler(call, **params)
+        elif self._fallback_callback is not None:
+            self._fallback_callback(call)
+
+    def register(self, bot, wrap=None):
+        """Daftarkan router ke TeleBot sebagai satu handler message dan satu handler callback"""
+        dispatch_message, dispatch_callback = self.dispatch_message, self.dispatch_callback
+        if wrap is not None:
+            dispatch_message, dispatch_callback = wrap(dispatch_message), wrap(dispatch_callback)
+        bot.message_handler(func=lambda message: True)(dispatch_message)
+        bot.callback_query_handler(func=lambda call: True)(dispatch_callback)
+        return self
@@ -0,0 +1,210 @@
+import threading
+import time
+from config import config
+from database import connection
+from utils import sequence
+
+# Nama counter high-water mark global di tb_sequence (id tb_deposit_detil terakhir yang sudah diproses)
+SALDO_HWM = 'saldo_member_hwm'
+
+_lock = threading.Lock()
+_worker_thread = None
+
+# Setiap NIK menyimpan saldo berjalan dan id tb_deposit_detil terakhir yang sudah dihitung.
+# Dibuat saat startup oleh utils.schema, di luar transaksi (DDL melakukan implicit commit)
+CREATE_SALDO_SQL = """
+    CREATE TABLE IF NOT EXISTS tb_saldo_member (
+        nik VARCHAR(32) NOT NULL PRIMARY KEY,
+        saldo DECIMAL(20,2) NOT NULL DEFAULT 0,
+        last_id BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+"""
+
+# Query refresh saldo per NIK, dipakai versi sinkron dan async
+INIT_SALDO_SQL = "INSERT IGNORE INTO tb_saldo_member (nik, saldo, last_id) VALUES (%s, 0, 0)"
+LOCK_SALDO_SQL = "SELECT saldo, last_id FROM tb_saldo_member WHERE nik = %s FOR UPDATE"
+DELTA_SALDO_SQL = """
+    SELECT
+        COALESCE(SUM(setor), 0) - COALESCE(SUM(tarik), 0) AS delta,
+        MAX(id) AS max_id
+    FROM tb_deposit_detil
+    WHERE nik = %s AND id > %s
+"""
+UPDATE_SALDO_SQL = "UPDATE tb_saldo_member SET saldo = %s, last_id = %s WHERE nik = %s"
+
+def refresh_saldo(sql, nik):
+    """
+    Tambahkan baris tb_deposit_detil baru (id > last_id) ke saldo NIK. Return (saldo, last_id).
+
+    Baris saldo dikunci (FOR UPDATE) sampai transaksi pemanggil di-commit, sehingga
+    lookup dan worker yang berjalan bersamaan tidak menghitung baris yang sama dua kali.
+    Hanya baris baru yang dibaca (range scan di index nik, id).
+    """
+    sql.execute(INIT_SALDO_SQL, (nik,))
+    sql.execute(LOCK_SALDO_SQL, (nik,))
+    row = sql.fetchone()
+    saldo, last_id = row['saldo'], row['last_id']
+
+    sql.execute(DELTA_SALDO_SQL, (nik, last_id))
+    baru = sql.fetchone()
+    if baru and baru['max_id'] is not None:
+        saldo += baru['delta']
+        last_id = baru['max_id']
+        sql.execute(UPDATE_SALDO_SQL, (saldo, last_id, nik))
+    return saldo, last_id
+
+# Saldo tersimpan untuk dibaca tanpa lock (baris bisa belum ada untuk NIK baru)
+READ_SALDO_SQL = "SELECT saldo, last_id FROM tb_saldo_member WHERE nik = %s"
+
+def _saldo_terbaca(row, baru):
+    saldo = row['saldo'] if row else 0
+    if baru and baru['max_id'] is not None:
+        saldo += baru['delta']
+    return saldo
+
+def read_saldo(sql, nik):
+    """
+    Saldo NIK tanpa menulis dan tanpa lock: saldo tersimpan ditambah baris baru yang
+    belum diproses worker (consistent read). Menyimpan hasilnya tugas worker.
+    """
+    sql.execute(READ_SALDO_SQL, (nik,))
+    row = sql.fetchone()
+    sql.execute(DELTA_SALDO_SQL, (nik, row['last_id'] if row else 0))
+    return _saldo_terbaca(row, sql.fetchone())
+
+async def read_saldo_async(db, nik):
+    """Versi async read_saldo (lewat async_database.db)"""
+    row = await db.fetchone(READ_SALDO_SQL, (nik,))
+    baru = await db.fetchone(DELTA_SALDO_SQL, (nik, row['last_id'] if row else 0))
+    return _saldo_terbaca(row, baru)
+
+def get_saldo(conn, nik):
+    """Saldo NIK untuk ditampilkan (read_saldo, tanpa transaksi tulis)"""
+    try:
+        with conn.cursor() as sql:
+            return read_saldo(sql, nik)
+    finally:
+        # Akhiri snapshot baca agar cek berikutnya melihat data terbaru
+        conn.rollback()
+
+def apply_new_rows(batch_size=None):
+    """
+    Proses baris tb_deposit_detil baru sejak high-water mark global untuk semua NIK,
+    maksimal batch_size baris per panggilan. Return jumlah NIK yang diperbarui.
+    """
+    batch_size = batch_size or config.get_int('SALDO_BATCH_SIZE', 5000)
+    with connection() as conn:
+        if conn is None:
+            return 0
+        try:
+            with conn.cursor() as sql:
+                hwm = sequence.get_value(sql, SALDO_HWM)
+                sql.execute("""
+                    SELECT MAX(id) AS batas FROM (
+                        SELECT id FROM tb_deposit_detil
+                        WHERE id > %s
+                        ORDER BY id
+                        LIMIT %s
+                    ) baru
+                """, (hwm, batch_size))
+                batas = sql.fetchone()['batas']
+                if batas is None:
+                    conn.rollback()
+                    return 0
+
+                sql.execute("""
+                    SELECT DISTINCT nik FROM tb_deposit_detil
+                    WHERE id > %s AND id <= %s AND nik IS NOT NULL
+                    ORDER BY nik
+                """, (hwm, batas))
+                niks = [row['nik'] for row in sql.fetchall()]
+
+                for nik in niks:
+                    refresh_saldo(sql, nik)
+                sequence.set_value(sql, SALDO_HWM, batas)
+            conn.commit()
+            return len(niks)
+        except Exception as e:
+            conn.rollback()
+            print(f"Error update saldo member: {e}")
+            return 0
+
+def reconcile(fix=False, nik=None):
+    """
+    Bandingkan saldo tersimpan dengan SUM penuh tb_deposit_detil (sampai last_id masing-masing).
+    Selisih muncul jika baris lama diubah/dihapus, atau baris dengan id lebih kecil baru
+    ter-commit setelah id yang lebih besar sudah dihitung.
+    Return list selisih {nik, saldo, saldo_penuh, last_id}; jika fix=True saldo diperbaiki.
+    """
+    with connection() as conn:
+        if conn is None:
+            return None
+        try:
+            with conn.cursor() as sql:
+                filter_nik = "WHERE m.nik = %s" if nik else ""
+                sql.execute(f"""
+                    SELECT
+                        m.nik,
+                        m.saldo,
+                        m.last_id,
+                        COALESCE(SUM(d.setor), 0) - COALESCE(SUM(d.tarik), 0) AS saldo_penuh
+                    FROM tb_saldo_member m
+                    LEFT JOIN tb_deposit_detil d ON d.nik = m.nik AND d.id <= m.last_id
+                    {filter_nik}
+                    GROUP BY m.nik, m.saldo, m.last_id
+                    HAVING m.saldo <> saldo_penuh
+                """, (nik,) if nik else ())
+                selisih = list(sql.fetchall())
+
+                if fix:
+                    for row in selisih:
+                        # Hanya perbaiki jika last_id belum berubah sejak dibaca
+                        sql.execute(
+                            "UPDATE tb_saldo_member SET saldo = %s WHERE nik = %s AND last_id = %s",
+                            (row['saldo_penuh'], row['nik'], row['last_id'])
+                        )
+            conn.commit()
+            return selisih
+        except Exception as e:
+            conn.rollback()
+            print(f"Error rekonsiliasi saldo: {e}")
+            return None
+
+def _worker(interval, reconcile_interval):
+    last_reconcile = time.monotonic()
+    while True:
+        try:
+            # Proses semua batch yang tertunda, lalu tunggu interval berikutnya
+            while apply_new_rows():
+                pass
+            if reconcile_interval and time.monotonic() - last_reconcile >= reconcile_interval:
+                last_reconcile = time.monotonic()
+                selisih = reconcile(fix=True)
+                if selisih:
+                    print(f"Rekonsiliasi saldo: {len(selisih)} NIK diperbaiki")
+        except Exception as e:
+            print(f"Error saldo worker: {e}")
+        time.sleep(interval)
+
+def start_saldo_worker():
+    """
+    Jalankan thread yang menjaga tabel saldo tetap terbaru (SALDO_REFRESH_INTERVAL detik)
+    dan rekonsiliasi berkala (SALDO_RECONCILE_INTERVAL detik, 0 = tidak). Rekonsiliasi
+    memperbaiki baris tb_deposit_detil yang ter-commit terlambat dengan id di bawah last_id,
+    yang tidak pernah terbaca oleh pembaruan inkremental (id > last_id). Return thread atau None.
+    """
+    global _worker_thread
+    interval = config.get_float('SALDO_REFRESH_INTERVAL', 60)
+    if interval <= 0:
+        return None
+    with _lock:
+        if _worker_thread is None:
+            _worker_thread = threading.Thread(
+                target=_worker,
+                args=(interval, config.get_float('SALDO_RECONCILE_INTERVAL', 900)),
+                name='saldo-worker',
+                daemon=True
+            )
+            _worker_thread.start()
+    return _worker_thread
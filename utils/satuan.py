@@ -0,0 +1,134 @@
+import threading
+import time
+from config import config
+from database import connection
+
+# Nilai default yang sama dengan perilaku lama jika satuan tidak ditemukan
+DEFAULT_NAMA_SATUAN = "PCS"
+DEFAULT_ID_SATUAN = 1
+
+def _id_key(id_satuan):
+    """Normalisasi id satuan (bisa datang sebagai int atau string dari kolom varchar)"""
+    try:
+        return int(id_satuan)
+    except (TypeError, ValueError):
+        return id_satuan
+
+def _nama_key(nama_satuan):
+    """Normalisasi nama satuan, mengikuti collation MySQL yang case-insensitive"""
+    return str(nama_satuan).strip().casefold()
+
+class SatuanRegistry:
+    """
+    Kamus satuan dari tb_satuan yang disimpan di memori (id -> nama dan nama -> id).
+    Dimuat sekali saat pertama dipakai, lalu diperbarui di background setiap
+    refresh_interval detik sehingga lookup tidak pernah menyentuh database.
+    """
+
+    def __init__(self, refresh_interval=600, retry_interval=30):
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self._by_id = {}
+        self._by_nama = {}
+        self._loaded_at = None
+        self._last_attempt = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def refresh(self):
+        """Muat ulang seluruh satuan aktif dari database. Return True jika berhasil."""
+        self._last_attempt = time.monotonic()
+        with connection() as conn:
+            if conn is None:
+                return False
+            try:
+                with conn.cursor() as sql:
+                    sql.execute("SELECT id, satuan FROM tb_satuan WHERE aktif = 'Y' ORDER BY id")
+                    rows = sql.fetchall()
+            except Exception as e:
+                print(f"Error refresh satuan: {e}")
+                return False
+
+        by_id = {}
+        by_nama = {}
+        for row in rows:
+            by_id[_id_key(row['id'])] = row['satuan']
+            if row['satuan']:
+                # Jika ada nama ganda, id terkecil yang dipakai
+                by_nama.setdefault(_nama_key(row['satuan']), row['id'])
+
+        with self._lock:
+            self._by_id = by_id
+            self._by_nama = by_nama
+            self._loaded_at = time.monotonic()
+        return True
+
+    def _ensure_loaded(self):
+        now = time.monotonic()
+        if self._loaded_at is None:
+            # Muat pertama kali secara sinkron, dengan jeda jika database sedang gagal
+            if self._last_attempt is None or now - self._last_attempt >= self.retry_interval:
+                self.refresh()
+            return
+        if now - self._loaded_at >= self.refresh_interval:
+            self._refresh_in_background()
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name='satuan-refresh', daemon=True).start()
+
+    def get_nama(self, id_satuan, default=DEFAULT_NAMA_SATUAN):
+        """Nama satuan untuk id_satuan"""
+        if not id_satuan:
+            return default
+        self._ensure_loaded()
+        return self._by_id.get(_id_key(id_satuan), default)
+
+    def get_id(self, nama_satuan, default=DEFAULT_ID_SATUAN):
+        """Id satuan untuk nama_satuan"""
+        if not nama_satuan:
+            return default
+        self._ensure_loaded()
+        return self._by_nama.get(_nama_key(nama_satuan), default)
+
+    def get_nama_many(self, ids, default=DEFAULT_NAMA_SATUAN):
+        """Nama satuan untuk banyak id sekaligus, urutan sama dengan input"""
+        self._ensure_loaded()
+        by_id = self._by_id
+        return [by_id.get(_id_key(i), default) if i else default for i in ids]
+
+    def get_id_many(self, names, default=DEFAULT_ID_SATUAN):
+        """Id satuan untuk banyak nama sekaligus, urutan sama dengan input"""
+        self._ensure_loaded()
+        by_nama = self._by_nama
+        return [by_nama.get(_nama_key(n), default) if n else default for n in names]
+
+    def stats(self):
+        """Info registry untuk monitoring"""
+        return {
+            'satuan': len(self._by_id),
+            'loaded': self._loaded_at is not None,
+            'age_seconds': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+        }
+
+# Global registry instance
+satuan_registry = SatuanRegistry(refresh_interval=config.get_float('SATUAN_REFRESH', 600))
+
+def get_nama_satuan(id_satuan):
+    """Get unit name (dari kamus satuan di memori)"""
+    return satuan_registry.get_nama(id_satuan)
+
+def get_id_satuan(nama_satuan):
+    """Get unit id dari nama satuan (dari kamus satuan di memori)"""
+    return satuan_registry.get_id(nama_satuan)
@@ -0,0 +1,64 @@
+"""
+Tabel milik bot sendiri: counter tb_sequence dan saldo tb_saldo_member.
+Dibuat saat startup (ensure_tables_on_startup) dan oleh tools/ensure_indexes.py lewat
+koneksi tersendiri, bukan di jalur transaksi handler/worker: DDL di MySQL melakukan
+implicit commit atas transaksi yang sedang terbuka.
+"""
+from database import create_connection
+from utils.saldo_store import CREATE_SALDO_SQL
+from utils.sequence import CREATE_SEQUENCE_SQL
+
+# (tabel, CREATE TABLE IF NOT EXISTS)
+TABLES = [
+    ('tb_sequence', CREATE_SEQUENCE_SQL),
+    ('tb_saldo_member', CREATE_SALDO_SQL),
+]
+
+def table_exists(sql, table):
+    sql.execute("""
+        SELECT 1
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return sql.fetchone() is not None
+
+def ensure_tables(sql, apply=False, report=print):
+    """
+    Cek (dan jika apply, buat) semua tabel di TABLES. Aman dijalankan berulang.
+    Return daftar (tabel, status): 'ok', 'missing', 'created' atau 'error'.
+    """
+    results = []
+    for table, statement in TABLES:
+        status, detail = ('ok', "sudah ada") if table_exists(sql, table) else ('missing', "belum ada")
+        if status == 'missing' and apply:
+            try:
+                sql.execute(statement)
+                status, detail = 'created', "dibuat"
+            except Exception as e:
+                status, detail = 'error', str(e)
+        report(f"[{status}] {table}: {detail}")
+        results.append((table, status))
+    return results
+
+def ensure_tables_on_startup():
+    """Buat tabel bot yang belum ada sebelum handler dan worker berjalan. Return True jika semua ada."""
+    try:
+        conn = create_connection()
+    except Exception as e:
+        print(f"Koneksi database gagal, tabel bot tidak dicek: {e}")
+        return False
+
+    def report(line):
+        if not line.startswith('[ok]'):
+            print(line)
+
+    try:
+        with conn.cursor() as sql:
+            results = ensure_tables(sql, apply=True, report=report)
+        conn.commit()
+    except Exception as e:
+        print(f"Error cek tabel bot: {e}")
+        return False
+    finally:
+        conn.close()
+    return all(status in ('ok', 'created') for _, status in results)
@@ -0,0 +1,105 @@
+import datetime
+import threading
+
+# Prefix nomor penerimaan: TLE + yymmdd + nomor urut 3 digit, contoh TLE251018001
+NORCV_PREFIX = "TLE"
+
+_lock = threading.Lock()
+_seeded = set()
+
+# Tabel counter, dibuat saat startup oleh utils.schema (DDL di MySQL melakukan implicit
+# commit, jadi tidak boleh dijalankan di tengah transaksi pemanggil)
+CREATE_SEQUENCE_SQL = """
+    CREATE TABLE IF NOT EXISTS tb_sequence (
+        nama VARCHAR(64) NOT NULL PRIMARY KEY,
+        nilai BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+"""
+
+def reserve(sql, nama, count=1, seed_sql=None, seed_params=()):
+    """
+    Reservasi `count` nomor berurutan dari counter `nama` secara atomik, return nomor pertama.
+
+    Baris counter dikunci (row lock) sampai transaksi pemanggil di-commit, sehingga
+    penyimpan yang bersamaan tidak pernah mendapat nomor yang sama, dan nomor
+    dikembalikan jika transaksi di-rollback.
+
+    seed_sql: SELECT (nama, nilai_awal) untuk mengisi counter pertama kali dari data yang sudah ada.
+    """
+    if count < 1:
+        raise ValueError("count harus >= 1")
+
+    for _ in range(2):
+        with _lock:
+            seeded = nama in _seeded
+        if not seeded:
+            if seed_sql:
+                sql.execute(f"INSERT IGNORE INTO tb_sequence (nama, nilai) {seed_sql}", (nama,) + tuple(seed_params))
+            else:
+                sql.execute("INSERT IGNORE INTO tb_sequence (nama, nilai) VALUES (%s, 0)", (nama,))
+            with _lock:
+                _seeded.add(nama)
+
+        # LAST_INSERT_ID(expr) membuat nilai baru langsung dikembalikan di paket OK (lastrowid),
+        # jadi cukup satu round-trip tanpa SELECT tambahan
+        sql.execute(
+            "UPDATE tb_sequence SET nilai = LAST_INSERT_ID(nilai + %s) WHERE nama = %s",
+            (count, nama)
+        )
+        if sql.rowcount:
+            return sql.lastrowid - count + 1
+
+        # Baris counter hilang (misal dihapus manual), isi ulang lalu coba sekali lagi
+        with _lock:
+            _seeded.discard(nama)
+
+    raise RuntimeError(f"Gagal reservasi sequence {nama}")
+
+def get_value(sql, nama, default=0):
+    """Nilai counter `nama` saat ini (misal high-water mark), default jika belum ada"""
+    sql.execute("SELECT nilai FROM tb_sequence WHERE nama = %s", (nama,))
+    row = sql.fetchone()
+    return row['nilai'] if row else default
+
+def set_value(sql, nama, nilai):
+    """Simpan nilai counter `nama` (dipakai untuk high-water mark, hanya boleh naik)"""
+    sql.execute("""
+        INSERT INTO tb_sequence (nama, nilai) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE nilai = GREATEST(nilai, VALUES(nilai))
+    """, (nama, nilai))
+
+def _norcv_prefix(tanggal=None):
+    tanggal = tanggal or datetime.datetime.now()
+    return f"{NORCV_PREFIX}{tanggal.strftime('%y%m%d')}"
+
+def norcv_seed_sql(prefix):
+    """
+    SELECT (nama, nomor terbesar) untuk seed counter norcv dari data yang sudah ada.
+    Parameter: nama counter, lalu pola LIKE prefix (masih bisa memakai index norcv).
+    """
+    return f"""
+        SELECT %s, COALESCE(MAX(CAST(SUBSTRING(norcv, {len(prefix) + 1}) AS UNSIGNED)), 0)
+        FROM tb_riceve
+        WHERE norcv LIKE %s
+    """
+
+def _reserve_norcv(sql, count, tanggal=None):
+    prefix = _norcv_prefix(tanggal)
+    # Seed dari nomor terbesar hari ini yang sudah ada
+    first = reserve(
+        sql,
+        f"norcv_{prefix}",
+        count,
+        seed_sql=norcv_seed_sql(prefix),
+        seed_params=(f"{prefix}%",)
+    )
+    return [f"{prefix}{seq:03d}" for seq in range(first, first + count)]
+
+def allocate_norcv(sql, tanggal=None):
+    """Nomor RCV berikutnya untuk hari ini, contoh TLE251018001"""
+    return _reserve_norcv(sql, 1, tanggal)[0]
+
+def reserve_norcv_block(sql, count, tanggal=None):
+    """Reservasi sekaligus `count` nomor RCV berurutan (untuk import massal)"""
+    return _reserve_norcv(sql, count, tanggal)
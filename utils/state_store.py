@@ -0,0 +1,255 @@
+import abc
+import datetime
+import decimal
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import config
+
+def _json_default(value):
+    """Konversi tipe dari MySQL yang tidak didukung JSON"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"Tipe {type(value).__name__} tidak bisa disimpan di state")
+
+class StateStore(abc.ABC):
+    """
+    API penyimpanan state percakapan, dipakai seperti dict:
+
+        store[user_id] = state      # simpan (dan perpanjang masa berlaku)
+        state = store.get(user_id)  # ambil, None jika tidak ada / kedaluwarsa
+        user_id in store
+        del store[user_id]
+
+    Key selalu dinormalisasi menjadi string. Setelah mengubah isi state, simpan
+    kembali dengan store[key] = state agar backend persisten ikut diperbarui.
+    Entry kedaluwarsa setelah `ttl` detik tanpa disimpan ulang, dan jumlah entry
+    dibatasi `max_entries` (yang paling lama tidak dipakai dibuang lebih dulu).
+    """
+
+    def __init__(self, namespace, ttl=86400, max_entries=5000):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+
+    @abc.abstractmethod
+    def get(self, key, default=None):
+        """State untuk key, atau default jika tidak ada / kedaluwarsa"""
+
+    @abc.abstractmethod
+    def set(self, key, value):
+        """Simpan state dan perpanjang masa berlakunya"""
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Hapus state (tidak error jika tidak ada)"""
+
+    @abc.abstractmethod
+    def purge_expired(self):
+        """Hapus semua entry kedaluwarsa. Return jumlah yang dihapus."""
+
+    @abc.abstractmethod
+    def items(self):
+        """Daftar (key, state) yang belum kedaluwarsa"""
+
+    @abc.abstractmethod
+    def __len__(self):
+        """Jumlah entry yang belum kedaluwarsa"""
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        self.delete(key)
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def stats(self):
+        return {'namespace': self.namespace, 'backend': type(self).__name__, 'entries': len(self)}
+
+class MemoryStateStore(StateStore):
+    """State di memori proses (hilang saat restart)"""
+
+    def __init__(self, namespace, ttl=86400, max_entries=5000):
+        super().__init__(namespace, ttl, max_entries)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purge_front_locked(self, now):
+        # Urutan OrderedDict = urutan terakhir disimpan, entry tertua ada di depan
+        removed = 0
+        while self._data:
+            key, (value, expires_at) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            del self._data[key]
+            removed += 1
+        return removed
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(str(key))
+            if item is None or item[1] <= now:
+                return default
+            return item[0]
+
+    def set(self, key, value):
+        now = time.monotonic()
+        with self._lock:
+            self._data[str(key)] = (value, now + self.ttl)
+            self._data.move_to_end(str(key))
+            self._purge_front_locked(now)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(str(key), None)
+
+    def purge_expired(self):
+        with self._lock:
+            return self._purge_front_locked(time.monotonic())
+
+    def items(self):
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (value, expires_at) in self._data.items() if expires_at > now]
+
+    def __len__(self):
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for _, expires_at in self._data.values() if expires_at > now)
+
+class SqliteStateStore(StateStore):
+    """
+    State di file SQLite lokal sehingga proses penerimaan bisa dilanjutkan setelah bot restart.
+    Beberapa namespace bisa berbagi satu file.
+    """
+
+    _connections = {}
+    _connections_lock = threading.Lock()
+
+    def __init__(self, namespace, path='state_bot.db', ttl=86400, max_entries=5000):
+        super().__init__(namespace, ttl, max_entries)
+        self.path = path
+        self._conn, self._lock = self._shared_connection(path)
+        self._writes = 0
+
+    @classmethod
+    def _shared_connection(cls, path):
+        with cls._connections_lock:
+            if path not in cls._connections:
+                conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS bot_state (
+                        namespace TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        PRIMARY KEY (namespace, key)
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_bot_state_expires ON bot_state (namespace, expires_at)")
+                cls._connections[path] = (conn, threading.Lock())
+            return cls._connections[path]
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM bot_state WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self.namespace, str(key), time.time())
+            ).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        data = json.dumps(value, default=_json_default, separators=(',', ':'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO bot_state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, str(key), data, time.time() + self.ttl)
+            )
+            self._writes += 1
+            check_limits = self._writes % 100 == 0
+        if check_limits:
+            self.purge_expired()
+            self._enforce_max_entries()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM bot_state WHERE namespace = ? AND key = ?",
+                (self.namespace, str(key))
+            )
+
+    def purge_expired(self):
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM bot_state WHERE namespace = ? AND expires_at <= ?",
+                (self.namespace, time.time())
+            )
+            return cursor.rowcount
+
+    def items(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM bot_state WHERE namespace = ? AND expires_at > ?",
+                (self.namespace, time.time())
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def _enforce_max_entries(self):
+        with self._lock:
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM bot_state WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+            if total > self.max_entries:
+                # expires_at = waktu terakhir disimpan + ttl, jadi yang terkecil paling lama tidak dipakai
+                self._conn.execute("""
+                    DELETE FROM bot_state WHERE namespace = ? AND key IN (
+                        SELECT key FROM bot_state WHERE namespace = ?
+                        ORDER BY expires_at LIMIT ?
+                    )
+                """, (self.namespace, self.namespace, total - self.max_entries))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM bot_state WHERE namespace = ? AND expires_at > ?",
+                (self.namespace, time.time())
+            ).fetchone()[0]
+
+def create_state_store(namespace):
+    """Buat state store sesuai STATE_BACKEND di config.txt (memory atau sqlite)"""
+    ttl = config.get_float('STATE_TTL', 86400)
+    max_entries = config.get_int('STATE_MAX_ENTRIES', 5000)
+    backend = str(config.get('STATE_BACKEND', 'memory')).strip().lower()
+
+    if backend == 'sqlite':
+        path = config.get('STATE_DB_FILE', 'state_bot.db')
+        try:
+            return SqliteStateStore(namespace, path=path, ttl=ttl, max_entries=max_entries)
+        except sqlite3.Error as e:
+            print(f"State store SQLite gagal dibuka ({e}), memakai memory")
+
+    return MemoryStateStore(namespace, ttl=ttl, max_entries=max_entries)
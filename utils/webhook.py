@@ -0,0 +1,258 @@
+import hmac
+import ipaddress
+import json
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from telebot import types
+from config import config
+from utils.cache import TTLCache
+from utils.metrics import METRICS_PATH
+
+# Header yang dikirim Telegram jika webhook didaftarkan dengan secret_token
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+HEALTH_PATH = '/health'
+
+class _PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer yang melayani koneksi di pool thread berukuran tetap (bukan satu thread per koneksi).
+    Satu koneksi keep-alive memegang satu thread sampai ditutup atau idle melewati timeout handler.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, handler_class, threads):
+        super().__init__(address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix='webhook')
+        self._active = set()
+        self._active_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        with self._active_lock:
+            self._active.add(request)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._active_lock:
+                self._active.discard(request)
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        # Putus koneksi keep-alive yang masih menunggu request agar thread pool bisa selesai
+        with self._active_lock:
+            active = list(self._active)
+        for request in active:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+class WebhookServer:
+    """
+    Penerima webhook Telegram: POST ke `path` berisi satu Update (JSON) dimasukkan ke
+    dispatcher, GET /health mengembalikan status dan metrik dalam JSON, GET /metrics
+    latensi per handler/SQL/Bot API (lihat utils.metrics).
+
+    Request ditolak jika secret token tidak cocok (403), body melebihi max_body (413),
+    atau JSON tidak valid (400). Jika antrian dispatcher penuh lebih dari queue_timeout
+    detik, dibalas 503 agar Telegram mengirim ulang nanti.
+
+    Port ini biasanya terbuka ke publik, jadi /health dan /metrics juga butuh header secret;
+    tanpa secret keduanya hanya dilayani untuk klien loopback (127.0.0.1/::1).
+    """
+
+    def __init__(self, dispatcher, host='127.0.0.1', port=8080, path='/telegram', secret='',
+                 max_body=1048576, threads=4, queue_timeout=5, idle_timeout=10, health=None, metrics=None):
+        self.dispatcher = dispatcher
+        self.host = host
+        self.port = port
+        self.path = '/' + path.strip('/')
+        self.secret = secret or ''
+        self.max_body = max_body
+        self.threads = threads
+        self.queue_timeout = queue_timeout
+        self.idle_timeout = idle_timeout
+        self.health = health
+        self.metrics = metrics
+        # Telegram bisa mengirim ulang update yang sama jika balasan terlambat
+        self._seen = TTLCache(maxsize=10000, ttl=300)
+        self._lock = threading.Lock()
+        self._stats = {'received': 0, 'accepted': 0, 'duplicate': 0, 'rejected': 0,
+                       'unauthorized': 0, 'too_large': 0, 'bad_request': 0}
+        self._started = time.time()
+        self._server = None
+
+    @classmethod
+    def from_config(cls, dispatcher, health=None, metrics=None):
+        """Buat server dari key WEBHOOK_* di config.txt"""
+        return cls(
+            dispatcher,
+            host=config.get('WEBHOOK_HOST', '127.0.0.1'),
+            port=config.get_int('WEBHOOK_PORT', 8080),
+            path=config.get('WEBHOOK_PATH', '/telegram'),
+            secret=config.get('WEBHOOK_SECRET', ''),
+            max_body=config.get_int('WEBHOOK_MAX_BODY', 1048576),
+            threads=config.get_int('WEBHOOK_THREADS', 4),
+            queue_timeout=config.get_float('WEBHOOK_QUEUE_TIMEOUT', 5),
+            idle_timeout=config.get_float('WEBHOOK_IDLE_TIMEOUT', 10),
+            health=health,
+            metrics=metrics
+        )
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+        result['uptime'] = int(time.time() - self._started)
+        return result
+
+    def check_secret(self, value):
+        if not self.secret:
+            return True
+        return hmac.compare_digest((value or '').encode('utf-8'), self.secret.encode('utf-8'))
+
+    def can_view_status(self, secret_value, client_host):
+        """Boleh melihat /health dan /metrics: secret cocok, atau klien lokal jika secret kosong"""
+        if self.secret:
+            return self.check_secret(secret_value)
+        try:
+            return ipaddress.ip_address(client_host).is_loopback
+        except ValueError:
+            return False
+
+    def handle_update(self, body):
+        """Proses body POST webhook. Return kode status HTTP."""
+        try:
+            data = json.loads(body.decode('utf-8'))
+            if not isinstance(data, dict) or 'update_id' not in data:
+                raise ValueError("bukan Update Telegram")
+            update = types.Update.de_json(data)
+        except Exception as e:
+            self._count('bad_request')
+            print(f"Webhook: update tidak valid: {e}")
+            return 400
+
+        # Cek dan tandai sekaligus agar dua kiriman ulang bersamaan tidak sama-sama masuk
+        with self._lock:
+            if self._seen.get(update.update_id):
+                self._stats['duplicate'] += 1
+                return 200
+            self._seen.set(update.update_id, True)
+        if not self.dispatcher.submit(update, timeout=self.queue_timeout):
+            self._seen.delete(update.update_id)
+            self._count('rejected')
+            return 503
+        self._count('accepted')
+        return 200
+
+    def health_status(self):
+        """Isi respon /health; status 'ok' selama dispatcher berjalan"""
+        result = {
+            'status': 'ok' if self.dispatcher.running else 'stopped',
+            'webhook': self.stats(),
+            'dispatcher': self.dispatcher.stats()
+        }
+        if self.health is not None:
+            try:
+                result.update(self.health())
+            except Exception as e:
+                result['status'] = 'error'
+                result['error'] = str(e)
+        return result
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Koneksi keep-alive yang idle dilepas agar tidak memegang thread pool selamanya
+            timeout = server.idle_timeout or None
+
+            def _reply(self, status, payload=None):
+                body = json.dumps(payload if payload is not None else {'ok': status == 200}, default=str).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path not in (HEALTH_PATH, METRICS_PATH):
+                    self._reply(404)
+                    return
+                if not server.can_view_status(self.headers.get(SECRET_HEADER), self.client_address[0]):
+                    server._count('unauthorized')
+                    self._reply(403)
+                    return
+                if path == METRICS_PATH and server.metrics is not None:
+                    self._reply(200, server.metrics())
+                    return
+                if path != HEALTH_PATH:
+                    self._reply(404)
+                    return
+                status = server.health_status()
+                self._reply(200 if status['status'] == 'ok' else 503, status)
+
+            def do_POST(self):
+                if self.path.split('?', 1)[0] != server.path:
+                    self._reply(404)
+                    return
+                server._count('received')
+                if not server.check_secret(self.headers.get(SECRET_HEADER)):
+                    server._count('unauthorized')
+                    self.close_connection = True
+                    self._reply(403)
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length', ''))
+                except ValueError:
+                    self.close_connection = True
+                    self._reply(411)
+                    return
+                if length < 0 or length > server.max_body:
+                    # Body tidak dibaca, jadi koneksi harus ditutup
+                    server._count('too_large')
+                    self.close_connection = True
+                    self._reply(413)
+                    return
+                self._reply(server.handle_update(self.rfile.read(length)))
+
+            def log_message(self, format, *args):
+                # Jangan cetak setiap request ke console
+                pass
+
+        return Handler
+
+    def start(self):
+        """Buka port dan layani request di thread terpisah. Return self."""
+        self._server = _PooledHTTPServer((self.host, self.port), self._handler_class(), self.threads)
+        cert = config.get('WEBHOOK_SSL_CERT')
+        if cert:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(cert, config.get('WEBHOOK_SSL_KEY') or None)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self.port = self._server.server_address[1]
+        thread = threading.Thread(target=self._server.serve_forever, name='webhook-server', daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None